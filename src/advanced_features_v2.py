@@ -10,6 +10,8 @@ import numpy as np
 import pandas as pd
 import pywt
 
+from src.features.rolling_kernels import rolling_fft_max_amplitude
+
 logger = logging.getLogger(__name__)
 
 
@@ -86,32 +88,8 @@ class AdvancedFeaturesV2:
             特徴量追加後のデータフレーム
         """
         try:
-            # 支配的な周期成分の振幅と位相を抽出
-
-            def get_fft_stats(x):
-                fft_vals = np.fft.fft(x)
-                fft_freq = np.fft.fftfreq(len(x))
-
-                # 正の周波数のみ
-                pos_mask = fft_freq > 0
-                fft_vals = fft_vals[pos_mask]
-                fft_freq = fft_freq[pos_mask]
-
-                if len(fft_vals) == 0:
-                    return 0, 0
-
-                # 最大振幅のインデックス
-                idx = np.argmax(np.abs(fft_vals))
-
-                max_amp = np.abs(fft_vals[idx])
-                # dominant_period = 1 / fft_freq[idx]
-
-                return max_amp
-
-            # ローリング適用 (計算コスト削減のため、ステップを大きくするか、重要なポイントのみ計算も検討)
-            # ここではシンプルにローリング適用
-
-            df[f"{column}_FFT_Amp"] = df[column].rolling(window=window).apply(get_fft_stats, raw=True)
+            # 正の周波数成分の最大振幅（全ウィンドウをまとめて rFFT）
+            df[f"{column}_FFT_Amp"] = rolling_fft_max_amplitude(df[column], window)
 
             return df
 
@@ -58,6 +58,8 @@ class AdvancedRiskManager:
         self.max_daily_loss_pct = rm_config.get("max_daily_loss_pct", at_config.get("max_daily_loss_pct", -3.0))
         self.market_crash_threshold = rm_config.get("market_crash_threshold", at_config.get("market_crash_threshold", -3.0))
         self.max_correlation = rm_config.get("max_correlation", at_config.get("max_correlation", 0.7))
+        # 運用サイクル中は MarketDataSnapshot が設定され、価格の再取得を避ける
+        self.market_snapshot = None
         self._max_position_size = rm_config.get("max_position_size", at_config.get("max_position_size", 0.1))
         self._stop_loss_pct = rm_config.get("stop_loss_pct", at_config.get("stop_loss_pct", 0.05))
         self._var_confidence = rm_config.get("var_confidence", at_config.get("var_confidence", 0.95))
@@ -211,7 +213,10 @@ class AdvancedRiskManager:
         try:
             # 価格データを取得
             # fetch_stock_data は Dict[ticker, DataFrame] を返す想定
-            data_map = fetch_stock_data(unique_tickers, period="3mo")  # 3ヶ月分のデータを使用
+            if self.market_snapshot is not None:
+                data_map = self.market_snapshot.get_many(unique_tickers, period="3mo")
+            else:
+                data_map = fetch_stock_data(unique_tickers, period="3mo")  # 3ヶ月分のデータを使用
         except Exception as e:
             logger.error(f"相関チェックのためのデータ取得に失敗: {e}")
             # データ取得失敗時は、リスクをとって許可する（テストの意図）
@@ -226,9 +231,8 @@ class AdvancedRiskManager:
         returns_map = {}
         for tkr, df in data_map.items():
             if df is not None and not df.empty and "Close" in df.columns:
-                # 終値リターン
-                df["Return"] = df["Close"].pct_change()
-                returns_map[tkr] = df["Return"].dropna()
+                # 終値リターン（渡されたフレームは共有データなので列を追加しない）
+                returns_map[tkr] = df["Close"].pct_change().dropna()
             else:
                 logger.warning(f"No valid price data for {tkr}")
                 returns_map[tkr] = pd.Series(dtype=float)  # 空のSeries
@@ -4,6 +4,7 @@ RESTful API for external system integration
 """
 
 import logging
+import math
 import time
 from contextlib import asynccontextmanager
 from typing import Any, Dict, List, Optional
@@ -15,6 +16,13 @@ from pydantic import BaseModel, Field
 
 from src.config_loader import config, get_api_config, get_security_config
 from src.database_manager import db_manager
+from src.utils.rate_limiter import (
+    GCRALimiter,
+    MemoryRateLimitStore,
+    RateLimitConfig,
+    RouteRateLimiter,
+    SQLiteRateLimitStore,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -130,29 +138,47 @@ class PredictionResponse(BaseModel):
     timestamp: str
 
 
-request_counts: Dict[str, float] = {}
+def _build_rate_limiter() -> RouteRateLimiter:
+    """security.rate_limit 設定からレートリミッターを構築"""
+    settings = get_security_config().get("rate_limit", {})
+    per_minute = int(settings.get("requests_per_minute", 60))
+    default = RateLimitConfig(max_calls=per_minute, time_window=60, name="api", burst=settings.get("burst"))
+    routes = {
+        prefix: RateLimitConfig(
+            max_calls=int(route.get("requests_per_minute", per_minute)),
+            time_window=60,
+            name=prefix,
+            burst=route.get("burst"),
+        )
+        for prefix, route in settings.get("routes", {}).items()
+    }
+
+    # 複数ワーカー構成では SQLite バックエンドでバケットを共有する
+    if settings.get("backend") == "sqlite":
+        store = SQLiteRateLimitStore(settings.get("db_path", "data/rate_limits.db"))
+    else:
+        store = MemoryRateLimitStore(max_keys=int(settings.get("max_clients", 10000)))
+    return RouteRateLimiter(default, routes, GCRALimiter(store))
+
+
+rate_limiter = _build_rate_limiter()
 
 
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
     """レート制限ミドルウェア"""
-    client_ip = request.client.host
-    current_time = time.time()
-    window = 60
-
-    if client_ip not in request_counts:
-        request_counts[client_ip] = []
-
-    request_counts[client_ip] = [t for t in request_counts[client_ip] if current_time - t < window]
+    client_ip = request.client.host if request.client else "unknown"
+    decision = rate_limiter.check(client_ip, request.url.path)
 
-    if len(request_counts[client_ip]) >= 60:
+    if not decision.allowed:
         return JSONResponse(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             content={"error": "Rate limit exceeded"},
+            headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))},
         )
 
-    request_counts[client_ip].append(current_time)
     response = await call_next(request)
+    response.headers["X-RateLimit-Remaining"] = str(decision.remaining)
     return response
 
 
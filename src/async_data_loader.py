@@ -5,17 +5,25 @@ asyncioとaiohttpを使用して、複数銘柄のデータを並列取得しま
 Streamlitの同期的な実行環境でも使用できるよう、同期ラッパー関数も提供します。
 """
 
+from __future__ import annotations
+
 import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-import aiohttp
 import nest_asyncio
 import pandas as pd
-import yfinance as yf
 
 from src.data_manager import DataManager
+from src.utils.lazy_imports import LazyImporter, LazyModule
+
+if not LazyImporter.is_available("aiohttp"):
+    raise ImportError("aiohttp is required for AsyncDataLoader")
+
+# 実際の取得時まで読み込まない（起動時間短縮）
+aiohttp = LazyModule("aiohttp")
+yf = LazyModule("yfinance")
 
 # Streamlit環境でもasyncioを使えるようにする
 nest_asyncio.apply()
@@ -2,10 +2,27 @@
 BERT Sentiment Analysis Module
 
 Uses Hugging Face Transformers and FinBERT to analyze sentiment of financial news.
+
+Texts are scored in batches with dynamic padding (each batch is padded only to its
+longest member, and texts are length-sorted first). Scores are cached on disk keyed
+by a hash of the normalized text, so a headline seen in an earlier scan is never
+re-scored. An int8-quantized ONNX export of the model can be used for CPU inference.
 """
 
+import hashlib
 import logging
-from typing import Dict
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.config_loader import get_config
+from src.paths import MODELS_DIR, SENTIMENT_CACHE_DB
+from src.utils.onnx_optimizer import ONNX_AVAILABLE, ONNXModelOptimizer
 
 try:
     import torch
@@ -14,30 +31,156 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# ProsusAI/finbert config: id2label = {0: 'positive', 1: 'negative', 2: 'neutral'}
+FINBERT_LABELS = ("positive", "negative", "neutral")
+ONNX_MODEL_NAME = "finbert_int8"
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a headline for cache lookups (NFKC, lower case, collapsed whitespace)."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip().lower()
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class SentimentCache:
+    """Persistent sentiment score cache keyed by model and normalized text hash."""
+
+    def __init__(self, db_path: str = str(SENTIMENT_CACHE_DB)):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS headline_sentiment (
+                    key TEXT PRIMARY KEY,
+                    score REAL NOT NULL,
+                    label TEXT NOT NULL,
+                    positive REAL,
+                    negative REAL,
+                    neutral REAL,
+                    created_at TEXT
+                )
+                """)
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha1(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Dict]:
+        if not keys:
+            return {}
+        found = {}
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            # SQLite limits bound parameters per statement
+            for i in range(0, len(keys), 500):
+                part = list(keys[i : i + 500])
+                rows = conn.execute(
+                    "SELECT key, score, label, positive, negative, neutral FROM headline_sentiment "
+                    f"WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, score, label, pos, neg, neu in rows:
+                    found[key] = {
+                        "score": score,
+                        "label": label,
+                        "probabilities": {"positive": pos, "negative": neg, "neutral": neu},
+                    }
+        return found
+
+    def put_many(self, results: Dict[str, Dict]):
+        if not results:
+            return
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                key,
+                r["score"],
+                r["label"],
+                r["probabilities"]["positive"],
+                r["probabilities"]["negative"],
+                r["probabilities"]["neutral"],
+                now,
+            )
+            for key, r in results.items()
+        ]
+        with self._lock, sqlite3.connect(self.db_path) as conn:
+            conn.executemany("INSERT OR REPLACE INTO headline_sentiment VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def __len__(self) -> int:
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM headline_sentiment").fetchone()[0]
+
 
 class BERTSentimentAnalyzer:
     """
     BERT Sentiment Analyzer using FinBERT
     """
 
-    def __init__(self, model_name: str = "ProsusAI/finbert"):
+    def __init__(
+        self,
+        model_name: str = "ProsusAI/finbert",
+        batch_size: int = 16,
+        max_length: int = 512,
+        use_onnx: bool = False,
+        cache_path: Optional[str] = str(SENTIMENT_CACHE_DB),
+    ):
+        """
+        Args:
+            model_name: Hugging Face model name
+            batch_size: Texts per forward pass in analyze_batch
+            max_length: Truncation length in tokens (batches are padded to their longest text only)
+            use_onnx: Use the int8-quantized ONNX export (models/finbert_int8.onnx) when it exists
+            cache_path: SQLite file for the persistent score cache (None disables caching)
+        """
         self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.use_onnx = use_onnx
         self.tokenizer = None
         self.model = None
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.onnx_session = None
+        self.labels = FINBERT_LABELS
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu") if torch else None
         self.is_ready = False
+        self.cache = SentimentCache(cache_path) if cache_path else None
+        self.stats = {"scored": 0, "cache_hits": 0, "batches": 0}
 
         self._load_model()
 
     def _load_model(self):
-        """Load tokenizer and model from Hugging Face"""
+        """Load tokenizer and model (ONNX Runtime session or PyTorch) from Hugging Face"""
         try:
-            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+            from transformers import AutoTokenizer
 
-            logger.info(f"Loading BERT model: {self.model_name} on {self.device}...")
             self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+
+            if self.use_onnx:
+                self.onnx_session = ONNXModelOptimizer().get_session(ONNX_MODEL_NAME)
+                if self.onnx_session is not None:
+                    self.is_ready = True
+                    logger.info(f"BERT model loaded from ONNX ({ONNX_MODEL_NAME}).")
+                    return
+                logger.info("ONNX model not available; falling back to PyTorch.")
+
+            if torch is None:
+                logger.error("torch not found. BERT sentiment falls back to keyword scoring.")
+                return
+
+            from transformers import AutoModelForSequenceClassification
+
+            logger.info(f"Loading BERT model: {self.model_name} on {self.device}...")
             self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name).to(self.device)
             self.model.eval()
+            id2label = getattr(self.model.config, "id2label", None) or {}
+            if id2label and {str(v).lower() for v in id2label.values()} == set(FINBERT_LABELS):
+                self.labels = tuple(str(id2label[i]).lower() for i in range(len(id2label)))
             self.is_ready = True
             logger.info("BERT model loaded successfully.")
 
@@ -56,55 +199,154 @@ class BERTSentimentAnalyzer:
         Returns:
             Dictionary with 'score' (-1.0 to 1.0) and 'label' (positive/negative/neutral)
         """
-        if not self.is_ready or not text:
-            return self._fallback_analyze(text)
-
-        try:
-            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=512).to(
-                self.device
-            )
-
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                probabilities = torch.nn.functional.softmax(outputs.logits, dim=-1)
-
-            # FinBERT labels: [positive, negative, neutral] -> check model config usually
-            # ProsusAI/finbert labels are: 0: positive, 1: negative, 2: neutral (Wait, need to verify)
-            # Actually ProsusAI/finbert config: id2label: {0: 'positive', 1: 'negative', 2: 'neutral'}
+        return self.analyze_batch([text])[0]
 
-            scores = probabilities.cpu().numpy()[0]
+    def analyze_batch(self, texts: Sequence[str], batch_size: Optional[int] = None) -> List[Dict[str, float]]:
+        """
+        Analyze sentiment of many texts.
 
-            # Map to scalar score (-1 to 1)
-            # Positive * 1 + Negative * -1 + Neutral * 0
-            # Note: Verify label indices. Usually standard FinBERT is pos, neg, neu
+        Cached texts are served from the cache; duplicates (after normalization) are scored
+        once; the rest are length-sorted and run through the model in batches.
 
-            # Let's assume standard mapping for FinBERT
-            # 0: positive, 1: negative, 2: neutral
-            pos_score = scores[0]
-            neg_score = scores[1]
-            neu_score = scores[2]
+        Returns:
+            One result dict per input text, in input order (same format as ``analyze``)
+        """
+        results: List[Optional[Dict]] = [None] * len(texts)
+        if not self.is_ready:
+            return [self._fallback_analyze(t) for t in texts]
+
+        keys = {}
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                results[i] = self._fallback_analyze(text)
+            else:
+                keys.setdefault(SentimentCache.make_key(self.model_name, text), []).append(i)
+
+        cached: Dict[str, Dict] = {}
+        if self.cache is not None:
+            try:
+                cached = self.cache.get_many(list(keys))
+            except Exception as e:
+                # A cache problem (e.g. "database is locked") must not stop the analysis; score everything
+                logger.warning(f"Sentiment cache read failed: {e}")
+        self.stats["cache_hits"] += sum(len(keys[k]) for k in cached)
+        misses = [k for k in keys if k not in cached]
+
+        scored: Dict[str, Dict] = {}
+        if misses:
+            try:
+                miss_texts = [texts[keys[k][0]] for k in misses]
+                for key, result in zip(misses, self._score(miss_texts, batch_size or self.batch_size)):
+                    scored[key] = result
+            except Exception as e:
+                logger.error(f"Error during BERT analysis: {e}")
+                for key in misses:
+                    scored[key] = self._fallback_analyze(texts[keys[key][0]])
+            else:
+                if self.cache is not None:
+                    try:
+                        self.cache.put_many(scored)
+                    except Exception as e:
+                        logger.warning(f"Sentiment cache write failed: {e}")
+
+        for key, indices in keys.items():
+            result = cached.get(key) or scored[key]
+            for i in indices:
+                results[i] = dict(result)
+        return results
+
+    def _score(self, texts: List[str], batch_size: int) -> List[Dict]:
+        """Run the model over texts in length-sorted batches; returns results in input order."""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        probabilities = np.zeros((len(texts), len(self.labels)), dtype=np.float64)
+
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start : start + batch_size]
+            batch = [texts[i] for i in batch_idx]
+            probabilities[batch_idx] = self._predict_proba(batch)
+            self.stats["batches"] += 1
+
+        self.stats["scored"] += len(texts)
+        return [self._to_result(p) for p in probabilities]
+
+    def _predict_proba(self, batch: List[str]) -> np.ndarray:
+        if self.onnx_session is not None:
+            inputs = self.tokenizer(
+                batch, return_tensors="np", truncation=True, padding="longest", max_length=self.max_length
+            )
+            feed_names = {i.name for i in self.onnx_session.get_inputs()}
+            feed = {name: value.astype(np.int64) for name, value in inputs.items() if name in feed_names}
+            logits = self.onnx_session.run(None, feed)[0]
+            return _softmax(np.asarray(logits, dtype=np.float64))
+
+        inputs = self.tokenizer(
+            batch, return_tensors="pt", truncation=True, padding="longest", max_length=self.max_length
+        ).to(self.device)
+        with torch.no_grad():
+            outputs = self.model(**inputs)
+            probabilities = torch.nn.functional.softmax(outputs.logits, dim=-1)
+        return probabilities.cpu().numpy()
+
+    def _to_result(self, scores: np.ndarray) -> Dict:
+        probs = dict(zip(self.labels, (float(s) for s in scores)))
+        pos_score = probs.get("positive", 0.0)
+        neg_score = probs.get("negative", 0.0)
+        neu_score = probs.get("neutral", 0.0)
+
+        # Map to scalar score (-1 to 1): Positive * 1 + Negative * -1 + Neutral * 0
+        compound_score = pos_score - neg_score
 
-            compound_score = pos_score - neg_score
+        label = "neutral"
+        if compound_score > 0.1:
+            label = "positive"
+        elif compound_score < -0.1:
+            label = "negative"
 
-            label = "neutral"
-            if compound_score > 0.1:
-                label = "positive"
-            elif compound_score < -0.1:
-                label = "negative"
+        return {
+            "score": float(compound_score),
+            "label": label,
+            "probabilities": {"positive": pos_score, "negative": neg_score, "neutral": neu_score},
+        }
 
-            return {
-                "score": float(compound_score),
-                "label": label,
-                "probabilities": {
-                    "positive": float(pos_score),
-                    "negative": float(neg_score),
-                    "neutral": float(neu_score),
-                },
-            }
+    def export_onnx(self, quantize: bool = True) -> Optional[str]:
+        """
+        Export the loaded PyTorch model to models/finbert_int8.onnx (dynamic int8 quantization).
 
-        except Exception as e:
-            logger.error(f"Error during BERT analysis: {e}")
-            return self._fallback_analyze(text)
+        Returns:
+            Path of the exported model, or None when torch/onnxruntime are unavailable
+        """
+        if self.model is None or torch is None or not ONNX_AVAILABLE:
+            logger.warning("ONNX export requires the PyTorch model, torch and onnxruntime.")
+            return None
+
+        MODELS_DIR.mkdir(parents=True, exist_ok=True)
+        fp32_path = MODELS_DIR / f"{ONNX_MODEL_NAME}_fp32.onnx"
+        out_path = MODELS_DIR / f"{ONNX_MODEL_NAME}.onnx"
+
+        sample = self.tokenizer(["sample headline"], return_tensors="pt", padding="longest").to(self.device)
+        input_names = list(sample.keys())
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        torch.onnx.export(
+            self.model,
+            tuple(sample[name] for name in input_names),
+            str(fp32_path),
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+        if quantize:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(str(fp32_path), str(out_path), weight_type=QuantType.QInt8)
+            fp32_path.unlink()
+        else:
+            fp32_path.replace(out_path)
+
+        logger.info(f"Exported FinBERT to {out_path}")
+        return str(out_path)
 
     def _fallback_analyze(self, text: str) -> Dict[str, float]:
         """Simple dictionary-based fallback"""
@@ -137,10 +379,27 @@ class BERTSentimentAnalyzer:
 
 # Singleton instance
 _bert_analyzer = None
+_bert_lock = threading.Lock()
 
 
 def get_bert_analyzer() -> BERTSentimentAnalyzer:
+    """Process-wide analyzer (the model is loaded once). Settings come from ``ai.sentiment``."""
     global _bert_analyzer
     if _bert_analyzer is None:
-        _bert_analyzer = BERTSentimentAnalyzer()
+        with _bert_lock:
+            if _bert_analyzer is None:
+                config = get_config("ai.sentiment", {}) or {}
+                _bert_analyzer = BERTSentimentAnalyzer(
+                    batch_size=config.get("batch_size", 16),
+                    max_length=config.get("max_length", 512),
+                    use_onnx=config.get("use_onnx", False),
+                    cache_path=config.get("cache_path", str(SENTIMENT_CACHE_DB)),
+                )
     return _bert_analyzer
+
+
+def reset_bert_analyzer():
+    """Drop the process-wide analyzer so its model can be freed; the next get_bert_analyzer() reloads it."""
+    global _bert_analyzer
+    with _bert_lock:
+        _bert_analyzer = None
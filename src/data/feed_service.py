@@ -0,0 +1,329 @@
+"""
+RSS/ニュースフィードの共通取得サービス
+
+SentimentAnalyzer / NewsAggregator / NewsCollector がそれぞれ feedparser.parse(url) で
+フィードを1本ずつ、毎回全文ダウンロードしていたのを1か所にまとめる。
+
+- 全フィードをスレッドプールで並行取得
+- ETag / Last-Modified による条件付きGET（304 なら再ダウンロード・再パースしない）
+- 記事は URL（トラッキング用パラメータ・フラグメント除去）のハッシュで重複排除して SQLite に保存。
+  タイトルでの重複排除（別ソースの同一記事）は ``title_window_hours`` 以内に保存した記事に限る
+  （"日経平均、反発" のような毎日同じ見出しの記事を取りこぼさないため）
+- 記事には追加順の連番があり、``new_articles(consumer)`` で利用者ごとに未処理の記事だけを取り出せる
+
+Example:
+    service = get_feed_service()
+    result = service.fetch({"yahoo": "https://...", "marketwatch": "https://..."}, per_feed_limit=10)
+    result["articles"]        # フィード順・新しい順の記事（304 のフィードは保存済みの記事）
+    result["new_count"]       # 今回新たに保存された記事数
+    service.new_articles("sentiment")   # sentiment がまだ処理していない記事
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import feedparser
+import requests
+
+from src.paths import NEWS_STORE_DB
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "AGStock/3.0 (+feed-service)"
+
+# 記事の同一性に関係しないクエリパラメータ（?id=123 などは残す）
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ncid", "cmpid")
+
+
+def article_key(link: str) -> str:
+    """URL からトラッキング用パラメータとフラグメントを除いたハッシュ"""
+    parts = urlsplit((link or "").strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), urlencode(query), ""))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def title_key(title: str) -> str:
+    """空白・大文字小文字を正規化したタイトルのハッシュ（別ソースの同一記事の検出用）"""
+    return hashlib.sha1(re.sub(r"\s+", " ", (title or "")).strip().lower().encode("utf-8")).hexdigest()
+
+
+def _http_get(url: str, headers: Dict[str, str], timeout: float) -> requests.Response:
+    return requests.get(url, headers=headers, timeout=timeout)
+
+
+class FeedService:
+    """並行・条件付きGET・記事ストア付きのフィード取得"""
+
+    def __init__(
+        self,
+        db_path: str = str(NEWS_STORE_DB),
+        max_workers: int = 8,
+        timeout: float = 10.0,
+        http_get: Optional[Callable[[str, Dict[str, str], float], Any]] = None,
+        title_window_hours: float = 12.0,
+    ):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.title_window_hours = title_window_hours  # 同じ見出しを別記事とみなさない期間
+        self._http_get = http_get or _http_get
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "not_modified": 0, "errors": 0, "new_articles": 0}
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            self._migrate_title_unique(conn)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url_hash TEXT NOT NULL UNIQUE,
+                    title_hash TEXT NOT NULL,
+                    feed_url TEXT NOT NULL,
+                    source TEXT,
+                    title TEXT,
+                    link TEXT,
+                    published TEXT,
+                    summary TEXT,
+                    fetched_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_articles_feed_seq ON articles(feed_url, seq);
+                CREATE INDEX IF NOT EXISTS idx_articles_title ON articles(title_hash, fetched_at);
+                CREATE TABLE IF NOT EXISTS feed_state (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    last_status INTEGER,
+                    last_fetched TEXT
+                );
+                CREATE TABLE IF NOT EXISTS consumer_cursor (
+                    consumer TEXT PRIMARY KEY,
+                    last_seq INTEGER NOT NULL
+                );
+                """)
+
+    @staticmethod
+    def _migrate_title_unique(conn: sqlite3.Connection):
+        """旧スキーマ（title_hash が UNIQUE）のテーブルを作り直す。seq は保持する"""
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'articles'").fetchone()
+        if not row or "title_hash TEXT NOT NULL UNIQUE" not in row[0]:
+            return
+        logger.info("Migrating news article store: title dedup becomes time-windowed")
+        conn.execute("ALTER TABLE articles RENAME TO articles_old")
+        conn.execute("DROP INDEX IF EXISTS idx_articles_feed_seq")
+        conn.execute(row[0].replace("title_hash TEXT NOT NULL UNIQUE", "title_hash TEXT NOT NULL"))
+        conn.execute("INSERT INTO articles SELECT * FROM articles_old")
+        conn.execute("DROP TABLE articles_old")
+
+    # ------------------------------------------------------------------
+    # 取得
+    # ------------------------------------------------------------------
+    def fetch(self, feeds: Union[Mapping[str, str], Iterable[str]], per_feed_limit: int = 10) -> Dict[str, Any]:
+        """
+        フィードを並行に取得して記事ストアを更新する
+
+        Args:
+            feeds: {source名: URL} または URL のリスト（source名は URL）
+            per_feed_limit: フィードごとに返す記事数
+
+        Returns:
+            {"articles": [...], "new_count": int, "feeds": {url: {"status", "new", "seconds"}}}
+        """
+        feed_map = dict(feeds) if isinstance(feeds, Mapping) else {url: url for url in feeds}
+        if not feed_map:
+            return {"articles": [], "new_count": 0, "feeds": {}}
+
+        with self._connect() as conn:
+            states = {
+                row[0]: {"etag": row[1], "last_modified": row[2]}
+                for row in conn.execute("SELECT url, etag, last_modified FROM feed_state")
+            }
+
+        workers = min(self.max_workers, len(feed_map))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feed") as pool:
+            futures = {
+                url: pool.submit(self._fetch_one, source, url, states.get(url, {}), per_feed_limit)
+                for source, url in feed_map.items()
+            }
+            feed_results = {url: future.result() for url, future in futures.items()}
+
+        articles = []
+        with self._connect() as conn:
+            for url in feed_map.values():
+                articles.extend(self._recent(conn, url, per_feed_limit))
+
+        new_count = sum(r["new"] for r in feed_results.values())
+        return {"articles": articles, "new_count": new_count, "feeds": feed_results}
+
+    def _fetch_one(self, source: str, url: str, state: Dict[str, str], limit: int) -> Dict[str, Any]:
+        start = time.perf_counter()
+        headers = {"User-Agent": USER_AGENT}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+        try:
+            response = self._http_get(url, headers, self.timeout)
+            self._count("requests")
+        except Exception as e:
+            logger.warning(f"Error fetching feed {url}: {e}")
+            self._count("errors")
+            return {"status": None, "new": 0, "seconds": time.perf_counter() - start, "error": str(e)}
+
+        status = response.status_code
+        new = 0
+        if status == 304:
+            self._count("not_modified")
+        elif status == 200:
+            parsed = feedparser.parse(response.content)
+            new = self._store(source, url, parsed.entries[:limit])
+            self._count("new_articles", new)
+        else:
+            logger.warning(f"Feed {url} returned HTTP {status}")
+            self._count("errors")
+
+        etag = response.headers.get("ETag") if status == 200 else state.get("etag")
+        last_modified = response.headers.get("Last-Modified") if status == 200 else state.get("last_modified")
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO feed_state (url, etag, last_modified, last_status, last_fetched) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (url, etag, last_modified, status, datetime.now().isoformat()),
+            )
+        return {"status": status, "new": new, "seconds": time.perf_counter() - start}
+
+    def _store(self, source: str, url: str, entries: List[Any]) -> int:
+        """記事を保存（重複は無視）し、新規保存数を返す。フィードは新しい順なので古い方から入れる"""
+        now_dt = datetime.now()
+        now = now_dt.isoformat()
+        title_cutoff = (now_dt - timedelta(hours=self.title_window_hours)).isoformat()
+        rows = []
+        for entry in reversed(entries):
+            title = entry.get("title", "")
+            link = entry.get("link", "")
+            if not title and not link:
+                continue
+            rows.append(
+                (
+                    article_key(link or title),
+                    title_key(title or link),
+                    url,
+                    source,
+                    title,
+                    link,
+                    entry.get("published", entry.get("updated", now)),
+                    entry.get("summary", ""),
+                    now,
+                )
+            )
+        if not rows:
+            return 0
+        with self._lock, self._connect() as conn:
+            before = conn.total_changes
+            for row in rows:
+                recent_title = conn.execute(
+                    "SELECT 1 FROM articles WHERE title_hash = ? AND fetched_at >= ? LIMIT 1", (row[1], title_cutoff)
+                ).fetchone()
+                if recent_title:
+                    continue  # 直近に別ソースから同じ見出しを保存済み
+                conn.execute(
+                    "INSERT OR IGNORE INTO articles (url_hash, title_hash, feed_url, source, title, link, published, "
+                    "summary, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+            return conn.total_changes - before
+
+    @staticmethod
+    def _row_to_article(row) -> Dict[str, Any]:
+        seq, source, title, link, published, summary = row
+        return {"seq": seq, "source": source, "title": title, "link": link, "published": published, "summary": summary}
+
+    def _recent(self, conn: sqlite3.Connection, url: str, limit: int) -> List[Dict[str, Any]]:
+        rows = conn.execute(
+            "SELECT seq, source, title, link, published, summary FROM articles WHERE feed_url = ? "
+            "ORDER BY seq DESC LIMIT ?",
+            (url, limit),
+        ).fetchall()
+        return [self._row_to_article(r) for r in rows]
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    # ------------------------------------------------------------------
+    # 利用者ごとの未処理記事
+    # ------------------------------------------------------------------
+    def new_articles(
+        self,
+        consumer: str,
+        limit: Optional[int] = None,
+        advance: bool = True,
+        feeds: Optional[Iterable[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        consumer がまだ受け取っていない記事を古い順に返す
+
+        Args:
+            consumer: 利用者名（例: "sentiment"）
+            limit: 最大件数
+            advance: True なら返した記事まで既読位置を進める
+            feeds: 指定したフィード URL の記事だけを返す（他のフィードの記事は読み飛ばす）
+        """
+        feed_urls = list(feeds) if feeds is not None else None
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT last_seq FROM consumer_cursor WHERE consumer = ?", (consumer,)).fetchone()
+            last_seq = row[0] if row else 0
+            query = "SELECT seq, source, title, link, published, summary FROM articles WHERE seq > ?"
+            params: List[Any] = [last_seq]
+            if feed_urls is not None:
+                query += f" AND feed_url IN ({', '.join('?' * len(feed_urls))})"
+                params.extend(feed_urls)
+            query += " ORDER BY seq"
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(limit)
+            articles = [self._row_to_article(r) for r in conn.execute(query, params).fetchall()]
+
+            if limit is not None and len(articles) == limit:
+                new_seq = articles[-1]["seq"]
+            else:
+                # 対象外のフィードの記事も読み飛ばしたことにする
+                new_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM articles").fetchone()[0]
+            if advance and new_seq > last_seq:
+                conn.execute(
+                    "INSERT OR REPLACE INTO consumer_cursor (consumer, last_seq) VALUES (?, ?)", (consumer, new_seq)
+                )
+        return articles
+
+    def article_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+# シングルトン
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_feed_service() -> FeedService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = FeedService()
+    return _service
@@ -0,0 +1,153 @@
+"""
+サイクル単位のマーケットデータスナップショット
+
+1回の運用サイクルで PaperTrader / PositionManager / MarketScanner / AdvancedRiskManager が
+同じ銘柄の価格を別々の期間で取得し直していたのを、サイクル開始時に最大期間で1回だけ
+取得して各コンポーネントに読み取り専用のビューとして配る。
+
+- ``load(tickers)`` で未取得の銘柄だけを一括取得（1銘柄につき1サイクル1回）
+- ``get_many(tickers, period)`` は ``fetch_stock_data`` と同じ形の辞書を返す
+  （期間はスナップショットから切り出すだけでコピーしない）
+- 配るフレームの値は書き込み禁止（ndarray を read-only にしている）。
+  列の追加は呼び出し側のフレームだけに効くが、既存の値を書き換える場合は ``copy()`` すること
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERIOD = "2y"
+
+
+def _default_fetcher(tickers: List[str], period: str) -> Dict[str, pd.DataFrame]:
+    # 呼び出し時に参照する（テストでの差し替えと循環インポート回避のため）
+    from src.data_loader import fetch_stock_data
+
+    return fetch_stock_data(tickers, period=period)
+
+
+def _period_start(period: str) -> datetime:
+    from src.data_loader import parse_period
+
+    return parse_period(period)
+
+
+def _freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """数値列を書き込み禁止の1ブロックにまとめた DataFrame を返す"""
+    if df is None or df.empty:
+        return df
+    numeric = df.select_dtypes(include=[np.number])
+    if numeric.shape[1] != df.shape[1]:
+        return df  # 非数値列を含むフレームはそのまま
+    values = numeric.to_numpy(dtype=np.float64, copy=True)
+    values.flags.writeable = False
+    return pd.DataFrame(values, index=df.index, columns=df.columns, copy=False)
+
+
+class MarketDataSnapshot:
+    """
+    1サイクル分の価格データ
+
+    Example:
+        snapshot = MarketDataSnapshot()
+        snapshot.load(held + universe)               # 最大期間で1回だけ取得
+        data_map = snapshot.get_many(held, "1mo")    # 直近1か月のビュー
+        snapshot.get_stats()
+    """
+
+    def __init__(
+        self,
+        period: str = DEFAULT_PERIOD,
+        fetcher: Optional[Callable[[List[str], str], Dict[str, pd.DataFrame]]] = None,
+    ):
+        self.period = period
+        self._fetcher = fetcher or _default_fetcher
+        self._frames: Dict[str, Optional[pd.DataFrame]] = {}
+        self._starts: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.created_at = time.time()
+        self.stats = {"fetch_calls": 0, "tickers_loaded": 0, "load_seconds": 0.0, "hits": 0, "misses": 0}
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._frames
+
+    def load(self, tickers: Iterable[str], period: Optional[str] = None) -> None:
+        """未取得（または期間が足りない）銘柄だけをまとめて取得する"""
+        period = period or self.period
+        start = _period_start(period)
+        with self._lock:
+            missing = []
+            for ticker in dict.fromkeys(t for t in tickers if t):
+                if ticker not in self._frames or self._starts[ticker] > start:
+                    missing.append(ticker)
+            if not missing:
+                return
+
+            t0 = time.perf_counter()
+            try:
+                data_map = self._fetcher(missing, period) or {}
+            except Exception as e:
+                logger.warning(f"Snapshot load failed for {len(missing)} tickers: {e}")
+                data_map = {}
+            self.stats["fetch_calls"] += 1
+            self.stats["tickers_loaded"] += len(missing)
+            self.stats["load_seconds"] += time.perf_counter() - t0
+
+            for ticker in missing:
+                # 取得できなかった銘柄も記録し、同じサイクル内で再取得しない
+                self._frames[ticker] = _freeze(data_map.get(ticker))
+                self._starts[ticker] = start
+
+    def get(self, ticker: str, period: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """1銘柄のビュー（period 省略時はスナップショット全期間）"""
+        return self.get_many([ticker], period).get(ticker)
+
+    def get_many(self, tickers: Iterable[str], period: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+        """``fetch_stock_data(tickers, period)`` の代わりに使えるビューの辞書"""
+        tickers = [t for t in dict.fromkeys(tickers) if t]
+        start = _period_start(period) if period else None
+        need = start if start is not None and start < _period_start(self.period) else None
+
+        with self._lock:
+            missing = [t for t in tickers if t not in self._frames or (need is not None and self._starts[t] > need)]
+            self.stats["hits"] += len(tickers) - len(missing)
+            self.stats["misses"] += len(missing)
+        if missing:
+            self.load(missing, period if need is not None else self.period)
+
+        result: Dict[str, pd.DataFrame] = {}
+        for ticker in tickers:
+            df = self._frames.get(ticker)
+            if df is None or df.empty:
+                continue
+            result[ticker] = self._slice(df, start)
+        return result
+
+    @staticmethod
+    def _slice(df: pd.DataFrame, start: Optional[datetime]) -> pd.DataFrame:
+        """start 以降の行を新しい DataFrame として返す（凍結済みならメモリは共有）"""
+        pos = 0
+        if start is not None and isinstance(df.index, pd.DatetimeIndex):
+            ts = pd.Timestamp(start)
+            if df.index.tz is not None:
+                ts = ts.tz_localize(df.index.tz)
+            pos = int(df.index.searchsorted(ts, side="left"))
+
+        values = df.to_numpy()
+        if values.flags.writeable:
+            return df.iloc[pos:].copy()  # 凍結できなかったフレームはコピーで保護
+        # スライスではなく独立したフレームにするので、呼び出し側が列を追加しても警告も副作用もない
+        return pd.DataFrame(values[pos:], index=df.index[pos:], columns=df.columns, copy=False)
+
+    def get_stats(self) -> Dict[str, float]:
+        stats = dict(self.stats)
+        stats["tickers"] = len(self._frames)
+        stats["load_seconds"] = round(stats["load_seconds"], 3)
+        return stats
@@ -3,7 +3,7 @@ import statistics
 from typing import Dict, Any
 from src.news_collector import NewsCollector
 from src.social_sentiment import SocialSentimentEngine
-from src.bert_sentiment import BERTSentimentAnalyzer
+from src.bert_sentiment import get_bert_analyzer
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +17,7 @@ class SentimentCorrelator:
     def __init__(self):
         self.news_collector = NewsCollector()
         self.social_engine = SocialSentimentEngine()
-        self.analyzer = BERTSentimentAnalyzer()
+        self.analyzer = get_bert_analyzer()
 
     def get_correlation_report(self, ticker: str) -> Dict[str, Any]:
         """
@@ -25,10 +25,7 @@ class SentimentCorrelator:
         """
         # 1. Get News Sentiment
         news = self.news_collector.fetch_news_for_ticker(ticker, limit=10)
-        news_scores = []
-        for n in news:
-            res = self.analyzer.analyze(n["title"])
-            news_scores.append(res["score"])
+        news_scores = [res["score"] for res in self.analyzer.analyze_batch([n["title"] for n in news])]
 
         avg_news_sentiment = statistics.mean(news_scores) if news_scores else 0.0
 
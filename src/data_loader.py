@@ -8,8 +8,6 @@ from datetime import datetime, timedelta
 from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Sequence, TypeVar, Union
 
 import pandas as pd
-import streamlit as st
-import yfinance as yf
 
 from .constants import (
     CRYPTO_PAIRS,
@@ -26,6 +24,10 @@ from .constants import (
 from .data_manager import DataManager
 from .data_quality_guard import evaluate_dataframe
 from .helpers import retry_with_backoff
+from .utils.lazy_imports import LazyModule, lazy_cache_data
+
+# streamlit / yfinance は初回利用時に読み込む（起動時間短縮）
+yf = LazyModule("yfinance")
 
 logger = logging.getLogger(__name__)
 
@@ -406,7 +408,7 @@ def _sanitize_price_history(df: pd.DataFrame) -> pd.DataFrame:
     return clean
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@lazy_cache_data(ttl=3600, show_spinner=False)
 @retry_with_backoff(retries=3, backoff_in_seconds=2)
 def fetch_stock_data(
     tickers: Sequence[str],
@@ -497,7 +499,7 @@ def get_latest_price(df: pd.DataFrame) -> float:
     return float(df["Close"].iloc[-1])
 
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@lazy_cache_data(ttl=3600, show_spinner=False)
 def fetch_macro_data(period: str = "2y") -> Dict[str, pd.DataFrame]:
     """Legacy macro data fetcher (kept for compatibility)."""
     return fetch_external_data(period)
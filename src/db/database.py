@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.ext.declarative import declarative_base
 import os
 
+from src.utils.db_utils import optimize_sqlite_connection
+
 # Ensure data directory exists
 DATA_DIR = os.path.join(os.getcwd(), "data")
 if not os.path.exists(DATA_DIR):
@@ -13,6 +15,14 @@ DATABASE_URL = f"sqlite:///{DB_PATH}"
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})  # Needed for SQLite with Streamlit
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL mode lets dashboard readers run while the scan logger is writing."""
+    optimize_sqlite_connection(dbapi_connection)
+    dbapi_connection.execute("PRAGMA busy_timeout=5000;")
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Scoped session for thread safety in Streamlit
 db_session = scoped_session(SessionLocal)
@@ -1,7 +1,9 @@
+from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from src.db.database import SessionLocal
 from src.db.models import MarketScan, TradeLog, CouncilVote, SystemEvent
+from src.db.write_buffer import WriteBuffer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,51 +12,66 @@ logger = logging.getLogger(__name__)
 class DatabaseManager:
     """
     High-level interface for database operations.
+
+    The ``log_*`` methods queue rows in a write-behind buffer instead of
+    committing each one; call ``flush()`` when rows must be visible at once.
     """
 
-    def __init__(self):
-        self.db: Session = SessionLocal()
+    def __init__(self, buffer_size: int = 500, flush_interval: float = 2.0, session_factory=None):
+        self.db: Session = (session_factory or SessionLocal)()
+        self.buffer = WriteBuffer(self.db.get_bind(), max_rows=buffer_size, flush_interval=flush_interval)
 
-    def log_scan(self, ticker: str, signal: int, confidence: float, reasoning: str, technicals: dict = None):
+    @staticmethod
+    def _now() -> datetime:
+        # Stamp rows when they are logged, not when the buffer is flushed
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def _queue(self, model, row: dict, kind: str) -> bool:
         try:
-            rsi = technicals.get("RSI") if technicals else None
-            sma_20 = technicals.get("SMA_20") if technicals else None
-            sma_50 = technicals.get("SMA_50") if technicals else None
-            scan = MarketScan(
+            row["timestamp"] = self._now()
+            self.buffer.add(model, row)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to log {kind}: {e}")
+            return False
+
+    def flush(self) -> int:
+        """Write any buffered log rows to the database."""
+        return self.buffer.flush()
+
+    def close(self):
+        self.buffer.close()
+        self.db.close()
+
+    def log_scan(self, ticker: str, signal: int, confidence: float, reasoning: str, technicals: dict = None):
+        technicals = technicals or {}
+        return self._queue(
+            MarketScan,
+            dict(
                 ticker=ticker,
                 signal=signal,
                 confidence=confidence,
                 reasoning=reasoning,
-                rsi=rsi,
-                sma_20=sma_20,
-                sma_50=sma_50,
-            )
-            self.db.add(scan)
-            self.db.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to log scan: {e}")
-            self.db.rollback()
-            return False
+                rsi=technicals.get("RSI"),
+                sma_20=technicals.get("SMA_20"),
+                sma_50=technicals.get("SMA_50"),
+            ),
+            "scan",
+        )
 
     def log_trade(
         self, ticker: str, action: str, price: float, quantity: float, strategy: str = "Manual", pnl: float = 0.0
     ):
-        try:
-            trade = TradeLog(
-                ticker=ticker, action=action, price=price, quantity=quantity, strategy_name=strategy, pnl=pnl
-            )
-            self.db.add(trade)
-            self.db.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to log trade: {e}")
-            self.db.rollback()
-            return False
+        return self._queue(
+            TradeLog,
+            dict(ticker=ticker, action=action, price=price, quantity=quantity, strategy_name=strategy, pnl=pnl),
+            "trade",
+        )
 
     def log_council_vote(self, ticker: str, vote_data: dict):
-        try:
-            vote = CouncilVote(
+        return self._queue(
+            CouncilVote,
+            dict(
                 ticker=ticker,
                 avatar_id=vote_data.get("id"),
                 avatar_name=vote_data.get("name"),
@@ -62,28 +79,16 @@ class DatabaseManager:
                 score=vote_data.get("score"),
                 stance=vote_data.get("stance"),
                 quote=vote_data.get("quote"),
-            )
-            self.db.add(vote)
-            self.db.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to log vote: {e}")
-            self.db.rollback()
-            return False
+            ),
+            "vote",
+        )
 
     def log_event(self, event_type: str, message: str, details: str = None):
-        try:
-            event = SystemEvent(event_type=event_type, message=message, details=details)
-            self.db.add(event)
-            self.db.commit()
-            return True
-        except Exception as e:
-            logger.error(f"Failed to log event: {e}")
-            self.db.rollback()
-            return False
+        return self._queue(SystemEvent, dict(event_type=event_type, message=message, details=details), "event")
 
     def get_strategy_performance(self) -> dict:
         """Calculates cumulative PnL for each strategy."""
+        self.flush()
         try:
             results = (
                 self.db.query(TradeLog.strategy_name, func.sum(TradeLog.pnl)).group_by(TradeLog.strategy_name).all()
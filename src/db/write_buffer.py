@@ -0,0 +1,152 @@
+"""
+Write-behind buffer for high-volume ORM logging.
+
+Rows are queued per table and written with one executemany INSERT per table
+inside a single transaction, so a full market scan costs a handful of commits
+instead of one fsync per row. The buffer flushes when it reaches
+``max_rows``, when ``flush_interval`` seconds have passed since the last
+flush, and at interpreter shutdown.
+
+If a batch fails, its rows are retried one by one so a single bad row does
+not take the rest of the batch with it. Rows that still fail are requeued for
+the next flush and dropped only after ``max_attempts`` tries.
+"""
+
+import atexit
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Buffers still alive at shutdown; held weakly so registering does not keep owners alive
+_live_buffers: "weakref.WeakSet[WriteBuffer]" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_live_buffers():
+    for buffer in list(_live_buffers):
+        buffer.close()
+
+
+class WriteBuffer:
+    """Batches ORM row mappings and writes them in bulk."""
+
+    def __init__(self, engine, max_rows: int = 500, flush_interval: float = 2.0, max_attempts: int = 3):
+        self.engine = engine
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._pending: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+        # Rows whose insert failed: (model, row, attempts so far)
+        self._retry: List[Tuple[Any, Dict[str, Any], int]] = []
+        self._count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self.total_rows = 0
+        self.total_flushes = 0
+        self.dropped_rows = 0
+        _live_buffers.add(self)
+
+    def add(self, model, row: Dict[str, Any]):
+        """Queue one row for ``model``; flushes inline when the size threshold is hit."""
+        with self._lock:
+            self._pending[model].append(row)
+            self._count += 1
+            full = self._count >= self.max_rows
+        if full:
+            self.flush()
+        elif self.flush_interval and not self._closed:
+            self._ensure_flusher()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def flush(self) -> int:
+        """Write all queued rows. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(list)
+                retry, self._retry = self._retry, []
+                self._count = 0
+                self._last_flush = time.monotonic()
+            entries = [(model, row, attempts) for model, row, attempts in retry]
+            entries += [(model, row, 0) for model, rows in pending.items() for row in rows]
+            if not entries:
+                return 0
+
+            batches: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+            for model, row, _ in entries:
+                batches[model].append(row)
+            try:
+                with self.engine.begin() as conn:
+                    for model, rows in batches.items():
+                        conn.execute(model.__table__.insert(), rows)
+                written = len(entries)
+            except Exception as e:
+                logger.warning(f"Batch flush of {len(entries)} rows failed, retrying row by row: {e}")
+                written = self._insert_rows(entries)
+
+            self.total_rows += written
+            self.total_flushes += 1
+            return written
+
+    def _insert_rows(self, entries: List[Tuple[Any, Dict[str, Any], int]]) -> int:
+        written = 0
+        for model, row, attempts in entries:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(model.__table__.insert(), [row])
+                written += 1
+            except Exception as e:
+                if attempts + 1 < self.max_attempts:
+                    with self._lock:
+                        self._retry.append((model, row, attempts + 1))
+                        self._count += 1
+                else:
+                    self.dropped_rows += 1
+                    logger.error(f"Dropping {model.__tablename__} row after {attempts + 1} failed inserts: {e}")
+        return written
+
+    def close(self):
+        """Stop the background flusher and write anything still queued."""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+        # Give rows that failed during the final flush their remaining attempts
+        for _ in range(self.max_attempts - 1):
+            if not self._retry:
+                break
+            self.flush()
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-write-buffer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            remaining = self.flush_interval - (time.monotonic() - self._last_flush)
+            if remaining > 0:
+                self._wakeup.wait(remaining)
+                continue
+            if self._count:
+                self.flush()
+            else:
+                # Nothing queued: exit and let the next add() restart the thread
+                with self._lock:
+                    if not self._count:
+                        self._thread = None
+                        return
@@ -1,8 +1,15 @@
-"""軽量なデータドリフト監視ユーティリティ."""
+"""軽量なデータドリフト監視ユーティリティ.
+
+基準データは生データを保持せず、特徴量ごとの固定サイズのスケッチ
+（基準分位点で区切ったヒストグラムと件数）として保存する。
+現行ウィンドウも同じビンで逐次集計するため、メモリは特徴量数×ビン数で一定になり、
+PSI / KS はスケッチ同士の比較で全特徴量まとめて計算できる。
+"""
 
 import logging
+from collections import deque
 from dataclasses import dataclass
-from typing import Dict
+from typing import Deque, Dict, List, Optional
 
 import numpy as np
 import pandas as pd
@@ -10,37 +17,66 @@ import pandas as pd
 logger = logging.getLogger(__name__)
 
 
-def _population_stability_index(expected: np.ndarray, actual: np.ndarray, bins: int = 10) -> float:
-    """PSIを計算（欠損・ゼロ割り込みに配慮）。"""
-    expected = expected[~np.isnan(expected)]
-    actual = actual[~np.isnan(actual)]
-    if expected.size == 0 or actual.size == 0:
-        return 0.0
-
-    try:
-        breakpoints = np.percentile(expected, np.linspace(0, 100, bins + 1))
-        expected_counts, _ = np.histogram(expected, bins=breakpoints)
-        actual_counts, _ = np.histogram(actual, bins=breakpoints)
-
-        expected_perc = np.where(expected_counts == 0, 1e-6, expected_counts / expected.size)
-        actual_perc = np.where(actual_counts == 0, 1e-6, actual_counts / actual.size)
-
-        psi = np.sum((actual_perc - expected_perc) * np.log(actual_perc / expected_perc))
-        return float(psi)
-    except Exception as exc:
-        logger.debug("PSI calculation failed: %s", exc)
-        return 0.0
-
-
 @dataclass
 class DriftResult:
     drift_detected: bool
     details: Dict[str, Dict[str, float]]
 
 
+class HistogramSketch:
+    """
+    複数特徴量の固定ビンヒストグラム。
+
+    edges は (特徴量数, ビン数-1) の内部境界で、両端のビンは開区間。
+    """
+
+    def __init__(self, columns: List[str], edges: np.ndarray) -> None:
+        self.columns = list(columns)
+        self.edges = edges
+        self.n_bins = edges.shape[1] + 1
+        self.counts = np.zeros((len(self.columns), self.n_bins), dtype=np.int64)
+
+    @classmethod
+    def from_reference(cls, numeric: pd.DataFrame, n_bins: int) -> "HistogramSketch":
+        """基準データの分位点でビン境界を決め、件数を集計する。"""
+        values = numeric.to_numpy(dtype=np.float64)
+        quantiles = np.linspace(0, 100, n_bins + 1)[1:-1]
+        if values.shape[0]:
+            edges = np.nan_to_num(np.nanpercentile(values, quantiles, axis=0).T, nan=0.0)
+        else:
+            edges = np.zeros((values.shape[1], n_bins - 1))
+        sketch = cls(list(numeric.columns), edges)
+        sketch.add(values)
+        return sketch
+
+    def empty_like(self) -> "HistogramSketch":
+        return HistogramSketch(self.columns, self.edges)
+
+    def bin_counts(self, values: np.ndarray) -> np.ndarray:
+        """(行数, 特徴量数) の配列をビン件数 (特徴量数, ビン数) に変換（NaNは除外）。"""
+        n_features = len(self.columns)
+        index = np.empty(values.shape, dtype=np.int64)
+        for j in range(n_features):
+            index[:, j] = np.searchsorted(self.edges[j], values[:, j], side="right")
+        flat = index + np.arange(n_features) * self.n_bins
+        flat = flat[~np.isnan(values)]
+        return np.bincount(flat, minlength=n_features * self.n_bins).reshape(n_features, self.n_bins)
+
+    def add(self, values: np.ndarray) -> None:
+        self.counts += self.bin_counts(values)
+
+    @property
+    def totals(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+
 class DriftMonitor:
     """
     数値特徴量の分布を監視し、ドリフト検知で再学習を促す。
+
+    ``check(df)`` は渡されたデータを一括比較する。ストリーミング用途では
+    ``update(df)`` で到着した行を現行ウィンドウに加算し ``check_current()`` で判定する。
+    ``window_batches`` を指定すると直近Nバッチ分だけを現行ウィンドウとして保持する。
     """
 
     def __init__(
@@ -48,21 +84,58 @@ class DriftMonitor:
         psi_threshold: float = 0.2,
         ks_threshold: float = 0.1,
         min_samples: int = 200,
+        n_bins: int = 100,
+        psi_bins: int = 10,
+        window_batches: Optional[int] = None,
     ) -> None:
+        if n_bins % psi_bins:
+            raise ValueError("n_bins must be a multiple of psi_bins")
         self.psi_threshold = psi_threshold
         self.ks_threshold = ks_threshold
         self.min_samples = min_samples
-        self.reference: pd.DataFrame | None = None
+        self.n_bins = n_bins
+        self.psi_bins = psi_bins
+        self.window_batches = window_batches
+        self.reference: Optional[HistogramSketch] = None
+        self.current: Optional[HistogramSketch] = None
+        self._batches: Deque[np.ndarray] = deque()
 
     def set_reference(self, df: pd.DataFrame) -> None:
-        """基準データを保存."""
+        """基準データのスケッチを保存（生データは保持しない）."""
         numeric = df.select_dtypes(include=[np.number])
         if numeric.shape[0] < self.min_samples:
             logger.info(
                 "Reference window too small for drift baseline: %s rows",
                 numeric.shape[0],
             )
-        self.reference = numeric.copy()
+        self.reference = HistogramSketch.from_reference(numeric, self.n_bins)
+        self.reset_current()
+
+    def reset_current(self) -> None:
+        """現行ウィンドウを空にする."""
+        self.current = self.reference.empty_like() if self.reference is not None else None
+        self._batches.clear()
+
+    def update(self, df: pd.DataFrame) -> None:
+        """到着した行を現行ウィンドウのスケッチに加算する."""
+        if self.reference is None:
+            return
+        values = self._aligned_values(df)
+        if values is None:
+            return
+        batch = self.current.bin_counts(values)
+        self.current.counts += batch
+        if self.window_batches:
+            self._batches.append(batch)
+            while len(self._batches) > self.window_batches:
+                self.current.counts -= self._batches.popleft()
+
+    def check_current(self) -> DriftResult:
+        """蓄積済みの現行ウィンドウと基準を比較する."""
+        if self.reference is None:
+            logger.info("No drift reference set; treating as no drift.")
+            return DriftResult(False, {})
+        return self._compare(self.current)
 
     def check(self, df: pd.DataFrame) -> DriftResult:
         """現行データと基準データを比較し、ドリフト有無を返す。"""
@@ -70,34 +143,47 @@ class DriftMonitor:
             logger.info("No drift reference set; treating as no drift.")
             return DriftResult(False, {})
 
+        values = self._aligned_values(df)
+        if values is None:
+            return DriftResult(False, {})
+
+        sketch = self.reference.empty_like()
+        sketch.add(values)
+        return self._compare(sketch)
+
+    def _aligned_values(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """基準の列順に揃えた数値配列を返す（欠けている列はNaN）。"""
         current = df.select_dtypes(include=[np.number])
         if current.empty:
+            return None
+        return current.reindex(columns=self.reference.columns).to_numpy(dtype=np.float64)
+
+    def _compare(self, sketch: HistogramSketch) -> DriftResult:
+        ref_counts = self.reference.counts.astype(np.float64)
+        cur_counts = sketch.counts.astype(np.float64)
+        ref_n = ref_counts.sum(axis=1)
+        cur_n = cur_counts.sum(axis=1)
+        valid = (ref_n >= self.min_samples) & (cur_n >= self.min_samples)
+        if not valid.any():
             return DriftResult(False, {})
 
-        drift_cols: Dict[str, Dict[str, float]] = {}
-
-        try:
-            from scipy import stats  # type: ignore
-        except Exception:
-            stats = None  # type: ignore
-
-        common_cols = [c for c in current.columns if c in self.reference.columns]
-        for col in common_cols:
-            ref_col = self.reference[col].dropna().values
-            cur_col = current[col].dropna().values
-            if ref_col.size < self.min_samples or cur_col.size < self.min_samples:
-                continue
-
-            psi = _population_stability_index(ref_col, cur_col)
-            ks_stat = 0.0
-            if stats:
-                try:
-                    ks_stat = float(stats.ks_2samp(ref_col, cur_col).statistic)
-                except Exception:
-                    ks_stat = 0.0
-
-            if psi > self.psi_threshold or ks_stat > self.ks_threshold:
-                drift_cols[col] = {"psi": psi, "ks": ks_stat}
-
-        drift_detected = bool(drift_cols)
-        return DriftResult(drift_detected, drift_cols)
+        ref_counts, cur_counts = ref_counts[valid], cur_counts[valid]
+        ref_n, cur_n = ref_n[valid, None], cur_n[valid, None]
+
+        # KS: ビン境界での経験CDFの最大差（誤差は1ビンの質量以内）
+        ks = np.abs(np.cumsum(ref_counts, axis=1) / ref_n - np.cumsum(cur_counts, axis=1) / cur_n).max(axis=1)
+
+        # PSI: 細かいビンを psi_bins 個の分位ビンにまとめて計算
+        shape = (ref_counts.shape[0], self.psi_bins, self.n_bins // self.psi_bins)
+        expected = ref_counts.reshape(shape).sum(axis=2) / ref_n
+        actual = cur_counts.reshape(shape).sum(axis=2) / cur_n
+        expected = np.where(expected == 0, 1e-6, expected)
+        actual = np.where(actual == 0, 1e-6, actual)
+        psi = np.sum((actual - expected) * np.log(actual / expected), axis=1)
+
+        columns = np.asarray(self.reference.columns, dtype=object)[valid]
+        drifted = (psi > self.psi_threshold) | (ks > self.ks_threshold)
+        drift_cols: Dict[str, Dict[str, float]] = {
+            col: {"psi": float(p), "ks": float(k)} for col, p, k in zip(columns[drifted], psi[drifted], ks[drifted])
+        }
+        return DriftResult(bool(drift_cols), drift_cols)
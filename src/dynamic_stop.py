@@ -5,17 +5,83 @@ This module implements advanced trailing stop logic:
     pass
 1. ATR Trailing Stop: Adjust stop level based on volatility.
 2. Profit Locking: Move stop to breakeven or profit zone after certain gain.
+
+Besides the per-ticker ``update_stop``/``check_exit``, the batch helpers below
+evaluate a whole book at once: the last ``length`` rows of every ticker are
+stacked into (n_tickers, length) matrices and ATR, stops and exits are
+computed column-wise with NumPy.
 """
 
 import logging
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Sequence
 
+import numpy as np
 import pandas as pd
 import ta
 
 logger = logging.getLogger(__name__)
 
 
+def stack_tails(frames: Sequence[Optional[pd.DataFrame]], column: str, length: int) -> np.ndarray:
+    """
+    Stack the last ``length`` values of ``column`` from each frame.
+
+    Rows are right-aligned (the latest value is always the last column) and
+    padded with NaN in front for short or missing frames.
+    """
+    out = np.full((len(frames), length), np.nan)
+    for i, df in enumerate(frames):
+        if df is None or df.empty or column not in df.columns:
+            continue
+        values = df[column].to_numpy(dtype=np.float64)[-length:]
+        out[i, length - len(values) :] = values
+    return out
+
+
+def true_range_matrix(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range per cell; the first bar of each row falls back to high - low (as in ``ta``)."""
+    prev_close = np.empty_like(close)
+    prev_close[:, 0] = np.nan
+    prev_close[:, 1:] = close[:, :-1]
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def sma_atr_matrix(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Latest simple-moving-average ATR per row (NaN if fewer than ``period`` bars)."""
+    tr = true_range_matrix(high, low, close)[:, -period:]
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(tr).any(axis=1), np.nan, tr.mean(axis=1))
+
+
+def wilder_atr_matrix(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    Latest Wilder ATR per row, matching ``ta.volatility.AverageTrueRange``.
+
+    The smoothing is seeded at the start of the stacked window rather than the
+    start of the full history; with a window of ~10x ``period`` the seed's
+    influence has decayed below 1e-4. Rows with fewer than ``period`` bars get NaN.
+    """
+    tr = true_range_matrix(high, low, close)
+    n_rows, length = tr.shape
+    counts = (~np.isnan(tr)).sum(axis=1)
+    start = length - counts
+    seed = start + period - 1
+
+    atr = np.full(n_rows, np.nan)
+    csum = np.concatenate([np.zeros((n_rows, 1)), np.nancumsum(tr, axis=1)], axis=1)
+    rows = np.arange(n_rows)
+    has_seed = seed < length
+    seed_mean = np.full(n_rows, np.nan)
+    seed_mean[has_seed] = (csum[rows[has_seed], seed[has_seed] + 1] - csum[rows[has_seed], start[has_seed]]) / period
+
+    for j in range(int(seed[has_seed].min()) if has_seed.any() else length, length):
+        at_seed = seed == j
+        atr[at_seed] = seed_mean[at_seed]
+        running = seed < j
+        atr[running] = (atr[running] * (period - 1) + tr[running, j]) / period
+    return atr
+
+
 class DynamicStopManager:
     def __init__(self, atr_period: int = 14, atr_multiplier: float = 2.0):
         self.atr_period = atr_period
@@ -96,6 +162,57 @@ class DynamicStopManager:
         self.stops[ticker] = new_stop
         return new_stop
 
+    def batch_atr(self, frames: Sequence[Optional[pd.DataFrame]], length: Optional[int] = None) -> np.ndarray:
+        """
+        ATR for many tickers at once with the same rules as ``update_stop``.
+
+        Frames with ``period`` rows or fewer get 0 (percentage fallback); an
+        existing ``ATR`` column takes precedence over the computed value.
+        """
+        length = length or self.atr_period * 10
+        high, low, close = (stack_tails(frames, col, length) for col in ("High", "Low", "Close"))
+        atr = wilder_atr_matrix(high, low, close, self.atr_period)
+
+        lengths = np.array([0 if df is None else len(df) for df in frames])
+        atr = np.where((lengths > self.atr_period) & np.isfinite(atr), atr, 0.0)
+        for i, df in enumerate(frames):
+            if df is not None and lengths[i] > self.atr_period and "ATR" in df.columns:
+                atr[i] = df["ATR"].iloc[-1]
+        return atr
+
+    def update_stops(self, tickers: Sequence[str], current_prices: np.ndarray, atr: np.ndarray) -> np.ndarray:
+        """
+        Vectorized ``update_stop`` for a whole book.
+
+        Tickers without a registered entry get a stop of 0 and leave the state untouched.
+        """
+        tickers = list(tickers)
+        current_prices = np.asarray(current_prices, dtype=np.float64)
+        atr = np.asarray(atr, dtype=np.float64)
+        known = np.array([t in self.entry_prices for t in tickers], dtype=bool)
+
+        entry = np.array([self.entry_prices.get(t, np.nan) for t in tickers], dtype=np.float64)
+        highest = np.array([self.highest_prices.get(t, np.nan) for t in tickers], dtype=np.float64)
+        current_stop = np.array([self.stops.get(t, 0.0) for t in tickers], dtype=np.float64)
+
+        highest = np.where(current_prices > highest, current_prices, highest)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            candidate = np.where(atr > 0, highest - atr * self.atr_multiplier, highest * 0.95)
+            profit_pct = (current_prices - entry) / entry
+            candidate = np.where(profit_pct > 0.05, np.fmax(candidate, entry * 1.005), candidate)
+        new_stop = np.where(known, np.fmax(current_stop, candidate), 0.0)
+
+        for i in np.flatnonzero(known):
+            ticker = tickers[i]
+            self.highest_prices[ticker] = float(highest[i])
+            self.stops[ticker] = float(new_stop[i])
+        return new_stop
+
+    def check_exits(self, tickers: Sequence[str], current_prices: np.ndarray) -> np.ndarray:
+        """Vectorized ``check_exit``: True where a (non-zero) stop has been hit."""
+        stops = np.array([self.stops.get(t) or 0.0 for t in tickers], dtype=np.float64)
+        return (stops > 0) & (np.asarray(current_prices, dtype=np.float64) <= stops)
+
     def check_exit(self, ticker: str, current_price: float) -> tuple[bool, str]:
         """Check if stop loss is hit."""
         stop_price = self.stops.get(ticker)
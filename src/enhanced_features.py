@@ -8,6 +8,8 @@ import numpy as np
 from typing import Dict, List, Tuple, Optional
 import logging
 
+from src.features.rolling_kernels import rolling_mad
+
 logger = logging.getLogger(__name__)
 
 
@@ -215,7 +217,7 @@ class EnhancedFeatureEngineer:
         """CCI計算"""
         tp = (df["High"] + df["Low"] + df["Close"]) / 3
         sma = tp.rolling(period).mean()
-        mad = tp.rolling(period).apply(lambda x: np.abs(x - x.mean()).mean())
+        mad = rolling_mad(tp, period)
         cci = (tp - sma) / (0.015 * mad)
         return cci
 
@@ -73,9 +73,10 @@ class EnsembleVoter:
 # Re-export from submodules
 try:
     from src.ensemble.adaptive_ensemble import AdaptiveEnsemble
-    from src.ensemble.stacking import StackingEnsemble
+    from src.ensemble.stacking import PurgedKFold, StackingEnsemble
 except ImportError:
     AdaptiveEnsemble = None
+    PurgedKFold = None
     StackingEnsemble = None
 
-__all__ = ["EnsembleVoter", "AdaptiveEnsemble", "StackingEnsemble"]
+__all__ = ["EnsembleVoter", "AdaptiveEnsemble", "PurgedKFold", "StackingEnsemble"]
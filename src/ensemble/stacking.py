@@ -4,7 +4,9 @@ Combines multiple base models with a meta-model for superior predictions.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import KFold
@@ -12,6 +14,53 @@ from sklearn.linear_model import Ridge
 
 logger = logging.getLogger(__name__)
 
+# Constructor params that set a model's own thread count (sklearn/LightGBM/XGBoost, LightGBM alias, CatBoost)
+_THREAD_PARAMS = ("n_jobs", "num_threads", "nthread", "thread_count")
+
+
+def _limit_threads(model: Any, n_threads: int) -> Dict[str, Any]:
+    """Cap a model's internal threads; returns the previous values so they can be restored."""
+    try:
+        params = model.get_params(deep=False)
+    except Exception:
+        return {}
+    previous = {key: params[key] for key in _THREAD_PARAMS if key in params}
+    if previous:
+        try:
+            model.set_params(**{key: n_threads for key in previous})
+        except Exception:
+            return {}
+    return previous
+
+
+class PurgedKFold:
+    """
+    Contiguous K-fold splitter for time-ordered data.
+
+    Every sample is validated exactly once (as OOF stacking requires), but
+    training rows within ``purge`` samples before a validation block and
+    ``embargo`` samples after it are dropped, so labels that overlap the
+    validation window cannot leak into the fold model.
+    """
+
+    def __init__(self, n_splits: int = 5, purge: int = 0, embargo: int = 0):
+        self.n_splits = n_splits
+        self.purge = purge
+        self.embargo = embargo
+
+    def get_n_splits(self, X=None, y=None, groups=None) -> int:
+        return self.n_splits
+
+    def split(self, X, y=None, groups=None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        n_samples = len(X)
+        indices = np.arange(n_samples)
+        for block in np.array_split(indices, self.n_splits):
+            if block.size == 0:
+                continue
+            start, stop = block[0], block[-1] + 1
+            keep = (indices < max(0, start - self.purge)) | (indices >= min(n_samples, stop + self.embargo))
+            yield indices[keep], block
+
 
 class StackingEnsemble:
     """
@@ -24,16 +73,28 @@ class StackingEnsemble:
     Level 2: Meta-model (Ridge Regression)
     """
 
-    def __init__(self, base_models: List[Any], meta_model: Optional[Any] = None, n_folds: int = 5):
+    def __init__(
+        self,
+        base_models: List[Any],
+        meta_model: Optional[Any] = None,
+        n_folds: int = 5,
+        n_jobs: int = -1,
+        cv: Optional[Any] = None,
+    ):
         """
         Args:
             base_models: List of base models with fit/predict methods
             meta_model: Meta-learner (default: Ridge Regression)
             n_folds: Number of folds for out-of-fold predictions
+            n_jobs: Concurrent (model x fold) jobs (-1 = number of CPUs). Each job's base model
+                is limited to its share of the CPUs so the pool does not oversubscribe them
+            cv: Splitter with split(X) (default: shuffled KFold; use PurgedKFold for time series)
         """
         self.base_models = base_models
         self.meta_model = meta_model or Ridge(alpha=1.0)
         self.n_folds = n_folds
+        self.n_jobs = n_jobs
+        self.cv = cv
         self.is_fitted = False
 
     def fit(self, X: pd.DataFrame, y: pd.Series) -> "StackingEnsemble":
@@ -49,13 +110,8 @@ class StackingEnsemble:
         """
         logger.info(f"Training stacking ensemble with {len(self.base_models)} base models")
 
-        # Generate out-of-fold predictions for meta-model training
-        meta_features = self._generate_meta_features(X, y)
-
-        # Train all base models on full dataset
-        for i, model in enumerate(self.base_models):
-            logger.info(f"Training base model {i + 1}/{len(self.base_models)}: {model.__class__.__name__}")
-            model.fit(X, y)
+        # Out-of-fold predictions and the full-data refits run as one job pool
+        meta_features = self._generate_meta_features(X, y, refit_full=True)
 
         # Train meta-model on out-of-fold predictions
         logger.info("Training meta-model")
@@ -87,38 +143,70 @@ class StackingEnsemble:
 
         return final_predictions
 
-    def _generate_meta_features(self, X: pd.DataFrame, y: pd.Series) -> np.ndarray:
+    def _splitter(self):
+        return self.cv if self.cv is not None else KFold(n_splits=self.n_folds, shuffle=True, random_state=42)
+
+    def _generate_meta_features(self, X: pd.DataFrame, y: pd.Series, refit_full: bool = False) -> np.ndarray:
         """
         Generate out-of-fold predictions for meta-model training.
 
         This prevents overfitting by ensuring the meta-model sees
         predictions on data the base models haven't seen.
+
+        Each (model, fold) pair is an independent job on a bounded thread
+        pool; all jobs index into one shared, read-only feature matrix.
+        With ``refit_full`` the full-data fit of every base model is
+        submitted to the same pool, so it overlaps the OOF stage instead
+        of running after it.
         """
         n_samples = len(X)
         n_models = len(self.base_models)
+        X_values = (X.to_numpy() if hasattr(X, "to_numpy") else np.asarray(X)).view()
+        y_values = y.to_numpy() if hasattr(y, "to_numpy") else np.asarray(y)
+        X_values.setflags(write=False)
 
         # Initialize array for out-of-fold predictions
         meta_features = np.zeros((n_samples, n_models))
-
-        # K-Fold cross-validation
-        kfold = KFold(n_splits=self.n_folds, shuffle=True, random_state=42)
-
-        for i, model in enumerate(self.base_models):
-            logger.debug(f"Generating OOF predictions for model {i + 1}")
-
-            for fold, (train_idx, val_idx) in enumerate(kfold.split(X)):
-                # Split data
-                X_train = X.iloc[train_idx]
-                y_train = y.iloc[train_idx]
-                X_val = X.iloc[val_idx]
-
-                # Train on fold
-                model_copy = self._clone_model(model)
-                model_copy.fit(X_train, y_train)
-
-                # Predict on validation fold
-                predictions = model_copy.predict(X_val)
-                meta_features[val_idx, i] = predictions
+        folds = list(self._splitter().split(X_values))
+
+        cpus = os.cpu_count() or 1
+        workers = self.n_jobs if self.n_jobs and self.n_jobs > 0 else cpus
+        n_jobs_total = n_models * len(folds) + (n_models if refit_full else 0)
+        workers = max(1, min(workers, n_jobs_total))
+        # LightGBM/XGBoost/RandomForest default to every core; split the CPUs between pool workers instead
+        threads_per_job = max(1, cpus // workers)
+
+        def _oof_job(i: int, train_idx: np.ndarray, val_idx: np.ndarray):
+            model_copy = self._clone_model(self.base_models[i])
+            if workers > 1:
+                _limit_threads(model_copy, threads_per_job)
+            model_copy.fit(X_values[train_idx], y_values[train_idx])
+            meta_features[val_idx, i] = model_copy.predict(X_values[val_idx])
+
+        def _full_job(i: int):
+            # Fit the base model itself on the original frame so feature names
+            # match later predict(X) calls; fold jobs only read its params to clone
+            model = self.base_models[i]
+            previous = _limit_threads(model, threads_per_job) if workers > 1 else {}
+            try:
+                model.fit(X, y)
+            finally:
+                if previous:
+                    model.set_params(**previous)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Submit full fits first: they are the longest jobs
+            full_fits = [executor.submit(_full_job, i) for i in range(n_models)] if refit_full else []
+            oof_jobs = [
+                executor.submit(_oof_job, i, train_idx, val_idx)
+                for i in range(n_models)
+                for train_idx, val_idx in folds
+            ]
+            for job in oof_jobs:
+                job.result()
+            for i, job in enumerate(full_fits):
+                job.result()
+                logger.info(f"Trained base model {i + 1}/{n_models}: {self.base_models[i].__class__.__name__}")
 
         return meta_features
 
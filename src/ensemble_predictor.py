@@ -29,6 +29,8 @@ except ImportError:
 
 from src.advanced_ensemble import create_model_diversity_ensemble
 from src.advanced_models import AdvancedModels
+from src.config_loader import get_config
+from src.utils.stage_graph import StageGraph
 
 # 新しい高度な機能のインポート
 try:
@@ -128,31 +130,46 @@ class EnhancedEnsemblePredictor:
         # センチメントスコアキャッシュ
         self.sentiment_cache = {}
 
+        # predict_trajectory のステージグラフ（初回予測時に構築）
+        self._prediction_graph = None
+
         logger.info("Enhanced Ensemble Predictor initialized with all advanced features")
 
-    def _prepare_advanced_models(self, df: pd.DataFrame, days_ahead: int) -> Dict[str, any]:
+    def _build_advanced_features(self, df: pd.DataFrame, external_features: Optional[Dict] = None) -> pd.DataFrame:
+        """前処理と拡張特徴量の適用（高度なモデルの入力）"""
+        if self.use_preprocessing:
+            df_processed, scaler = preprocess_for_prediction(df.copy())
+        else:
+            df_processed = df.copy()
+
+        if external_features is None:
+            external_features = self._fetch_external_features()
+
+        if self.use_enhanced_features:
+            return generate_enhanced_features(df_processed, external_features=external_features)
+        return df_processed
+
+    @staticmethod
+    def _fetch_external_features() -> Dict:
+        """外部データ（VIX）の取得。失敗時は空"""
+        external_features: Dict = {}
+        try:
+            ext = fetch_external_data(period="6mo")
+            if ext and isinstance(ext, dict) and ext.get("VIX") is not None:
+                external_features["vix"] = ext["VIX"]
+        except Exception:
+            external_features = {}
+        return external_features
+
+    def _prepare_advanced_models(
+        self, df: pd.DataFrame, days_ahead: int, df_features: Optional[pd.DataFrame] = None
+    ) -> Dict[str, any]:
         """新しいモデルの準備と学習"""
         models = {}
 
         try:
-            # 前処理と拡張特徴量の適用
-            if self.use_preprocessing:
-                df_processed, scaler = preprocess_for_prediction(df.copy())
-            else:
-                df_processed = df.copy()
-
-            external_features: Dict = {}
-            try:
-                ext = fetch_external_data(period="6mo")
-                if ext and isinstance(ext, dict) and ext.get("VIX") is not None:
-                    external_features["vix"] = ext["VIX"]
-            except Exception:
-                external_features = {}
-
-            if self.use_enhanced_features:
-                df_features = generate_enhanced_features(df_processed, external_features=external_features)
-            else:
-                df_features = df_processed
+            if df_features is None:
+                df_features = self._build_advanced_features(df)
 
             # 数値カラムのみを抽出
             numeric_cols = df_features.select_dtypes(include=[np.number]).columns.tolist()
@@ -216,6 +233,107 @@ class EnhancedEnsemblePredictor:
 
         return models
 
+    def _predict_advanced(self, df_features: pd.DataFrame, df: pd.DataFrame, days_ahead: int) -> Dict[str, Dict]:
+        """高度なモデルを学習して直近データで予測する（学習済みモデルは保持しない）"""
+        advanced_models = self._prepare_advanced_models(df, days_ahead, df_features=df_features)
+        current_price = df["Close"].iloc[-1]
+        predictions = {}
+
+        for model_name, model in advanced_models.items():
+            try:
+                # 予測の実行
+                recent_data = df.tail(30)[["Open", "High", "Low", "Close", "Volume"]].dropna()
+                if len(recent_data) >= 30:
+                    # シーケンスデータの準備
+                    X_recent = recent_data.values
+
+                    # モデル予測
+                    pred = model.predict(X_recent.reshape(1, X_recent.shape[0], X_recent.shape[1]))
+                    pred_values = pred[0]  # days_aheadの値
+
+                    # 結果をフォーマット
+                    predictions[model_name] = {
+                        "current_price": current_price,
+                        "predictions": pred_values.tolist(),
+                        "peak_price": max(pred_values),
+                        "trend": (
+                            "UP"
+                            if pred_values[-1] > current_price * 1.01
+                            else "DOWN" if pred_values[-1] < current_price * 0.99 else "FLAT"
+                        ),
+                        "change_pct": (pred_values[-1] - current_price) / current_price * 100,
+                    }
+            except Exception as e:
+                logger.warning(f"{model_name} prediction failed: {e}")
+
+        return predictions
+
+    def _get_prediction_graph(self) -> StageGraph:
+        """
+        predict_trajectory のステージグラフ（初回に構築）
+
+        入力: df, days_ahead, ticker, fundamentals
+        各ステージの出力は入力のフィンガープリントでメモ化されるため、
+        同じデータで再度呼ばれた場合（ダッシュボード更新など）は再計算しない。
+        """
+        if self._prediction_graph is not None:
+            return self._prediction_graph
+
+        config = get_config("ai.prediction_pipeline", {}) or {}
+        ttl = config.get("ttl_seconds", {})
+        graph = StageGraph(max_workers=config.get("max_workers", 4), max_entries=config.get("max_entries", 512))
+
+        # 共有の前処理
+        graph.add("external", self._fetch_external_features, ttl=ttl.get("external", 3600))
+        graph.add("advanced_features", self._build_advanced_features, deps=("df", "external"), cache=False)
+        graph.add("returns", lambda df: df["Close"].pct_change().dropna().values, deps=("df",), cache=False)
+
+        # 各モデルの予測（互いに独立なので並行実行）
+        for name in ("lstm", "lgbm", "prophet", "transformer"):
+            predictor_attr = f"{name}_predictor"
+            graph.add(
+                name,
+                lambda df, days_ahead, attr=predictor_attr: getattr(self, attr).predict_trajectory(df, days_ahead),
+                deps=("df", "days_ahead"),
+            )
+        graph.add("advanced", self._predict_advanced, deps=("advanced_features", "df", "days_ahead"))
+        graph.add("sma", self._predict_sma, deps=("df", "days_ahead"))
+
+        # 調整用の分析
+        graph.add(
+            "sentiment",
+            lambda ticker, df: self.sentiment_predictor.predict_with_sentiment(ticker, df.values[-10:]),
+            deps=("ticker", "df"),
+            ttl=ttl.get("sentiment", 900),
+        )
+        graph.add(
+            "fundamental",
+            lambda ticker, fundamentals: self.fundamental_analyzer.analyze(ticker, fundamentals),
+            deps=("ticker", "fundamentals"),
+        )
+        graph.add(
+            "risk",
+            lambda df, returns, days_ahead: self.risk_predictor.predict_with_risk_adjustment(
+                df.values[-20:], returns[-252:], investment_horizon=days_ahead
+            ),
+            deps=("df", "returns", "days_ahead"),
+        )
+        graph.add(
+            "scenario",
+            lambda ticker, df, days_ahead: self.scenario_predictor.predict_with_scenarios(ticker, df, days_ahead),
+            deps=("ticker", "df", "days_ahead"),
+            ttl=ttl.get("scenario", 3600),
+        )
+
+        self._prediction_graph = graph
+        return graph
+
+    def get_stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """予測パイプラインのステージ別統計（実行回数・キャッシュヒット・所要時間）"""
+        if self._prediction_graph is None:
+            return {}
+        return self._prediction_graph.get_stats()
+
     def select_horizon_by_sharpe(self, performance_log: Optional[pd.DataFrame] = None) -> str:
         """
         直近のパフォーマンス（例: equity/return列）からシャープ比が高いホライズンを選択する簡易ルール。
@@ -266,102 +384,63 @@ class EnhancedEnsemblePredictor:
             current_price = df["Close"].iloc[-1]
             prediction_start_time = pd.Timestamp.now()
 
+            # 1-5. ステージグラフで各分析・モデル予測を実行（独立なステージは並行、結果はメモ化）
+            targets = ["lstm", "lgbm", "prophet", "transformer", "advanced", "sma"]
+            if enable_sentiment and ticker:
+                targets.append("sentiment")
+            if ticker and fundamentals:
+                targets.append("fundamental")
+            if enable_risk_adjustment:
+                targets.append("risk")
+            if enable_scenario_analysis and ticker:
+                targets.append("scenario")
+
+            stage_run = self._get_prediction_graph().run(
+                {"df": df, "days_ahead": days_ahead, "ticker": ticker, "fundamentals": fundamentals},
+                targets=targets,
+            )
+            for stage_name, error in stage_run.errors.items():
+                logger.warning(f"Prediction stage {stage_name} failed: {error}")
+
             # 1. センチメント分析（有効な場合）
             sentiment_features = {}
-            if enable_sentiment and ticker:
-                sentiment_result = self.sentiment_predictor.predict_with_sentiment(ticker, df.values[-10:])
+            sentiment_adjustment = 0.0
+            if "sentiment" in stage_run.values:
+                sentiment_result = stage_run.values["sentiment"]
                 sentiment_features = sentiment_result.get("sentiment_features", {})
                 sentiment_adjustment = sentiment_result.get("sentiment_impact", 0.0)
                 logger.info(f"Sentiment analysis applied for {ticker}, impact: {sentiment_adjustment:.4f}")
-            else:
-                sentiment_adjustment = 0.0
 
             # 2. ファンダメンタルズ分析（利用可能な場合）
-            fundamental_result = None
+            fundamental_result = stage_run.get("fundamental")
             confidence_multiplier = 1.0
 
-            if ticker and fundamentals:
-                fundamental_result = self.fundamental_analyzer.analyze(ticker, fundamentals)
+            if fundamental_result is not None:
                 confidence_multiplier = fundamental_result["confidence_multiplier"]
                 logger.info(
                     f"{ticker}: ファンダメンタルズ評価={fundamental_result['valuation']}, "
                     f"スコア={fundamental_result['score']}"
                 )
 
-            # 3. 各既存モデルで予測を実行
+            # 3. 各既存モデルの予測
             predictions = {}
+            model_labels = {"lstm": "LSTM", "lgbm": "LightGBM", "prophet": "Prophet", "transformer": "Transformer"}
+            for model_name, label in model_labels.items():
+                result = stage_run.get(model_name, {"error": stage_run.errors.get(model_name, "not run")})
+                if "error" not in result:
+                    predictions[model_name] = result
+                    logger.info(f"{label}予測: {result['trend']} ({result['change_pct']:+.1f}%)")
+                else:
+                    logger.warning(f"{label} prediction failed: {result['error']}")
 
-            # LSTM予測
-            lstm_result = self.lstm_predictor.predict_trajectory(df, days_ahead)
-            if "error" not in lstm_result:
-                predictions["lstm"] = lstm_result
-                logger.info(f"LSTM予測: {lstm_result['trend']} ({lstm_result['change_pct']:+.1f}%)")
-            else:
-                logger.warning(f"LSTM prediction failed: {lstm_result['error']}")
-
-            # LightGBM予測
-            lgbm_result = self.lgbm_predictor.predict_trajectory(df, days_ahead)
-            if "error" not in lgbm_result:
-                predictions["lgbm"] = lgbm_result
-                logger.info(f"LightGBM予測: {lgbm_result['trend']} ({lgbm_result['change_pct']:+.1f}%)")
-            else:
-                logger.warning(f"LightGBM prediction failed: {lgbm_result['error']}")
-
-            # Prophet予測
-            prophet_result = self.prophet_predictor.predict_trajectory(df, days_ahead)
-            if "error" not in prophet_result:
-                predictions["prophet"] = prophet_result
-                logger.info(f"Prophet予測: {prophet_result['trend']} ({prophet_result['change_pct']:+.1f}%)")
-            else:
-                logger.warning(f"Prophet prediction failed: {prophet_result['error']}")
-
-            # Transformer予測
-            transformer_result = self.transformer_predictor.predict_trajectory(df, days_ahead)
-            if "error" not in transformer_result:
-                predictions["transformer"] = transformer_result
-                logger.info(
-                    f"Transformer予測: {transformer_result['trend']} ({transformer_result['change_pct']:+.1f}%)"
-                )
-            else:
-                logger.warning(f"Transformer prediction failed: {transformer_result['error']}")
-
-            # 4. 新しい高度なモデルで予測を実行
-            advanced_models = self._prepare_advanced_models(df, days_ahead)
-
-            for model_name, model in advanced_models.items():
-                try:
-                    # 予測の実行
-                    recent_data = df.tail(30)[["Open", "High", "Low", "Close", "Volume"]].dropna()
-                    if len(recent_data) >= 30:
-                        # シーケンスデータの準備
-                        X_recent = recent_data.values
-                        # 前処理が必要な場合はここで行う
-
-                        # モデル予測
-                        pred = model.predict(X_recent.reshape(1, X_recent.shape[0], X_recent.shape[1]))
-                        pred_values = pred[0]  # days_aheadの値
-
-                        # 結果をフォーマット
-                        predictions[model_name] = {
-                            "current_price": current_price,
-                            "predictions": pred_values.tolist(),
-                            "peak_price": max(pred_values),
-                            "trend": (
-                                "UP"
-                                if pred_values[-1] > current_price * 1.01
-                                else "DOWN" if pred_values[-1] < current_price * 0.99 else "FLAT"
-                            ),
-                            "change_pct": (pred_values[-1] - current_price) / current_price * 100,
-                        }
-
-                        logger.info(
-                            f"{model_name}予測: {predictions[model_name]['trend']} ({predictions[model_name]['change_pct']:+.1f}%)"
-                        )
-                except Exception as e:
-                    logger.warning(f"{model_name} prediction failed: {e}")
+            # 4. 新しい高度なモデルの予測
+            advanced_predictions = stage_run.get("advanced", {})
+            for model_name, result in advanced_predictions.items():
+                predictions[model_name] = result
+                logger.info(f"{model_name}予測: {result['trend']} ({result['change_pct']:+.1f}%)")
 
             # 5. ベースライン予測（SMA）
-            sma_result = self._predict_sma(df, days_ahead)
+            sma_result = stage_run.values["sma"]
             predictions["sma"] = sma_result
             logger.info(f"SMA予測: {sma_result['trend']} ({sma_result['change_pct']:+.1f}%)")
 
@@ -399,13 +478,8 @@ class EnhancedEnsemblePredictor:
             fundamental_adj_preds = current_price + (adjustment_factor * current_price * confidence_multiplier)
 
             # 10. リートフォリオリスク調整（有効な場合）
+            risk_adj_result = stage_run.get("risk", {})
             if enable_risk_adjustment:
-                risk_adj_result = self.risk_predictor.predict_with_risk_adjustment(
-                    df.values[-20:],  # 最近の価格データ
-                    df["Close"].pct_change().dropna().values[-252:],  # 1年分のリターンデータ
-                    investment_horizon=days_ahead,
-                )
-
                 # リートフォリオリターン調整
                 risk_factor = risk_adj_result.get("risk_factor", 1.0)
                 risk_adjusted_preds = fundamental_adj_preds * risk_factor
@@ -417,7 +491,7 @@ class EnhancedEnsemblePredictor:
             # 11. シナリオ分析（有効な場合）
             scenario_analysis_result = {}
             if enable_scenario_analysis and ticker:
-                scenario_result = self.scenario_predictor.predict_with_scenarios(ticker, df, days_ahead)
+                scenario_result = stage_run.get("scenario", {})
                 scenario_analysis_result = {
                     "scenario_risk_assessment": scenario_result.get("scenario_risk_assessment", {}),
                     "historical_comparisons": scenario_result.get("historical_comparisons", {}),
@@ -506,13 +580,15 @@ class EnhancedEnsemblePredictor:
                     "transformer_trend": predictions.get("transformer", {}).get("trend", "N/A"),
                     "sma_trend": predictions.get("sma", {}).get("trend", "N/A"),
                     "fundamental": fundamental_result,
-                    "enhanced_models_used": [name for name in advanced_models.keys() if name in predictions],
+                    "enhanced_models_used": list(advanced_predictions.keys()),
                     "sentiment_analysis": sentiment_features,
                     "scenario_analysis": scenario_analysis_result,
-                    "risk_adjustment": risk_adj_result if enable_risk_adjustment else {},
+                    "risk_adjustment": risk_adj_result,
                     "xai_explanation": xai_explanation,
                     "prediction_confidence": 0.8,  # 仮の信頼度（実際にはXAIやリスク指標から計算）
                     "execution_time": (pd.Timestamp.now() - prediction_start_time).total_seconds(),
+                    "stage_timings": stage_run.timings,
+                    "cached_stages": sorted(stage_run.cached),
                 },
             }
 
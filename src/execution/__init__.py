@@ -1,4 +1,4 @@
-from .execution_engine import ExecutionEngine
+from .execution_engine import ExecutionEngine, RiskContext
 from .adaptive_rebalancer import AdaptiveRebalancer
 from .event_trader import EventTrader
 from .news_shock_defense import NewsShockDefense
@@ -6,6 +6,7 @@ from .position_sizer import PositionSizer
 
 __all__ = [
     "ExecutionEngine",
+    "RiskContext",
     "AdaptiveRebalancer",
     "EventTrader",
     "NewsShockDefense",
@@ -2,6 +2,7 @@ import json
 import logging
 import os
 import time
+from dataclasses import dataclass, field, replace
 from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 import pandas as pd
@@ -13,6 +14,65 @@ from src.utils.health import quick_health_check
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class RiskContext:
+    """
+    1バッチ分の発注前リスク情報のスナップショット。
+
+    execute_orders の冒頭で1度だけ構築し、約定ごとに with_fill で新しいコンテキストを作る。
+    注文ごとのチェックはこのスナップショットだけを参照する（ポジション取得・VIX取得を繰り返さない）。
+    """
+
+    equity: float
+    cash: float
+    initial_capital: float
+    quantities: Dict[str, int] = field(default_factory=dict)
+    values: Dict[str, float] = field(default_factory=dict)
+    sectors: Dict[str, Optional[str]] = field(default_factory=dict)
+    vix: Optional[float] = None
+    cvar_factor: float = 1.0
+
+    @property
+    def drawdown(self) -> float:
+        if self.equity <= 0 or self.initial_capital <= 0:
+            return 0.0
+        return (self.initial_capital - self.equity) / self.initial_capital
+
+    def with_fill(
+        self, ticker: str, action: str, qty: int, price: float, sector: Optional[str] = None
+    ) -> "RiskContext":
+        """約定を反映した新しいコンテキストを返す（自身は変更しない）"""
+        quantities = dict(self.quantities)
+        values = dict(self.values)
+        sectors = dict(self.sectors)
+        amount = qty * price
+
+        if action == "BUY":
+            quantities[ticker] = quantities.get(ticker, 0) + qty
+            values[ticker] = values.get(ticker, 0.0) + amount
+            if sector is not None:
+                sectors[ticker] = sector
+            return replace(self, cash=self.cash - amount, quantities=quantities, values=values, sectors=sectors)
+
+        held_qty = quantities.get(ticker, 0)
+        held_value = values.get(ticker, 0.0)
+        sold_value = held_value * min(qty, held_qty) / held_qty if held_qty > 0 else 0.0
+        if qty >= held_qty:
+            quantities.pop(ticker, None)
+            values.pop(ticker, None)
+        else:
+            quantities[ticker] = held_qty - qty
+            values[ticker] = held_value - sold_value
+        return replace(
+            self,
+            cash=self.cash + amount,
+            equity=self.equity + amount - sold_value,
+            quantities=quantities,
+            values=values,
+            sectors=sectors,
+        )
+
+
 class ExecutionEngine:
     def __init__(self, paper_trader: PaperTrader, real_broker: Any = None, config_path: str = "config.json") -> None:
         self.pt = paper_trader
@@ -162,34 +222,63 @@ class ExecutionEngine:
         except Exception:
             return None
 
-    def _check_exposure_limit(self, ticker: str, qty: int, price: float) -> Tuple[bool, str]:
-        equity = float(self.pt.get_current_balance().get("total_equity", 0.0))
+    def build_risk_context(self, include_sizing: bool = True) -> RiskContext:
+        """
+        残高・ポジション・セクター・VIX・CVaR を1度だけ取得してリスクコンテキストを作る。
+
+        Args:
+            include_sizing: False の場合、ポジションサイズ計算用の VIX / CVaR を取得しない
+        """
+        balance = self.pt.get_current_balance()
+        positions = self.pt.get_positions()
+        quantities: Dict[str, int] = {}
+        values: Dict[str, float] = {}
+
+        if isinstance(positions, pd.DataFrame) and not positions.empty and "ticker" in positions.columns:
+            if "market_value" in positions.columns:
+                market_values = positions["market_value"]
+            elif {"quantity", "current_price"}.issubset(positions.columns):
+                market_values = positions["quantity"] * positions["current_price"]
+            else:
+                market_values = pd.Series(0.0, index=positions.index)
+            qty_col = positions["quantity"] if "quantity" in positions.columns else pd.Series(0, index=positions.index)
+            for tkr, qty, value in zip(positions["ticker"], qty_col, market_values):
+                if not tkr:
+                    continue
+                quantities[tkr] = quantities.get(tkr, 0) + int(qty)
+                values[tkr] = values.get(tkr, 0.0) + float(value)
+
+        return RiskContext(
+            equity=float(balance.get("total_equity", 0.0)),
+            cash=float(balance.get("cash", 0.0)),
+            initial_capital=float(self.pt.initial_capital),
+            quantities=quantities,
+            values=values,
+            sectors={tkr: self._get_sector(tkr) for tkr in values},
+            vix=self._fetch_vix() if include_sizing else None,
+            cvar_factor=self._cvar_adjustment() if include_sizing else 1.0,
+        )
+
+    def _check_exposure_limit(
+        self, ticker: str, qty: int, price: float, context: Optional[RiskContext] = None
+    ) -> Tuple[bool, str]:
+        if context is None:
+            context = self.build_risk_context(include_sizing=False)
+        equity = context.equity
         if equity <= 0:
             return True, ""
 
         value = qty * price
-        positions = self.pt.get_positions()
-        ticker_value = 0.0
+        ticker_value = context.values.get(ticker, 0.0)
         sector_value = 0.0
 
-        if not positions.empty and "ticker" in positions.columns:
-            if "market_value" in positions.columns:
-                ticker_value = float(positions.loc[positions["ticker"] == ticker, "market_value"].sum())
-            else:
-                row = positions.loc[positions["ticker"] == ticker]
-                if not row.empty and {"quantity", "current_price"}.issubset(row.columns):
-                    ticker_value = float((row["quantity"] * row["current_price"]).sum())
+        if context.values:
             sector = self._get_sector(ticker)
             if sector:
-                current_sector_tickers = positions["ticker"].tolist()
-                for tkr in current_sector_tickers:
-                    same_sector = self._get_sector(tkr) == sector
-                    if same_sector:
-                        if "market_value" in positions.columns:
-                            sector_value += float(positions.loc[positions["ticker"] == tkr, "market_value"].sum())
-                        elif {"quantity", "current_price"}.issubset(positions.columns):
-                            sel = positions.loc[positions["ticker"] == tkr]
-                            sector_value += float((sel["quantity"] * sel["current_price"]).sum())
+                for tkr, tkr_value in context.values.items():
+                    tkr_sector = context.sectors[tkr] if tkr in context.sectors else self._get_sector(tkr)
+                    if tkr_sector == sector:
+                        sector_value += tkr_value
         # 追加分を加味
         ticker_after = (ticker_value + value) / equity
         if ticker_after > self.exposure_limits["max_per_ticker_pct"]:
@@ -202,21 +291,24 @@ class ExecutionEngine:
 
         return True, ""
 
-    def _volatility_slowdown_factor(self) -> float:
-        """VIXやドローダウンを加味してポジションを縮小。"""
-        factor = 1.0
-        dd = self._current_drawdown()
-        if dd > 0.05:
-            factor *= max(0.5, 1.0 - dd)  # 5%以上のDDで縮小
-
-        vix_level = None
+    def _fetch_vix(self) -> Optional[float]:
         try:
             ext = fetch_external_data(period="5d")
             vix_df = ext.get("VIX")
             if vix_df is not None and not vix_df.empty:
-                vix_level = float(vix_df["Close"].iloc[-1])
+                return float(vix_df["Close"].iloc[-1])
         except Exception:
-            vix_level = None
+            pass
+        return None
+
+    def _volatility_slowdown_factor(self, context: Optional[RiskContext] = None) -> float:
+        """VIXやドローダウンを加味してポジションを縮小。"""
+        factor = 1.0
+        dd = context.drawdown if context is not None else self._current_drawdown()
+        if dd > 0.05:
+            factor *= max(0.5, 1.0 - dd)  # 5%以上のDDで縮小
+
+        vix_level = context.vix if context is not None else self._fetch_vix()
 
         if vix_level and vix_level > self.vol_slowdown_threshold:
             factor *= 0.6  # 高ボラ期は40%縮小
@@ -243,16 +335,26 @@ class ExecutionEngine:
         except Exception:
             return 1.0
 
-    def calculate_position_size(self, ticker: str, price: float, confidence: float = 1.0) -> int:
-        """Calculates the number of shares to buy based on risk management."""
-        balance = self.pt.get_current_balance()
-        equity = float(balance.get("total_equity", 0.0))
-        cash = float(balance.get("cash", 0.0))
+    def calculate_position_size(
+        self, ticker: str, price: float, confidence: float = 1.0, context: Optional[RiskContext] = None
+    ) -> int:
+        """Calculates the number of shares to buy based on risk management.
+
+        When a RiskContext is given, equity/cash/VIX/CVaR are taken from it instead of being fetched again.
+        """
+        if context is not None:
+            equity, cash = context.equity, context.cash
+            cvar_factor = context.cvar_factor
+        else:
+            balance = self.pt.get_current_balance()
+            equity = float(balance.get("total_equity", 0.0))
+            cash = float(balance.get("cash", 0.0))
+            cvar_factor = self._cvar_adjustment()
 
         target_amount = equity * self.max_position_size_pct
         target_amount *= confidence
-        target_amount *= self._volatility_slowdown_factor()
-        target_amount *= self._cvar_adjustment()
+        target_amount *= self._volatility_slowdown_factor(context)
+        target_amount *= cvar_factor
         target_amount = min(target_amount, cash)
 
         if target_amount <= 0:
@@ -298,6 +400,10 @@ class ExecutionEngine:
         if not self.check_risk():
             return executed_trades
 
+        # バッチ全体で1度だけリスク情報を取得し、以降は約定ごとに差分更新する
+        needs_sizing = any(s.get("action") == "BUY" and not int(s.get("quantity", 0)) for s in signals)
+        context = self.build_risk_context(include_sizing=needs_sizing)
+
         def _retry_trade(func) -> bool:
             for attempt in range(3):
                 if func():
@@ -322,10 +428,10 @@ class ExecutionEngine:
             if action == "BUY":
                 qty = int(signal.get("quantity", 0))
                 if qty == 0:
-                    qty = self.calculate_position_size(ticker, price, confidence)
+                    qty = self.calculate_position_size(ticker, price, confidence, context=context)
 
                 if qty > 0:
-                    ok, reason = self._check_exposure_limit(ticker, qty, price)
+                    ok, reason = self._check_exposure_limit(ticker, qty, price, context=context)
                     if not ok:
                         logger.warning("Exposure limit hit: %s", reason)
                         continue
@@ -342,6 +448,7 @@ class ExecutionEngine:
                             self.pt.execute_trade(
                                 ticker, "BUY", qty, price, reason=f"Real Trade Sync (Conf: {confidence:.2f})"
                             )
+                            context = context.with_fill(ticker, "BUY", qty, price, self._sector_cache.get(ticker))
                             executed_trades.append(
                                 {"ticker": ticker, "action": "BUY", "quantity": qty, "price": price, "reason": reason}
                             )
@@ -361,6 +468,7 @@ class ExecutionEngine:
                         )
                         if success:
                             logger.info(f"EXECUTED: BUY {qty} {ticker} @ {price} (Stop: {initial_stop:.2f})")
+                            context = context.with_fill(ticker, "BUY", qty, price, self._sector_cache.get(ticker))
                             executed_trades.append(
                                 {
                                     "ticker": ticker,
@@ -375,11 +483,8 @@ class ExecutionEngine:
                             logger.warning(f"FAILED: BUY {ticker} (Insufficient funds?)")
 
             elif action == "SELL":
-                positions = self.pt.get_positions()
-
-                if not positions.empty and "ticker" in positions.columns and ticker in positions["ticker"].values:
-                    row = positions[positions["ticker"] == ticker].iloc[0]
-                    qty = int(row["quantity"])
+                if ticker in context.quantities:
+                    qty = context.quantities[ticker]
 
                     if self.real_broker:
                         logger.info(f"🚀 REAL TRADE: SELL {qty} {ticker} @ {price}")
@@ -389,6 +494,7 @@ class ExecutionEngine:
                         success = _retry_trade(lambda: self.pt.execute_trade(ticker, "SELL", qty, price, reason=reason))
                         if success:
                             logger.info(f"EXECUTED: SELL {qty} {ticker} @ {price}")
+                            context = context.with_fill(ticker, "SELL", qty, price)
                             executed_trades.append(
                                 {"ticker": ticker, "action": "SELL", "quantity": qty, "price": price, "reason": reason}
                             )
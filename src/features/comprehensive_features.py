@@ -8,6 +8,8 @@ from typing import Dict, Optional
 import numpy as np
 import pandas as pd
 
+from src.features.rolling_kernels import rolling_autocorr
+
 logger = logging.getLogger(__name__)
 
 
@@ -207,7 +209,7 @@ class ComprehensiveFeatureGenerator:
         df["zscore"] = (df["Close"] - mean_20) / (std_20 + 1e-10)
 
         # Autocorrelation
-        df["autocorr_5"] = df["returns_1d"].rolling(20).apply(lambda x: x.autocorr(lag=5) if len(x) >= 5 else 0)
+        df["autocorr_5"] = rolling_autocorr(df["returns_1d"], window=20, lag=5)
 
         return df
 
@@ -17,6 +17,8 @@ import numpy as np
 import pandas as pd
 import ta
 
+from src.features.rolling_kernels import rolling_sum_of_squares
+
 warnings.filterwarnings("ignore")
 
 logger = logging.getLogger(__name__)
@@ -263,7 +265,7 @@ def add_volatility_features(df: pd.DataFrame) -> pd.DataFrame:
 
     # 2. 実現ボラティリティ（対数リターンの二乗和）
     log_rets = np.log(df_out["Close"] / df_out["Close"].shift(1))
-    df_out["Realized_Vol"] = np.sqrt(log_rets.rolling(20).apply(lambda x: np.sum(x**2)))
+    df_out["Realized_Vol"] = np.sqrt(rolling_sum_of_squares(log_rets, 20))
 
     # 3. ボラティリティクラスタリング（GARCH的な特徴）
     squared_rets = log_rets**2
@@ -0,0 +1,408 @@
+"""
+ローカル特徴量ストア
+
+特徴量セット（``generate_phase29_features`` など）の計算結果を
+(キー=銘柄, 特徴量セット, バージョン) ごとに列指向ファイルとして永続化する。
+
+- 保存先: ``{base_dir}/{feature_set}/{version}/{key}.parquet``
+  （pyarrow が使えない環境では ``.pkl`` で代替）
+- 増分計算可能な特徴量セットは、前回保存以降に追加された行だけを lookback 行の
+  ウォームアップ付きで再計算して末尾に追記する
+- 全期間の分位点・累積値（OBV, VWAP）・長期 EMA など履歴全体に依存する列は
+  ``FeatureSet.history`` で保存済みの全期間から計算し直して上書きする（軽い計算だけ）
+- 入力の期間が保存済みの期間に含まれていればキャッシュから切り出して返す
+  （値は保存済みの全期間で計算したもの）
+- ``incremental=False`` の特徴量セットは期間が保存済みに含まれないとき全再計算
+- 保存済みの生データ（Close など）が変わっていた場合（分割調整など）は全再計算
+- キーを省略した呼び出し（先頭行のハッシュ）の結果はディスクに保存せず、
+  件数上限つきのメモリキャッシュにだけ置く
+- 複数銘柄の float32 特徴量行列を学習・推論にまとめて提供する
+
+特徴量関数を変更したときは FeatureSet の version を上げること（古いキャッシュは参照されなくなる）。
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 特徴量に含めない生データ列
+RAW_COLUMNS = ("Open", "High", "Low", "Close", "Adj Close", "Volume")
+
+_parquet_available: Optional[bool] = None
+
+
+def _use_parquet() -> bool:
+    global _parquet_available
+    if _parquet_available is None:
+        try:
+            import pyarrow  # noqa: F401
+
+            _parquet_available = True
+        except Exception:
+            _parquet_available = False
+    return _parquet_available
+
+
+@dataclass(frozen=True)
+class FeatureSet:
+    """
+    特徴量セットの定義
+
+    Attributes:
+        name: 特徴量セット名
+        func: 生データ(OHLCV) -> 特徴量付きデータフレーム
+        version: 関数の出力が変わったら上げる
+        lookback: 1行を正しく計算するのに必要な過去行数（増分計算のウォームアップ）
+        incremental: lookback 行のウォームアップで全期間計算と同じ値になる場合のみ True
+        history: 履歴全体に依存する列を計算する関数（保存済みの全期間 -> 上書きする列）。
+            増分計算のあとに適用するので、それ以外の列だけが lookback で決まればよい
+    """
+
+    name: str
+    func: Callable[[pd.DataFrame], pd.DataFrame]
+    version: str = "1"
+    lookback: int = 252
+    incremental: bool = True
+    history: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None
+
+
+def _phase29(df: pd.DataFrame) -> pd.DataFrame:
+    from src.features.time_series_features import generate_phase29_features
+
+    return generate_phase29_features(df)
+
+
+def _phase29_history(df: pd.DataFrame) -> pd.DataFrame:
+    """Volatility_Regime（全期間のボラティリティ分位点で分類）"""
+    from src.features.time_series_features import add_volatility_regime
+
+    return add_volatility_regime(df[["Close"]])[["Volatility_Regime"]]
+
+
+def _enhanced(df: pd.DataFrame) -> pd.DataFrame:
+    from src.features.enhanced_features import generate_enhanced_features
+
+    return generate_enhanced_features(df)
+
+
+def _enhanced_history(df: pd.DataFrame) -> pd.DataFrame:
+    """Vol_Regime, Close_Cat（全期間の値幅で pd.cut）と Close_Cat_ExpReturn"""
+    from src.features.enhanced_features import add_target_encoding_features, add_volatility_features
+
+    out = add_target_encoding_features(add_volatility_features(df[["Close"]]))
+    out = out[["Vol_Regime", "Close_Cat", "Close_Cat_ExpReturn"]].replace([np.inf, -np.inf], np.nan)
+    # generate_enhanced_features の欠損処理と同じ
+    out["Close_Cat_ExpReturn"] = out["Close_Cat_ExpReturn"].ffill().bfill().fillna(0)
+    out[["Vol_Regime", "Close_Cat"]] = out[["Vol_Regime", "Close_Cat"]].ffill().bfill()
+    return out
+
+
+def _comprehensive(df: pd.DataFrame) -> pd.DataFrame:
+    from src.features.comprehensive_features import ComprehensiveFeatureGenerator
+
+    return ComprehensiveFeatureGenerator().generate_all_features(df)
+
+
+def _comprehensive_history(df: pd.DataFrame) -> pd.DataFrame:
+    """EMA_50, EMA_200, OBV, VWAP（ComprehensiveFeatureGenerator と同じ式）"""
+    out = pd.DataFrame(index=df.index)
+    for period in (50, 200):
+        out[f"EMA_{period}"] = df["Close"].ewm(span=period).mean()
+    out["OBV"] = (np.sign(df["Close"].diff()) * df["Volume"]).fillna(0).cumsum()
+    out["VWAP"] = (df["Close"] * df["Volume"]).cumsum() / df["Volume"].cumsum()
+    out["VWAP_deviation"] = (df["Close"] - out["VWAP"]) / (out["VWAP"] + 1e-10)
+    return out
+
+
+# 履歴全体に依存する列は history で全期間から計算し直し、残りの列を増分計算する
+DEFAULT_FEATURE_SETS = (
+    FeatureSet("phase29", _phase29, version="2", history=_phase29_history),
+    FeatureSet("enhanced", _enhanced, version="2", history=_enhanced_history),
+    FeatureSet("comprehensive", _comprehensive, version="2", history=_comprehensive_history),
+)
+
+
+def frame_key(df: pd.DataFrame) -> str:
+    """
+    銘柄名が分からないときのキー
+
+    先頭行（日付と値）のハッシュ。同じ開始日の同じ銘柄の履歴は末尾に行が増えても同じキーになる。
+    """
+    first = df.iloc[:1]
+    payload = f"{first.index[0]!s}|{first.to_numpy().tobytes().hex()}|{','.join(map(str, df.columns))}"
+    return "anon-" + hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _safe_name(key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", key)
+
+
+class FeatureStore:
+    """
+    特徴量フレームの永続キャッシュ
+
+    Example:
+        store = get_feature_store()
+        feats = store.get_features(df, "phase29", key="7203.T")
+        X = store.get_matrix({"7203.T": df1, "6758.T": df2}, "phase29", columns=["RSI", "MACD"])
+    """
+
+    def __init__(
+        self,
+        base_dir: str = "data/feature_store",
+        feature_sets: Iterable[FeatureSet] = DEFAULT_FEATURE_SETS,
+        max_memory_frames: int = 64,
+    ):
+        self.base_dir = Path(base_dir)
+        self.max_memory_frames = max_memory_frames
+        # (特徴量セット, バージョン, キー) -> 直近に使ったフレーム（ストリーミングで毎回ファイルを読まないため）
+        self._memory: "OrderedDict[Tuple[str, str, str], pd.DataFrame]" = OrderedDict()
+        self.feature_sets: Dict[str, FeatureSet] = {}
+        for feature_set in feature_sets:
+            self.register(feature_set)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._stats = {"hits": 0, "incremental": 0, "full": 0}
+
+    def register(self, feature_set: FeatureSet) -> None:
+        self.feature_sets[feature_set.name] = feature_set
+
+    # ------------------------------------------------------------------
+    # 永続化
+    # ------------------------------------------------------------------
+    def _path(self, feature_set: FeatureSet, key: str) -> Path:
+        suffix = ".parquet" if _use_parquet() else ".pkl"
+        return self.base_dir / feature_set.name / feature_set.version / f"{_safe_name(key)}{suffix}"
+
+    def _remember(self, feature_set: FeatureSet, key: str, frame: pd.DataFrame) -> None:
+        with self._lock:
+            self._memory[(feature_set.name, feature_set.version, key)] = frame
+            self._memory.move_to_end((feature_set.name, feature_set.version, key))
+            while len(self._memory) > self.max_memory_frames:
+                self._memory.popitem(last=False)
+
+    def _recall(self, feature_set: FeatureSet, key: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            frame = self._memory.get((feature_set.name, feature_set.version, key))
+            if frame is not None:
+                self._memory.move_to_end((feature_set.name, feature_set.version, key))
+            return frame
+
+    def _load(self, feature_set: FeatureSet, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(feature_set, key)
+        if not path.exists():
+            return None
+        try:
+            if path.suffix == ".parquet":
+                return pd.read_parquet(path)
+            return pd.read_pickle(path)
+        except Exception as e:
+            logger.warning(f"Failed to read feature cache {path}: {e}")
+            return None
+
+    def _save(self, feature_set: FeatureSet, key: str, frame: pd.DataFrame) -> None:
+        path = self._path(feature_set, key)
+        tmp = path.with_name(path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.suffix == ".parquet":
+                frame.to_parquet(tmp, compression="snappy")
+            else:
+                frame.to_pickle(tmp)
+            os.replace(tmp, path)  # 読み手が書きかけのファイルを見ないようにアトミックに置換
+        except Exception as e:
+            logger.warning(f"Failed to write feature cache {path}: {e}")
+            tmp.unlink(missing_ok=True)
+
+    def invalidate(self, feature_set: str, key: str) -> None:
+        fs = self.feature_sets[feature_set]
+        with self._lock:
+            self._memory.pop((fs.name, fs.version, key), None)
+        self._path(fs, key).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # 計算
+    # ------------------------------------------------------------------
+    def _key_lock(self, feature_set: str, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault((feature_set, key), threading.Lock())
+
+    @staticmethod
+    def _raw_matches(raw: pd.DataFrame, cached: pd.DataFrame) -> bool:
+        """保存済み範囲の生データが変わっていないか（Close で判定）"""
+        if "Close" not in raw.columns or "Close" not in cached.columns:
+            return True
+        overlap = cached.index.intersection(raw.index)
+        if len(overlap) == 0:
+            return False
+        return np.allclose(
+            raw["Close"].reindex(overlap).to_numpy(dtype=np.float64),
+            cached["Close"].reindex(overlap).to_numpy(dtype=np.float64),
+            equal_nan=True,
+        )
+
+    def _update(self, feature_set: FeatureSet, raw: pd.DataFrame, cached: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """不足行だけを計算して保存済みフレームに追記する（無理なら全再計算）"""
+        if (
+            cached is not None
+            and len(cached)
+            and cached.index[0] <= raw.index[0]
+            and cached.index[-1] >= raw.index[-1]
+            and self._raw_matches(raw, cached)
+        ):
+            # 保存済みの期間に含まれる: 呼び出し側で切り出す
+            self._stats["hits"] += 1
+            return cached
+
+        if not feature_set.incremental:
+            self._stats["full"] += 1
+            return feature_set.func(raw)
+
+        if (
+            cached is not None
+            and len(cached)
+            and cached.index[0] <= raw.index[0]
+            and cached.index[-1] >= raw.index[0]
+            and self._raw_matches(raw, cached)
+        ):
+            last = cached.index[-1]
+            first_new = int(raw.index.searchsorted(last, side="right"))
+            context = raw.iloc[max(0, first_new - feature_set.lookback) :]
+            computed = feature_set.func(context)
+            tail = computed.loc[computed.index > last]
+            if list(tail.columns) == list(cached.columns):
+                self._stats["incremental"] += 1
+                result = pd.concat([cached, tail])
+                if feature_set.history is not None:
+                    history = feature_set.history(result)
+                    for col in history.columns.intersection(result.columns):
+                        result[col] = history[col]
+                return result
+            logger.info(f"Feature columns changed for {feature_set.name}; recomputing full history")
+
+        self._stats["full"] += 1
+        return feature_set.func(raw)
+
+    def get_features(
+        self,
+        df: pd.DataFrame,
+        feature_set: str = "phase29",
+        key: Optional[str] = None,
+        start=None,
+        end=None,
+    ) -> pd.DataFrame:
+        """
+        df（OHLCV）の特徴量を返す。保存済みなら不足行だけ計算する。
+
+        Args:
+            df: DatetimeIndex の生データ
+            feature_set: 特徴量セット名
+            key: 銘柄コードなど（省略時は先頭行のハッシュ。ディスクには保存しない）
+            start, end: 返す期間（省略時は df の期間）
+        """
+        fs = self.feature_sets[feature_set]
+        if df is None or df.empty or not isinstance(df.index, pd.DatetimeIndex):
+            # 日付インデックスのないデータはキャッシュせずそのまま計算
+            return fs.func(df)
+
+        raw = df
+        if not (raw.index.is_monotonic_increasing and raw.index.is_unique):
+            raw = raw[~raw.index.duplicated(keep="last")].sort_index()
+        # 先頭行のハッシュは開始日ごとに別キーになり無制限に増えるので、メモリキャッシュだけに置く
+        persist = key is not None
+        key = key or frame_key(raw)
+
+        with self._key_lock(feature_set, key):
+            cached = self._recall(fs, key)
+            if cached is None and persist:
+                cached = self._load(fs, key)
+            result = self._update(fs, raw, cached)
+            # 短すぎて特徴量列のない結果も保存してよい: 行が増えると列の不一致か全再計算で置き換わる
+            if result is not cached and persist:
+                self._save(fs, key, result)
+            self._remember(fs, key, result)
+
+        lo = raw.index[0] if start is None else pd.Timestamp(start)
+        hi = raw.index[-1] if end is None else pd.Timestamp(end)
+        return result.loc[lo:hi].copy()
+
+    def get_matrix(
+        self,
+        frames: Dict[str, pd.DataFrame],
+        feature_set: str = "phase29",
+        columns: Optional[List[str]] = None,
+        start=None,
+        end=None,
+        dtype=np.float32,
+    ) -> pd.DataFrame:
+        """
+        複数銘柄の特徴量行列を (ticker, date) の MultiIndex で返す
+
+        columns 省略時は生データ列を除く全数値列。値は dtype（既定 float32）。
+        """
+        parts = []
+        for ticker, df in frames.items():
+            feats = self.get_features(df, feature_set, key=ticker, start=start, end=end)
+            if feats is None or feats.empty:
+                continue
+            if columns is None:
+                cols = [c for c in feats.select_dtypes(include=[np.number]).columns if c not in RAW_COLUMNS]
+            else:
+                cols = columns
+            part = feats.reindex(columns=cols).astype(dtype, copy=False)
+            part.index = pd.MultiIndex.from_product([[ticker], part.index], names=["ticker", "date"])
+            parts.append(part)
+
+        if not parts:
+            return pd.DataFrame(columns=columns or [], dtype=dtype)
+        # 銘柄ごとに列が違う場合は和集合（欠けた列は NaN）
+        return pd.concat(parts).astype(dtype, copy=False)
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+
+_store: Optional[FeatureStore] = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store() -> Optional[FeatureStore]:
+    """設定 ``ai.feature_store`` に従ったシングルトン（無効なら None）"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from src.config_loader import get_config
+
+                settings = get_config("ai.feature_store", {}) or {}
+                if not settings.get("enabled", True):
+                    return None
+                _store = FeatureStore(base_dir=settings.get("base_dir", "data/feature_store"))
+    return _store
+
+
+def cached_features(df: pd.DataFrame, feature_set: str = "phase29", key: Optional[str] = None) -> pd.DataFrame:
+    """
+    特徴量ストア経由で特徴量を取得（ストアが無効・失敗時は直接計算）
+
+    既存の ``add_advanced_features(df)`` 呼び出しの置き換え用。
+    """
+    store = get_feature_store()
+    if store is not None:
+        try:
+            return store.get_features(df, feature_set, key=key)
+        except Exception as e:
+            logger.warning(f"Feature store unavailable ({e}); computing {feature_set} directly")
+    feature_sets = store.feature_sets if store is not None else {fs.name: fs for fs in DEFAULT_FEATURE_SETS}
+    return feature_sets[feature_set].func(df)
@@ -0,0 +1,112 @@
+"""
+ベクトル化ローリングカーネル
+
+``Series.rolling(...).apply(python_fn)`` はウィンドウごとに Python 関数を呼ぶため遅い。
+ここでは ``sliding_window_view`` で (ウィンドウ数, window) のビューを作り、
+行方向の NumPy 演算でまとめて計算する。
+
+pandas の ``rolling(window)`` と同じく、先頭 window-1 行と NaN を含むウィンドウは NaN になる。
+入力が Series なら同じインデックスの Series を返す。
+"""
+
+from typing import Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+ArrayLike = Union[pd.Series, np.ndarray]
+
+# 一度に展開するウィンドウ数（FFT などの中間配列のメモリ上限用）
+_CHUNK_ROWS = 65536
+
+
+def _as_float_array(x: ArrayLike) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def _wrap(result: np.ndarray, x: ArrayLike, window: int) -> ArrayLike:
+    """ウィンドウ単位の結果を元の長さに揃える（先頭は NaN）"""
+    out = np.full(len(x), np.nan)
+    if result.size:
+        out[window - 1 :] = result
+    if isinstance(x, pd.Series):
+        return pd.Series(out, index=x.index, name=x.name)
+    return out
+
+
+def rolling_windows(x: ArrayLike, window: int) -> np.ndarray:
+    """(len(x)-window+1, window) のゼロコピーなウィンドウ行列"""
+    values = _as_float_array(x)
+    if window <= 0:
+        raise ValueError("window must be positive")
+    if len(values) < window:
+        return np.empty((0, window))
+    return sliding_window_view(values, window)
+
+
+def rolling_sum_of_squares(x: ArrayLike, window: int) -> ArrayLike:
+    """ローリング二乗和（実現ボラティリティ用）"""
+    windows = rolling_windows(x, window)
+    return _wrap(np.einsum("ij,ij->i", windows, windows), x, window)
+
+
+def rolling_mad(x: ArrayLike, window: int) -> ArrayLike:
+    """ローリング平均絶対偏差 mean(|x - mean(x)|)（CCI 用）"""
+    windows = rolling_windows(x, window)
+    result = np.empty(len(windows))
+    for start in range(0, len(windows), _CHUNK_ROWS):
+        chunk = windows[start : start + _CHUNK_ROWS]
+        result[start : start + len(chunk)] = np.abs(chunk - chunk.mean(axis=1, keepdims=True)).mean(axis=1)
+    return _wrap(result, x, window)
+
+
+def rolling_autocorr(x: ArrayLike, window: int, lag: int = 1) -> ArrayLike:
+    """
+    ローリング自己相関（``Series.autocorr(lag)`` と同じピアソン相関）
+
+    分散ゼロのウィンドウは NaN。
+    """
+    windows = rolling_windows(x, window)
+    if lag >= window:
+        return _wrap(np.full(len(windows), np.nan), x, window)
+
+    result = np.empty(len(windows))
+    for start in range(0, len(windows), _CHUNK_ROWS):
+        chunk = windows[start : start + _CHUNK_ROWS]
+        a = chunk[:, lag:]
+        b = chunk[:, : window - lag]
+        a = a - a.mean(axis=1, keepdims=True)
+        b = b - b.mean(axis=1, keepdims=True)
+        denom = np.sqrt(np.einsum("ij,ij->i", a, a) * np.einsum("ij,ij->i", b, b))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = np.einsum("ij,ij->i", a, b) / denom
+        corr[denom == 0] = np.nan
+        result[start : start + len(chunk)] = corr
+    return _wrap(result, x, window)
+
+
+def rolling_fft_max_amplitude(x: ArrayLike, window: int, taper: bool = False) -> ArrayLike:
+    """
+    ローリング FFT の正の周波数成分の最大振幅
+
+    ウィンドウ行列に対して rfft をまとめて実行する。直流成分と
+    （偶数長の）ナイキスト成分は ``np.fft.fftfreq(n) > 0`` と同様に除外する。
+
+    Args:
+        taper: True ならハニング窓を掛けてから変換する
+    """
+    windows = rolling_windows(x, window)
+    n_positive = (window - 1) // 2
+    if n_positive == 0:
+        return _wrap(np.zeros(len(windows)), x, window)
+
+    weights = np.hanning(window) if taper else None
+    result = np.empty(len(windows))
+    for start in range(0, len(windows), _CHUNK_ROWS):
+        chunk = windows[start : start + _CHUNK_ROWS]
+        if weights is not None:
+            chunk = chunk * weights
+        spectrum = np.abs(np.fft.rfft(chunk, axis=1)[:, 1 : n_positive + 1])
+        result[start : start + len(chunk)] = spectrum.max(axis=1)
+    return _wrap(result, x, window)
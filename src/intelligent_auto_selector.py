@@ -142,7 +142,7 @@ class IntelligentAutoSelector:
 
             # 1. オンライン学習でモデルを更新（必要に応じて）
             if self.online_lgbm:
-                self.online_lgbm.update_if_needed(df)
+                self.online_lgbm.update_if_needed(df, ticker=ticker)
 
             # 2. メタ学習で最適化（必要に応じて）
             if self.meta_optimizer:
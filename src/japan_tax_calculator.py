@@ -14,6 +14,8 @@ import logging
 from pathlib import Path
 from decimal import Decimal, ROUND_HALF_UP
 
+from src.tax.lots import TaxLotEngine
+
 
 @dataclass
 class TaxTransaction:
@@ -79,6 +81,8 @@ class JapanTaxCalculator:
         self.config = self._load_config(config_path)
         self.logger = self._setup_logger()
         self.positions = {}  # 税務上の建玉管理
+        # 取引履歴全体の譲渡損益・配当は列指向のロットエンジンで年度別に集計
+        self.lot_engine = TaxLotEngine(method=self.config.get("lot_method", "average"))
 
     def _load_config(self, config_path: str) -> Dict:
         """設定ファイル読み込み"""
@@ -143,8 +147,30 @@ class JapanTaxCalculator:
         elif transaction.transaction_type == "dividend":
             self._process_dividend_transaction(transaction)
 
+        self.lot_engine.add(transaction)
         self.logger.info(f"Added {transaction.transaction_type} transaction for {transaction.symbol}")
 
+    def add_transactions(self, transactions):
+        """取引履歴の一括追加（TaxTransaction のリストまたは DataFrame）"""
+        self.lot_engine.ingest(transactions)
+
+        # 建玉をロットエンジンの保有ロットから作り直す
+        lots = self.lot_engine.open_lots()
+        tx = self.lot_engine.transactions
+        commissions = tx[tx["transaction_type"] == "buy"].groupby("symbol")["commission"].sum()
+        held = lots.groupby("symbol")[["quantity", "cost_basis"]].sum()
+        self.positions = {
+            symbol: TaxPosition(
+                symbol=symbol,
+                quantity=int(quantity),
+                avg_purchase_price=cost / quantity,
+                total_purchase_cost=cost,
+                commission=float(commissions.get(symbol, 0.0)),
+            )
+            for symbol, quantity, cost in zip(held.index, held["quantity"], held["cost_basis"])
+        }
+        self.logger.info(f"Added {len(tx)} transactions in bulk")
+
     def _process_buy_transaction(self, transaction: TaxTransaction):
         """買付取引処理"""
         if transaction.symbol not in self.positions:
@@ -243,13 +269,10 @@ class JapanTaxCalculator:
         return result
 
     def _calculate_capital_gains(self, fiscal_year: str) -> Dict:
-        """譲渡所得計算"""
-        gains = 0.0
-        losses = 0.0
-
-        # 年間の売買取引から損益を計算
-        # ここでは簡易版として仮の値を使用
-        # 実際には取引履歴から計算する必要がある
+        """譲渡所得計算（ロットエンジンの年度別キャッシュから取得）"""
+        summary = self.lot_engine.year_summary(int(fiscal_year))
+        gains = summary["total_gains"]
+        losses = summary["total_losses"]
 
         return {
             "total_gains": gains,
@@ -258,12 +281,14 @@ class JapanTaxCalculator:
         }
 
     def _calculate_dividend_income(self, fiscal_year: str) -> Dict:
-        """配当所得計算"""
-        # 年間の配当金から所得を計算
-        # ここでは簡易版として仮の値を使用
-
-        gross_income = 50000.0  # 総配当金
-        tax_withheld = gross_income * self.config["tax_rates"]["dividend"]["withholding_rate"]
+        """配当所得計算（ロットエンジンの年度別キャッシュから取得）"""
+        summary = self.lot_engine.year_summary(int(fiscal_year))
+
+        gross_income = summary["dividend_gross_income"]
+        tax_withheld = summary["dividend_tax_withheld"]
+        if tax_withheld == 0 and gross_income > 0:
+            # 源泉徴収額が記録されていなければ源泉徴収税率で推定
+            tax_withheld = gross_income * self.config["tax_rates"]["dividend"]["withholding_rate"]
         net_income = gross_income - tax_withheld
 
         return {
@@ -1,38 +1,159 @@
 """
 Lazy Model Loader - 遅延モデル読み込み
 必要になるまでモデルをロードしない
+
+ロード済みモデルの概算メモリ使用量を記録し、メモリ予算を超える場合は
+優先度の低い・最も長く使われていないモデルから退避（アンロード）する。
 """
 
 import logging
-from typing import Any, Callable, Dict, Optional
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 logger = logging.getLogger(__name__)
 
+_MB = 1024 * 1024
+
+
+def _process_rss() -> Optional[int]:
+    """現在のプロセスRSS（バイト）。psutil が無ければ None"""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+def estimate_size_bytes(obj: Any, max_depth: int = 4) -> int:
+    """
+    オブジェクトが保持する配列・テンソルのサイズを概算
+
+    numpy 配列は nbytes、torch テンソルは要素数×要素サイズ、
+    それ以外は sys.getsizeof で数え、属性・コンテナを max_depth まで辿る。
+    """
+    seen = set()
+
+    def _walk(o: Any, depth: int) -> int:
+        if id(o) in seen:
+            return 0
+        seen.add(id(o))
+
+        nbytes = getattr(o, "nbytes", None)
+        if isinstance(nbytes, int):
+            return nbytes
+        if hasattr(o, "element_size") and hasattr(o, "numel"):
+            try:
+                return int(o.element_size() * o.numel())
+            except Exception:
+                return 0
+
+        try:
+            size = sys.getsizeof(o)
+        except Exception:
+            size = 0
+        if depth >= max_depth:
+            return size
+
+        if isinstance(o, dict):
+            children: Iterable = o.values()
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            children = o
+        elif hasattr(o, "__dict__"):
+            children = vars(o).values()
+        else:
+            children = ()
+        return size + sum(_walk(child, depth + 1) for child in children)
+
+    return _walk(obj, 0)
+
+
+@dataclass
+class ModelStats:
+    """モデルごとのロード統計"""
+
+    loads: int = 0
+    hits: int = 0
+    evictions: int = 0
+    failures: int = 0
+    last_load_seconds: float = 0.0
+    total_load_seconds: float = 0.0
+    size_bytes: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+            "failures": self.failures,
+            "last_load_seconds": round(self.last_load_seconds, 3),
+            "avg_load_seconds": round(self.total_load_seconds / self.loads, 3) if self.loads else 0.0,
+            "size_mb": round(self.size_bytes / _MB, 1),
+        }
+
 
 class LazyModelLoader:
-    """遅延モデル読み込み"""
+    """遅延モデル読み込み（メモリ予算付き）"""
 
-    def __init__(self):
-        self._models: Dict[str, Any] = {}
+    def __init__(self, memory_budget_mb: Optional[float] = None):
+        self.memory_budget_mb = memory_budget_mb
+        self._models: "OrderedDict[str, Any]" = OrderedDict()  # LRU順（末尾が最新）
         self._loaders: Dict[str, Callable] = {}
+        self._unloaders: Dict[str, Callable] = {}
         self._loaded: Dict[str, bool] = {}
-
-    def register(self, name: str, loader: Callable):
+        self._priority: Dict[str, int] = {}
+        self._declared_size: Dict[str, int] = {}
+        self._hot: List[str] = []
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.RLock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._preload_thread: Optional[threading.Thread] = None
+
+    def register(
+        self,
+        name: str,
+        loader: Callable,
+        priority: int = 0,
+        size_mb: Optional[float] = None,
+        hot: bool = False,
+        on_unload: Optional[Callable[[Any], None]] = None,
+    ):
         """
         モデルローダーを登録
 
         Args:
             name: モデル名
             loader: モデルをロードする関数
+            priority: 退避優先度（大きいほど残りやすい）
+            size_mb: 既知の概算サイズ（未指定ならロード時に計測）
+            hot: 起動時にバックグラウンドでプリロードする
+            on_unload: アンロード時に呼ぶ関数（モデルを渡す）。ローダーが
+                プロセス共有のシングルトンを返す場合、その参照もここで解放する
         """
-        self._loaders[name] = loader
-        self._loaded[name] = False
+        with self._lock:
+            self._loaders[name] = loader
+            if on_unload is not None:
+                self._unloaders[name] = on_unload
+            self._loaded[name] = False
+            self._priority[name] = priority
+            self._load_locks[name] = threading.Lock()
+            self._stats.setdefault(name, ModelStats())
+            if size_mb is not None:
+                self._declared_size[name] = int(size_mb * _MB)
+            if hot and name not in self._hot:
+                self._hot.append(name)
         logger.debug(f"Registered lazy loader for: {name}")
 
     def get(self, name: str) -> Optional[Any]:
         """
         モデルを取得（必要に応じてロード）
 
+        同じモデルへの同時ロード要求は1回のロードにまとめられる。
+
         Args:
             name: モデル名
 
@@ -43,16 +164,82 @@ class LazyModelLoader:
             logger.warning(f"Unknown model: {name}")
             return None
 
-        if not self._loaded.get(name, False):
-            logger.info(f"Lazy loading model: {name}")
-            try:
-                self._models[name] = self._loaders[name]()
-                self._loaded[name] = True
-            except Exception as e:
-                logger.error(f"Failed to load {name}: {e}")
-                return None
+        model = self._hit(name)
+        if model is not None:
+            return model
 
-        return self._models.get(name)
+        with self._load_locks[name]:
+            # 待っている間に別スレッドがロードを終えていれば、それを使う
+            model = self._hit(name)
+            if model is not None:
+                return model
+            return self._load(name)
+
+    def _hit(self, name: str) -> Optional[Any]:
+        with self._lock:
+            if not self._loaded.get(name, False):
+                return None
+            self._models.move_to_end(name)
+            self._stats[name].hits += 1
+            return self._models[name]
+
+    def _load(self, name: str) -> Optional[Any]:
+        stats = self._stats[name]
+        expected = self._declared_size.get(name) or stats.size_bytes
+        if expected:
+            self._enforce_budget(incoming=expected, protect=name)
+
+        logger.info(f"Lazy loading model: {name}")
+        rss_before = _process_rss()
+        start = time.perf_counter()
+        try:
+            model = self._loaders[name]()
+        except Exception as e:
+            stats.failures += 1
+            logger.error(f"Failed to load {name}: {e}")
+            return None
+        elapsed = time.perf_counter() - start
+
+        size = self._declared_size.get(name)
+        if size is None:
+            rss_after = _process_rss()
+            rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else 0
+            size = max(rss_delta, estimate_size_bytes(model))
+
+        with self._lock:
+            self._models[name] = model
+            self._models.move_to_end(name)
+            self._loaded[name] = True
+            stats.loads += 1
+            stats.last_load_seconds = elapsed
+            stats.total_load_seconds += elapsed
+            stats.size_bytes = size
+
+        logger.info(f"Loaded {name} in {elapsed:.2f}s (~{size / _MB:.1f} MB)")
+        self._enforce_budget(protect=name)
+        return model
+
+    def _enforce_budget(self, incoming: int = 0, protect: Optional[str] = None):
+        """予算超過分を低優先度・LRU順に退避"""
+        if self.memory_budget_mb is None:
+            return
+        budget = int(self.memory_budget_mb * _MB)
+        with self._lock:
+            candidates = sorted(
+                (n for n in self._models if n != protect),
+                key=lambda n: self._priority.get(n, 0),
+            )  # sorted は安定なので、同じ優先度内では LRU 順が保たれる
+            for victim in candidates:
+                if self.resident_bytes() + incoming <= budget:
+                    break
+                self._stats[victim].evictions += 1
+                logger.info(f"Evicting model {victim} to stay within {self.memory_budget_mb:.0f} MB budget")
+                self.unload(victim)
+
+    def resident_bytes(self) -> int:
+        """ロード済みモデルの概算合計サイズ"""
+        with self._lock:
+            return sum(self._stats[n].size_bytes for n in self._models)
 
     def is_loaded(self, name: str) -> bool:
         """モデルがロード済みか確認"""
@@ -60,22 +247,62 @@ class LazyModelLoader:
 
     def unload(self, name: str):
         """モデルをアンロード"""
-        if name in self._models:
-            del self._models[name]
-            self._loaded[name] = False
-            logger.info(f"Unloaded model: {name}")
+        with self._lock:
+            if name in self._models:
+                model = self._models.pop(name)
+                self._loaded[name] = False
+                on_unload = self._unloaders.get(name)
+                if on_unload is not None:
+                    try:
+                        on_unload(model)
+                    except Exception as e:
+                        logger.warning(f"Unload hook for {name} failed: {e}")
+                logger.info(f"Unloaded model: {name}")
 
     def unload_all(self):
         """全モデルをアンロード"""
         for name in list(self._models.keys()):
             self.unload(name)
 
+    def preload(self, names: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """
+        モデルを先読み（デフォルトは hot 指定のモデル）
+
+        Args:
+            names: 先読みするモデル名
+            background: True ならデーモンスレッドで実行しスレッドを返す
+        """
+        targets = list(names) if names is not None else list(self._hot)
+        if not targets:
+            return None
+
+        def _run():
+            for name in targets:
+                self.get(name)
+
+        if not background:
+            _run()
+            return None
+
+        self._preload_thread = threading.Thread(target=_run, name="model-preload", daemon=True)
+        self._preload_thread.start()
+        return self._preload_thread
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """モデルごとのロード時間・ヒット数・サイズ"""
+        with self._lock:
+            return {
+                name: dict(stats.as_dict(), loaded=self._loaded.get(name, False)) for name, stats in self._stats.items()
+            }
+
     def get_status(self) -> Dict:
         """ロード状態を取得"""
         return {
             "registered": list(self._loaders.keys()),
             "loaded": [name for name, loaded in self._loaded.items() if loaded],
             "unloaded": [name for name, loaded in self._loaded.items() if not loaded],
+            "resident_mb": round(self.resident_bytes() / _MB, 1),
+            "memory_budget_mb": self.memory_budget_mb,
         }
 
 
@@ -86,12 +313,16 @@ _loader = None
 def get_lazy_loader() -> LazyModelLoader:
     global _loader
     if _loader is None:
-        _loader = LazyModelLoader()
-        _register_default_models(_loader)
+        from src.config_loader import get_config
+
+        settings = get_config("ai.model_residency", {}) or {}
+        _loader = LazyModelLoader(memory_budget_mb=settings.get("memory_budget_mb"))
+        _register_default_models(_loader, hot=settings.get("hot_models", []))
+        _loader.preload()
     return _loader
 
 
-def _register_default_models(loader: LazyModelLoader):
+def _register_default_models(loader: LazyModelLoader, hot: Iterable[str] = ()):
     """デフォルトモデルを登録"""
 
     def load_lstm():
@@ -124,11 +355,19 @@ def _register_default_models(loader: LazyModelLoader):
 
         return get_bert_analyzer()
 
-    loader.register("lstm", load_lstm)
-    loader.register("lgbm", load_lgbm)
-    loader.register("prophet", load_prophet)
-    loader.register("transformer", load_transformer)
-    loader.register("rl", load_rl)
-    loader.register("bert", load_bert)
+    def unload_bert(_model):
+        # load_bert はプロセス共有のシングルトンを返すので、そちらも手放さないとメモリが解放されない
+        from src.bert_sentiment import reset_bert_analyzer
+
+        reset_bert_analyzer()
+
+    hot = set(hot)
+    # 軽量でよく使う LightGBM を残しやすく、重い深層学習モデルから退避させる
+    loader.register("lstm", load_lstm, hot="lstm" in hot)
+    loader.register("lgbm", load_lgbm, priority=2, hot="lgbm" in hot)
+    loader.register("prophet", load_prophet, hot="prophet" in hot)
+    loader.register("transformer", load_transformer, hot="transformer" in hot)
+    loader.register("rl", load_rl, priority=1, hot="rl" in hot)
+    loader.register("bert", load_bert, hot="bert" in hot, on_unload=unload_bert)
 
     logger.info("Registered 6 lazy-loadable models")
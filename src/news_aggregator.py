@@ -7,7 +7,7 @@ import logging
 from datetime import datetime
 from typing import Dict, List
 
-import feedparser
+from src.data.feed_service import get_feed_service
 
 logger = logging.getLogger(__name__)
 
@@ -36,25 +36,22 @@ class NewsAggregator:
         Returns:
             ニュースリスト [{'title', 'link', 'published', 'summary', 'source'}]
         """
+        # 全ソースを並行・条件付きGETで取得（更新のないフィードは記事ストアから）
         all_news = []
-
-        for source, url in self.RSS_FEEDS.items():
-            try:
-                feed = feedparser.parse(url)
-
-                for entry in feed.entries[:5]:  # 各ソースから最新5件
-                    published = entry.get("published", entry.get("updated", str(datetime.now())))
-
-                    news_item = {
-                        "title": entry.title,
-                        "link": entry.link,
-                        "published": published,
-                        "summary": getattr(entry, "summary", ""),
-                        "source": source,
+        try:
+            result = get_feed_service().fetch(self.RSS_FEEDS, per_feed_limit=5)  # 各ソースから最新5件
+            for article in result["articles"]:
+                all_news.append(
+                    {
+                        "title": article["title"],
+                        "link": article["link"],
+                        "published": article["published"] or str(datetime.now()),
+                        "summary": article["summary"] or "",
+                        "source": article["source"],
                     }
-                    all_news.append(news_item)
-            except Exception as e:
-                logger.warning(f"Error fetching RSS from {source}: {e}")
+                )
+        except Exception as e:
+            logger.warning(f"Error fetching RSS news: {e}")
 
         # 日付順にソート（簡易実装）
         # 日付フォーマットがバラバラなため、そのままではソート難しいが、一旦そのまま
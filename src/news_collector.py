@@ -7,7 +7,7 @@ import datetime
 import logging
 from typing import Dict, List
 
-import feedparser
+from src.data.feed_service import get_feed_service
 
 logger = logging.getLogger(__name__)
 
@@ -49,20 +49,17 @@ class NewsCollector:
 
         all_news = []
 
-        # Yahoo Business
+        # Yahoo Business (conditional GET; an unchanged feed is served from the article store)
         try:
-            feed = feedparser.parse(RSS_FEEDS["YAHOO_JP_BIZ"])
-            for entry in feed.entries[:limit]:
+            result = get_feed_service().fetch({"Yahoo Finance": RSS_FEEDS["YAHOO_JP_BIZ"]}, per_feed_limit=limit)
+            for article in result["articles"]:
                 all_news.append(
                     {
                         "source": "Yahoo Finance",
-                        "title": entry.title,
-                        "link": entry.link,
-                        "published": entry.get(
-                            "published",
-                            datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
-                        ),
-                        "summary": entry.get("summary", ""),  # specific to ticker if scraping, but RSS usually generic
+                        "title": article["title"],
+                        "link": article["link"],
+                        "published": article["published"] or datetime.datetime.now().strftime("%Y-%m-%d %H:%M"),
+                        "summary": article["summary"] or "",
                     }
                 )
         except Exception as e:
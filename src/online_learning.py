@@ -57,7 +57,7 @@ class OnlineLearner:
             sample_weight: サンプルの重み（Noneの場合は時間減衰重みを使用）
         """
         if sample_weight is None:
-            sample_weight = self._calculate_time_decay_weights(len(X_new))
+            sample_weight = self.time_decay_weights(len(X_new))
 
         logger.info(f"Incremental fit with {len(X_new)} samples")
 
@@ -81,7 +81,7 @@ class OnlineLearner:
             logger.error(f"Error during incremental fit: {e}")
             raise
 
-    def _calculate_time_decay_weights(self, n_samples: int) -> np.ndarray:
+    def time_decay_weights(self, n_samples: int) -> np.ndarray:
         """
         時間減衰を考慮した重み計算
 
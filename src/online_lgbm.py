@@ -1,25 +1,73 @@
 """
 Online Learning Wrapper for LightGBM
 LightGBMモデルに継続的学習機能を追加
+
+更新は直近 window_size 行のスライディングウィンドウだけを使い、保存済みブースターから
+rounds_per_update 本の木を追加学習する（木の数が max_trees を超えたらウィンドウで再学習）。
+ブースターは LightGBM のネイティブ形式（テキスト）で保存し、学習済み範囲などの状態は
+同名の .json に保存する。旧形式の pickle (ONLINE_MODEL_PATH) があれば初回に読み込んで移行する。
 """
 
+import json
 import logging
 import os
 from datetime import datetime
+from typing import Dict, List, Optional
 
 import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
-ONLINE_MODEL_PATH = "models/lgbm_online.pkl"
+ONLINE_MODEL_PATH = "models/lgbm_online.pkl"  # 旧形式（読み込みのみ）
+ONLINE_BOOSTER_PATH = "models/lgbm_online.txt"
+
+EXCLUDE_COLS = ["Date", "Open", "High", "Low", "Close", "Volume", "target"]
+
+# 学習ウィンドウの特徴量を計算するのに必要な過去行数（phase29 の最長ウィンドウ。特徴量ストアの lookback と同じ）
+FEATURE_LOOKBACK = 252
+
+LGBM_PARAMS = {
+    "objective": "binary",
+    "max_depth": 5,
+    "learning_rate": 0.1,
+    "seed": 42,
+    "verbose": -1,
+}
 
 
 class OnlineLGBMPredictor:
     """オンライン学習対応のLightGBM予測器"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        model_path: str = ONLINE_BOOSTER_PATH,
+        window_size: Optional[int] = None,
+        rounds_per_update: Optional[int] = None,
+        max_trees: Optional[int] = None,
+    ):
+        """
+        Args:
+            model_path: ブースターの保存先（状態は拡張子を .json にしたファイル）
+            window_size: 1回の更新に使う直近の行数
+            rounds_per_update: 追加学習で増やす木の本数
+            max_trees: これを超えたらウィンドウで再学習（モデルサイズの上限）
+        """
+        from src.config_loader import get_config
+
+        settings = get_config("ai.online_lgbm", {}) or {}
+        self.model_path = model_path
+        self.state_path = os.path.splitext(model_path)[0] + ".json"
+        self.window_size = int(window_size or settings.get("window_size", 500))
+        self.rounds_per_update = int(rounds_per_update or settings.get("rounds_per_update", 20))
+        self.initial_rounds = int(settings.get("initial_rounds", 100))
+        self.max_trees = int(max_trees or settings.get("max_trees", 600))
+
         self.learner = None
+        self.booster = None
+        self.feature_cols: List[str] = []
+        # 銘柄ごとの学習済み最終行（新しい行がなければ再学習しない）
+        self.trained_until: Dict[str, str] = {}
         self.last_update = None
         self.update_interval_days = 7  # 週次更新
         self._initialize()
@@ -31,7 +79,7 @@ class OnlineLGBMPredictor:
 
             from src.online_learning import OnlineLearner
 
-            # ベースモデル
+            # ベースモデル（時間減衰重み・更新頻度・性能履歴の管理に使う）
             base_model = LGBMClassifier(
                 n_estimators=100,
                 max_depth=5,
@@ -48,15 +96,101 @@ class OnlineLGBMPredictor:
             )
 
             # 保存済みモデルをロード
-            if os.path.exists(ONLINE_MODEL_PATH):
-                self.learner.load_model(ONLINE_MODEL_PATH)
+            if os.path.exists(self.model_path):
+                self._load()
                 logger.info("Online LightGBM model loaded")
+            elif os.path.exists(ONLINE_MODEL_PATH):
+                self.learner.load_model(ONLINE_MODEL_PATH)
+                if hasattr(self.learner.base_model, "booster_"):
+                    self.booster = self.learner.base_model.booster_
+                    self.feature_cols = self.booster.feature_name()
+                logger.info("Online LightGBM model migrated from pickle")
 
         except Exception as e:
             logger.error(f"Failed to initialize Online LightGBM: {e}")
 
-    def update_if_needed(self, df: pd.DataFrame):
-        """必要に応じてモデルを更新"""
+    # ------------------------------------------------------------------
+    # 永続化
+    # ------------------------------------------------------------------
+    def _load(self):
+        import lightgbm as lgb
+
+        self.booster = lgb.Booster(model_file=self.model_path)
+        self.feature_cols = self.booster.feature_name()
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.trained_until = state.get("trained_until", {})
+            if state.get("last_update"):
+                self.last_update = datetime.fromisoformat(state["last_update"])
+                self.learner.last_update = self.last_update
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+        state = {
+            "feature_cols": self.feature_cols,
+            "trained_until": self.trained_until,
+            "last_update": self.last_update.isoformat() if self.last_update else None,
+            "num_trees": self.booster.num_trees(),
+        }
+        # 書きかけのファイルを読まれないように一時ファイルから置換
+        for path, write in (
+            (self.model_path, lambda tmp: self.booster.save_model(tmp)),
+            (self.state_path, lambda tmp: _write_json(tmp, state)),
+        ):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            write(tmp)
+            os.replace(tmp, path)
+
+    # ------------------------------------------------------------------
+    # 学習
+    # ------------------------------------------------------------------
+    def _training_window(self, df: pd.DataFrame, ticker: Optional[str]) -> pd.DataFrame:
+        """直近 window_size 行の特徴量とターゲット（翌日上昇=1）"""
+        from src.features.feature_store import cached_features
+
+        # 特徴量準備（特徴量ストア経由）。全履歴ではなく学習ウィンドウ + ウォームアップ分だけを渡す
+        tail = df.iloc[-(self.window_size + 1 + FEATURE_LOOKBACK) :]
+        df_features = cached_features(tail, "phase29", key=ticker)
+        window = df_features.iloc[-(self.window_size + 1) :].copy()
+
+        # ターゲット作成（翌日リターン）。最終行は翌日が未確定なので除く
+        window["target"] = (window["Close"].shift(-1) > window["Close"]).astype(int)
+        return window.iloc[:-1].dropna()
+
+    def _select_features(self, window: pd.DataFrame) -> List[str]:
+        if self.feature_cols and all(c in window.columns for c in self.feature_cols):
+            return self.feature_cols
+        feature_cols = [c for c in window.columns if c not in EXCLUDE_COLS]
+        return window[feature_cols].select_dtypes(include=[np.number]).columns.tolist()
+
+    def _fit(self, X: pd.DataFrame, y: pd.Series) -> None:
+        """保存済みブースターから追加学習（列が変わった・木が多すぎる場合は再学習）"""
+        import lightgbm as lgb
+
+        # 時間減衰重み（平均1に正規化して min_sum_hessian の効き方を重みなしと揃える）
+        weights = self.learner.time_decay_weights(len(X)) * len(X)
+        train_set = lgb.Dataset(X.astype(np.float32), label=y.to_numpy(), weight=weights, free_raw_data=True)
+
+        warm = (
+            self.booster is not None
+            and self.booster.feature_name() == list(X.columns)
+            and self.booster.num_trees() + self.rounds_per_update <= self.max_trees
+        )
+        self.booster = lgb.train(
+            LGBM_PARAMS,
+            train_set,
+            num_boost_round=self.rounds_per_update if warm else self.initial_rounds,
+            init_model=self.booster if warm else None,
+        )
+        self.feature_cols = list(X.columns)
+        self.learner.update_history.append(
+            {"timestamp": datetime.now(), "n_samples": len(X), "warm_start": warm, "avg_weight": weights.mean()}
+        )
+        self.learner.update_history = self.learner.update_history[-100:]
+
+    def update_if_needed(self, df: pd.DataFrame, ticker: Optional[str] = None):
+        """必要に応じてモデルを更新（ticker を渡すと特徴量ストアのキーと学習済み範囲の管理に使う）"""
         if self.learner is None:
             return False
 
@@ -67,33 +201,29 @@ class OnlineLGBMPredictor:
                 return False
 
         try:
-            from src.features import add_advanced_features
-
-            # 特徴量準備
-            df_features = add_advanced_features(df.copy())
-            df_features = df_features.dropna()
+            window = self._training_window(df, ticker)
 
-            if len(df_features) < 50:
+            if len(window) < 50:
                 return False
 
-            # ターゲット作成（翌日リターン）
-            df_features["target"] = (df_features["Close"].shift(-1) > df_features["Close"]).astype(int)
-            df_features = df_features.dropna()
+            # 前回以降に新しい行がなければ何もしない
+            key = ticker or "_default"
+            last_row = str(window.index[-1])
+            if self.trained_until.get(key) == last_row:
+                return False
 
             # 特徴量とターゲット
-            exclude_cols = ["Date", "Open", "High", "Low", "Close", "Volume", "target"]
-            feature_cols = [c for c in df_features.columns if c not in exclude_cols]
-            feature_cols = df_features[feature_cols].select_dtypes(include=[np.number]).columns.tolist()
-
-            X = df_features[feature_cols]
-            y = df_features["target"]
+            feature_cols = self._select_features(window)
+            X = window[feature_cols]
+            y = window["target"]
 
             # 増分学習を実行
             if self.learner.should_update():
-                self.learner.incremental_fit(X, y)
-                self.learner.save_model(ONLINE_MODEL_PATH)
-                self.last_update = datetime.now()
-                logger.info("Online LightGBM model updated")
+                self._fit(X, y)
+                self.last_update = self.learner.last_update = datetime.now()
+                self.trained_until[key] = last_row
+                self._save()
+                logger.info(f"Online LightGBM model updated ({self.booster.num_trees()} trees)")
                 return True
 
         except Exception as e:
@@ -109,6 +239,11 @@ class OnlineLGBMPredictor:
         return self.learner.get_performance_summary()
 
 
+def _write_json(path: str, data: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
 # シングルトンインスタンス
 _online_predictor = None
 
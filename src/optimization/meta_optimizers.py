@@ -10,7 +10,7 @@ import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, precision_score
 
-from src.features import add_advanced_features
+from src.features.feature_store import cached_features
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +45,7 @@ class HyperparameterOptimizer:
         logger.info("Starting Random Forest optimization...")
 
         # Prepare Data
-        data = add_advanced_features(df).dropna()
+        data = cached_features(df, "phase29").dropna()
         if len(data) < 100:
             logger.warning("Not enough data for optimization")
             return {}
@@ -99,7 +99,7 @@ class HyperparameterOptimizer:
         """
         logger.info("Starting LightGBM optimization...")
 
-        data = add_advanced_features(df).dropna()
+        data = cached_features(df, "phase29").dropna()
         if len(data) < 100:
             return {}
 
@@ -222,7 +222,7 @@ if __name__ == "__main__":
             logger.error("Transformer model not available")
             return {}
 
-        data = add_advanced_features(df).dropna()
+        data = cached_features(df, "phase29").dropna()
         if len(data) < 200:
             logger.warning("Not enough data for Transformer optimization")
             return {}
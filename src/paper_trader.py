@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, Union, Any, List, Tuple, Optional
 
+import numpy as np
 import pandas as pd
 
 
@@ -43,6 +44,8 @@ class PaperTrader:
                 initial_capital = 1000000  # Fallback to 1M JPY
 
         self.initial_capital = float(initial_capital)
+        # 運用サイクル中に MarketDataSnapshot を設定すると価格をそこから読む
+        self.market_snapshot = None
         self.conn = sqlite3.connect(db_path)
         self._initialize_database()
 
@@ -98,6 +101,14 @@ class PaperTrader:
         )
         # インデックス追加
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_ticker_time ON orders (ticker, timestamp)")
+        # 既存DBのマイグレーション（SELL 時の実現損益を注文に記録）
+        try:
+            cursor.execute("SELECT realized_pnl FROM orders LIMIT 1")
+        except sqlite3.OperationalError:
+            cursor.execute("ALTER TABLE orders ADD COLUMN realized_pnl REAL DEFAULT 0.0")
+        # 取引履歴のカーソルページング用（銘柄別 / 時刻順）
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_ticker_id ON orders (ticker, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_timestamp ON orders (timestamp, id)")
 
         # Create balance table for equity history
         cursor.execute(
@@ -113,6 +124,31 @@ class PaperTrader:
         # 日付インデックス
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_balance_date ON balance (date)")
 
+        # 台帳の集計値（注文ごとに同じトランザクションで更新する）
+        for column, ddl in (
+            ("realized_pnl", "REAL DEFAULT 0.0"),
+            ("order_count", "INTEGER DEFAULT 0"),
+            ("last_order_id", "INTEGER DEFAULT 0"),
+        ):
+            try:
+                cursor.execute(f"SELECT {column} FROM accounts LIMIT 1")
+            except sqlite3.OperationalError:
+                cursor.execute(f"ALTER TABLE accounts ADD COLUMN {column} {ddl}")
+
+        # 銘柄別の取得原価・実現損益
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ticker_ledger (
+                ticker TEXT PRIMARY KEY,
+                quantity INTEGER DEFAULT 0,
+                cost_basis REAL DEFAULT 0.0,
+                realized_pnl REAL DEFAULT 0.0,
+                buy_quantity INTEGER DEFAULT 0,
+                sell_quantity INTEGER DEFAULT 0
+            )
+        """
+        )
+
         # Initialize account balance if not exists
         cursor.execute("SELECT COUNT(*) FROM accounts")
         if cursor.fetchone()[0] == 0:
@@ -125,45 +161,95 @@ class PaperTrader:
             )
 
         self.conn.commit()
-        
-        # Ensure data consistency on startup
-        self.recalculate_balance()
+
+        # Ensure data consistency on startup (only when orders were written outside execute_order)
+        if not self._ledger_in_sync():
+            self.recalculate_balance()
+
+    def _ledger_in_sync(self) -> bool:
+        """台帳の集計値が orders の最新行まで反映済みか（主キー参照のみ）"""
+        try:
+            last_applied = self.conn.execute("SELECT last_order_id FROM accounts WHERE id = 1").fetchone()
+            last_order = self.conn.execute("SELECT MAX(id) FROM orders").fetchone()
+            return bool(last_applied) and (last_applied[0] or 0) == (last_order[0] or 0)
+        except sqlite3.Error:
+            return False
 
     def recalculate_balance(self):
         """
         Recalculates the current cash balance based on initial capital and order history.
         This fixes potential data corruption where orders exist but balance wasn't updated.
+
+        Also rebuilds the ledger aggregates (realized PnL, per-ticker cost basis) by
+        replaying the orders table. This is a full scan, so it only runs on startup when
+        the aggregates are behind the orders table; execute_order keeps them current.
         """
         try:
             cursor = self.conn.cursor()
-            
-            # Since we don't have a deposits table, we'll assume the 'initial_capital' 
+
+            # Since we don't have a deposits table, we'll assume the 'initial_capital'
             # in the accounts table is the starting point.
-            
+
             cursor.execute("SELECT initial_capital FROM accounts WHERE id=1")
             res = cursor.fetchone()
-            if not res: return
+            if not res:
+                return
             start_cap = res[0]
-            
-            # Sum up all BUYs and SELLs
-            cursor.execute("SELECT action, quantity, price FROM orders")
-            orders = cursor.fetchall()
-            
+
+            # Replay all BUYs and SELLs with average-cost accounting
+            ledger: Dict[str, List[float]] = {}  # ticker -> [quantity, cost_basis, realized, bought, sold]
             calculated_balance = start_cap
-            
-            for action, qty, price in orders:
-                if price is None: continue
+            total_realized = 0.0
+            order_count = 0
+            last_order_id = 0
+            realized_updates = []
+
+            for order_id, ticker, action, qty, price in cursor.execute(
+                "SELECT id, ticker, action, quantity, price FROM orders ORDER BY id"
+            ):
+                order_count += 1
+                last_order_id = order_id
+                if price is None or qty is None:
+                    continue
                 amount = qty * price
+                entry = ledger.setdefault(ticker, [0, 0.0, 0.0, 0, 0])
                 if action == "BUY":
                     calculated_balance -= amount
+                    entry[0] += qty
+                    entry[1] += amount
+                    entry[3] += qty
                 elif action == "SELL":
                     calculated_balance += amount
-            
-            # Update the accounts table
-            cursor.execute("UPDATE accounts SET current_balance = ? WHERE id = 1", (calculated_balance,))
-            self.conn.commit()
+                    avg_cost = entry[1] / entry[0] if entry[0] > 0 else price
+                    sold = min(qty, entry[0])
+                    realized = (price - avg_cost) * qty
+                    entry[0] -= sold
+                    entry[1] = entry[1] - avg_cost * sold if entry[0] > 0 else 0.0
+                    entry[2] += realized
+                    entry[4] += qty
+                    total_realized += realized
+                    realized_updates.append((realized, order_id))
+
+            # Update the accounts table and ledger in one transaction
+            with self.conn:
+                self.conn.execute(
+                    """
+                    UPDATE accounts SET current_balance = ?, realized_pnl = ?, order_count = ?, last_order_id = ?
+                    WHERE id = 1
+                """,
+                    (calculated_balance, total_realized, order_count, last_order_id),
+                )
+                self.conn.execute("DELETE FROM ticker_ledger")
+                self.conn.executemany(
+                    """
+                    INSERT INTO ticker_ledger (ticker, quantity, cost_basis, realized_pnl, buy_quantity, sell_quantity)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                    [(ticker, *values) for ticker, values in ledger.items()],
+                )
+                self.conn.executemany("UPDATE orders SET realized_pnl = ? WHERE id = ?", realized_updates)
             logger.info(f"Balance recalculated from history: {calculated_balance:,.0f} JPY")
-            
+
         except Exception as e:
             logger.error(f"Failed to recalculate balance: {e}")
 
@@ -209,70 +295,72 @@ class PaperTrader:
             if not rows:
                 return pd.DataFrame()
 
-            positions = []
-            tickers = [r[columns.index("ticker")] for r in rows]
-            
+            book = pd.DataFrame.from_records(rows, columns=columns)
+            tickers = book["ticker"].tolist()
+
             # Fetch current prices (using external data loader)
+            prices = np.zeros(len(tickers))
+            volatilities = np.zeros(len(tickers))
             try:
-                from src.data_loader import fetch_stock_data
-                # Batch fetch prices for better performance
-                data_map = fetch_stock_data(tickers, period="1mo")
-                prices = {}
-                volatilities = {}
-                for ticker in tickers:
+                # Batch fetch prices for better performance (reuse the cycle snapshot when set)
+                snapshot = getattr(self, "market_snapshot", None)
+                if snapshot is not None:
+                    data_map = snapshot.get_many(tickers, period="1mo")
+                else:
+                    from src.data_loader import fetch_stock_data
+
+                    data_map = fetch_stock_data(tickers, period="1mo")
+                for i, ticker in enumerate(tickers):
                     df = data_map.get(ticker)
-                    if df is not None and not df.empty:
-                        prices[ticker] = float(df["Close"].iloc[-1])
-                        rets = df["Close"].pct_change().dropna()
-                        vol = rets.std() * df["Close"].iloc[-1]
-                        volatilities[ticker] = float(vol) if not pd.isna(vol) else 0.0
-                    else:
-                        prices[ticker] = 0.0
-                        volatilities[ticker] = 0.0
+                    if df is None or df.empty:
+                        continue
+                    close = df["Close"].to_numpy(dtype=np.float64)
+                    prices[i] = close[-1]
+                    rets = close[1:] / close[:-1] - 1.0
+                    rets = rets[np.isfinite(rets)]
+                    if rets.size > 1:
+                        volatilities[i] = np.std(rets, ddof=1) * close[-1]
+                volatilities = np.nan_to_num(volatilities)
             except Exception as e:
                 logger.warning(f"Batch fetch failed: {e}")
-                prices = {t: 0.0 for t in tickers}
-                volatilities = {t: 0.0 for t in tickers}
-
-            for row in rows:
-                pos = dict(zip(columns, row))
-                ticker = pos.get("ticker")
-                qty = pos.get("quantity")
-                avg_p = pos.get("avg_price", 0.0)
-                
-                # Use current price if available, fallback to stored current_price then avg_price
-                curr_p = prices.get(ticker, 0.0)
-                if curr_p <= 0:
-                    curr_p = pos.get("current_price", 0.0)
-                if curr_p <= 0:
-                    curr_p = avg_p
-                
-                m_val = qty * curr_p
-                
-                if avg_p > 0:
-                    u_pnl = m_val - (qty * avg_p)
-                    u_pnl_pct = u_pnl / (qty * avg_p)
-                else:
-                    u_pnl = 0.0
-                    u_pnl_pct = 0.0
-                
-                positions.append({
-                    "ticker": ticker,
-                    "quantity": qty,
+                prices = np.zeros(len(tickers))
+                volatilities = np.zeros(len(tickers))
+
+            def column(name: str, default) -> pd.Series:
+                return book[name] if name in book.columns else pd.Series(default, index=book.index)
+
+            qty = book["quantity"].to_numpy(dtype=np.float64)
+            avg_p = column("avg_price", 0.0).fillna(0.0).to_numpy(dtype=np.float64)
+            stored = column("current_price", 0.0).fillna(0.0).to_numpy(dtype=np.float64)
+
+            # Use current price if available, fallback to stored current_price then avg_price
+            prices = np.nan_to_num(prices)
+            curr_p = np.where(prices > 0, prices, np.where(stored > 0, stored, avg_p))
+
+            m_val = qty * curr_p
+            cost = qty * avg_p
+            has_cost = avg_p > 0
+            u_pnl = np.where(has_cost, m_val - cost, 0.0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                u_pnl_pct = np.where(has_cost, u_pnl / cost, 0.0)
+
+            return pd.DataFrame(
+                {
+                    "ticker": tickers,
+                    "quantity": book["quantity"],
                     "avg_price": avg_p,
-                    "entry_price": pos.get("entry_price", avg_p),
-                    "entry_date": pos.get("entry_date"),
-                    "volatility": volatilities.get(ticker, 0.0),
+                    "entry_price": column("entry_price", avg_p),
+                    "entry_date": column("entry_date", None),
+                    "volatility": volatilities,
                     "current_price": curr_p,
                     "market_value": m_val,
                     "unrealized_pnl": u_pnl,
                     "unrealized_pnl_pct": u_pnl_pct,
                     "sector": "Market",
-                    "stop_price": pos.get("stop_price", 0.0),
-                    "highest_price": pos.get("highest_price", 0.0)
-                })
-            
-            return pd.DataFrame(positions)
+                    "stop_price": column("stop_price", 0.0),
+                    "highest_price": column("highest_price", 0.0),
+                }
+            )
 
         except Exception as e:
             logger.error(f"Error getting positions: {e}")
@@ -280,16 +368,23 @@ class PaperTrader:
 
     def update_position_stop(self, ticker: str, stop_price: float, highest_price: float) -> bool:
         """Update stop price and highest price for a position."""
+        return self.update_position_stops([(ticker, stop_price, highest_price)])
+
+    def update_position_stops(self, updates: List[Tuple[str, float, float]]) -> bool:
+        """Update stop/highest prices for many positions in one transaction.
+
+        Args:
+            updates: (ticker, stop_price, highest_price) tuples
+        """
+        params = [(float(stop), float(high), ticker) for ticker, stop, high in updates]
+        if not params:
+            return True
         try:
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "UPDATE positions SET stop_price = ?, highest_price = ? WHERE ticker = ?",
-                (stop_price, highest_price, ticker)
-            )
-            self.conn.commit()
+            with self.conn:
+                self.conn.executemany("UPDATE positions SET stop_price = ?, highest_price = ? WHERE ticker = ?", params)
             return True
         except Exception as e:
-            logger.error(f"Error updating position stop: {e}")
+            logger.error(f"Error updating position stops: {e}")
             return False
 
     def get_trade_history(self, limit: int = 1000, start_date: Optional[datetime] = None) -> pd.DataFrame:
@@ -300,14 +395,81 @@ class PaperTrader:
             if start_date:
                 query += " WHERE timestamp >= ?"
                 params.append(start_date.isoformat())
-            query += " ORDER BY timestamp DESC LIMIT ?"
+            # idx_orders_timestamp で上位 limit 行だけを読む
+            query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
             params.append(limit)
-            
+
             return pd.read_sql_query(query, self.conn, params=params)
         except Exception as e:
             logger.error(f"Error fetching trade history: {e}")
             return pd.DataFrame()
 
+    def get_trade_page(
+        self, limit: int = 100, before_id: Optional[int] = None, ticker: Optional[str] = None
+    ) -> Tuple[pd.DataFrame, Optional[int]]:
+        """Get one page of trade history, newest first, using keyset pagination.
+
+        Each page is an index range scan (primary key, or idx_orders_ticker_id when
+        filtered by ticker), so the cost does not grow with the size of the trade log.
+
+        Args:
+            limit: Page size
+            before_id: Cursor returned by the previous call (None for the newest page)
+            ticker: Optional ticker filter
+
+        Returns:
+            (trades, next_cursor) - next_cursor is None on the last page
+        """
+        clauses, params = [], []
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(int(before_id))
+        if ticker:
+            clauses.append("ticker = ?")
+            params.append(ticker)
+        query = "SELECT * FROM orders"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limit))
+
+        try:
+            page = pd.read_sql_query(query, self.conn, params=params)
+        except Exception as e:
+            logger.error(f"Error fetching trade page: {e}")
+            return pd.DataFrame(), None
+
+        next_cursor = int(page["id"].iloc[-1]) if len(page) == limit else None
+        return page, next_cursor
+
+    def get_ledger_summary(self) -> Dict[str, float]:
+        """Running ledger aggregates maintained by execute_order (no table scans)."""
+        row = self.conn.execute(
+            "SELECT initial_capital, current_balance, realized_pnl, order_count FROM accounts WHERE id = 1"
+        ).fetchone()
+        if not row:
+            return {"initial_capital": 0.0, "cash": 0.0, "realized_pnl": 0.0, "order_count": 0, "cost_basis": 0.0}
+        cost_basis = self.conn.execute("SELECT COALESCE(SUM(cost_basis), 0.0) FROM ticker_ledger").fetchone()[0]
+        return {
+            "initial_capital": row[0],
+            "cash": row[1],
+            "realized_pnl": row[2] or 0.0,
+            "order_count": row[3] or 0,
+            "cost_basis": cost_basis,
+        }
+
+    def get_ticker_ledger(self, ticker: str) -> Dict[str, float]:
+        """Per-ticker cost basis and realized PnL."""
+        row = self.conn.execute(
+            """
+            SELECT quantity, cost_basis, realized_pnl, buy_quantity, sell_quantity
+            FROM ticker_ledger WHERE ticker = ?
+        """,
+            (ticker,),
+        ).fetchone()
+        keys = ("quantity", "cost_basis", "realized_pnl", "buy_quantity", "sell_quantity")
+        return dict(zip(keys, row)) if row else dict.fromkeys(keys, 0)
+
     def get_current_balance(self) -> Dict[str, float]:
         """Get balance summary including estimated total equity."""
         cash = self.get_balance()
@@ -338,21 +500,62 @@ class PaperTrader:
         }
 
     def execute_order(self, order: Any) -> bool:
-        """Execute a trade order."""
+        """Execute a trade order.
+
+        The order row, cash, position and ledger aggregates are written in one
+        transaction with fixed SQL statements (reused from the connection's
+        statement cache), so the cost is independent of the trade log size.
+        """
         try:
             balance = self.get_balance()
             position = self.get_position(order.ticker)
 
             cost = order.quantity * order.price
+            realized_pnl = 0.0
             if order.action == "BUY":
                 if cost > balance:
                     logger.warning(f"Insufficient balance for order: {order}")
                     return False
+                cash_delta = -cost
+            elif order.action == "SELL":
+                if order.quantity > position["quantity"]:
+                    logger.warning(f"Trying to sell more than owned: {order}")
+                    return False
+                cash_delta = cost
+                realized_pnl = (order.price - position["avg_price"]) * order.quantity
+            else:
+                logger.warning(f"Unknown order action: {order}")
+                return False
+
+            cursor = self.conn.cursor()
 
-                new_balance = balance - cost
-                cursor = self.conn.cursor()
-                cursor.execute("UPDATE accounts SET current_balance = ? WHERE id = 1", (new_balance,))
+            # Log order
+            cursor.execute(
+                """
+                INSERT INTO orders (ticker, action, quantity, price, strategy_name, realized_pnl)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    order.ticker,
+                    order.action,
+                    order.quantity,
+                    order.price,
+                    getattr(order, "strategy", None),
+                    realized_pnl,
+                ),
+            )
+            order_id = cursor.lastrowid
+            cursor.execute(
+                """
+                UPDATE accounts
+                SET current_balance = current_balance + ?, realized_pnl = COALESCE(realized_pnl, 0) + ?,
+                    order_count = COALESCE(order_count, 0) + 1, last_order_id = ?
+                WHERE id = 1
+            """,
+                (cash_delta, realized_pnl, order_id),
+            )
 
+            if order.action == "BUY":
                 new_quantity = position["quantity"] + order.quantity
                 if position["quantity"] > 0:
                     new_avg_price = (
@@ -367,26 +570,32 @@ class PaperTrader:
                     VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
                     (
-                        order.ticker, 
-                        new_quantity, 
-                        new_avg_price, 
+                        order.ticker,
+                        new_quantity,
+                        new_avg_price,
                         new_avg_price if position["quantity"] == 0 else position.get("entry_price", new_avg_price),
-                        datetime.now().strftime("%Y-%m-%d %H:%M:%S") if position["quantity"] == 0 else position.get("entry_date"),
+                        (
+                            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            if position["quantity"] == 0
+                            else position.get("entry_date")
+                        ),
                         order.price,
-                        max(new_avg_price, order.price)
+                        max(new_avg_price, order.price),
                     ),
                 )
+                cursor.execute(
+                    """
+                    INSERT INTO ticker_ledger (ticker, quantity, cost_basis, buy_quantity)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (ticker) DO UPDATE SET
+                        quantity = excluded.quantity,
+                        cost_basis = excluded.cost_basis,
+                        buy_quantity = buy_quantity + excluded.buy_quantity
+                """,
+                    (order.ticker, new_quantity, new_quantity * new_avg_price, order.quantity),
+                )
 
             elif order.action == "SELL":
-                if order.quantity > position["quantity"]:
-                    logger.warning(f"Trying to sell more than owned: {order}")
-                    return False
-
-                proceeds = order.quantity * order.price
-                new_balance = balance + proceeds
-                cursor = self.conn.cursor()
-                cursor.execute("UPDATE accounts SET current_balance = ? WHERE id = 1", (new_balance,))
-
                 new_quantity = position["quantity"] - order.quantity
                 if new_quantity == 0:
                     cursor.execute("DELETE FROM positions WHERE ticker = ?", (order.ticker,))
@@ -395,15 +604,24 @@ class PaperTrader:
                         "UPDATE positions SET quantity = ? WHERE ticker = ?",
                         (new_quantity, order.ticker),
                     )
-
-            # Log order
-            cursor.execute(
-                """
-                INSERT INTO orders (ticker, action, quantity, price, strategy_name)
-                VALUES (?, ?, ?, ?, ?)
-            """,
-                (order.ticker, order.action, order.quantity, order.price, getattr(order, "strategy", None)),
-            )
+                cursor.execute(
+                    """
+                    INSERT INTO ticker_ledger (ticker, quantity, cost_basis, realized_pnl, sell_quantity)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (ticker) DO UPDATE SET
+                        quantity = excluded.quantity,
+                        cost_basis = excluded.cost_basis,
+                        realized_pnl = realized_pnl + excluded.realized_pnl,
+                        sell_quantity = sell_quantity + excluded.sell_quantity
+                """,
+                    (
+                        order.ticker,
+                        new_quantity,
+                        new_quantity * position["avg_price"],
+                        realized_pnl,
+                        order.quantity,
+                    ),
+                )
 
             self.conn.commit()
             return True
@@ -452,13 +670,16 @@ class PaperTrader:
             if not cursor.fetchone():
                 return pd.DataFrame(columns=["date", "total_equity", "cash", "invested"])
 
-            query = "SELECT date, total_equity, cash, invested FROM balance ORDER BY date ASC"
-            df = pd.read_sql_query(query, self.conn)
+            if days:
+                # 主キー(date)の降順で直近 days 行だけ読む
+                query = "SELECT date, total_equity, cash, invested FROM balance ORDER BY date DESC LIMIT ?"
+                df = pd.read_sql_query(query, self.conn, params=(int(days),)).iloc[::-1].reset_index(drop=True)
+            else:
+                query = "SELECT date, total_equity, cash, invested FROM balance ORDER BY date ASC"
+                df = pd.read_sql_query(query, self.conn)
 
             if not df.empty:
                 df["date"] = pd.to_datetime(df["date"])
-                if days:
-                    df = df.tail(days)
 
             return df
         except Exception as e:
@@ -32,6 +32,9 @@ DIGITAL_TWIN_DB = DATA_DIR / "digital_twin.db"
 EARNINGS_ANALYSIS_DB = DATA_DIR / "earnings_analysis.db"
 COMMITTEE_FEEDBACK_DB = DATA_DIR / "committee_feedback.db"
 SENTIMENT_HISTORY_DB = DATA_DIR / "sentiment_history.db"
+SENTIMENT_CACHE_DB = DATA_DIR / "sentiment_cache.db"
+TOURNAMENT_DB = DATA_DIR / "tournament.db"
+NEWS_STORE_DB = DATA_DIR / "news_store.db"
 TEST_FEEDBACK_DB = DATA_DIR / "test_feedback.db"
 MLRUNS_DB = DATA_DIR / "mlruns.db"
 YFINANCE_CACHE = DATA_DIR / "yfinance_cache.sqlite"
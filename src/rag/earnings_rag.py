@@ -3,9 +3,12 @@ Earnings RAG Engine
 決算短信PDFのベクトル化と検索機能を提供
 """
 
+import hashlib
 import logging
 import os
-from typing import Dict, List, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 import chromadb
 from langchain_text_splitters import RecursiveCharacterTextSplitter
@@ -13,20 +16,57 @@ from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 logger = logging.getLogger(__name__)
 
+EmbeddingFunction = Callable[[List[str]], List[List[float]]]
+
+
+class CallableEmbeddings:
+    """
+    テキストのリストを受け取ってベクトルのリストを返す関数を
+    LangChain の Embeddings と同じインターフェース（embed_documents / embed_query）に合わせる
+
+    ローカルモデル（sentence-transformers 等）でオフラインにインデックス化する場合に使う。
+    """
+
+    def __init__(self, func: EmbeddingFunction):
+        self.func = func
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [list(map(float, v)) for v in self.func(list(texts))]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def chunk_id(doc_id: str, chunk: str) -> str:
+    """チャンク内容のハッシュから決まるID（同じ内容は再インデックスしない）"""
+    return f"{doc_id}_{hashlib.sha1(chunk.encode('utf-8')).hexdigest()[:16]}"
+
 
 class EarningsRAG:
     """
     決算短信用のRAG（Retrieval-Augmented Generation）エンジン
     """
 
-    def __init__(self, persist_directory: str = "./data/chroma_earnings"):
+    def __init__(
+        self,
+        persist_directory: str = "./data/chroma_earnings",
+        embedding_function: Optional[Union[EmbeddingFunction, Any]] = None,
+        batch_size: int = 64,
+        max_workers: int = 4,
+    ):
         """
         初期化
 
         Args:
             persist_directory: ChromaDBの永続化ディレクトリ
+            embedding_function: 埋め込み関数（texts -> vectors）または embed_documents を持つオブジェクト。
+                省略時は Gemini Embeddings を使う
+            batch_size: 1回の埋め込み・upsert で処理するチャンク数
+            max_workers: index_documents で並行にインデックス化するドキュメント数
         """
         self.persist_directory = persist_directory
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
         os.makedirs(persist_directory, exist_ok=True)
 
         # ChromaDB クライアント初期化
@@ -43,18 +83,15 @@ class EarningsRAG:
             )
             logger.info("Created new earnings collection")
 
-        # Gemini Embeddings初期化
-        try:
-            api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                logger.warning("No Gemini API key found. RAG will not work properly.")
-                self.embeddings = None
+        # 埋め込み関数の初期化（指定がなければ Gemini Embeddings）
+        if embedding_function is not None:
+            if hasattr(embedding_function, "embed_documents"):
+                self.embeddings = embedding_function
             else:
-                self.embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=api_key)
-                logger.info("Initialized Gemini embeddings")
-        except Exception as e:
-            logger.error(f"Failed to initialize embeddings: {e}")
-            self.embeddings = None
+                self.embeddings = CallableEmbeddings(embedding_function)
+            logger.info("Using custom embedding function")
+        else:
+            self.embeddings = self._init_gemini_embeddings()
 
         # テキスト分割器
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -63,6 +100,21 @@ class EarningsRAG:
             length_function=len,
         )
 
+    @staticmethod
+    def _init_gemini_embeddings():
+        """Gemini Embeddings の初期化（APIキーがなければ None）"""
+        try:
+            api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                logger.warning("No Gemini API key found. RAG will not work properly.")
+                return None
+            embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=api_key)
+            logger.info("Initialized Gemini embeddings")
+            return embeddings
+        except Exception as e:
+            logger.error(f"Failed to initialize embeddings: {e}")
+            return None
+
     def index_document(self, pdf_data: Dict[str, Any], doc_id: str) -> bool:
         """
         PDFドキュメントをインデックス化
@@ -74,52 +126,117 @@ class EarningsRAG:
         Returns:
             成功したかどうか
         """
+        return self.index_document_with_stats(pdf_data, doc_id)["success"]
+
+    def index_document_with_stats(self, pdf_data: Dict[str, Any], doc_id: str) -> Dict[str, Any]:
+        """
+        PDFドキュメントをバッチでインデックス化し、処理統計を返す
+
+        - チャンクIDは内容ハッシュ。既にインデックス済みのチャンクは埋め込みを生成しない
+        - 埋め込みは embed_documents で batch_size 件ずつ生成し、まとめて upsert する
+        - 再インデックスで内容が変わった場合、古いチャンクは全バッチの upsert が成功した後に削除する
+
+        Returns:
+            {"doc_id", "success", "chunks", "indexed", "skipped", "removed", "seconds", "chunks_per_sec"}
+        """
+        start = time.perf_counter()
+        stats = {"doc_id": doc_id, "success": False, "chunks": 0, "indexed": 0, "skipped": 0, "removed": 0}
+
         if not self.embeddings:
             logger.error("Embeddings not initialized. Cannot index document.")
-            return False
+            return self._finish_stats(stats, start)
 
         try:
             # テキスト取得
             text = pdf_data.get("text", "")
             if not text:
                 logger.warning("No text found in PDF data")
-                return False
+                return self._finish_stats(stats, start)
 
-            # チャンク分割
-            chunks = self.text_splitter.split_text(text)
+            # チャンク分割（同一内容のチャンクは1つにまとめる）
+            chunks: Dict[str, Tuple[int, str]] = {}
+            for i, chunk in enumerate(self.text_splitter.split_text(text)):
+                chunks.setdefault(chunk_id(doc_id, chunk), (i, chunk))
+            stats["chunks"] = len(chunks)
             logger.info(f"Split document into {len(chunks)} chunks")
 
+            # インデックス済みチャンクの確認
+            existing = set(self.collection.get(where={"doc_id": doc_id}, include=[])["ids"])
+            stale = sorted(existing - chunks.keys())
+            pending = [(cid, i, chunk) for cid, (i, chunk) in chunks.items() if cid not in existing]
+            stats["skipped"] = len(chunks) - len(pending)
+
             # メタデータ
             metadata = pdf_data.get("metadata", {})
-
-            # 埋め込み生成とChromaDBに追加
-            for i, chunk in enumerate(chunks):
-                chunk_id = f"{doc_id}_chunk_{i}"
-
-                # 埋め込み生成
-                embedding = self.embeddings.embed_query(chunk)
-
-                # ChromaDBに追加
-                self.collection.add(
-                    ids=[chunk_id],
-                    embeddings=[embedding],
-                    documents=[chunk],
+            company = metadata.get("company", "Unknown")
+            date = metadata.get("date", "Unknown")
+
+            # 埋め込み生成とChromaDBへの一括upsert
+            for batch in _batched(pending, self.batch_size):
+                ids = [cid for cid, _, _ in batch]
+                documents = [chunk for _, _, chunk in batch]
+                embeddings = self.embeddings.embed_documents(documents)
+                self.collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=documents,
                     metadatas=[
-                        {
-                            "doc_id": doc_id,
-                            "chunk_index": i,
-                            "company": metadata.get("company", "Unknown"),
-                            "date": metadata.get("date", "Unknown"),
-                        }
+                        {"doc_id": doc_id, "chunk_index": i, "company": company, "date": date} for _, i, _ in batch
                     ],
                 )
-
-            logger.info(f"Successfully indexed document: {doc_id}")
-            return True
+                stats["indexed"] += len(batch)
+
+            # 古いチャンクは新しいチャンクが全て upsert できてから削除する（途中で失敗しても旧版が残る）
+            if stale:
+                self.collection.delete(ids=stale)
+                stats["removed"] = len(stale)
+
+            stats["success"] = True
+            stats = self._finish_stats(stats, start)
+            logger.info(
+                f"Successfully indexed document: {doc_id} "
+                f"({stats['indexed']} new, {stats['skipped']} skipped, {stats['chunks_per_sec']:.1f} chunks/sec)"
+            )
+            return stats
 
         except Exception as e:
             logger.error(f"Failed to index document: {e}")
-            return False
+            stats["error"] = str(e)
+            return self._finish_stats(stats, start)
+
+    def index_documents(
+        self, documents: Union[Dict[str, Dict[str, Any]], Iterable[Tuple[str, Dict[str, Any]]]]
+    ) -> Dict[str, Any]:
+        """
+        複数ドキュメントを並行にインデックス化
+
+        Args:
+            documents: {doc_id: pdf_data} または (doc_id, pdf_data) のリスト
+
+        Returns:
+            {"documents": {doc_id: stats}, "chunks", "indexed", "skipped", "failed", "seconds", "chunks_per_sec"}
+        """
+        items = list(documents.items()) if isinstance(documents, dict) else list(documents)
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(items)))) as executor:
+            results = list(executor.map(lambda item: self.index_document_with_stats(item[1], item[0]), items))
+
+        summary = {
+            "documents": {r["doc_id"]: r for r in results},
+            "chunks": sum(r["chunks"] for r in results),
+            "indexed": sum(r["indexed"] for r in results),
+            "skipped": sum(r["skipped"] for r in results),
+            "failed": [r["doc_id"] for r in results if not r["success"]],
+        }
+        return self._finish_stats(summary, start)
+
+    @staticmethod
+    def _finish_stats(stats: Dict[str, Any], start: float) -> Dict[str, Any]:
+        seconds = time.perf_counter() - start
+        stats["seconds"] = seconds
+        stats["chunks_per_sec"] = stats["indexed"] / seconds if seconds > 0 else 0.0
+        return stats
 
     def query(self, question: str, n_results: int = 5, filter_doc_id: str = None) -> List[Dict[str, Any]]:
         """
@@ -219,6 +336,11 @@ class EarningsRAG:
             return False
 
 
+def _batched(items: Sequence, size: int) -> Iterable[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
 if __name__ == "__main__":
     # テスト
     logging.basicConfig(level=logging.INFO)
@@ -1,154 +1,491 @@
-"""
-Filing Watcher
-適時開示や決算短信PDFを監視し、自動分析をトリガーする
-"""
-
-import logging
-import os
-import time
-import shutil
-from datetime import datetime
-from typing import Dict, Any
-
-from src.rag.pdf_loader import PDFLoader
-from src.rag.earnings_rag import EarningsRAG
-from src.rag.earnings_analyzer import EarningsAnalyzer
-from src.data.earnings_history import EarningsHistory
-from src.smart_notifier import SmartNotifier
-from src.execution.event_trader import EventTrader
-
-logger = logging.getLogger(__name__)
-
-
-class FilingWatcher:
-    """
-    適時開示資料（PDF）のディレクトリ監視または擬似スキャン
-    """
-
-    def __init__(
-        self,
-        watch_dir: str = "./data/new_filings",
-        processed_dir: str = "./data/processed_filings",
-    ):
-        self.watch_dir = watch_dir
-        self.processed_dir = processed_dir
-        self.loader = PDFLoader()
-        self.rag = EarningsRAG()
-        self.analyzer = EarningsAnalyzer()
-        self.history = EarningsHistory()
-        self.notifier = SmartNotifier()
-        self.event_trader = EventTrader(dry_run=True)  # Default to dry-run for safety
-
-        # ディレクトリ準備
-        os.makedirs(watch_dir, exist_ok=True)
-        os.makedirs(processed_dir, exist_ok=True)
-
-        self.is_running = False
-
-    def start_monitoring(self, interval: int = 60):
-        """監視を開始（ノンブロッキングな実行は呼び出し側で制御するか、ループ内で呼ぶ）"""
-        logger.info(f"FilingWatcher starting. Watching: {self.watch_dir}")
-        self.is_running = True
-
-        while self.is_running:
-            try:
-                self.scan_and_process()
-            except Exception as e:
-                logger.error(f"Error during scan: {e}")
-
-            time.sleep(interval)
-
-    def stop_monitoring(self):
-        self.is_running = False
-        logger.info("FilingWatcher stopping...")
-
-    def scan_and_process(self):
-        """ディレクトリをスキャンして未処理のPDFを処理"""
-        files = [f for f in os.listdir(self.watch_dir) if f.lower().endswith(".pdf")]
-
-        if not files:
-            return
-
-        logger.info(f"Found {len(files)} new filings to process")
-
-        for filename in files:
-            file_path = os.path.join(self.watch_dir, filename)
-            logger.info(f"Processing filing: {filename}")
-
-            try:
-                # 1. 分析実行
-                analysis_result = self._process_file(file_path)
-
-                if analysis_result:
-                    # 2. 通知
-                    self._send_notification(analysis_result)
-
-                    # 3. 自動売買判定 (Event-Driven Execution)
-                    trade_result = self.event_trader.handle_high_impact_event(analysis_result)
-                    if trade_result.get("status") == "success":
-                        logger.info(f"Event-driven trade executed for {filename}")
-
-                    # 4. 移動（処理済みへ）
-                    dest_path = os.path.join(
-                        self.processed_dir,
-                        f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{filename}",
-                    )
-                    shutil.move(file_path, dest_path)
-                    logger.info(f"Moved {filename} to processed directory")
-
-            except Exception as e:
-                logger.error(f"Failed to process {filename}: {e}")
-
-    def _process_file(self, file_path: str) -> Dict[str, Any]:
-        """個別のファイルを処理"""
-        # PDF読み込み
-        pdf_data = self.loader.load_pdf(file_path)
-        if not pdf_data.get("text"):
-            logger.warning(f"No text extracted from {file_path}")
-            return None
-
-        metadata = pdf_data.get("metadata", {})
-        ticker = metadata.get("ticker", "UNKNOWN")
-        company = metadata.get("company", "Unknown")
-
-        # RAGインデックス化
-        doc_id = f"{ticker}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        self.rag.index_document(pdf_data, doc_id)
-
-        # 分析
-        result = self.analyzer.analyze(pdf_data, self.rag, doc_id)
-
-        # 履歴保存
-        self.history.save_analysis(result, ticker=ticker)
-
-        logger.info(f"Analysis completed for {company} ({ticker})")
-        return {"ticker": ticker, "company": company, "analysis": result}
-
-    def _send_notification(self, data: Dict[str, Any]):
-        """通知を送信"""
-        ticker = data["ticker"]
-        company = data["company"]
-        analysis = data["analysis"]
-
-        rec = analysis.get("recommendation", "HOLD")
-        sent = analysis.get("sentiment", "NEUTRAL")
-        reason = analysis.get("reasoning", "")
-
-        emoji = "🚀" if rec == "BUY" else "📉" if rec == "SELL" else "⚖️"
-
-        message = (
-            f"{emoji} 【決算速報】 {company} ({ticker})\n"
-            f"判断: {rec} | センチメント: {sent}\n"
-            f"理由: {reason}\n"
-            f"分析完了。AI投資委員会に反映されます。"
-        )
-
-        self.notifier.send_text(message, title=f"Filing Analysis: {ticker}")
-        logger.info(f"Notification sent for {ticker}")
-
-
-if __name__ == "__main__":
-    # Test
-    logging.basicConfig(level=logging.INFO)
-    watcher = FilingWatcher()
-    watcher.scan_and_process()
+"""
+Filing Watcher
+適時開示や決算短信PDFを監視し、自動分析をトリガーする
+
+処理は extract → index → analyze → act の段階的パイプラインで行う。
+- 各段階の間は上限付きキューでつなぎ、段階ごとに並行ワーカーを持つ
+- PDFのテキスト抽出（CPUバウンド）はプロセスプールで実行する
+- 変更検知は watchdog があればファイルシステムイベント、なければポーリング
+- ファイル内容のハッシュで処理済みを記録し、同じ内容を二度処理しない
+- 一時的な失敗（API タイムアウトなど）は間隔を伸ばしながら再試行する
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.rag.pdf_loader import PDFLoader, extract_filing
+from src.rag.earnings_rag import EarningsRAG
+from src.rag.earnings_analyzer import EarningsAnalyzer
+from src.data.earnings_history import EarningsHistory
+from src.smart_notifier import SmartNotifier
+from src.execution.event_trader import EventTrader
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FILENAME = ".filing_ledger.json"
+
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    """ファイル内容のSHA-256"""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _WatchHandler(FileSystemEventHandler):
+    """watchdog のイベントを FilingWatcher に通知する"""
+
+    def __init__(self, watcher: "FilingWatcher"):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        self.watcher._notify(event.src_path)
+
+    def on_modified(self, event):
+        self.watcher._notify(event.src_path)
+
+    def on_moved(self, event):
+        self.watcher._notify(event.dest_path)
+
+
+class FilingWatcher:
+    """
+    適時開示資料（PDF）のディレクトリ監視または擬似スキャン
+    """
+
+    def __init__(
+        self,
+        watch_dir: str = "./data/new_filings",
+        processed_dir: str = "./data/processed_filings",
+        extract_workers: Optional[int] = None,
+        index_workers: int = 2,
+        analyze_workers: int = 4,
+        queue_size: int = 16,
+        settle_seconds: float = 1.0,
+        use_processes: bool = True,
+        retry_base_seconds: float = 30.0,
+        retry_max_seconds: float = 1800.0,
+    ):
+        self.watch_dir = watch_dir
+        self.processed_dir = processed_dir
+        self.loader = PDFLoader()
+        self.rag = EarningsRAG()
+        self.analyzer = EarningsAnalyzer()
+        self.history = EarningsHistory()
+        self.notifier = SmartNotifier()
+        self.event_trader = EventTrader(dry_run=True)  # Default to dry-run for safety
+
+        # パイプライン設定
+        self.extract_workers = extract_workers or min(4, os.cpu_count() or 1)
+        self.index_workers = index_workers
+        self.analyze_workers = analyze_workers
+        self.queue_size = queue_size
+        self.settle_seconds = settle_seconds  # 書き込み途中のファイルを避けるための待ち時間
+        self.use_processes = use_processes
+        self.retry_base_seconds = retry_base_seconds  # 失敗したファイルの再試行間隔（失敗ごとに倍）
+        self.retry_max_seconds = retry_max_seconds
+
+        # ディレクトリ準備
+        os.makedirs(watch_dir, exist_ok=True)
+        os.makedirs(processed_dir, exist_ok=True)
+
+        self.is_running = False
+
+        # 変更検知の状態
+        self._lock = threading.Lock()
+        self._seen: Dict[str, Optional[Tuple[int, int]]] = {}  # path -> (size, mtime_ns) 投入済み
+        self._inflight: set = set()  # 処理中のファイルハッシュ
+        self._retry: Dict[str, Tuple[float, int]] = {}  # path -> (再試行する時刻, 失敗回数)
+        self._dir_mtime: Optional[int] = None
+        self._events: set = set()
+        self._wakeup = threading.Event()
+        self._observer = None
+
+        # 処理済みハッシュの台帳
+        self.ledger_path = os.path.join(processed_dir, LEDGER_FILENAME)
+        self._ledger: Dict[str, Dict[str, Any]] = self._load_ledger()
+
+        self.stats: Dict[str, Any] = {"processed": 0, "duplicates": 0, "failed": 0, "skipped": 0, "latencies": []}
+
+    # ------------------------------------------------------------------
+    # 監視
+    # ------------------------------------------------------------------
+    def start_monitoring(self, interval: int = 60):
+        """監視を開始（ノンブロッキングな実行は呼び出し側で制御するか、ループ内で呼ぶ）"""
+        logger.info(f"FilingWatcher starting. Watching: {self.watch_dir}")
+        self.is_running = True
+        self._start_observer()
+
+        while self.is_running:
+            try:
+                self.scan_and_process()
+            except Exception as e:
+                logger.error(f"Error during scan: {e}")
+
+            # イベントが来れば即座に、来なければ interval 秒後にポーリング
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+        self._stop_observer()
+
+    def stop_monitoring(self):
+        self.is_running = False
+        self._wakeup.set()
+        logger.info("FilingWatcher stopping...")
+
+    def _start_observer(self):
+        if Observer is None or self._observer is not None:
+            return
+        try:
+            self._observer = Observer()
+            self._observer.schedule(_WatchHandler(self), self.watch_dir, recursive=False)
+            self._observer.start()
+            logger.info("Using filesystem events for change detection")
+        except Exception as e:
+            logger.warning(f"Filesystem events unavailable, falling back to polling: {e}")
+            self._observer = None
+
+    def _stop_observer(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+
+    def _notify(self, path: str):
+        if path.lower().endswith(".pdf"):
+            with self._lock:
+                self._events.add(path)
+            self._wakeup.set()
+
+    def _collect_candidates(self) -> List[str]:
+        """
+        処理候補のPDFを返す
+
+        イベント監視中はイベントのあったファイルと既知のファイルだけを確認し、
+        ポーリング時もディレクトリの更新時刻が変わったときだけ一覧を取り直す。
+        """
+        with self._lock:
+            events, self._events = self._events, set()
+            known = set(self._seen)  # 書き込み中・失敗したファイル（上書きか再試行時刻で再処理）
+
+        dir_mtime = os.stat(self.watch_dir).st_mtime_ns
+        if (self._observer is not None or dir_mtime == self._dir_mtime) and self._dir_mtime is not None:
+            paths = events | known
+        else:
+            with os.scandir(self.watch_dir) as it:
+                paths = {entry.path for entry in it if entry.is_file() and entry.name.lower().endswith(".pdf")}
+        self._dir_mtime = dir_mtime
+
+        candidates = []
+        now = time.time()
+        for path in sorted(paths):
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                with self._lock:
+                    self._seen.pop(path, None)
+                    self._retry.pop(path, None)
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            with self._lock:
+                if now - st.st_mtime < self.settle_seconds:
+                    self._seen[path] = None  # 書き込み中。次回また確認する
+                    continue
+                retry = self._retry.get(path)
+                if self._seen.get(path) == signature and (retry is None or now < retry[0]):
+                    continue  # 同じ内容で投入済み（テキストなし、または再試行待ちの失敗）
+                self._seen[path] = signature
+            candidates.append(path)
+        return candidates
+
+    # ------------------------------------------------------------------
+    # パイプライン
+    # ------------------------------------------------------------------
+    def scan_and_process(self) -> List[Dict[str, Any]]:
+        """ディレクトリをスキャンして未処理のPDFを処理"""
+        files = self._collect_candidates()
+
+        if not files:
+            return []
+
+        logger.info(f"Found {len(files)} new filings to process")
+        return self.process_files(files)
+
+    def process_files(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """
+        ファイル群を extract → index → analyze → act のパイプラインで処理する
+
+        Returns:
+            ファイルごとの結果（status: processed / duplicate / deferred / no_text / failed、latency、段階別timings）
+            deferred は同じ内容の別ファイルが処理中だったもの。次回のスキャンで改めて判定する
+        """
+        jobs = [
+            {"path": p, "filename": os.path.basename(p), "submitted": time.time(), "timings": {}} for p in file_paths
+        ]
+
+        if self.use_processes and len(jobs) > 1:
+            # spawn: forked children would inherit native library state (HTTP clients, DB handles)
+            pool = ProcessPoolExecutor(self.extract_workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            pool = ThreadPoolExecutor(max_workers=self.extract_workers)
+        with pool:
+            stages: List[Tuple[str, Callable[[Dict[str, Any]], None], int]] = [
+                ("extract", lambda job: self._stage_extract(job, pool), self.extract_workers),
+                ("index", self._stage_index, self.index_workers),
+                ("analyze", self._stage_analyze, self.analyze_workers),
+                ("act", self._stage_act, 1),  # 発注と移動は直列に行う
+            ]
+            results = self._run_pipeline(jobs, stages)
+
+        with self._lock:
+            self._inflight.clear()
+        for job in results:
+            self._update_retry(job)
+            job["latency"] = time.time() - job["submitted"]
+            self.stats["latencies"].append(job["latency"])
+        self.stats["latencies"] = self.stats["latencies"][-1000:]
+        return results
+
+    def _update_retry(self, job: Dict[str, Any]):
+        """失敗は間隔を伸ばしながら再試行し、保留は次回すぐ判定する。それ以外は結果が確定している"""
+        path = job["path"]
+        with self._lock:
+            if job["status"] == "failed":
+                attempts = self._retry.get(path, (0.0, 0))[1] + 1
+                delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+                self._retry[path] = (time.time() + delay, attempts)
+                logger.info(f"Will retry {job['filename']} in {delay:.0f}s (attempt {attempts})")
+            elif job["status"] == "deferred":
+                self._retry[path] = (time.time(), self._retry.get(path, (0.0, 0))[1])
+            else:
+                self._retry.pop(path, None)
+
+    def _run_pipeline(self, jobs: List[Dict[str, Any]], stages) -> List[Dict[str, Any]]:
+        """上限付きキューでつないだ段階ごとのワーカーでジョブを流す"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in stages] + [queue.Queue()]
+        threads = []
+
+        def worker(name, func, inbox, outbox):
+            while True:
+                job = inbox.get()
+                if job is None:
+                    break
+                if "status" not in job:  # 前段で終了したジョブは素通り
+                    start = time.perf_counter()
+                    try:
+                        func(job)
+                    except Exception as e:
+                        logger.error(f"Failed to process {job['filename']} at {name}: {e}")
+                        job["status"] = "failed"
+                        job["error"] = f"{name}: {e}"
+                        self._count("failed")
+                    job["timings"][name] = time.perf_counter() - start
+                outbox.put(job)
+
+        for i, (name, func, n_workers) in enumerate(stages):
+            group = [
+                threading.Thread(target=worker, args=(name, func, queues[i], queues[i + 1]), daemon=True)
+                for _ in range(max(1, n_workers))
+            ]
+            for t in group:
+                t.start()
+            threads.append(group)
+
+        feeder = threading.Thread(target=lambda: [queues[0].put(job) for job in jobs], daemon=True)
+        feeder.start()
+
+        results = [queues[-1].get() for _ in jobs]
+
+        # 段階ごとに停止
+        feeder.join()
+        for i, group in enumerate(threads):
+            for _ in group:
+                queues[i].put(None)
+            for t in group:
+                t.join()
+        return results
+
+    def _stage_extract(self, job: Dict[str, Any], pool: Executor):
+        job["hash"] = file_sha256(job["path"])
+        with self._lock:
+            entry = self._ledger.get(job["hash"])
+            duplicate = entry is not None
+            deferred = not duplicate and job["hash"] in self._inflight
+            if not duplicate and not deferred:
+                self._inflight.add(job["hash"])
+        if deferred:
+            # 同じ内容を処理中。そちらが失敗したときのために、ここでは移動せず次回に回す
+            job["status"] = "deferred"
+            return
+        if duplicate:
+            # 同じ内容は処理済み。ファイルだけ処理済みへ移す
+            self._move_to_processed(job)
+            job["doc_id"] = entry.get("doc_id")
+            if "processed_at" not in entry:
+                # 通知・発注までは済んでいて、移動か記録で失敗したもの。act はやり直さない
+                self._record(job)
+                job["status"] = "processed"
+                self._count("processed")
+                return
+            job["status"] = "duplicate"
+            self._count("duplicates")
+            return
+
+        pdf_data = pool.submit(extract_filing, job["path"]).result()
+        if not pdf_data.get("text"):
+            logger.warning(f"No text extracted from {job['path']}")
+            job["status"] = "no_text"
+            self._count("skipped")
+            return
+        job["pdf_data"] = pdf_data
+
+    def _stage_index(self, job: Dict[str, Any]):
+        metadata = job["pdf_data"].get("metadata", {})
+        job["ticker"] = metadata.get("ticker", "UNKNOWN")
+        job["company"] = metadata.get("company", "Unknown")
+
+        # RAGインデックス化（ファイルハッシュ由来のIDなので再処理しても重複しない）
+        job["doc_id"] = f"{job['ticker']}_{job['hash'][:12]}"
+        self.rag.index_document(job["pdf_data"], job["doc_id"])
+
+    def _stage_analyze(self, job: Dict[str, Any]):
+        # 分析
+        result = self.analyzer.analyze(job["pdf_data"], self.rag, job["doc_id"])
+
+        # 履歴保存
+        self.history.save_analysis(result, ticker=job["ticker"])
+
+        logger.info(f"Analysis completed for {job['company']} ({job['ticker']})")
+        job["analysis_result"] = {"ticker": job["ticker"], "company": job["company"], "analysis": result}
+
+    def _stage_act(self, job: Dict[str, Any]):
+        analysis_result = job["analysis_result"]
+
+        # 通知
+        self._send_notification(analysis_result)
+
+        # 自動売買判定 (Event-Driven Execution)
+        trade_result = self.event_trader.handle_high_impact_event(analysis_result)
+        if trade_result and trade_result.get("status") == "success":
+            logger.info(f"Event-driven trade executed for {job['filename']}")
+
+        # 移動に失敗して再試行されても通知・発注を繰り返さないよう、先に実行済みとして記録する
+        self._record(job, processed=False)
+
+        # 移動（処理済みへ）と台帳への記録
+        self._move_to_processed(job)
+        self._record(job)
+        job.pop("pdf_data", None)
+        job["status"] = "processed"
+        self._count("processed")
+
+    def _process_file(self, file_path: str) -> Dict[str, Any]:
+        """個別のファイルを処理（パイプラインを使わずに extract → analyze まで実行）"""
+        job = {"path": file_path, "filename": os.path.basename(file_path), "timings": {}}
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            self._stage_extract(job, pool)
+        if "status" in job:
+            return None
+        self._stage_index(job)
+        self._stage_analyze(job)
+        return job["analysis_result"]
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    # ------------------------------------------------------------------
+    # 台帳
+    # ------------------------------------------------------------------
+    def _load_ledger(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.ledger_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Failed to load filing ledger: {e}")
+            return {}
+
+    def _record(self, job: Dict[str, Any], processed: bool = True):
+        """
+        台帳に記録する。processed=False は通知・発注まで済んだ（acted_at のみの）状態で、
+        次回のスキャンでは act を飛ばしてファイルの移動だけを行う
+        """
+        with self._lock:
+            now = datetime.now().isoformat()
+            entry = {
+                "filename": job["filename"],
+                "doc_id": job["doc_id"],
+                "acted_at": self._ledger.get(job["hash"], {}).get("acted_at", now),
+            }
+            if processed:
+                entry["processed_at"] = now
+            self._ledger[job["hash"]] = entry
+            tmp_path = f"{self.ledger_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._ledger, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.ledger_path)
+
+    def is_processed(self, file_path: str) -> bool:
+        """同じ内容のファイルが処理済みかどうか"""
+        return file_sha256(file_path) in self._ledger
+
+    def _move_to_processed(self, job: Dict[str, Any]):
+        dest_path = os.path.join(
+            self.processed_dir,
+            f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job['filename']}",
+        )
+        shutil.move(job["path"], dest_path)
+        with self._lock:
+            self._seen.pop(job["path"], None)
+            self._retry.pop(job["path"], None)
+        logger.info(f"Moved {job['filename']} to processed directory")
+
+    def _send_notification(self, data: Dict[str, Any]):
+        """通知を送信"""
+        ticker = data["ticker"]
+        company = data["company"]
+        analysis = data["analysis"]
+
+        rec = analysis.get("recommendation", "HOLD")
+        sent = analysis.get("sentiment", "NEUTRAL")
+        reason = analysis.get("reasoning", "")
+
+        emoji = "🚀" if rec == "BUY" else "📉" if rec == "SELL" else "⚖️"
+
+        message = (
+            f"{emoji} 【決算速報】 {company} ({ticker})\n"
+            f"判断: {rec} | センチメント: {sent}\n"
+            f"理由: {reason}\n"
+            f"分析完了。AI投資委員会に反映されます。"
+        )
+
+        self.notifier.send_text(message, title=f"Filing Analysis: {ticker}")
+        logger.info(f"Notification sent for {ticker}")
+
+
+if __name__ == "__main__":
+    # Test
+    logging.basicConfig(level=logging.INFO)
+    watcher = FilingWatcher()
+    watcher.scan_and_process()
@@ -1,7 +1,14 @@
+import hashlib
 import io
+import json
 import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import BinaryIO, List, Optional, Union
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from pypdf import PdfReader
 
@@ -10,6 +17,47 @@ logger = logging.getLogger(__name__)
 
 PdfSource = Union[str, Path, BinaryIO, bytes, bytearray]
 
+# Pages handed to a worker process per task when extracting in parallel
+PAGES_PER_TASK = 8
+# Documents shorter than this are extracted in-process even when workers > 1
+MIN_PAGES_FOR_PARALLEL = 16
+
+_worker_reader: Optional[PdfReader] = None
+
+# Leading ticker in filing names such as "7203_決算短信.pdf"
+_TICKER_PATTERN = re.compile(r"^([0-9A-Za-z]{4,5}(?:\.T)?)[_\-\s]")
+
+
+def _init_page_worker(source: Union[str, bytes]) -> None:
+    """Open the document once per worker process."""
+    global _worker_reader
+    _worker_reader = PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _extract_page_range(start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extract pages [start, stop) in a worker process (1-based page numbers in the result)."""
+    return [(idx + 1, PDFLoader._page_text(_worker_reader.pages[idx])) for idx in range(start, stop)]
+
+
+def extract_filing(file_path: str) -> Dict[str, Any]:
+    """
+    Extract text and metadata from a filing PDF.
+
+    Used as a process-pool task by FilingWatcher; it lives here so spawned workers
+    only import this module, not the watcher's RAG/notification/trading dependencies.
+    The ticker is taken from the start of the file name (e.g. "7203_決算短信.pdf").
+    """
+    filename = os.path.basename(file_path)
+    match = _TICKER_PATTERN.match(filename)
+    return {
+        "text": PDFLoader.extract_text(file_path),
+        "metadata": {
+            "ticker": match.group(1) if match else "UNKNOWN",
+            "company": "Unknown",
+            "source": filename,
+        },
+    }
+
 
 class PDFLoader:
     """PDF content extractor shared by RAG/earnings features."""
@@ -33,9 +81,220 @@ class PDFLoader:
 
         return PdfReader(str(source))
 
+    @staticmethod
+    def _page_text(page) -> str:
+        return (page.extract_text() or "").replace("\r\n", "\n").strip()
+
+    @staticmethod
+    def _portable_source(source: PdfSource) -> Union[str, bytes]:
+        """Path string or raw bytes, which can be sent to worker processes."""
+        if hasattr(source, "read"):
+            try:
+                source.seek(0)
+            except Exception:
+                pass
+            return source.read()
+        if isinstance(source, (bytes, bytearray)):
+            return bytes(source)
+        return str(source)
+
+    @staticmethod
+    def file_hash(source: PdfSource) -> str:
+        """SHA-256 of the PDF content (used as the extraction cache key)."""
+        h = hashlib.sha256()
+        if hasattr(source, "read"):
+            try:
+                source.seek(0)
+            except Exception:
+                pass
+            for block in iter(lambda: source.read(1 << 20), b""):
+                h.update(block)
+            try:
+                source.seek(0)
+            except Exception:
+                pass
+        elif isinstance(source, (bytes, bytearray)):
+            h.update(source)
+        else:
+            with open(source, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        return h.hexdigest()
+
+    @classmethod
+    def iter_pages(
+        cls,
+        source: PdfSource,
+        max_pages: Optional[int] = None,
+        workers: int = 1,
+        cache_dir: Optional[str] = None,
+    ) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) for each page, in order, without building the full document text.
+
+        Args:
+            source: Path, bytes, or file-like object.
+            max_pages: Optional max pages to read.
+            workers: Worker processes for page parsing. Large documents are split into page ranges
+                that are parsed in parallel; results are still yielded in page order.
+            cache_dir: Optional directory for an on-disk page cache keyed by file hash. A cached
+                document is read back from disk instead of being parsed again.
+        """
+        cache_path = None
+        if cache_dir:
+            cache_path = os.path.join(cache_dir, f"{cls.file_hash(source)}.jsonl")
+            if os.path.exists(cache_path):
+                yield from cls._read_page_cache(cache_path, max_pages)
+                return
+
+        pages = cls._parse_pages(source, max_pages, workers)
+        if cache_path is None or max_pages is not None:
+            yield from pages
+            return
+
+        # Write-through: the cache file only appears once the whole document was extracted
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for page_number, text in pages:
+                    f.write(json.dumps({"page": page_number, "text": text}, ensure_ascii=False) + "\n")
+                    yield page_number, text
+            os.replace(tmp_path, cache_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @staticmethod
+    def _read_page_cache(cache_path: str, max_pages: Optional[int]) -> Iterator[Tuple[int, str]]:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            for idx, line in enumerate(f):
+                if max_pages is not None and idx >= max_pages:
+                    break
+                record = json.loads(line)
+                yield record["page"], record["text"]
+
+    @classmethod
+    def _parse_pages(cls, source: PdfSource, max_pages: Optional[int], workers: int) -> Iterator[Tuple[int, str]]:
+        reader = cls._open_reader(source)
+        n_pages = len(reader.pages) if max_pages is None else min(max_pages, len(reader.pages))
+
+        if workers <= 1 or n_pages < MIN_PAGES_FOR_PARALLEL:
+            for idx in range(n_pages):
+                yield idx + 1, cls._page_text(reader.pages[idx])
+            return
+
+        ranges = [(start, min(start + PAGES_PER_TASK, n_pages)) for start in range(0, n_pages, PAGES_PER_TASK)]
+        portable = cls._portable_source(source)
+        next_page = 0
+        try:
+            # spawn: forked children would inherit native library state (HTTP clients, BLAS threads)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_page_worker,
+                initargs=(portable,),
+            ) as pool:
+                # Keep a bounded number of ranges in flight so memory stays flat on long documents
+                pending = iter(ranges)
+                in_flight = [pool.submit(_extract_page_range, *r) for _, r in zip(range(workers * 2), pending)]
+                while in_flight:
+                    for page in in_flight.pop(0).result():
+                        yield page
+                        next_page = page[0]
+                    nxt = next(pending, None)
+                    if nxt is not None:
+                        in_flight.append(pool.submit(_extract_page_range, *nxt))
+        except BrokenProcessPool as e:
+            logger.warning(f"PDF worker pool failed ({e}); continuing in-process from page {next_page + 1}")
+            for idx in range(next_page, n_pages):
+                yield idx + 1, cls._page_text(reader.pages[idx])
+
+    @classmethod
+    def iter_chunks(
+        cls,
+        source: Union[PdfSource, Iterable[Tuple[int, str]]],
+        chunk_size: int = 1200,
+        overlap: int = 200,
+        workers: int = 1,
+        cache_dir: Optional[str] = None,
+    ) -> Iterator[Dict[str, object]]:
+        """
+        Chunk a PDF on the fly while pages are extracted.
+
+        Produces the same windows as ``chunk_text`` over the extracted text, but only keeps the
+        current window in memory. Each chunk carries the pages it spans.
+
+        Args:
+            source: PDF source, or an iterable of (page_number, text) as produced by ``iter_pages``.
+
+        Yields:
+            {"index", "text", "page_start", "page_end"}
+        """
+        if chunk_size <= overlap:
+            raise ValueError("chunk_size must be greater than overlap")
+
+        if isinstance(source, (str, Path, bytes, bytearray)) or hasattr(source, "read"):
+            pages = cls.iter_pages(source, workers=workers, cache_dir=cache_dir)
+        else:
+            pages = source
+
+        buffer = ""
+        offset = 0  # position of buffer[0] in the full document text
+        boundaries: List[Tuple[int, int]] = []  # (document offset where a page starts, page number)
+        emitted_until = 0  # document offset up to which text has already been emitted
+        seen_text = False  # the buffer can be empty at a page boundary (overlap=0), but the separator still belongs
+        index = 0
+
+        def page_at(position: int) -> int:
+            page = boundaries[0][1]
+            for start, number in boundaries:
+                if start > position:
+                    break
+                page = number
+            return page
+
+        def make_chunk(start: int, end: int) -> Optional[Dict[str, object]]:
+            text = buffer[start - offset : end - offset].strip()
+            if not text:
+                return None
+            return {"index": index, "text": text, "page_start": page_at(start), "page_end": page_at(end - 1)}
+
+        for page_number, text in pages:
+            if not text:
+                continue
+            if seen_text:
+                buffer += "\n\n"
+            seen_text = True
+            boundaries.append((offset + len(buffer), page_number))
+            buffer += text
+
+            while len(buffer) >= chunk_size:
+                chunk = make_chunk(offset, offset + chunk_size)
+                emitted_until = offset + chunk_size
+                if chunk:
+                    yield chunk
+                    index += 1
+                step = chunk_size - overlap
+                buffer = buffer[step:]
+                offset += step
+                while len(boundaries) > 1 and boundaries[1][0] <= offset:
+                    boundaries.pop(0)
+
+        # Tail: emit it unless it is entirely overlap that was already emitted
+        if buffer and (offset + len(buffer) > emitted_until):
+            chunk = make_chunk(offset, offset + len(buffer))
+            if chunk:
+                yield chunk
+
     @classmethod
     def extract_text(
-        cls, source: PdfSource, max_pages: Optional[int] = None, return_error_message: bool = False
+        cls,
+        source: PdfSource,
+        max_pages: Optional[int] = None,
+        return_error_message: bool = False,
+        workers: int = 1,
+        cache_dir: Optional[str] = None,
     ) -> str:
         """
         Extract text from any supported PDF source.
@@ -44,23 +303,15 @@ class PDFLoader:
             source: Path, bytes, or file-like object.
             max_pages: Optional max pages to read (useful for quick previews).
             return_error_message: If True, returns a user-facing error string instead of blank on failure.
+            workers: Worker processes for page parsing (see ``iter_pages``).
+            cache_dir: Optional on-disk page cache directory (see ``iter_pages``).
         """
         if not source:
             return ""
 
         try:
-            reader = cls._open_reader(source)
-            text_parts: List[str] = []
-
-            for idx, page in enumerate(reader.pages):
-                if max_pages is not None and idx >= max_pages:
-                    break
-                page_text = page.extract_text() or ""
-                page_text = page_text.strip()
-                if page_text:
-                    text_parts.append(page_text)
-
-            return "\n\n".join(text_parts).strip()
+            pages = cls.iter_pages(source, max_pages=max_pages, workers=workers, cache_dir=cache_dir)
+            return "\n\n".join(text for _, text in pages if text).strip()
         except Exception as e:
             logger.error(f"Error extracting PDF: {e}")
             if return_error_message:
@@ -114,11 +114,11 @@ class RLStrategy:
 
     def _build_state(self, df: pd.DataFrame, current_position: int) -> np.ndarray:
         """状態ベクトルを構築"""
-        from src.features import add_advanced_features
+        from src.features.feature_store import cached_features
 
         # 特徴量を追加（まだ追加されていなければ）
         if "rsi" not in df.columns:
-            df = add_advanced_features(df.copy())
+            df = cached_features(df, "phase29")
 
         # 最新の行
         latest = df.iloc[-1]
@@ -2,9 +2,12 @@ import datetime
 import sqlite3
 from typing import Dict, List, Optional
 
-import feedparser
-
 from src.bert_sentiment import get_bert_analyzer
+from src.data.feed_service import article_key, get_feed_service
+
+
+# How long per-article scores are kept
+ARTICLE_SCORE_RETENTION_DAYS = 30
 
 
 class SentimentAnalyzer:
@@ -27,30 +30,23 @@ class SentimentAnalyzer:
     def fetch_news(self, limit: int = 20) -> List[Dict]:
         """
         Fetches news headlines from RSS feeds.
+        Feeds are fetched concurrently with conditional GETs; unchanged feeds are served from the article store.
         """
-        news_items = []
-        seen_titles = set()
-
-        for url in self.feeds:
-            try:
-                feed = feedparser.parse(url)
-                for entry in feed.entries[:10]:  # Top 10 from each
-                    title = entry.title
-                    if title in seen_titles:
-                        continue
-                    seen_titles.add(title)
-
-                    news_items.append(
-                        {
-                            "title": title,
-                            "link": entry.link,
-                            "published": entry.get("published", str(datetime.datetime.now())),
-                            "summary": entry.get("summary", ""),
-                        }
-                    )
-            except Exception as e:
-                print(f"Error fetching feed {url}: {e}")
+        try:
+            result = get_feed_service().fetch(self.feeds, per_feed_limit=10)  # Top 10 from each
+        except Exception as e:
+            print(f"Error fetching feeds: {e}")
+            return []
 
+        news_items = [
+            {
+                "title": article["title"],
+                "link": article["link"],
+                "published": article["published"] or str(datetime.datetime.now()),
+                "summary": article["summary"] or "",
+            }
+            for article in result["articles"]
+        ]
         return news_items[:limit]
 
     def analyze_sentiment(self, text: str) -> float:
@@ -61,6 +57,50 @@ class SentimentAnalyzer:
         result = self.bert_analyzer.analyze(text)
         return result["score"]
 
+    def analyze_sentiments(self, texts: List[str]) -> List[float]:
+        """
+        Analyzes sentiment of many texts in batched BERT passes (cached headlines are not re-scored).
+        """
+        return [result["score"] for result in self.bert_analyzer.analyze_batch(texts)]
+
+    @staticmethod
+    def _news_text(item: Dict) -> str:
+        # Analyze title and summary
+        return f"{item['title']} {item['summary'] or ''}"
+
+    def score_new_articles(self) -> int:
+        """
+        Scores only the articles the feed service has not yet handed to the sentiment consumer
+        and stores the scores. Returns the number of articles scored.
+        """
+        try:
+            articles = get_feed_service().new_articles("sentiment", feeds=self.feeds)
+        except Exception as e:
+            print(f"Error reading new articles: {e}")
+            return 0
+        if not articles:
+            return 0
+
+        scores = self.analyze_sentiments([self._news_text(article) for article in articles])
+        self._save_article_scores(
+            {article_key(article["link"] or article["title"]): score for article, score in zip(articles, scores)}
+        )
+        return len(articles)
+
+    def _news_scores(self, news: List[Dict]) -> List[float]:
+        """
+        Scores for the given headlines; stored scores are reused and only unseen headlines are analyzed.
+        """
+        keys = [article_key(item.get("link") or item["title"]) for item in news]
+        scores = self._load_article_scores(keys)
+        missing = [i for i, key in enumerate(keys) if key not in scores]
+        if missing:
+            fresh = self.analyze_sentiments([self._news_text(news[i]) for i in missing])
+            fresh_scores = {keys[i]: score for i, score in zip(missing, fresh)}
+            self._save_article_scores(fresh_scores)
+            scores.update(fresh_scores)
+        return [scores[key] for key in keys]
+
     def get_market_sentiment(self, multimodal_data: Optional[Dict] = None) -> Dict:
         """
         Calculates overall market sentiment, now supporting multimodal inputs.
@@ -70,14 +110,11 @@ class SentimentAnalyzer:
         count = 0
 
         if news:
-            total_score = 0.0
-            for item in news:
-                # Analyze title and summary
-                text = f"{item['title']} {item['summary']}"
-                score = self.analyze_sentiment(text)
-                total_score += score
-                count += 1
-            news_score = total_score / count if count > 0 else 0.0
+            # Articles are scored once when they first arrive; later calls read the stored scores
+            self.score_new_articles()
+            scores = self._news_scores(news)
+            count = len(scores)
+            news_score = sum(scores) / count if count > 0 else 0.0
 
         # Fusion with Multimodal Data
         final_score = news_score
@@ -136,6 +173,40 @@ class SentimentAnalyzer:
                 ON sentiment_history(timestamp)
             """
             )
+            # Per-article scores keyed like the feed service's article store
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS article_sentiment (
+                    url_hash TEXT PRIMARY KEY,
+                    score REAL NOT NULL,
+                    scored_at TEXT NOT NULL
+                )
+            """
+            )
+
+    def _load_article_scores(self, keys: List[str]) -> Dict[str, float]:
+        if not keys:
+            return {}
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT url_hash, score FROM article_sentiment WHERE url_hash IN ({', '.join('?' * len(keys))})",
+                keys,
+            )
+            return {key: score for key, score in cursor.fetchall()}
+
+    def _save_article_scores(self, scores: Dict[str, float]):
+        if not scores:
+            return
+        now = datetime.datetime.now()
+        cutoff = now - datetime.timedelta(days=ARTICLE_SCORE_RETENTION_DAYS)
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT OR REPLACE INTO article_sentiment (url_hash, score, scored_at) VALUES (?, ?, ?)",
+                [(key, score, now.isoformat()) for key, score in scores.items()],
+            )
+            cursor.execute("DELETE FROM article_sentiment WHERE scored_at < ?", (cutoff.isoformat(),))
 
     def save_sentiment_history(self, sentiment_data: Dict):
         """
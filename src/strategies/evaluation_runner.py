@@ -0,0 +1,284 @@
+"""
+Process-isolated strategy tournament for custom/evolved strategies.
+
+Strategy modules are discovered without importing them (``loader.discover_strategies``) and each
+strategy is imported, instantiated and backtested inside a worker process:
+
+- Price data is written once to a memory-mapped ``.npy`` file that every worker maps read-only,
+  so the dataset is not pickled per task.
+- Each evaluation has a wall-clock timeout; a worker that exceeds it is killed and replaced.
+- Each worker runs under an address-space limit, so a runaway allocation fails inside that worker.
+- Results are yielded as they finish; a crashing module only loses its own result.
+
+Example:
+    runner = StrategyEvaluationRunner(price_data, workers=4, timeout=60, memory_limit_mb=2048)
+    for result in runner.run():
+        print(result["class_name"], result["status"], result.get("sharpe_ratio"))
+"""
+
+import importlib.util
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .loader import StrategySpec, discover_strategies
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Per-worker state (set by _worker_main)
+_frames: Dict[str, pd.DataFrame] = {}
+
+
+def score_signals(signals: pd.Series, close: pd.Series, cost: float = 0.001) -> pd.Series:
+    """
+    Daily strategy returns for one ticker (same rules as VectorizedBacktester).
+
+    The position is the latest non-zero signal (1 long / -1 short), applied to the next day's return,
+    with ``cost`` charged on each position change.
+    """
+    signals = pd.Series(signals, index=close.index).reindex(close.index).fillna(0)
+    position = signals.replace(0, np.nan).ffill().fillna(0).clip(-1, 1)
+    returns = close.pct_change().fillna(0) * position.shift(1).fillna(0)
+    return returns - position.diff().abs().fillna(position.abs()) * cost
+
+
+def _summarize(daily: pd.DataFrame) -> Dict[str, float]:
+    portfolio = daily.mean(axis=1)
+    wealth = (1 + portfolio).cumprod()
+    vol = portfolio.std()
+    return {
+        "total_return": float(wealth.iloc[-1] - 1) if len(wealth) else 0.0,
+        "sharpe_ratio": float(portfolio.mean() / vol * np.sqrt(252)) if vol and vol > 0 else 0.0,
+        "max_drawdown": float((wealth / wealth.cummax() - 1).min()) if len(wealth) else 0.0,
+    }
+
+
+def _apply_memory_limit(memory_limit_mb: Optional[int]):
+    """Caps the worker's address space at its current size + memory_limit_mb."""
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        limit = current + memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, OSError, ValueError) as e:
+        logger.warning(f"Memory limit not applied in strategy worker: {e}")
+
+
+def _load_strategy(spec: StrategySpec):
+    module_name = f"{spec.module_name}_{os.getpid()}"
+    module_spec = importlib.util.spec_from_file_location(module_name, spec.path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    return getattr(module, spec.class_name)()
+
+
+def _evaluate(spec: StrategySpec, cost: float) -> Dict[str, Any]:
+    strategy = _load_strategy(spec)
+    daily = {}
+    trades = 0
+    for ticker, frame in _frames.items():
+        # dropna copies the rows out of the read-only mapping, so strategies may add columns freely
+        frame = frame.dropna(subset=["Close"])
+        signals = strategy.generate_signals(frame)
+        daily[ticker] = score_signals(signals, frame["Close"], cost)
+        trades += int((pd.Series(signals).replace(0, np.nan).ffill().diff().fillna(0) != 0).sum())
+    result = _summarize(pd.DataFrame(daily))
+    result["trades"] = trades
+    result["name"] = getattr(strategy, "name", spec.class_name)
+    return result
+
+
+def _worker_main(conn, data_path: str, tickers: List[str], dates: np.ndarray, memory_limit_mb: Optional[int]):
+    global _frames
+    values = np.load(data_path, mmap_mode="r")
+    index = pd.DatetimeIndex(dates)
+    _frames = {}
+    for i, ticker in enumerate(tickers):
+        _frames[ticker] = pd.DataFrame(values[i], index=index, columns=PRICE_COLUMNS, copy=False)
+    _apply_memory_limit(memory_limit_mb)
+    conn.send("ready")
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        spec, cost = task
+        start = time.perf_counter()
+        try:
+            result = _evaluate(spec, cost)
+            result["status"] = "ok"
+        except MemoryError:
+            result = {"status": "memory_limit", "error": "MemoryError"}
+        except BaseException as e:  # noqa: B036 - strategy code may raise anything, including SystemExit
+            result = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+        result["seconds"] = time.perf_counter() - start
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, ctx, args):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn,) + args, daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.spec: Optional[StrategySpec] = None
+        self.started = 0.0
+
+    def submit(self, spec: StrategySpec, cost: float):
+        self.spec = spec
+        self.started = time.monotonic()
+        self.conn.send((spec, cost))
+
+    def start_timer(self):
+        # The timeout covers the evaluation itself, not interpreter start-up and imports
+        self.ready = True
+        self.started = time.monotonic()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        self.kill()
+
+
+class StrategyEvaluationRunner:
+    """Backtests discovered strategies in isolated, time- and memory-limited worker processes."""
+
+    def __init__(
+        self,
+        price_data: Dict[str, pd.DataFrame],
+        workers: Optional[int] = None,
+        timeout: float = 60.0,
+        memory_limit_mb: Optional[int] = 2048,
+        cost: float = 0.001,
+    ):
+        """
+        Args:
+            price_data: {ticker: OHLCV DataFrame}
+            workers: Worker processes (default: CPU count)
+            timeout: Seconds allowed per strategy (import + all tickers)
+            memory_limit_mb: Extra address space a worker may allocate beyond its startup size (None = no limit)
+            cost: Cost per position change
+        """
+        self.price_data = price_data
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.cost = cost
+
+    def _write_prices(self, directory: str):
+        tickers = sorted(self.price_data)
+        index = pd.DatetimeIndex([])
+        for df in self.price_data.values():
+            index = index.union(pd.DatetimeIndex(df.index))
+        values = np.full((len(tickers), len(index), len(PRICE_COLUMNS)), np.nan)
+        for i, ticker in enumerate(tickers):
+            df = self.price_data[ticker].reindex(index)
+            for c, column in enumerate(PRICE_COLUMNS):
+                if column in df.columns:
+                    values[i, :, c] = df[column].to_numpy(dtype=float)
+        path = os.path.join(directory, "prices.npy")
+        np.save(path, values)
+        return path, tickers, index.values
+
+    def run(self, specs: Optional[Iterable[StrategySpec]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluates strategies and yields one result per strategy as soon as it finishes.
+
+        Each result has ``path``, ``class_name``, ``status`` (ok / error / memory_limit / timeout / crashed)
+        and ``seconds``; successful ones add ``name``, ``total_return``, ``sharpe_ratio``, ``max_drawdown``
+        and ``trades``.
+        """
+        pending = deque(discover_strategies() if specs is None else specs)
+        if not pending:
+            return
+
+        ctx = multiprocessing.get_context("spawn")
+        tmp_dir = tempfile.mkdtemp(prefix="strategy_eval_")
+        workers: List[_Worker] = []
+        try:
+            args = self._write_prices(tmp_dir) + (self.memory_limit_mb,)
+            workers = [_Worker(ctx, args) for _ in range(min(self.workers, len(pending)))]
+
+            while True:
+                for i, worker in enumerate(workers):
+                    if worker.spec is None and pending:
+                        if not worker.process.is_alive():
+                            worker.kill()
+                            workers[i] = worker = _Worker(ctx, args)
+                        worker.submit(pending.popleft(), self.cost)
+                busy = [w for w in workers if w.spec is not None]
+                if not busy:
+                    break
+
+                now = time.monotonic()
+                running = [w for w in busy if w.ready]
+                wait_for = max(0.0, min(w.started + self.timeout - now for w in running)) if running else None
+                signalled = wait([w.conn for w in busy] + [w.process.sentinel for w in busy], timeout=wait_for)
+
+                for i, worker in enumerate(workers):
+                    if worker.spec is None:
+                        continue
+                    spec = worker.spec
+                    result = None
+                    if worker.conn in signalled or worker.process.sentinel in signalled:
+                        try:
+                            if worker.conn.poll():
+                                result = worker.conn.recv()
+                        except (EOFError, OSError):
+                            result = None
+                        if result == "ready":
+                            worker.start_timer()
+                            continue
+                        if result is None:
+                            result = {"status": "crashed", "error": f"exit code {worker.process.exitcode}"}
+                    elif worker.ready and time.monotonic() - worker.started >= self.timeout:
+                        result = {"status": "timeout", "error": f"exceeded {self.timeout:.0f}s"}
+
+                    if result is None:
+                        continue
+                    result.setdefault("seconds", time.monotonic() - worker.started)
+                    result.update({"path": spec.path, "class_name": spec.class_name})
+                    worker.spec = None
+                    if result["status"] in ("timeout", "crashed"):
+                        logger.warning(f"Strategy {spec.class_name} ({spec.path}) {result['status']}")
+                        worker.kill()
+                        workers[i] = _Worker(ctx, args) if pending else worker
+                    yield result
+        finally:
+            for worker in workers:
+                worker.stop()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def run_all(self, specs: Optional[Iterable[StrategySpec]] = None) -> pd.DataFrame:
+        """Evaluates every strategy and returns the results ranked by Sharpe ratio (failures last)."""
+        df = pd.DataFrame(list(self.run(specs)))
+        if df.empty:
+            return df
+        if "sharpe_ratio" not in df.columns:
+            df["sharpe_ratio"] = np.nan
+        return df.sort_values("sharpe_ratio", ascending=False, na_position="last").reset_index(drop=True)
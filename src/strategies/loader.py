@@ -1,18 +1,31 @@
+import ast
 import importlib.util
 import inspect
 import os
 import sys
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
 
 from .base import Strategy
 
 
-def load_custom_strategies() -> list:
-    custom_strategies = []
+@dataclass(frozen=True)
+class StrategySpec:
+    """A strategy class found on disk, identified without importing its module."""
+
+    path: str
+    module_name: str
+    class_name: str
+
+
+def strategy_dirs() -> List[str]:
     # Adjust path to find 'custom' directory relative to this file
     # Provided structure is src/strategies/loader.py, so custom dir would be src/strategies/custom
     current_dir = os.path.dirname(__file__)
-    search_dirs = [os.path.join(current_dir, "custom"), os.path.join(current_dir, "evolved")]
+    return [os.path.join(current_dir, "custom"), os.path.join(current_dir, "evolved")]
 
+
+def _module_files(search_dirs: Iterable[str]):
     for custom_dir in search_dirs:
         if not os.path.exists(custom_dir):
             continue
@@ -20,28 +33,58 @@ def load_custom_strategies() -> list:
         # Determine relative module path based on directory name
         dir_name = os.path.basename(custom_dir)
 
-        for filename in os.listdir(custom_dir):
+        for filename in sorted(os.listdir(custom_dir)):
             if filename.endswith(".py") and filename != "__init__.py":
-                filepath = os.path.join(custom_dir, filename)
                 # Module name construction needs to be safe
-                module_name = f"src.strategies.{dir_name}.{filename[:-3]}"
-
-                try:
-                    spec = importlib.util.spec_from_file_location(module_name, filepath)
-                    if spec and spec.loader:
-                        module = importlib.util.module_from_spec(spec)
-                        sys.modules[module_name] = module
-                        spec.loader.exec_module(module)
-
-                        for name, obj in inspect.getmembers(module):
-                            if inspect.isclass(obj) and issubclass(obj, Strategy) and obj is not Strategy:
-                                try:
-                                    strategy_instance = obj()
-                                    custom_strategies.append(strategy_instance)
-                                    print(f"Loaded custom strategy: {strategy_instance.name}")
-                                except Exception as e:
-                                    print(f"Failed to instantiate {name}: {e}")
-                except Exception as e:
-                    print(f"Failed to load custom strategy from {filename}: {e}")
+                yield os.path.join(custom_dir, filename), f"src.strategies.{dir_name}.{filename[:-3]}"
+
+
+def discover_strategies(search_dirs: Optional[Iterable[str]] = None) -> List[StrategySpec]:
+    """
+    Find strategy classes in the custom/evolved directories by parsing the source files.
+
+    Nothing is imported or executed, so a broken or slow module cannot affect the caller.
+    A class qualifies when one of its bases is named ``Strategy`` or ``...Strategy``.
+    """
+    specs = []
+    for filepath, module_name in _module_files(search_dirs or strategy_dirs()):
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=filepath)
+        except (SyntaxError, UnicodeDecodeError, OSError) as e:
+            print(f"Skipping unparsable strategy file {filepath}: {e}")
+            continue
+
+        for node in tree.body:
+            if not isinstance(node, ast.ClassDef):
+                continue
+            base_names = [b.id if isinstance(b, ast.Name) else getattr(b, "attr", "") for b in node.bases]
+            if any(name.endswith("Strategy") for name in base_names):
+                specs.append(StrategySpec(filepath, module_name, node.name))
+    return specs
+
+
+def load_custom_strategies() -> list:
+    custom_strategies = []
+
+    for filepath, module_name in _module_files(strategy_dirs()):
+        filename = os.path.basename(filepath)
+        try:
+            spec = importlib.util.spec_from_file_location(module_name, filepath)
+            if spec and spec.loader:
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[module_name] = module
+                spec.loader.exec_module(module)
+
+                for name, obj in inspect.getmembers(module):
+                    if inspect.isclass(obj) and issubclass(obj, Strategy) and obj is not Strategy:
+                        try:
+                            strategy_instance = obj()
+                            custom_strategies.append(strategy_instance)
+                            print(f"Loaded custom strategy: {strategy_instance.name}")
+                        except Exception as e:
+                            print(f"Failed to instantiate {name}: {e}")
+        except Exception as e:
+            print(f"Failed to load custom strategy from {filename}: {e}")
 
     return custom_strategies
@@ -7,7 +7,8 @@ import pandas as pd
 from ..base import Strategy
 
 # Update relative imports to match new depth
-from ...features import add_advanced_features, add_macro_features
+from ...features import add_macro_features
+from ...features.feature_store import cached_features
 from ...data_loader import fetch_macro_data
 from ...optimization.optuna_tuner import OptunaTuner
 from ...oracle.oracle_2026 import Oracle2026
@@ -128,7 +129,7 @@ class LightGBMStrategy(Strategy):
             import shap
 
             # Prepare latest data point
-            data = add_advanced_features(df)
+            data = cached_features(df, "phase29")
             macro_data = fetch_macro_data(period="5y")
             data = add_macro_features(data, macro_data)
 
@@ -224,7 +225,7 @@ class LightGBMStrategy(Strategy):
         else:
             work_df = df
 
-        data = add_advanced_features(work_df)
+        data = cached_features(work_df, "phase29")
         macro_data = fetch_macro_data(period="5y")  # Macro data is daily usually
 
         # If weekly, we need macro data to be aligned or resampled?
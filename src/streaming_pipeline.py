@@ -9,7 +9,7 @@ from typing import Any, Dict, List
 
 import pandas as pd
 
-from src.features import add_advanced_features
+from src.features.feature_store import cached_features
 from src.realtime_alerts import get_alert_manager
 from src.strategies import AttentionLSTMStrategy, GRUStrategy, LightGBMStrategy
 
@@ -29,6 +29,7 @@ class StreamingPipeline:
         self.strategies = {}
         self.alert_manager = get_alert_manager()
         self.historical_data: Dict[str, pd.DataFrame] = {}
+        self.raw_data: Dict[str, pd.DataFrame] = {}
         self.is_initialized = False
 
     def initialize(self, tickers: List[str], lookback_days: int = 60):
@@ -53,9 +54,9 @@ class StreamingPipeline:
 
         for ticker, df in data.items():
             if not df.empty:
-                # 特徴量を事前に計算しておく
-                df_feat = add_advanced_features(df)
-                self.historical_data[ticker] = df_feat
+                # 特徴量を事前に計算しておく（同じ期間を保存済みならストアから読む）
+                self.raw_data[ticker] = df
+                self.historical_data[ticker] = cached_features(df, "phase29", key=ticker)
                 logger.info(f"Loaded historical data for {ticker}: {len(df)} rows")
 
         self.is_initialized = True
@@ -94,7 +95,7 @@ class StreamingPipeline:
             try:
                 # 1. データの統合
                 # 最新の1行だけが来る想定だが、念のためマージ
-                current_df = self.historical_data[ticker]
+                current_df = self.raw_data.get(ticker, self.historical_data[ticker])
 
                 # インデックス（日時）で結合・更新
                 # update()はインデックスが一致する場合のみ更新するので、
@@ -107,16 +108,12 @@ class StreamingPipeline:
                 # ソート
                 combined_df = combined_df.sort_index()
 
-                # 履歴データを更新（メモリ節約のため一定期間で切り詰めも検討すべき）
-                self.historical_data[ticker] = combined_df
-
-                # 2. 特徴量の再計算
-                # 増分更新は複雑なので、直近データに対して再計算を行う
-                # 計算時間を短縮するため、直近N行のみを使用しても良いが、
-                # 移動平均などが狂うので、ある程度の期間が必要
+                # 生データを更新（メモリ節約のため一定期間で切り詰めも検討すべき）
+                self.raw_data[ticker] = combined_df
 
-                # ここでは簡易的に全再計算（最適化の余地あり）
-                df_feat = add_advanced_features(combined_df)
+                # 2. 特徴量の更新
+                # 特徴量ストア経由（追加行だけを増分計算し、履歴全体に依存する列だけ全期間で計算し直す）
+                df_feat = cached_features(combined_df, "phase29", key=ticker)
                 self.historical_data[ticker] = df_feat
 
                 # 3. 推論実行
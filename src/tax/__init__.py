@@ -1,5 +1,6 @@
 """Tax Calculation Package"""
 from .calculator import TaxCalculator
+from .lots import TaxLotEngine
 from .report import TaxReportGenerator
 
-__all__ = ["TaxCalculator", "TaxReportGenerator"]
+__all__ = ["TaxCalculator", "TaxLotEngine", "TaxReportGenerator"]
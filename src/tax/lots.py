@@ -0,0 +1,515 @@
+"""
+税務ロット（取得単位）エンジン
+
+取引履歴全体を列指向の DataFrame として一括で取り込み、売却ごとの譲渡損益を
+銘柄単位のベクトル演算で求める。
+
+- method="average": 移動平均法（特定口座の取得価額の計算方法）
+- method="specific": 個別ロット指定。売却行の lot_id が指す買付ロットから払い出し、
+  lot_id のない売却はその時点で保有しているロットの古いものから順に（FIFO）払い出す
+- 年度別の実現損益・配当の集計は取り込み後に1回だけ計算してキャッシュする
+- 保有ロットの含み損をまとめて評価し、損出し候補を順位付けする
+"""
+
+import logging
+from dataclasses import asdict, is_dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TRANSACTION_COLUMNS = [
+    "symbol",
+    "transaction_type",
+    "date",
+    "quantity",
+    "price",
+    "commission",
+    "tax_withheld",
+    "lot_id",
+]
+
+# exp(-L) がオーバーフローしない範囲（超えたら逐次計算に切り替える）
+_MAX_LOG_SCALE = 600.0
+
+
+def transactions_to_frame(transactions: Union[pd.DataFrame, Iterable[Any]]) -> pd.DataFrame:
+    """
+    取引を TRANSACTION_COLUMNS の DataFrame に正規化する
+
+    TaxTransaction などのデータクラス・辞書のリスト、または DataFrame を受け付ける。
+    PaperTrader の取引履歴の列名（ticker / action / timestamp）も読み替える。
+    """
+    if isinstance(transactions, pd.DataFrame):
+        frame = transactions.copy()
+    else:
+        records = [asdict(t) if is_dataclass(t) else dict(t) for t in transactions]
+        frame = pd.DataFrame.from_records(records)
+
+    frame = frame.rename(columns={"ticker": "symbol", "action": "transaction_type", "timestamp": "date"})
+    for column, default in (("commission", 0.0), ("tax_withheld", 0.0), ("lot_id", None)):
+        if column not in frame.columns:
+            frame[column] = default
+    missing = [c for c in TRANSACTION_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Transactions are missing columns: {missing}")
+
+    frame = frame[TRANSACTION_COLUMNS].copy()
+    frame["transaction_type"] = frame["transaction_type"].astype(str).str.lower()
+    frame["date"] = pd.to_datetime(frame["date"])
+    frame["quantity"] = frame["quantity"].astype(np.float64)
+    frame["price"] = frame["price"].astype(np.float64)
+    frame["commission"] = frame["commission"].fillna(0.0).astype(np.float64)
+    frame["tax_withheld"] = frame["tax_withheld"].fillna(0.0).astype(np.float64)
+    frame["lot_id"] = frame["lot_id"].astype(object).where(frame["lot_id"].notna(), None)
+    return frame
+
+
+def rank_loss_candidates(
+    frame: pd.DataFrame,
+    price_col: str = "current_price",
+    cost_col: str = "entry_price",
+    quantity_col: str = "quantity",
+    target_loss: float = 0.0,
+) -> pd.DataFrame:
+    """
+    含み損の大きい順に損出し候補を並べる
+
+    target_loss > 0 の場合は、それまでの累積損失が target_loss に達する前の候補だけを返す。
+    unrealized_pnl（負）と cumulative_loss（正）の列を追加する。
+    """
+    if frame.empty:
+        return frame.assign(unrealized_pnl=pd.Series(dtype=float), cumulative_loss=pd.Series(dtype=float))
+
+    unrealized = (frame[price_col] - frame[cost_col]) * frame[quantity_col]
+    candidates = frame.assign(unrealized_pnl=unrealized)
+    candidates = candidates[candidates["unrealized_pnl"] < 0].sort_values("unrealized_pnl", kind="mergesort")
+
+    cumulative = (-candidates["unrealized_pnl"]).cumsum()
+    if target_loss > 0:
+        # 追加前の累積損失が目標未満の候補まで（目標を少し超える最後の1件を含む）
+        candidates = candidates[(cumulative + candidates["unrealized_pnl"]) < target_loss]
+        cumulative = cumulative.loc[candidates.index]
+    return candidates.assign(cumulative_loss=cumulative)
+
+
+class TaxLotEngine:
+    """
+    列指向の税務ロットエンジン
+
+    Example:
+        engine = TaxLotEngine(method="average").ingest(trade_history)
+        engine.year_summary(2024)            # {"total_gains": ..., "net_gains": ...}
+        engine.rank_loss_harvest({"7203": 2400.0}, target_loss=100_000)
+    """
+
+    METHODS = ("average", "specific")
+
+    def __init__(self, method: str = "average"):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown lot matching method: {method}")
+        self.method = method
+        self._frames: List[pd.DataFrame] = []
+        self._pending: List[Any] = []
+        self._transactions: Optional[pd.DataFrame] = None
+        self._reset_cache()
+
+    def _reset_cache(self) -> None:
+        self._realized: Optional[pd.DataFrame] = None
+        self._open_lots: Optional[pd.DataFrame] = None
+        self._by_year: Optional[pd.DataFrame] = None
+        self._dividends_by_year: Optional[pd.DataFrame] = None
+
+    # ------------------------------------------------------------------
+    # 取り込み
+    # ------------------------------------------------------------------
+    def ingest(self, transactions: Union[pd.DataFrame, Iterable[Any]], replace: bool = False) -> "TaxLotEngine":
+        """取引履歴をまとめて取り込む（replace=True なら既存の履歴を置き換える）"""
+        frame = transactions_to_frame(transactions)
+        if replace:
+            self._frames, self._pending = [], []
+            self._transactions = None
+        self._frames.append(frame)
+        self._transactions = None
+        self._reset_cache()
+        return self
+
+    def add(self, transaction: Any) -> None:
+        """1件追加（次に結果を参照するときにまとめて取り込む）"""
+        self._pending.append(transaction)
+        self._reset_cache()
+
+    @property
+    def transactions(self) -> pd.DataFrame:
+        """取り込み済みの全取引（日付順、同日内は追加順）"""
+        if self._pending:
+            self._frames.append(transactions_to_frame(self._pending))
+            self._pending = []
+            self._transactions = None
+        if self._transactions is None:
+            frames = [f for f in self._frames if not f.empty]
+            if frames:
+                merged = pd.concat(frames, ignore_index=True)
+            else:
+                merged = transactions_to_frame(pd.DataFrame(columns=TRANSACTION_COLUMNS))
+            self._frames = [merged]
+            self._transactions = merged.sort_values("date", kind="mergesort").reset_index(drop=True)
+        return self._transactions
+
+    # ------------------------------------------------------------------
+    # 計算
+    # ------------------------------------------------------------------
+    def _trades(self) -> pd.DataFrame:
+        tx = self.transactions
+        trades = tx[tx["transaction_type"].isin(["buy", "sell"])].copy()
+        trades["seq"] = np.arange(len(trades))
+        trades = trades.sort_values(["symbol", "seq"], kind="mergesort").reset_index(drop=True)
+        return self._drop_oversells(trades)
+
+    @staticmethod
+    def _drop_oversells(trades: pd.DataFrame) -> pd.DataFrame:
+        """保有数量を超える売却を除外する（銘柄ごとに最初の超過売却から順に）"""
+        while len(trades):
+            signed = np.where(trades["transaction_type"] == "buy", trades["quantity"], -trades["quantity"])
+            held = pd.Series(signed, index=trades.index).groupby(trades["symbol"]).cumsum()
+            bad = held < -1e-9
+            if not bad.any():
+                break
+            first_bad = bad[bad].groupby(trades.loc[bad, "symbol"]).head(1).index
+            for _, row in trades.loc[first_bad].iterrows():
+                logger.error(f"Sell quantity exceeds position for {row['symbol']} on {row['date']:%Y-%m-%d}")
+            trades = trades.drop(index=first_bad)
+        return trades.reset_index(drop=True)
+
+    def _compute(self) -> None:
+        if self._realized is not None:
+            return
+        trades = self._trades()
+        if self.method == "average":
+            realized, open_lots = _average_cost(trades)
+        else:
+            realized, open_lots = _specific_lots(trades)
+        realized["year"] = realized["date"].dt.year
+        self._realized = realized.sort_values("seq", kind="mergesort").drop(columns="seq").reset_index(drop=True)
+        self._open_lots = open_lots.reset_index(drop=True)
+
+    @property
+    def realized(self) -> pd.DataFrame:
+        """売却ごとの実現損益（symbol, date, year, quantity, proceeds, cost_basis, gain_loss, lot_id）"""
+        self._compute()
+        return self._realized
+
+    def open_lots(self) -> pd.DataFrame:
+        """保有中のロット（symbol, lot_id, quantity, unit_cost, cost_basis）。移動平均法では銘柄ごとに1行"""
+        self._compute()
+        return self._open_lots
+
+    def realized_by_year(self) -> pd.DataFrame:
+        """年度別の譲渡損益（キャッシュ）"""
+        if self._by_year is None:
+            realized = self.realized
+            gain = realized["gain_loss"]
+            self._by_year = (
+                realized.assign(gains=gain.clip(lower=0.0), losses=-gain.clip(upper=0.0))
+                .groupby("year")
+                .agg(
+                    total_gains=("gains", "sum"),
+                    total_losses=("losses", "sum"),
+                    proceeds=("proceeds", "sum"),
+                    cost_basis=("cost_basis", "sum"),
+                    n_sales=("gain_loss", "size"),
+                )
+            )
+            self._by_year["net_gains"] = self._by_year["total_gains"] - self._by_year["total_losses"]
+        return self._by_year
+
+    def dividends_by_year(self) -> pd.DataFrame:
+        """年度別の配当（gross_income, tax_withheld, net_income）"""
+        if self._dividends_by_year is None:
+            tx = self.transactions
+            dividends = tx[tx["transaction_type"] == "dividend"]
+            gross = dividends["quantity"] * dividends["price"]
+            self._dividends_by_year = (
+                pd.DataFrame(
+                    {
+                        "year": dividends["date"].dt.year,
+                        "gross_income": gross,
+                        "tax_withheld": dividends["tax_withheld"],
+                    }
+                )
+                .groupby("year")
+                .sum()
+            )
+            self._dividends_by_year["net_income"] = (
+                self._dividends_by_year["gross_income"] - self._dividends_by_year["tax_withheld"]
+            )
+        return self._dividends_by_year
+
+    def year_summary(self, year: int) -> Dict[str, float]:
+        """指定年度の譲渡損益と配当"""
+        year = int(year)
+        by_year = self.realized_by_year()
+        dividends = self.dividends_by_year()
+        summary = {"total_gains": 0.0, "total_losses": 0.0, "net_gains": 0.0, "n_sales": 0}
+        if year in by_year.index:
+            row = by_year.loc[year]
+            summary.update(
+                total_gains=float(row["total_gains"]),
+                total_losses=float(row["total_losses"]),
+                net_gains=float(row["net_gains"]),
+                n_sales=int(row["n_sales"]),
+            )
+        for column in ("gross_income", "tax_withheld", "net_income"):
+            summary[f"dividend_{column}"] = float(dividends.at[year, column]) if year in dividends.index else 0.0
+        return summary
+
+    def rank_loss_harvest(
+        self, prices: Union[Mapping[str, float], pd.Series], target_loss: float = 0.0
+    ) -> pd.DataFrame:
+        """
+        保有ロット全体から損出し候補を含み損の大きい順に返す
+
+        Args:
+            prices: 銘柄 -> 現在値
+            target_loss: 相殺したい利益額（0 なら含み損のロットをすべて返す）
+        """
+        lots = self.open_lots()
+        price_map = prices if isinstance(prices, pd.Series) else pd.Series(prices, dtype=float)
+        lots = lots.assign(current_price=lots["symbol"].map(price_map)).dropna(subset=["current_price"])
+        return rank_loss_candidates(lots, cost_col="unit_cost", target_loss=target_loss)
+
+
+def _realized_frame(sells: pd.DataFrame, cost_basis: np.ndarray) -> pd.DataFrame:
+    proceeds = (sells["quantity"] * sells["price"] - sells["commission"]).to_numpy()
+    return pd.DataFrame(
+        {
+            "symbol": sells["symbol"].to_numpy(),
+            "date": sells["date"].to_numpy(),
+            "quantity": sells["quantity"].to_numpy(),
+            "proceeds": proceeds,
+            "cost_basis": cost_basis,
+            "gain_loss": proceeds - cost_basis,
+            "lot_id": sells["lot_id"].to_numpy(),
+            "seq": sells["seq"].to_numpy(),
+        }
+    )
+
+
+def _average_cost(trades: pd.DataFrame):
+    """
+    移動平均法
+
+    売却は取得原価のプールを保有比率 r = 売却後数量 / 売却前数量 で縮めるだけなので、
+    保有ゼロで区切った区間ごとに L = cumsum(log r) とすると、各行の後のプール原価は
+    C_t = exp(L_t) * cumsum(買付原価_j * exp(-L_j)) で一度に求まる。
+    """
+    if trades.empty:
+        return _realized_frame(trades, np.empty(0)), _empty_lots()
+
+    is_buy = (trades["transaction_type"] == "buy").to_numpy()
+    qty = trades["quantity"].to_numpy()
+    signed = np.where(is_buy, qty, -qty)
+    held_after = pd.Series(signed).groupby(trades["symbol"]).cumsum().to_numpy()
+    held_before = held_after - signed
+
+    # 保有ゼロからの買付で新しい区間
+    episode = pd.Series(np.cumsum(held_before <= 1e-9))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        retained = np.where(~is_buy & (held_before > 0), held_after / held_before, 1.0)
+        log_r = np.where(retained > 0, np.log(retained), 0.0)
+    log_scale = pd.Series(log_r).groupby(episode).cumsum().to_numpy()
+
+    if -log_scale.min() > _MAX_LOG_SCALE:
+        pool = _average_cost_pool_loop(is_buy, qty, trades, held_before, held_after)
+    else:
+        buy_cost = np.where(is_buy, qty * trades["price"].to_numpy() + trades["commission"].to_numpy(), 0.0)
+        scaled = pd.Series(buy_cost * np.exp(-log_scale)).groupby(episode).cumsum().to_numpy()
+        pool = np.exp(log_scale) * scaled
+    pool = np.where(held_after > 1e-9, pool, 0.0)
+
+    pool_before = pd.Series(pool).groupby(episode).shift(1).fillna(0.0).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_before = np.where(held_before > 0, pool_before / held_before, 0.0)
+
+    sells = ~is_buy
+    realized = _realized_frame(trades[sells], qty[sells] * avg_before[sells])
+
+    last = ~trades["symbol"].duplicated(keep="last").to_numpy()
+    holding = last & (held_after > 1e-9)
+    open_lots = pd.DataFrame(
+        {
+            "symbol": trades["symbol"].to_numpy()[holding],
+            "lot_id": None,
+            "quantity": held_after[holding],
+            "unit_cost": pool[holding] / held_after[holding],
+            "cost_basis": pool[holding],
+        }
+    )
+    return realized, open_lots
+
+
+def _average_cost_pool_loop(is_buy, qty, trades, held_before, held_after) -> np.ndarray:
+    """部分売却が極端に多い区間向けの逐次計算（結果は _average_cost と同じ）"""
+    price = trades["price"].to_numpy()
+    commission = trades["commission"].to_numpy()
+    pool = np.empty(len(qty))
+    current = 0.0
+    for i in range(len(qty)):
+        if held_before[i] <= 1e-9:
+            current = 0.0
+        if is_buy[i]:
+            current += qty[i] * price[i] + commission[i]
+        elif held_before[i] > 0:
+            current *= held_after[i] / held_before[i]
+        pool[i] = current
+    return pool
+
+
+def _empty_lots() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "symbol": pd.Series(dtype=object),
+            "lot_id": pd.Series(dtype=object),
+            "quantity": pd.Series(dtype=float),
+            "unit_cost": pd.Series(dtype=float),
+            "cost_basis": pd.Series(dtype=float),
+        }
+    )
+
+
+def _specific_lots(trades: pd.DataFrame):
+    """
+    個別ロット指定 + FIFO
+
+    lot_id 付きの売却がない銘柄は、銘柄ごとの累積数量区間（買付ロット [lo, hi) と売却 [lo, hi)）の
+    重なりとして一括で割り当てる。超過売却は除外済みなので、各売却にはそれ以前の買付だけが割り当たる。
+    lot_id 付きの売却がある銘柄は取引順に逐次処理し、FIFO の売却もその時点で保有しているロットから払い出す。
+    """
+    if trades.empty:
+        return _realized_frame(trades, np.empty(0)), _empty_lots()
+
+    is_buy = trades["transaction_type"] == "buy"
+    lots = trades[is_buy].copy()
+    ordinal = lots.groupby("symbol").cumcount() + 1
+    default_ids = lots["symbol"].astype(str) + ":" + ordinal.astype(str)
+    lots["lot_id"] = lots["lot_id"].where(lots["lot_id"].notna(), default_ids).astype(str)
+    lots["unit_cost"] = (lots["quantity"] * lots["price"] + lots["commission"]) / lots["quantity"]
+    lots = lots.reset_index(drop=True)
+
+    sells = trades[~is_buy].reset_index(drop=True)
+    cost_basis = np.zeros(len(sells))
+    remaining = lots["quantity"].to_numpy().copy()
+
+    # lot_id 指定の売却が指すロット（見つからなければ FIFO）
+    lot_index = pd.Series(lots.index, index=pd.MultiIndex.from_arrays([lots["symbol"], lots["lot_id"]]))
+    explicit_keys = pd.MultiIndex.from_arrays([sells["symbol"], sells["lot_id"].astype(str)])
+    matched = lot_index.reindex(explicit_keys).to_numpy()
+    explicit = sells["lot_id"].notna().to_numpy() & ~np.isnan(matched)
+    unknown = sells["lot_id"].notna().to_numpy() & ~explicit
+    for _, row in sells[unknown].iterrows():
+        logger.warning(f"Lot {row['lot_id']} not found for {row['symbol']}; matching FIFO")
+    sell_lot = np.where(explicit, np.nan_to_num(matched, nan=-1.0), -1.0).astype(int)
+
+    # 1) lot_id 指定の売却がある銘柄: 取引順に逐次処理
+    in_order = set(sells.loc[explicit, "symbol"])
+    ordered_sells = sells["symbol"].isin(in_order).to_numpy()
+    if ordered_sells.any():
+        cost_basis[ordered_sells] = _match_in_order(lots, sells, np.flatnonzero(ordered_sells), sell_lot, remaining)
+
+    # 2) それ以外の銘柄: FIFO を一括で割り当て
+    fifo = ~ordered_sells
+    if fifo.any():
+        fifo_lots = np.flatnonzero(~lots["symbol"].isin(in_order).to_numpy())
+        lot_idx, sell_idx, alloc = _fifo_intervals(lots.iloc[fifo_lots], remaining[fifo_lots], sells[fifo])
+        cost_basis[fifo] = np.bincount(
+            sell_idx, weights=alloc * lots["unit_cost"].to_numpy()[fifo_lots][lot_idx], minlength=int(fifo.sum())
+        )
+        remaining[fifo_lots] -= np.bincount(lot_idx, weights=alloc, minlength=len(fifo_lots))
+
+    realized = _realized_frame(sells, cost_basis)
+    holding = remaining > 1e-9
+    open_lots = pd.DataFrame(
+        {
+            "symbol": lots["symbol"].to_numpy()[holding],
+            "lot_id": lots["lot_id"].to_numpy()[holding],
+            "quantity": remaining[holding],
+            "unit_cost": lots["unit_cost"].to_numpy()[holding],
+            "cost_basis": remaining[holding] * lots["unit_cost"].to_numpy()[holding],
+        }
+    )
+    return realized, open_lots
+
+
+def _fifo_intervals(lots: pd.DataFrame, lot_qty: np.ndarray, sells: pd.DataFrame):
+    """
+    FIFO の割り当てを累積数量区間の重なりとして一括で求める
+
+    Returns:
+        (lots 内の位置, sells 内の位置, 割り当て数量) の配列
+    """
+    symbols = pd.Index(pd.unique(lots["symbol"]))
+    lot_total = pd.Series(lot_qty).groupby(lots["symbol"].to_numpy()).sum().reindex(symbols)
+    sell_total = sells.groupby("symbol")["quantity"].sum().reindex(symbols).fillna(0.0)
+    if (sell_total > lot_total + 1e-9).any():
+        raise ValueError(f"FIFO sells exceed remaining lots for: {list(symbols[sell_total > lot_total + 1e-9])}")
+
+    # 銘柄ごとに区間が重ならないようにオフセットを足して一列に並べる
+    offset = (lot_total.cumsum() - lot_total).to_dict()
+    lot_hi = pd.Series(lot_qty).groupby(lots["symbol"].to_numpy()).cumsum().to_numpy() + lots["symbol"].map(
+        offset
+    ).to_numpy(dtype=float)
+    lot_lo = lot_hi - lot_qty
+    sell_qty = sells["quantity"].to_numpy()
+    sell_hi = sells.groupby("symbol")["quantity"].cumsum().to_numpy() + sells["symbol"].map(offset).to_numpy(
+        dtype=float
+    )
+    sell_lo = sell_hi - sell_qty
+
+    first = np.searchsorted(lot_hi, sell_lo + 1e-9, side="left")
+    last = np.searchsorted(lot_lo, sell_hi - 1e-9, side="left") - 1
+    counts = np.maximum(last - first + 1, 0)
+    sell_idx = np.repeat(np.arange(len(sell_qty)), counts)
+    lot_idx = first[sell_idx] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    alloc = np.minimum(lot_hi[lot_idx], sell_hi[sell_idx]) - np.maximum(lot_lo[lot_idx], sell_lo[sell_idx])
+    return lot_idx, sell_idx, np.clip(alloc, 0.0, None)
+
+
+def _match_in_order(
+    lots: pd.DataFrame, sells: pd.DataFrame, rows: np.ndarray, sell_lot: np.ndarray, remaining: np.ndarray
+) -> np.ndarray:
+    """
+    lot_id 指定の売却がある銘柄の売却を取引順に払い出し、rows の各売却の取得原価を返す
+
+    指定ロットがその時点で保有されていない（買付前・払い出し済み）売却は FIFO で割り当てる。
+    remaining はその場で更新する。
+    """
+    unit_cost = lots["unit_cost"].to_numpy()
+    lot_seq = lots["seq"].to_numpy()
+    lots_of = {symbol: np.asarray(idx) for symbol, idx in lots.groupby("symbol").indices.items()}
+    cost = np.zeros(len(rows))
+
+    for k, i in enumerate(rows):
+        sell = sells.iloc[i]
+        qty, j = sell["quantity"], sell_lot[i]
+        if j >= 0 and lot_seq[j] < sell["seq"] and remaining[j] >= qty - 1e-9:
+            remaining[j] -= qty
+            cost[k] = qty * unit_cost[j]
+            continue
+        if j >= 0:
+            logger.warning(
+                f"Lot {sell['lot_id']} is not held for {sell['symbol']} on {sell['date']:%Y-%m-%d}; matching FIFO"
+            )
+
+        need = qty
+        for lot in lots_of.get(sell["symbol"], ()):
+            if lot_seq[lot] > sell["seq"] or need <= 1e-9:
+                break
+            take = min(need, remaining[lot])
+            remaining[lot] -= take
+            cost[k] += take * unit_cost[lot]
+            need -= take
+        if need > 1e-9:
+            raise ValueError(f"Sell exceeds lots held for {sell['symbol']} on {sell['date']:%Y-%m-%d}")
+    return cost
@@ -137,46 +137,32 @@ class TaxCalculator:
         if positions.empty:
             return []
 
-        # 含み損のポジションを抽出
-        positions = positions.copy()
-        positions["unrealized_pnl"] = (positions["current_price"] - positions["entry_price"]) * positions["quantity"]
+        from src.tax.lots import rank_loss_candidates
 
-        loss_positions = positions[positions["unrealized_pnl"] < 0].copy()
+        # 含み損のポジションを損失額の大きい順に抽出（目標額に達するまで）
+        loss_positions = rank_loss_candidates(positions, target_loss=target_loss)
 
         if loss_positions.empty:
             return []
 
-        # 損失額でソート（大きい順）
-        loss_positions = loss_positions.sort_values("unrealized_pnl")
-
-        recommendations = []
-        cumulative_loss = 0.0
-
-        for _, pos in loss_positions.iterrows():
-            loss = abs(pos["unrealized_pnl"])
-
-            if target_loss > 0 and cumulative_loss >= target_loss:
-                break
-
-            recommendations.append(
-                {
-                    "ticker": pos["ticker"],
-                    "quantity": pos["quantity"],
-                    "entry_price": pos["entry_price"],
-                    "current_price": pos["current_price"],
-                    "unrealized_loss": -loss,
-                    "tax_benefit": loss
-                    * (
-                        self.CAPITAL_GAINS_TAX_RATE
-                        + self.CAPITAL_GAINS_RESIDENT_TAX_RATE
-                        + self.CAPITAL_GAINS_TAX_RATE * self.RECONSTRUCTION_TAX_RATE
-                    ),
-                }
-            )
-
-            cumulative_loss += loss
-
-        return recommendations
+        benefit_rate = (
+            self.CAPITAL_GAINS_TAX_RATE
+            + self.CAPITAL_GAINS_RESIDENT_TAX_RATE
+            + self.CAPITAL_GAINS_TAX_RATE * self.RECONSTRUCTION_TAX_RATE
+        )
+        loss = -loss_positions["unrealized_pnl"]
+
+        recommendations = pd.DataFrame(
+            {
+                "ticker": loss_positions["ticker"],
+                "quantity": loss_positions["quantity"],
+                "entry_price": loss_positions["entry_price"],
+                "current_price": loss_positions["current_price"],
+                "unrealized_loss": -loss,
+                "tax_benefit": loss * benefit_rate,
+            }
+        )
+        return recommendations.to_dict("records")
 
     def calculate_year_end_tax_strategy(self, realized_gains: float, unrealized_positions: pd.DataFrame) -> Dict:
         """
@@ -125,17 +125,17 @@ class TaxReportGenerator:
 
         detail_data = [["日付", "銘柄", "売買", "数量", "単価", "金額"]]
 
-        for _, trade in detail_trades.iterrows():
-            detail_data.append(
-                [
-                    trade["date"],
-                    trade["ticker"],
-                    trade["action"],
-                    str(trade["quantity"]),
-                    f"¥{trade['price']:,.0f}",
-                    f"¥{trade['amount']:,.0f}",
-                ]
+        detail_data.extend(
+            [date, ticker, action, str(quantity), f"¥{price:,.0f}", f"¥{amount:,.0f}"]
+            for date, ticker, action, quantity, price, amount in zip(
+                detail_trades["date"],
+                detail_trades["ticker"],
+                detail_trades["action"],
+                detail_trades["quantity"],
+                detail_trades["price"],
+                detail_trades["amount"],
             )
+        )
 
         detail_table = Table(detail_data, colWidths=[25 * mm, 25 * mm, 15 * mm, 20 * mm, 25 * mm, 30 * mm])
         detail_table.setStyle(
@@ -168,27 +168,26 @@ class TaxReportGenerator:
         Returns:
             CSV文字列
         """
-        # e-Tax形式に変換
-        etax_data = []
-
-        for _, trade in trades.iterrows():
-            if trade["action"] == "SELL":
-                # 売却のみe-Taxに記載
-                etax_data.append(
-                    {
-                        "銘柄コード": trade["ticker"],
-                        "銘柄名": trade.get("ticker_name", trade["ticker"]),
-                        "売却日": pd.to_datetime(trade["timestamp"]).strftime("%Y/%m/%d"),
-                        "売却数量": trade["quantity"],
-                        "売却単価": trade["price"],
-                        "売却金額": trade["amount"],
-                        "取得単価": trade.get("entry_price", 0),
-                        "取得金額": trade.get("entry_price", 0) * trade["quantity"],
-                        "譲渡損益": trade.get("realized_pnl", 0),
-                    }
-                )
-
-        df = pd.DataFrame(etax_data)
+        # e-Tax形式に変換（売却のみe-Taxに記載）
+        sells = trades[trades["action"] == "SELL"]
+
+        def column(name: str, default) -> pd.Series:
+            return sells[name] if name in sells.columns else pd.Series(default, index=sells.index)
+
+        entry_price = column("entry_price", 0)
+        df = pd.DataFrame(
+            {
+                "銘柄コード": sells["ticker"],
+                "銘柄名": column("ticker_name", None).fillna(sells["ticker"]),
+                "売却日": pd.to_datetime(sells["timestamp"]).dt.strftime("%Y/%m/%d"),
+                "売却数量": sells["quantity"],
+                "売却単価": sells["price"],
+                "売却金額": sells["amount"],
+                "取得単価": entry_price,
+                "取得金額": entry_price * sells["quantity"],
+                "譲渡損益": column("realized_pnl", 0),
+            }
+        )
 
         # CSV出力
         csv_str = df.to_csv(index=False, encoding="shift_jis")
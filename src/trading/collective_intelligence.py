@@ -2,32 +2,179 @@ import logging
 import json
 import os
 import hashlib
-from typing import Dict, List, Any
+import threading
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 from src.utils import retry_with_backoff
 
 logger = logging.getLogger(__name__)
 
+
+class LedgerCorruptionError(ValueError):
+    """A stored block is unreadable somewhere other than a torn final append."""
+
+
 class BlockchainSignalLedger:
     """
     A simulated immutable ledger for trading signals.
     Each signal is a block linked to the previous one via a hash.
+
+    Blocks are stored append-only, one JSON line per block, in numbered segment files under a
+    directory next to ``ledger_path`` (``data/signal_chain.json`` -> ``data/signal_chain/``).
+    Appends are flushed immediately and fsynced in batches. A checkpoint file records the last
+    verified head (index + hash) so integrity checks only rehash blocks added after it.
+    A legacy single-file JSON chain at ``ledger_path`` is imported on first load.
+    On load, a torn final append is dropped; an unreadable block anywhere else raises
+    ``LedgerCorruptionError`` and the files are left untouched.
     """
-    def __init__(self, ledger_path: str = "data/signal_chain.json"):
+    CHECKPOINT_FILE = "checkpoint.json"
+
+    def __init__(
+        self,
+        ledger_path: str = "data/signal_chain.json",
+        segment_size: int = 10000,
+        fsync_every: int = 32,
+        checkpoint_every: int = 1000,
+    ):
         self.ledger_path = ledger_path
+        self.segment_dir = os.path.splitext(ledger_path)[0]
+        self.segment_size = segment_size
+        self.fsync_every = max(1, fsync_every)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._lock = threading.RLock()
+        self._handle = None
+        self._handle_segment: Optional[str] = None
+        self._unsynced = 0
+        self.chain: List[Dict[str, Any]] = []
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self.checkpoint = self._load_checkpoint()
         self.chain = self._load_chain()
 
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    def _segment_path(self, first_index: int) -> str:
+        return os.path.join(self.segment_dir, f"{first_index:012d}.jsonl")
+
+    def _segment_files(self) -> List[str]:
+        names = sorted(n for n in os.listdir(self.segment_dir) if n.endswith(".jsonl"))
+        return [os.path.join(self.segment_dir, n) for n in names]
+
     def _load_chain(self) -> List[Dict[str, Any]]:
-        if os.path.exists(self.ledger_path):
+        chain: List[Dict[str, Any]] = []
+        segments = self._segment_files()
+        for i, path in enumerate(segments):
+            chain.extend(self._read_segment(path, allow_torn_tail=i == len(segments) - 1))
+
+        if not chain and os.path.exists(self.ledger_path):
             try:
                 with open(self.ledger_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+                    legacy = json.load(f)
+                logger.info(f"Importing {len(legacy)} blocks from legacy ledger {self.ledger_path}")
+                for block in legacy:
+                    self._write_block(block)
+                self._sync()
+                return legacy
             except Exception as e:
                 logger.error(f"Failed to load ledger: {e}")
-        
+
+        if chain:
+            return chain
+
         # Genesis Block
-        return [self._create_block("GENESIS", "0")]
+        genesis = self._create_block("GENESIS", "0")
+        self._write_block(genesis)
+        self._sync()
+        return [genesis]
+
+    @staticmethod
+    def _read_segment(path: str, allow_torn_tail: bool = True) -> List[Dict[str, Any]]:
+        """
+        Reads one segment. Only a final line without its newline (a crash mid-append to the newest
+        segment) is dropped and truncated; any other unreadable line raises LedgerCorruptionError.
+        """
+        blocks = []
+        valid_bytes = 0
+        with open(path, "rb") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.endswith(b"\n"):
+                    if not allow_torn_tail:
+                        raise LedgerCorruptionError(f"Incomplete block in sealed segment {path}:{line_no}")
+                    logger.warning(f"Dropping incomplete block at the end of {path}")
+                    break
+                try:
+                    blocks.append(json.loads(line))
+                except ValueError as e:
+                    raise LedgerCorruptionError(f"Corrupt block at {path}:{line_no}: {e}") from e
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(path):
+            with open(path, "r+b") as f:
+                f.truncate(valid_bytes)
+        return blocks
+
+    def _write_block(self, block: Dict[str, Any]):
+        index = block["index"]
+        if self._handle is None or index % self.segment_size == 0:
+            first_index = index - index % self.segment_size
+            segment = self._segment_path(first_index)
+            if segment != self._handle_segment:
+                self._close_handle()
+                self._handle = open(segment, "a", encoding="utf-8")
+                self._handle_segment = segment
+        self._handle.write(json.dumps(block, ensure_ascii=False, sort_keys=True) + "\n")
+        self._handle.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self._sync()
+
+    def _sync(self):
+        if self._handle is not None and self._unsynced:
+            os.fsync(self._handle.fileno())
+            self._unsynced = 0
 
+    def _close_handle(self):
+        if self._handle is not None:
+            self._sync()
+            self._handle.close()
+            self._handle = None
+            self._handle_segment = None
+
+    def flush(self):
+        """Forces buffered appends to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        with self._lock:
+            self._close_handle()
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        path = os.path.join(self.segment_dir, self.CHECKPOINT_FILE)
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable ledger checkpoint: {e}")
+        return {"index": 0, "hash": None}
+
+    def _save_checkpoint(self, index: int, block_hash: str):
+        self._sync()
+        path = os.path.join(self.segment_dir, self.CHECKPOINT_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"index": index, "hash": block_hash, "updated_at": datetime.now().isoformat()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.checkpoint = {"index": index, "hash": block_hash}
+
+    # ------------------------------------------------------------------
+    # Blocks
+    # ------------------------------------------------------------------
     def _create_block(self, data: Any, previous_hash: str) -> Dict[str, Any]:
         block = {
             "index": 0 if data == "GENESIS" else len(self.chain),
@@ -45,26 +192,46 @@ class BlockchainSignalLedger:
 
     @retry_with_backoff(retries=3)
     def add_signal(self, signal: Dict[str, Any]):
-        previous_hash = self.chain[-1]["hash"]
-        new_block = self._create_block(signal, previous_hash)
-        self.chain.append(new_block)
-        self._save_chain()
-
-    def _save_chain(self):
-        with open(self.ledger_path, "w", encoding="utf-8") as f:
-            json.dump(self.chain, f, indent=2, ensure_ascii=False)
-
-    def verify_integrity(self) -> bool:
-        """Verifies that the chain has not been tampered with."""
-        for i in range(1, len(self.chain)):
-            current = self.chain[i]
-            previous = self.chain[i-1]
-            
-            if current["hash"] != self._calculate_hash(current):
-                return False
-            if current["previous_hash"] != previous["hash"]:
+        with self._lock:
+            previous_hash = self.chain[-1]["hash"]
+            new_block = self._create_block(signal, previous_hash)
+            # Only extend the in-memory chain once the block is on disk, so a retried append cannot duplicate it
+            self._write_block(new_block)
+            self.chain.append(new_block)
+            if new_block["index"] - self.checkpoint["index"] >= self.checkpoint_every:
+                self.verify_integrity()
+
+    def verify_integrity(self, full: bool = False) -> bool:
+        """
+        Verifies that the chain has not been tampered with.
+
+        Only blocks after the last checkpoint are rehashed (plus the checkpointed head itself);
+        ``full=True`` rehashes from genesis. A successful check moves the checkpoint to the head.
+        """
+        with self._lock:
+            start = 1
+            anchor = self.checkpoint.get("index", 0)
+            if not full and self.checkpoint.get("hash") and 0 < anchor < len(self.chain):
+                if self.chain[anchor]["hash"] != self.checkpoint["hash"]:
+                    return False
+                start = anchor
+            elif not full and anchor >= len(self.chain):
+                # Checkpoint is ahead of the stored chain: blocks were lost or truncated
                 return False
-        return True
+
+            for i in range(start, len(self.chain)):
+                current = self.chain[i]
+                previous = self.chain[i-1]
+
+                if current["hash"] != self._calculate_hash(current):
+                    return False
+                if current["previous_hash"] != previous["hash"]:
+                    return False
+
+            head = self.chain[-1]
+            if head["index"] != self.checkpoint.get("index") or head["hash"] != self.checkpoint.get("hash"):
+                self._save_checkpoint(head["index"], head["hash"])
+            return True
 
 class CollectiveIntelligenceManager:
     """
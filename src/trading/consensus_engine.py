@@ -4,12 +4,76 @@ Consensus Engine for DAO-Ready Trading
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+from typing import List, Dict, Any, Mapping, Optional, Sequence
 import numpy as np
 import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class SignalCube:
+    """
+    過去シグナルの (日付 × 銘柄 × 戦略) キューブ
+
+    signals は 1 (BUY) / -1 (SELL) / 0 (HOLD)、confidence は各シグナルの信頼度。
+    """
+
+    dates: pd.DatetimeIndex
+    tickers: List[str]
+    strategies: List[str]
+    signals: np.ndarray  # (D, T, S) int8
+    confidence: np.ndarray  # (D, T, S) float
+
+    @classmethod
+    def from_signals(
+        cls,
+        signals: Mapping[str, Mapping[str, pd.Series]],
+        confidence: Optional[Mapping[str, Mapping[str, pd.Series]]] = None,
+    ) -> "SignalCube":
+        """
+        generate_signals の出力からキューブを作る
+
+        Args:
+            signals: {strategy: {ticker: generate_signals(df) の Series}}
+            confidence: 同じ形の信頼度 (省略時は BaseStrategy.analyze と同じく非ゼロシグナル=1.0)
+        """
+        strategies = list(signals)
+        tickers = sorted({t for per_ticker in signals.values() for t in per_ticker})
+        index = pd.DatetimeIndex([])
+        for per_ticker in signals.values():
+            for series in per_ticker.values():
+                index = index.union(pd.DatetimeIndex(series.index))
+
+        cube = np.zeros((len(index), len(tickers), len(strategies)), dtype=np.int8)
+        conf = np.zeros(cube.shape)
+        for k, strategy in enumerate(strategies):
+            for j, ticker in enumerate(tickers):
+                series = signals[strategy].get(ticker)
+                if series is None:
+                    continue
+                values = series.reindex(index).fillna(0).to_numpy()
+                cube[:, j, k] = np.sign(values).astype(np.int8)
+                if confidence is not None and ticker in confidence.get(strategy, {}):
+                    conf[:, j, k] = confidence[strategy][ticker].reindex(index).fillna(0).to_numpy()
+                else:
+                    conf[:, j, k] = (values != 0).astype(float)
+        return cls(index, tickers, strategies, cube, conf)
+
+    @classmethod
+    def from_strategies(cls, strategies: Mapping[str, Any], data: Mapping[str, pd.DataFrame]) -> "SignalCube":
+        """各戦略の generate_signals を銘柄ごとに実行してキューブを作る（失敗した組み合わせは HOLD 扱い）"""
+        signals: Dict[str, Dict[str, pd.Series]] = {}
+        for name, strategy in strategies.items():
+            signals[name] = {}
+            for ticker, df in data.items():
+                try:
+                    signals[name][ticker] = strategy.generate_signals(df)
+                except Exception as e:
+                    logger.warning(f"Signal generation failed for {name} on {ticker}: {e}")
+        return cls.from_signals(signals)
+
 class ConsensusEngine:
     """
     複数ソースからのシグナルを統合し、最終的な意思決定を行う
@@ -55,8 +119,10 @@ class ConsensusEngine:
             
             # コンセンサス判定 (BUY)
             if total_buy > self.threshold and total_buy > total_sell:
-                # 代表的なシグナルを選択して詳細を引き継ぐ
-                base_sig = max(votes["details"], key=lambda x: x.get("confidence", 0))
+                # 代表的なシグナルを選択して詳細を引き継ぐ (合意した方向のシグナルから)
+                base_sig = max(
+                    (s for s in votes["details"] if s["action"] == "BUY"), key=lambda x: x.get("confidence", 0)
+                )
                 consensus_sig = base_sig.copy()
                 consensus_sig["confidence"] = min(1.0, total_buy / sum(self.source_weights.values()))
                 consensus_sig["reason"] = f"DAO Consensus Reached (Score: {total_buy:.2f})"
@@ -65,7 +131,9 @@ class ConsensusEngine:
             
             # コンセンサス判定 (SELL)
             elif total_sell > self.threshold and total_sell > total_buy:
-                base_sig = max(votes["details"], key=lambda x: x.get("confidence", 0))
+                base_sig = max(
+                    (s for s in votes["details"] if s["action"] == "SELL"), key=lambda x: x.get("confidence", 0)
+                )
                 consensus_sig = base_sig.copy()
                 consensus_sig["confidence"] = min(1.0, total_sell / sum(self.source_weights.values()))
                 consensus_sig["reason"] = f"DAO Consensus Reached (Score: {total_sell:.2f})"
@@ -73,3 +141,100 @@ class ConsensusEngine:
                 logger.info(f"✅ Consensus reached for {ticker}: SELL (Score: {total_sell:.2f})")
 
         return consensus_signals
+
+    def replay_decisions(
+        self,
+        cube: SignalCube,
+        thresholds: Sequence[float],
+        weights: Optional[Mapping[str, float]] = None,
+    ) -> np.ndarray:
+        """
+        aggregate_signals と同じ判定を全日付・全銘柄・全閾値について配列演算で行う
+
+        Args:
+            cube: シグナルキューブ
+            thresholds: 判定閾値のリスト
+            weights: 戦略ごとのウェイト (省略時は source_weights、未登録は 0.5)
+
+        Returns:
+            (D, T, H) の int8 配列。1=BUY, -1=SELL, 0=合意なし
+
+        Note:
+            StreamingPipeline の多数決は weights を全戦略 1/S、confidence=1、閾値 0.5 とした場合に一致する。
+        """
+        w = np.array([(weights or self.source_weights).get(name, 0.5) for name in cube.strategies], dtype=float)
+        score = cube.confidence * w
+        buy = np.where(cube.signals == 1, score, 0.0).sum(axis=2)[..., None]
+        sell = np.where(cube.signals == -1, score, 0.0).sum(axis=2)[..., None]
+        h = np.asarray(thresholds, dtype=float)
+
+        decisions = np.zeros(buy.shape[:2] + (len(h),), dtype=np.int8)
+        decisions[(buy > h) & (buy > sell)] = 1
+        decisions[(sell > h) & (sell > buy)] = -1
+        return decisions
+
+    def replay(
+        self,
+        cube: SignalCube,
+        prices: pd.DataFrame,
+        thresholds: Sequence[float],
+        weightings: Optional[Mapping[str, Mapping[str, float]]] = None,
+        cost: float = 0.001,
+    ) -> pd.DataFrame:
+        """
+        閾値 × ウェイト設定の全組み合わせについてコンセンサス判定を再生し、ベクトル化バックテストで評価する
+
+        BUY の合意で保有 (1)、SELL の合意で手仕舞い (0)、合意なしは前日のポジションを維持する。
+        銘柄ごとに前日のポジションで当日のリターンを受け取り、ポジション変更時に cost を控除、
+        ポートフォリオは銘柄の等金額配分とする。
+
+        Args:
+            cube: シグナルキューブ
+            prices: 終値 (index=日付, columns=銘柄)
+            thresholds: 判定閾値のリスト
+            weightings: {設定名: {戦略: ウェイト}} (省略時は現在の source_weights のみ)
+            cost: 片道取引コスト
+
+        Returns:
+            weighting, threshold ごとの total_return / sharpe_ratio / max_drawdown / trades / exposure (sharpe 降順)
+        """
+        weightings = weightings or {"default": self.source_weights}
+        close = prices.reindex(index=cube.dates, columns=cube.tickers).ffill()
+        returns = close.pct_change().fillna(0.0).to_numpy()[..., None]  # (D, T, 1)
+        n_days = len(cube.dates)
+        day_index = np.arange(n_days)[:, None, None]
+
+        rows = []
+        for name, weights in weightings.items():
+            decisions = self.replay_decisions(cube, thresholds, weights)
+
+            # 直近の合意を前方に持ち越す (ffill)
+            last = np.where(decisions != 0, day_index, -1)
+            np.maximum.accumulate(last, axis=0, out=last)
+            held = np.take_along_axis(decisions, np.clip(last, 0, None), axis=0) == 1
+            position = np.where(last >= 0, held, False).astype(float)
+
+            prev_position = np.concatenate([np.zeros((1,) + position.shape[1:]), position[:-1]], axis=0)
+            turnover = np.abs(position - prev_position)
+            ticker_returns = prev_position * returns - turnover * cost
+            portfolio = ticker_returns.mean(axis=1)  # (D, H)
+
+            wealth = np.cumprod(1.0 + portfolio, axis=0)
+            drawdown = wealth / np.maximum.accumulate(wealth, axis=0) - 1.0
+            vol = portfolio.std(axis=0)
+            sharpe = np.divide(portfolio.mean(axis=0) * np.sqrt(252), vol, out=np.zeros_like(vol), where=vol > 0)
+
+            for i, threshold in enumerate(thresholds):
+                rows.append(
+                    {
+                        "weighting": name,
+                        "threshold": float(threshold),
+                        "total_return": float(wealth[-1, i] - 1.0) if n_days else 0.0,
+                        "sharpe_ratio": float(sharpe[i]),
+                        "max_drawdown": float(drawdown[:, i].min()) if n_days else 0.0,
+                        "trades": int(turnover[:, :, i].sum()),
+                        "exposure": float(position[:, :, i].mean()) if n_days else 0.0,
+                    }
+                )
+
+        return pd.DataFrame(rows).sort_values("sharpe_ratio", ascending=False).reset_index(drop=True)
@@ -29,6 +29,7 @@ from src.regime_detector import RegimeDetector
 from src.schemas import AppConfig
 from src.smart_notifier import SmartNotifier
 from src.utils.logger import get_logger, setup_logger
+from src.data.market_snapshot import MarketDataSnapshot
 from src.data.universe_manager import UniverseManager
 from src.utils.self_healing import SelfHealingEngine
 from src.utils.parameter_optimizer import ParameterOptimizer
@@ -282,15 +283,49 @@ class FullyAutomatedTrader:
     def handle_risk_alert(self, alert: Dict[str, Any]):
         self.log(f"Handling risk alert: {alert}", "WARNING")
 
+    def _snapshot_consumers(self) -> List[Any]:
+        consumers = (self.pt, getattr(self, "position_manager", None), getattr(self, "advanced_risk", None))
+        return [c for c in consumers if c]
+
+    def open_market_snapshot(self) -> MarketDataSnapshot:
+        """
+        サイクル用のマーケットデータスナップショットを作成して各コンポーネントに配る
+
+        保有銘柄とスキャン対象銘柄を最大期間（2年）で1回ずつ取得する。
+        """
+        snapshot = MarketDataSnapshot(period="2y")
+        for consumer in self._snapshot_consumers():
+            consumer.market_snapshot = snapshot
+        try:
+            # get_target_tickers 内の get_positions で保有銘柄が先に読み込まれる
+            snapshot.load(self.get_target_tickers())
+        except Exception as e:
+            self.log(f"スナップショットの事前読み込みに失敗: {e}", "WARNING")
+        return snapshot
+
+    def close_market_snapshot(self, snapshot: MarketDataSnapshot) -> None:
+        """サイクル終了時にスナップショットを外し、統計をログに出す"""
+        for consumer in self._snapshot_consumers():
+            if getattr(consumer, "market_snapshot", None) is snapshot:
+                consumer.market_snapshot = None
+        stats = snapshot.get_stats()
+        self.log(
+            f"Market snapshot: {stats['tickers']}銘柄 / 取得{stats['fetch_calls']}回 "
+            f"({stats['load_seconds']:.2f}s) / hit {stats['hits']} miss {stats['misses']}"
+        )
+
     def run_daily_cycle(self) -> None:
         """1日の運用サイクルを実行"""
         self.log("=== 運用サイクル開始 ===")
+        snapshot = None
         try:
             is_safe, reason = self.is_safe_to_trade()
             if not is_safe:
                 self.log(f"安全上の理由で停止中: {reason}", "WARNING")
                 return
 
+            snapshot = self.open_market_snapshot()
+
             exit_signals = self.evaluate_positions()
             if exit_signals: self.execute_signals(exit_signals)
 
@@ -305,6 +340,9 @@ class FullyAutomatedTrader:
         except Exception as e:
             self.log(f"運用サイクル実行エラー: {e}", "ERROR")
             traceback.print_exc()
+        finally:
+            if snapshot is not None:
+                self.close_market_snapshot(snapshot)
 
     def daily_routine(self, force_run: bool = False) -> None:
         """日次ルーチン（エイリアス）"""
@@ -39,6 +39,7 @@ class MarketScanner:
             "assets", {"japan_stocks": True, "us_stocks": True, "europe_stocks": True, "crypto": False, "fx": False}
         )
         self.allow_small_mid_cap = True  # AssetSelectorから引き継ぎ
+        self._sentiment_analyzer = None  # スキャン間で使い回す（初回スキャン時に生成）
 
     def scan_market(self) -> List[Dict]:
         """市場をスキャンして新規シグナルを検出（グローバル分散対応）"""
@@ -51,8 +52,9 @@ class MarketScanner:
 
         # センチメント分析
         try:
-            sa = SentimentAnalyzer()
-            sentiment = sa.get_market_sentiment()
+            if self._sentiment_analyzer is None:
+                self._sentiment_analyzer = SentimentAnalyzer()
+            sentiment = self._sentiment_analyzer.get_market_sentiment()
             self.logger.info(f"市場センチメント: {sentiment['label']} ({sentiment['score']:.2f})")
 
             # ネガティブセンチメント時はBUYを抑制
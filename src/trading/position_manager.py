@@ -1,11 +1,10 @@
 from typing import Dict, List
 
+import numpy as np
 import pandas as pd
 from tenacity import retry, stop_after_attempt, wait_exponential  # _fetch_data_with_retry は SafetyChecks にある
 
-from src.data_loader import (
-    get_latest_price,
-)  # fetch_stock_data は SafetyChecks にあるので必要に応じてインポート
+from src.dynamic_stop import sma_atr_matrix, stack_tails
 
 
 class PositionManager:
@@ -19,6 +18,8 @@ class PositionManager:
         self.logger = logger
         self.dynamic_stop_manager = dynamic_stop_manager
         self.risk_manager = risk_manager
+        # 運用サイクル中は MarketDataSnapshot が設定される
+        self.market_snapshot = None
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
     def _fetch_data_with_retry(self, tickers: List[str]) -> Dict:
@@ -27,6 +28,10 @@ class PositionManager:
         """
         from src.data_loader import fetch_stock_data  # ここでインポートすることで循環参照を避ける
 
+        if self.market_snapshot is not None:
+            # サイクル開始時に取得済みのデータを使う（未取得の銘柄だけ追加取得）
+            return self.market_snapshot.get_many(tickers)
+
         try:
             self.logger.info(f"データ取得中... ({len(tickers)}銘柄)")
             data_map = fetch_stock_data(tickers, period="2y")
@@ -44,140 +49,165 @@ class PositionManager:
         - トレーリング／固定利確
         """
         positions = self.pt.get_positions()
-        if positions.empty:
+        if positions.empty or "ticker" not in positions.columns:
             return []
 
-        tickers = [pos.get("ticker") for _, pos in positions.iterrows() if pos.get("ticker")]
-        if not tickers:
+        positions = positions[positions["ticker"].fillna("").astype(bool)].reset_index(drop=True)
+        if positions.empty:
             return []
 
-        data_map = self._fetch_data_with_retry(tickers)
-        signals: List[Dict] = []
-
-        for _, position in positions.iterrows():
-            ticker = position.get("ticker")
-            if not ticker:
-                continue
-
-            df = data_map.get(ticker)
-            if df is None or df.empty:
-                continue
+        data_map = self._fetch_data_with_retry(list(dict.fromkeys(positions["ticker"])))
+        return self.evaluate_book(positions, data_map)
 
-            latest_price = get_latest_price(df)
-            entry_price = position.get("entry_price") or position.get("avg_price")
-            quantity = position.get("quantity", 0)
-            if entry_price is None or quantity <= 0 or latest_price is None:
-                self.logger.warning(f"エントリー価格または数量が不明: {ticker}")
-                continue
-
-            pnl_pct = (latest_price - entry_price) / entry_price
-            unrealized_pct = position.get("unrealized_pnl_pct", pnl_pct * 100)
+    def evaluate_book(self, positions: pd.DataFrame, data_map: Dict[str, pd.DataFrame]) -> List[Dict]:
+        """
+        ポジション一覧全体を NumPy 配列でまとめて評価する
 
-            # Dynamic Stop Managerでストップを再計算してDBに保存
-            highest_price = position.get("highest_price", entry_price)
-            self.dynamic_stop_manager.highest_prices[ticker] = highest_price
-            self.dynamic_stop_manager.entry_prices[ticker] = entry_price
+        各銘柄の直近の価格を (銘柄数, 期間) の行列に積み、損益・ATR・ストップ・
+        出口判定を列演算で計算する。ストップの更新は1トランザクションで保存する。
+        """
+        dsm = self.dynamic_stop_manager
+        tickers = positions["ticker"].tolist()
+        frames = [data_map.get(t) for t in tickers]
+        lengths = np.array([0 if df is None else len(df) for df in frames])
+
+        length = max(dsm.atr_period * 10, 20)
+        high, low, close = (stack_tails(frames, col, length) for col in ("High", "Low", "Close"))
+        latest = close[:, -1]
+
+        def column(name: str) -> np.ndarray:
+            if name not in positions.columns:
+                return np.full(len(positions), np.nan)
+            return pd.to_numeric(positions[name], errors="coerce").to_numpy(dtype=np.float64)
+
+        entry = column("entry_price")
+        entry = np.where(np.isfinite(entry) & (entry != 0), entry, column("avg_price"))
+        quantity = np.nan_to_num(column("quantity"))
+
+        valid = (lengths > 0) & np.isfinite(entry) & (entry != 0) & (quantity > 0) & np.isfinite(latest)
+        for i in np.flatnonzero((lengths > 0) & ~valid):
+            self.logger.warning(f"エントリー価格または数量が不明: {tickers[i]}")
+        if not valid.any():
+            return []
 
-            new_stop = self.dynamic_stop_manager.update_stop(ticker, latest_price, df)
-            new_highest = self.dynamic_stop_manager.highest_prices.get(ticker, latest_price)
-            self.pt.update_position_stop(ticker, new_stop, new_highest)
+        idx = np.flatnonzero(valid)
+        tickers_v = [tickers[i] for i in idx]
+        entry, quantity, latest = entry[idx], quantity[idx], latest[idx]
+        high, low, close, lengths = high[idx], low[idx], close[idx], lengths[idx]
+
+        pnl_pct = (latest - entry) / entry
+        if "unrealized_pnl_pct" in positions.columns:
+            unrealized_pct = column("unrealized_pnl_pct")[idx]
+        else:
+            unrealized_pct = pnl_pct * 100
+        highest = column("highest_price")[idx] if "highest_price" in positions.columns else entry.copy()
+        highest = np.where(np.isfinite(highest), highest, entry)
+
+        # Dynamic Stop Managerでストップを再計算して一括保存
+        dsm.highest_prices.update(zip(tickers_v, highest.tolist()))
+        dsm.entry_prices.update(zip(tickers_v, entry.tolist()))
+        new_stop = dsm.update_stops(tickers_v, latest, dsm.batch_atr([frames[i] for i in idx], length))
+        new_highest = np.array([dsm.highest_prices.get(t, p) for t, p in zip(tickers_v, latest)])
+        self._save_stops(list(zip(tickers_v, new_stop.tolist(), new_highest.tolist())))
+
+        stop_exit = dsm.check_exits(tickers_v, latest)
+
+        # DynamicRiskManagerの利確閾値
+        take_profit = np.zeros(len(tickers_v), dtype=bool)
+        take_profit_threshold = 0.0
+        try:
+            take_profit_threshold = float(self.risk_manager.current_params.get("take_profit", 0.10))
+            take_profit = pnl_pct > take_profit_threshold
+        except Exception:
+            pass
+
+        # ATRベースの下支えとトレーリング利確（20本以上のデータがある銘柄のみ）
+        enough = lengths >= 20
+        atr = sma_atr_matrix(high, low, close, 14)
+        stop_loss_price = entry - atr * 2
+        with np.errstate(invalid="ignore"):
+            atr_stop = enough & (latest <= stop_loss_price)
+            recent_high = np.nanmax(np.where(np.isnan(high[:, -20:]), -np.inf, high[:, -20:]), axis=1)
+            trailing = enough & (unrealized_pct >= 5.0) & (latest <= recent_high * 0.97)
+            target = enough & (unrealized_pct >= 20.0)
 
-            should_exit, exit_reason = self.dynamic_stop_manager.check_exit(ticker, latest_price)
-            if should_exit:
+        signals: List[Dict] = []
+        for k in np.flatnonzero(stop_exit | take_profit | atr_stop | trailing | target):
+            ticker, price, qty = tickers_v[k], float(latest[k]), quantity[k]
+            qty = int(qty) if float(qty).is_integer() else float(qty)
+            if stop_exit[k]:
+                _, exit_reason = dsm.check_exit(ticker, price)
                 signals.append(
                     {
                         "ticker": ticker,
                         "action": "SELL",
                         "reason": exit_reason,
                         "confidence": 1.0,
-                        "price": latest_price,
-                        "quantity": quantity,
+                        "price": price,
+                        "quantity": qty,
                     }
                 )
                 self.logger.info(f"Exit Signal ({ticker}): {exit_reason}")
-                continue
-
-            # DynamicRiskManagerの利確閾値
-            try:
-                params = self.risk_manager.current_params
-                take_profit_threshold = params.get("take_profit", 0.10)
-                if pnl_pct > take_profit_threshold:
-                    signals.append(
-                        {
-                            "ticker": ticker,
-                            "action": "SELL",
-                            "reason": f"利確({pnl_pct:.1%}、閾値{take_profit_threshold:.1%})",
-                            "confidence": 1.0,
-                            "price": latest_price,
-                            "quantity": quantity,
-                        }
-                    )
-                    self.logger.info(f"利確判断: {ticker} ({pnl_pct:.1%})")
-                    continue
-            except Exception:
-                pass
-
-            # ATRベースの下支えとトレーリング利確
-            if len(df) >= 20:
-                high = df["High"]
-                low = df["Low"]
-                close = df["Close"]
-
-                tr1 = high - low
-                tr2 = (high - close.shift()).abs()
-                tr3 = (low - close.shift()).abs()
-                tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-                atr = tr.rolling(window=14).mean().iloc[-1]
-
-                stop_loss_price = entry_price - (atr * 2)
-                stop_loss_pct = ((stop_loss_price - entry_price) / entry_price) * 100
-
-                if latest_price <= stop_loss_price:
-                    self.logger.info(f"🛑 {ticker}: 動的ストップロス発動 ({stop_loss_pct:.1f}%)")
-                    signals.append(
-                        {
-                            "ticker": ticker,
-                            "action": "SELL",
-                            "confidence": 1.0,
-                            "price": latest_price,
-                            "quantity": quantity,
-                            "strategy": "Dynamic Stop-Loss",
-                            "reason": f"ATRベース損切り ({unrealized_pct:.1f}%)",
-                        }
-                    )
-                    continue
-
-                if unrealized_pct >= 5.0:
-                    recent_high = df["High"].tail(20).max()
-                    trailing_stop_price = recent_high * 0.97
-
-                    if latest_price <= trailing_stop_price:
-                        self.logger.info(f"📈 {ticker}: トレーリングストップ発動 (利益確定 +{unrealized_pct:.1f}%)")
-                        signals.append(
-                            {
-                                "ticker": ticker,
-                                "action": "SELL",
-                                "confidence": 1.0,
-                                "price": latest_price,
-                                "quantity": quantity,
-                                "strategy": "Trailing Stop",
-                                "reason": f"利益確定 (+{unrealized_pct:.1f}%)",
-                            }
-                        )
-                        continue
-
-                if unrealized_pct >= 20.0:
-                    self.logger.info(f"🎯 {ticker}: 目標利益達成 (+{unrealized_pct:.1f}%)")
-                    signals.append(
-                        {
-                            "ticker": ticker,
-                            "action": "SELL",
-                            "confidence": 1.0,
-                            "price": latest_price,
-                            "quantity": quantity,
-                            "strategy": "Target Profit",
-                            "reason": f"目標利益達成 (+{unrealized_pct:.1f}%)",
-                        }
-                    )
+            elif take_profit[k]:
+                signals.append(
+                    {
+                        "ticker": ticker,
+                        "action": "SELL",
+                        "reason": f"利確({pnl_pct[k]:.1%}、閾値{take_profit_threshold:.1%})",
+                        "confidence": 1.0,
+                        "price": price,
+                        "quantity": qty,
+                    }
+                )
+                self.logger.info(f"利確判断: {ticker} ({pnl_pct[k]:.1%})")
+            elif atr_stop[k]:
+                stop_loss_pct = (stop_loss_price[k] - entry[k]) / entry[k] * 100
+                self.logger.info(f"🛑 {ticker}: 動的ストップロス発動 ({stop_loss_pct:.1f}%)")
+                signals.append(
+                    {
+                        "ticker": ticker,
+                        "action": "SELL",
+                        "confidence": 1.0,
+                        "price": price,
+                        "quantity": qty,
+                        "strategy": "Dynamic Stop-Loss",
+                        "reason": f"ATRベース損切り ({unrealized_pct[k]:.1f}%)",
+                    }
+                )
+            elif trailing[k]:
+                self.logger.info(f"📈 {ticker}: トレーリングストップ発動 (利益確定 +{unrealized_pct[k]:.1f}%)")
+                signals.append(
+                    {
+                        "ticker": ticker,
+                        "action": "SELL",
+                        "confidence": 1.0,
+                        "price": price,
+                        "quantity": qty,
+                        "strategy": "Trailing Stop",
+                        "reason": f"利益確定 (+{unrealized_pct[k]:.1f}%)",
+                    }
+                )
+            else:
+                self.logger.info(f"🎯 {ticker}: 目標利益達成 (+{unrealized_pct[k]:.1f}%)")
+                signals.append(
+                    {
+                        "ticker": ticker,
+                        "action": "SELL",
+                        "confidence": 1.0,
+                        "price": price,
+                        "quantity": qty,
+                        "strategy": "Target Profit",
+                        "reason": f"目標利益達成 (+{unrealized_pct[k]:.1f}%)",
+                    }
+                )
 
         return signals
+
+    def _save_stops(self, updates: List[tuple]) -> None:
+        """ストップ更新を一括保存（一括APIがないトレーダーは1件ずつ）"""
+        batch = getattr(self.pt, "update_position_stops", None)
+        if callable(batch):
+            batch(updates)
+            return
+        for ticker, stop, highest in updates:
+            self.pt.update_position_stop(ticker, stop, highest)
@@ -1,9 +1,13 @@
 import logging
 import datetime
-from typing import Dict, List, Any
+import itertools
+import json
+import sqlite3
+from typing import Dict, List, Any, Iterable, Optional
+import numpy as np
 import pandas as pd
-from src.paper_trader import PaperTrader
-from src.constants import NIKKEI_225_TICKERS, SP500_TICKERS
+from src.paths import TOURNAMENT_DB
+from src.pnl_utils import calculate_total_return
 
 logger = logging.getLogger(__name__)
 
@@ -39,99 +43,448 @@ PERSONALITIES = {
 }
 
 
-class TournamentManager:
+def personality_grid(
+    risk_per_trade: Iterable[float],
+    stop_loss: Iterable[float],
+    take_profit: Iterable[float],
+    prefix: str = "variant",
+) -> Dict[str, Dict[str, Any]]:
+    """Builds personality variants for every combination of the given parameters."""
+    variants = {}
+    for risk, stop, take in itertools.product(risk_per_trade, stop_loss, take_profit):
+        acc_id = f"{prefix}_r{risk:g}_s{stop:g}_t{take:g}"
+        variants[acc_id] = {
+            "name": f"{prefix} (risk {risk:.0%} / stop {stop:.0%} / take {take:.0%})",
+            "risk_per_trade": risk,
+            "stop_loss": stop,
+            "take_profit": take,
+            "description": f"1回あたり現金の{risk:.0%}を投資するパラメータ探索用の派生性格。",
+        }
+    return variants
+
+
+class VectorizedTournament:
     """
-    Multiversal Shadow Tournament Manager.
-    Runs multiple paper trading accounts with different personalities.
+    In-memory shadow tournament.
+
+    Every personality's book is held as arrays (personality × ticker): cash and realized PnL per
+    personality, quantity / average price per personality and ticker. A day's signals are applied to
+    all personalities at once with the same sizing rules the per-account PaperTraders used
+    (BUY: cash × risk_per_trade, SELL: the full position), and one snapshot per day is persisted.
+    The books as they stood before the latest day are kept too, so that day can be re-run.
     """
 
-    def __init__(self, initial_capital: float = 1000000.0):
-        self.traders = {}
-        for acc_id, profile in PERSONALITIES.items():
-            db_path = f"paper_trading_{acc_id}.db"
-            self.traders[acc_id] = PaperTrader(
-                db_path=db_path, 
-                initial_capital=initial_capital,
-                account_id=acc_id
+    def __init__(
+        self,
+        personalities: Dict[str, Dict[str, Any]],
+        initial_capital: float = 1000000.0,
+        db_path: str = str(TOURNAMENT_DB),
+    ):
+        self.personalities = personalities
+        self.account_ids = list(personalities)
+        self.initial_capital = float(initial_capital)
+        self.db_path = db_path
+
+        n = len(self.account_ids)
+        self.risk_per_trade = np.array([float(p["risk_per_trade"]) for p in personalities.values()])
+        self.cash = np.full(n, self.initial_capital)
+        self.realized_pnl = np.zeros(n)
+        self.prev_equity = np.full(n, self.initial_capital)
+        self.tickers: List[str] = []
+        self._ticker_index: Dict[str, int] = {}
+        self.quantity = np.zeros((n, 0), dtype=np.int64)
+        self.avg_price = np.zeros((n, 0))
+        self.last_price = np.zeros(0)
+
+        self._init_db()
+        self._load_state()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS tournament_accounts (
+                    account_id TEXT PRIMARY KEY,
+                    cash REAL NOT NULL,
+                    realized_pnl REAL NOT NULL,
+                    params TEXT,
+                    updated_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS tournament_positions (
+                    account_id TEXT NOT NULL,
+                    ticker TEXT NOT NULL,
+                    quantity INTEGER NOT NULL,
+                    avg_price REAL NOT NULL,
+                    last_price REAL,
+                    PRIMARY KEY (account_id, ticker)
+                );
+                CREATE TABLE IF NOT EXISTS tournament_equity (
+                    date TEXT NOT NULL,
+                    account_id TEXT NOT NULL,
+                    total_equity REAL NOT NULL,
+                    cash REAL NOT NULL,
+                    invested REAL NOT NULL,
+                    unrealized_pnl REAL NOT NULL,
+                    realized_pnl REAL NOT NULL,
+                    daily_pnl REAL NOT NULL,
+                    PRIMARY KEY (date, account_id)
+                );
+                CREATE TABLE IF NOT EXISTS tournament_opening (
+                    date TEXT NOT NULL,
+                    account_id TEXT NOT NULL,
+                    cash REAL NOT NULL,
+                    realized_pnl REAL NOT NULL,
+                    positions TEXT NOT NULL,
+                    PRIMARY KEY (date, account_id)
+                );
+                """
             )
 
-    def run_daily_simulation(self, signals: List[Dict[str, Any]]):
-        """Run simulation for each personality based on the same signals."""
-        logger.info(f"🏆 Shadow Tournament: Running simulation for {len(signals)} signals...")
-
-        for acc_id, trader in self.traders.items():
-            profile = PERSONALITIES[acc_id]
-            for sig in signals:
-                ticker = sig["ticker"]
-                action = sig["action"]
-                price = sig["price"]
-
-                if action == "BUY":
-                    # Adjust quantity based on personality risk
-                    balance = trader.get_current_balance()
-                    cash = balance["cash"]
-
-                    # Target investment amount based on personality
-                    target_investment = cash * profile["risk_per_trade"]
-                    quantity = int(target_investment / price)
-
-                    if quantity > 0:
-                        stop_price = price * (1.0 - profile["stop_loss"])
-                        trader.execute_trade(
-                            ticker=ticker,
-                            action="BUY",
-                            quantity=quantity,
-                            price=price,
-                            strategy="Tournament",
-                            reason=f"Tournament: {profile['name']} (Stop: {stop_price:,.0f})",
-                        )
-
-                elif action == "SELL":
-                    # Personalities follow main signals, selling full position if held
-                    pos_df = trader.get_positions()
-                    if not pos_df.empty and ticker in pos_df["ticker"].values:
-                        qty = pos_df[pos_df["ticker"] == ticker]["quantity"].values[0]
-                        trader.execute_trade(
-                            ticker=ticker,
-                            action="SELL",
-                            quantity=qty,
-                            price=price,
-                            strategy="Tournament",
-                            reason=f"Tournament: {profile['name']} (Signal Sell)",
-                        )
-
-            # Important: Ensure balance is recalculated and daily snapshot is saved
-            trader.recalculate_balance()
-            trader.update_daily_equity()
+    def _load_state(self):
+        row_of = {acc_id: i for i, acc_id in enumerate(self.account_ids)}
+        with self._connect() as conn:
+            for acc_id, cash, realized in conn.execute(
+                "SELECT account_id, cash, realized_pnl FROM tournament_accounts"
+            ):
+                if acc_id in row_of:
+                    self.cash[row_of[acc_id]] = cash
+                    self.realized_pnl[row_of[acc_id]] = realized
 
-    def get_leaderboard(self) -> pd.DataFrame:
-        """Get the current ranking of personalities."""
+            positions = [
+                r
+                for r in conn.execute(
+                    "SELECT account_id, ticker, quantity, avg_price, last_price FROM tournament_positions"
+                )
+                if r[0] in row_of
+            ]
+            self._ensure_tickers(r[1] for r in positions)
+            for acc_id, ticker, qty, avg_price, last_price in positions:
+                i, j = row_of[acc_id], self._ticker_index[ticker]
+                self.quantity[i, j] = qty
+                self.avg_price[i, j] = avg_price
+                if last_price:
+                    self.last_price[j] = last_price
+
+            latest = conn.execute(
+                "SELECT account_id, total_equity FROM tournament_equity "
+                "WHERE date = (SELECT MAX(date) FROM tournament_equity)"
+            ).fetchall()
+            for acc_id, equity in latest:
+                if acc_id in row_of:
+                    self.prev_equity[row_of[acc_id]] = equity
+
+    def _book_state(self) -> Dict[str, Any]:
+        return {
+            "cash": self.cash.copy(),
+            "realized_pnl": self.realized_pnl.copy(),
+            "quantity": self.quantity.copy(),
+            "avg_price": self.avg_price.copy(),
+        }
+
+    def _save_snapshot(self, date: str, metrics: Dict[str, np.ndarray], opening: Dict[str, Any]):
+        """
+        Persists the books, one equity row per personality and the books as they stood before the day's
+        signals (``opening``) for ``date`` in a single transaction.
+        """
+        now = datetime.datetime.now().isoformat()
+        rows_i, cols_j = np.nonzero(self.quantity)
+        with self._connect() as conn:
+            # Only the latest day can be re-run, so older opening books are dropped
+            conn.execute("DELETE FROM tournament_opening")
+            conn.executemany(
+                "INSERT INTO tournament_opening (date, account_id, cash, realized_pnl, positions) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        date,
+                        acc_id,
+                        float(opening["cash"][i]),
+                        float(opening["realized_pnl"][i]),
+                        json.dumps(
+                            {
+                                self.tickers[j]: [int(opening["quantity"][i, j]), float(opening["avg_price"][i, j])]
+                                for j in np.nonzero(opening["quantity"][i])[0]
+                            }
+                        ),
+                    )
+                    for i, acc_id in enumerate(self.account_ids)
+                ],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO tournament_accounts (account_id, cash, realized_pnl, params, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        acc_id,
+                        float(self.cash[i]),
+                        float(self.realized_pnl[i]),
+                        json.dumps(self.personalities[acc_id], ensure_ascii=False),
+                        now,
+                    )
+                    for i, acc_id in enumerate(self.account_ids)
+                ],
+            )
+            conn.execute(
+                "DELETE FROM tournament_positions WHERE account_id IN (%s)" % ",".join("?" * len(self.account_ids)),
+                self.account_ids,
+            )
+            conn.executemany(
+                "INSERT INTO tournament_positions (account_id, ticker, quantity, avg_price, last_price) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        self.account_ids[i],
+                        self.tickers[j],
+                        int(self.quantity[i, j]),
+                        float(self.avg_price[i, j]),
+                        float(self.last_price[j]),
+                    )
+                    for i, j in zip(rows_i, cols_j)
+                ],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO tournament_equity (date, account_id, total_equity, cash, invested, "
+                "unrealized_pnl, realized_pnl, daily_pnl) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        date,
+                        acc_id,
+                        float(metrics["total_equity"][i]),
+                        float(self.cash[i]),
+                        float(metrics["invested"][i]),
+                        float(metrics["unrealized_pnl"][i]),
+                        float(self.realized_pnl[i]),
+                        float(metrics["daily_pnl"][i]),
+                    )
+                    for i, acc_id in enumerate(self.account_ids)
+                ],
+            )
+
+    def _latest_snapshot_date(self) -> Optional[str]:
+        with self._connect() as conn:
+            return conn.execute("SELECT MAX(date) FROM tournament_equity").fetchone()[0]
+
+    def _restore_opening(self, date: str) -> bool:
+        """Resets the books to how they stood before ``date``'s signals; False if they were not kept."""
+        row_of = {acc_id: i for i, acc_id in enumerate(self.account_ids)}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT account_id, cash, realized_pnl, positions FROM tournament_opening WHERE date = ?", (date,)
+            ).fetchall()
+        rows = [r for r in rows if r[0] in row_of]
+        if not rows:
+            return False
+
+        positions = {acc_id: json.loads(held) for acc_id, _, _, held in rows}
+        self._ensure_tickers(t for held in positions.values() for t in held)
+        self.quantity[:] = 0
+        self.avg_price[:] = 0.0
+        for acc_id, cash, realized, _ in rows:
+            i = row_of[acc_id]
+            self.cash[i] = cash
+            self.realized_pnl[i] = realized
+            for ticker, (qty, avg_price) in positions[acc_id].items():
+                self.quantity[i, self._ticker_index[ticker]] = qty
+                self.avg_price[i, self._ticker_index[ticker]] = avg_price
+        return True
+
+    def _previous_equity(self, date: str) -> np.ndarray:
+        """Equity at the last snapshot before ``date`` (initial capital if there is none)."""
+        prev = np.full(len(self.account_ids), self.initial_capital)
+        row_of = {acc_id: i for i, acc_id in enumerate(self.account_ids)}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT account_id, total_equity FROM tournament_equity "
+                "WHERE date = (SELECT MAX(date) FROM tournament_equity WHERE date < ?)",
+                (date,),
+            ).fetchall()
+        for acc_id, equity in rows:
+            if acc_id in row_of:
+                prev[row_of[acc_id]] = equity
+        return prev
+
+    # ------------------------------------------------------------------
+    # Simulation
+    # ------------------------------------------------------------------
+    def _ensure_tickers(self, tickers: Iterable[str]):
+        new = [t for t in dict.fromkeys(tickers) if t not in self._ticker_index]
+        if not new:
+            return
+        for t in new:
+            self._ticker_index[t] = len(self.tickers)
+            self.tickers.append(t)
+        n = len(self.account_ids)
+        self.quantity = np.hstack([self.quantity, np.zeros((n, len(new)), dtype=np.int64)])
+        self.avg_price = np.hstack([self.avg_price, np.zeros((n, len(new)))])
+        self.last_price = np.concatenate([self.last_price, np.zeros(len(new))])
+
+    def _metrics(self) -> Dict[str, np.ndarray]:
+        mark = np.where(self.last_price > 0, self.last_price, 0.0)
+        # Without a known price a position is valued at cost
+        market_value = np.where(mark > 0, self.quantity * mark, self.quantity * self.avg_price)
+        invested = (self.quantity * self.avg_price).sum(axis=1)
+        unrealized = market_value.sum(axis=1) - invested
+        total_equity = self.cash + invested + unrealized
+        return {
+            "total_equity": total_equity,
+            "invested": invested,
+            "unrealized_pnl": unrealized,
+            "daily_pnl": total_equity - self.prev_equity,
+        }
+
+    def run_day(
+        self,
+        signals: List[Dict[str, Any]],
+        date: Optional[str] = None,
+        prices: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Applies one day's signals to every personality and saves the day's snapshot.
+
+        Signals are processed in order (each BUY is sized from the cash left after the previous ones);
+        each step is a vector operation over all personalities.
+
+        Args:
+            signals: [{"ticker", "action", "price"}, ...]
+            date: Snapshot date (YYYY-MM-DD); today by default. Re-running the latest day starts again from
+                the books as they stood before it and overwrites its snapshot.
+            prices: Optional closing prices to mark open positions to market.
+
+        Raises:
+            ValueError: ``date`` is before the latest snapshot, or is the latest day but its opening books
+                were not kept (the signals would be applied twice).
+        """
+        date = date or datetime.date.today().isoformat()
+        latest = self._latest_snapshot_date()
+        if latest and date < latest:
+            raise ValueError(f"Tournament books are already at {latest}; cannot replay {date}")
+        if date == latest and not self._restore_opening(date):
+            raise ValueError(f"Opening books for {date} are not available; cannot re-run it")
+        opening = self._book_state()
+        valid = [s for s in signals if s.get("ticker") and s.get("price") and float(s["price"]) > 0]
+        self._ensure_tickers(s["ticker"] for s in valid)
+        self.prev_equity = self._previous_equity(date)
+
+        for sig in valid:
+            j = self._ticker_index[sig["ticker"]]
+            price = float(sig["price"])
+            self.last_price[j] = price
+            held = self.quantity[:, j].copy()
+
+            if sig.get("action") == "BUY":
+                qty = np.floor(self.cash * self.risk_per_trade / price).astype(np.int64)
+                bought = qty > 0
+                new_qty = held + qty
+                total_cost = held * self.avg_price[:, j] + qty * price
+                self.avg_price[bought, j] = total_cost[bought] / new_qty[bought]
+                self.quantity[:, j] = new_qty
+                self.cash -= qty * price
+
+            elif sig.get("action") == "SELL":
+                # Personalities follow main signals, selling full position if held
+                self.cash += held * price
+                self.realized_pnl += (price - self.avg_price[:, j]) * held
+                self.quantity[:, j] = 0
+                self.avg_price[:, j] = 0.0
+
+        for ticker, price in (prices or {}).items():
+            if ticker in self._ticker_index and price and price > 0:
+                self.last_price[self._ticker_index[ticker]] = float(price)
+
+        metrics = self._metrics()
+        self._save_snapshot(date, metrics, opening)
+        return metrics
+
+    def positions(self, account_id: str) -> pd.DataFrame:
+        i = self.account_ids.index(account_id)
+        held = np.nonzero(self.quantity[i])[0]
+        return pd.DataFrame(
+            {
+                "ticker": [self.tickers[j] for j in held],
+                "quantity": self.quantity[i, held],
+                "avg_price": self.avg_price[i, held],
+                "current_price": self.last_price[held],
+            }
+        )
+
+    def leaderboard(self) -> pd.DataFrame:
+        metrics = self._metrics()
         data = []
-        for acc_id, trader in self.traders.items():
-            balance = trader.get_current_balance()
-            profile = PERSONALITIES[acc_id]
-            
-            # Calculate Total Return using utility
-            from src.pnl_utils import calculate_total_return
-            total_return_pct, _ = calculate_total_return(trader.initial_capital, balance["total_equity"])
-            
+        for i, acc_id in enumerate(self.account_ids):
+            profile = self.personalities[acc_id]
+            total_return_pct, _ = calculate_total_return(self.initial_capital, metrics["total_equity"][i])
             data.append(
                 {
                     "Account ID": acc_id,
-                    "Name": profile["name"],
-                    "Total Equity": balance["total_equity"],
-                    "Return %": total_return_pct,
-                    "Daily PnL": balance["daily_pnl"],
-                    "Unrealized PnL": balance["unrealized_pnl"],
-                    "Description": profile["description"],
+                    "Name": profile.get("name", acc_id),
+                    "Total Equity": float(metrics["total_equity"][i]),
+                    "Return %": float(total_return_pct),
+                    "Daily PnL": float(metrics["daily_pnl"][i]),
+                    "Unrealized PnL": float(metrics["unrealized_pnl"][i]),
+                    "Description": profile.get("description", ""),
                 }
             )
-
         df = pd.DataFrame(data)
         if not df.empty:
             df = df.sort_values("Return %", ascending=False)
         return df
 
+    def equity_history(self, account_id: str, days: Optional[int] = None) -> pd.DataFrame:
+        query = "SELECT date, total_equity FROM tournament_equity WHERE account_id = ? ORDER BY date DESC"
+        params: List[Any] = [account_id]
+        if days:
+            query += " LIMIT ?"
+            params.append(int(days))
+        with self._connect() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        return df.iloc[::-1].reset_index(drop=True)
+
+
+class TournamentManager:
+    """
+    Multiversal Shadow Tournament Manager.
+    Runs multiple paper trading accounts with different personalities.
+
+    The accounts live in a single VectorizedTournament (one in-memory book per personality,
+    persisted once per day), so any number of personality variants can compete.
+    """
+
+    def __init__(
+        self,
+        initial_capital: float = 1000000.0,
+        personalities: Optional[Dict[str, Dict[str, Any]]] = None,
+        db_path: str = str(TOURNAMENT_DB),
+    ):
+        self.personalities = personalities or PERSONALITIES
+        self.book = VectorizedTournament(self.personalities, initial_capital=initial_capital, db_path=db_path)
+
+    def run_daily_simulation(
+        self,
+        signals: List[Dict[str, Any]],
+        date: Optional[str] = None,
+        prices: Optional[Dict[str, float]] = None,
+    ):
+        """Run simulation for each personality based on the same signals."""
+        logger.info(
+            f"🏆 Shadow Tournament: Running simulation for {len(signals)} signals "
+            f"across {len(self.personalities)} personalities..."
+        )
+        self.book.run_day(signals, date=date, prices=prices)
+
+    def get_leaderboard(self) -> pd.DataFrame:
+        """Get the current ranking of personalities."""
+        return self.book.leaderboard()
+
+    def get_equity_history(self, account_id: str, days: Optional[int] = None) -> pd.DataFrame:
+        """Daily equity snapshots of one personality ([date, total_equity])."""
+        return self.book.equity_history(account_id, days=days)
+
     def get_winner_advise(self) -> str:
         """Get investment advice based on the top performing personality."""
         df = self.get_leaderboard()
@@ -148,4 +501,4 @@ class TournamentManager:
             return PERSONALITIES["shadow_trend_follower"]  # Default
 
         winner_id = df.iloc[0]["Account ID"]
-        return PERSONALITIES[winner_id]
+        return self.personalities[winner_id]
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from src.trading.tournament_manager import TournamentManager, PERSONALITIES
+from src.trading.tournament_manager import TournamentManager
 from src.utils.currency import CurrencyConverter
 
 
@@ -27,9 +27,10 @@ def render_tournament_ui():
 
         # Leaderboard Cards
         st.subheader("現在のリーダーボード")
-        cols = st.columns(len(leaderboard))
+        top = leaderboard.head(4)
+        cols = st.columns(len(top))
 
-        for i, (_, row) in enumerate(leaderboard.iterrows()):
+        for i, (_, row) in enumerate(top.iterrows()):
             with cols[i]:
                 # Medal emoji for top rankings
                 rank_emoji = "🥇" if i == 0 else "🥈" if i == 1 else "🥉" if i == 2 else "👤"
@@ -53,12 +54,11 @@ def render_tournament_ui():
         # Performance Chart
         st.subheader("資産推移 (Equity Curves)")
         equity_data = {}
-        for acc_id in PERSONALITIES.keys():
-            trader = tm.traders[acc_id]
-            history = trader.get_equity_history(days=30)
+        for acc_id in top["Account ID"]:
+            history = tm.get_equity_history(acc_id, days=30)
             if not history.empty:
                 history = history.set_index("date")["total_equity"]
-                equity_data[PERSONALITIES[acc_id]["name"]] = history
+                equity_data[tm.personalities[acc_id]["name"]] = history
 
         if equity_data:
             chart_df = pd.DataFrame(equity_data).ffill()
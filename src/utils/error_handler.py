@@ -12,7 +12,11 @@ import sqlite3
 import datetime
 from functools import wraps
 from typing import Any, Callable, Optional
-import streamlit as st
+
+from .lazy_imports import LazyModule
+
+# UI 通知時にだけ読み込む（API・スケジューラーの起動を重くしない）
+st = LazyModule("streamlit")
 
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,215 @@
+"""
+起動時インポートプロファイラー
+
+エントリーポイントを新しいプロセスで ``python -X importtime`` 付きで import し、
+モジュールごとのインポート時間ツリーとコールドスタート時間を記録する。
+予算（秒）を超えた場合は非ゼロで終了するため、ベンチマークとして CI でも使える。
+
+Usage:
+    python -m src.utils.import_profiler                 # 全エントリーポイント
+    python -m src.utils.import_profiler api scheduler --budget 1.0 --output reports/startup_profile.json
+"""
+
+import argparse
+import json
+import logging
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# エントリーポイント名 -> import するモジュール
+# app.py は import するとダッシュボードのスクリプト全体が実行されるため対象外
+ENTRY_POINTS: Dict[str, str] = {
+    "api": "src.api.server",
+    "api_legacy": "src.api_server",
+    "scheduler": "scheduler",
+    "main": "main",
+}
+
+DEFAULT_BUDGET_SECONDS = 1.0
+
+# クリティカルパスに現れてはいけない重量級ライブラリ
+HEAVY_MODULES = ("tensorflow", "torch", "prophet", "transformers", "streamlit", "yfinance", "lightgbm")
+
+_TIMER_SNIPPET = (
+    "import sys, time; t = time.perf_counter(); import {module}; "
+    "sys.stdout.write('__COLD_START__=%f' % (time.perf_counter() - t))"
+)
+
+
+@dataclass
+class ImportNode:
+    """インポートツリーのノード（時間はマイクロ秒）"""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: List["ImportNode"] = field(default_factory=list)
+
+    def walk(self, depth: int = 0) -> Iterator[tuple]:
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "self_ms": round(self.self_us / 1000, 2),
+            "cumulative_ms": round(self.cumulative_us / 1000, 2),
+            "children": [c.to_dict() for c in self.children],
+        }
+
+
+@dataclass
+class ImportProfile:
+    """1エントリーポイント分のプロファイル結果"""
+
+    module: str
+    cold_start_seconds: Optional[float]
+    roots: List[ImportNode]
+    error: Optional[str] = None
+
+    def nodes(self) -> Iterator[ImportNode]:
+        for root in self.roots:
+            for _, node in root.walk():
+                yield node
+
+    def top(self, n: int = 15) -> List[ImportNode]:
+        """自己時間の大きいモジュール上位 n 件"""
+        return sorted(self.nodes(), key=lambda node: node.self_us, reverse=True)[:n]
+
+    def heavy_imports(self) -> List[str]:
+        """読み込まれた重量級ライブラリ（トップレベルパッケージ名）"""
+        loaded = {node.name.split(".")[0] for node in self.nodes()}
+        return [name for name in HEAVY_MODULES if name in loaded]
+
+    def format_tree(self, min_ms: float = 5.0) -> str:
+        """累積時間が min_ms 以上のノードだけをツリー表示"""
+        lines = []
+        for root in self.roots:
+            for depth, node in root.walk():
+                if node.cumulative_us / 1000 >= min_ms:
+                    lines.append(f"{'  ' * depth}{node.name}  {node.cumulative_us / 1000:.1f}ms")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict:
+        return {
+            "module": self.module,
+            "cold_start_seconds": self.cold_start_seconds,
+            "heavy_imports": self.heavy_imports(),
+            "error": self.error,
+            "tree": [root.to_dict() for root in self.roots],
+        }
+
+
+def parse_importtime(stderr: str) -> List[ImportNode]:
+    """
+    ``-X importtime`` の出力をツリーに変換
+
+    出力は子→親の順（後順）で、インデントが深さを表す。
+    """
+    pending: Dict[int, List[ImportNode]] = {}
+    roots: List[ImportNode] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # ヘッダー行
+        raw_name = parts[2].rstrip()
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        node = ImportNode(raw_name.strip(), int(parts[0]), int(parts[1]))
+        node.children = pending.pop(depth + 1, [])
+        if depth == 0:
+            roots.append(node)
+        else:
+            pending.setdefault(depth, []).append(node)
+    return roots
+
+
+def profile_imports(module: str, python: str = sys.executable, timeout: float = 120.0) -> ImportProfile:
+    """新しいプロセスで module を import し、インポート時間を計測"""
+    try:
+        result = subprocess.run(
+            [python, "-X", "importtime", "-c", _TIMER_SNIPPET.format(module=module)],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return ImportProfile(module, None, [], error=f"timed out after {timeout}s")
+
+    roots = parse_importtime(result.stderr)
+    cold_start = None
+    for token in result.stdout.split():
+        if token.startswith("__COLD_START__="):
+            cold_start = float(token.split("=", 1)[1])
+
+    error = None
+    if result.returncode != 0:
+        error_lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        error = error_lines[-1] if error_lines else f"exit code {result.returncode}"
+    return ImportProfile(module, cold_start, roots, error=error)
+
+
+def check_budget(profile: ImportProfile, budget_seconds: float = DEFAULT_BUDGET_SECONDS) -> List[str]:
+    """予算違反の内容を返す（空なら合格）"""
+    if profile.error:
+        return [f"{profile.module}: import failed ({profile.error})"]
+    problems = []
+    if profile.cold_start_seconds is not None and profile.cold_start_seconds > budget_seconds:
+        problems.append(
+            f"{profile.module}: cold start {profile.cold_start_seconds:.2f}s > budget {budget_seconds:.2f}s"
+        )
+    heavy = profile.heavy_imports()
+    if heavy:
+        problems.append(f"{profile.module}: heavy modules on the startup path: {', '.join(heavy)}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile cold-start imports of AGStock entry points")
+    parser.add_argument(
+        "entry_points", nargs="*", help=f"Entry point names or module paths ({', '.join(ENTRY_POINTS)})"
+    )
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="Cold start budget in seconds")
+    parser.add_argument("--min-ms", type=float, default=10.0, help="Hide tree nodes faster than this")
+    parser.add_argument("--output", help="Write the full import trees as JSON")
+    args = parser.parse_args(argv)
+
+    names = args.entry_points or list(ENTRY_POINTS)
+    report = {}
+    failures: List[str] = []
+    for name in names:
+        module = ENTRY_POINTS.get(name, name)
+        profile = profile_imports(module)
+        report[name] = profile.to_dict()
+        problems = check_budget(profile, args.budget)
+        failures.extend(problems)
+
+        status = "FAIL" if problems else "OK"
+        cold = f"{profile.cold_start_seconds:.3f}s" if profile.cold_start_seconds is not None else "n/a"
+        print(f"[{status}] {name} ({module}): cold start {cold}")
+        print(profile.format_tree(args.min_ms))
+        for node in profile.top(5):
+            print(f"    self {node.self_us / 1000:8.1f}ms  {node.name}")
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    for problem in failures:
+        print(f"Budget violation: {problem}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,11 @@
 起動時間とメモリ使用量を大幅に削減。
 """
 
+import functools
 import importlib
 import logging
 from functools import lru_cache
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +61,42 @@ class LazyImporter:
             return False
 
 
+def lazy_cache_data(**cache_kwargs) -> Callable:
+    """
+    st.cache_data と同等のデコレーター
+
+    streamlit の読み込みを初回呼び出しまで遅らせるため、
+    API やスケジューラーから import しても streamlit を読み込まない。
+    """
+
+    def decorator(func: Callable) -> Callable:
+        cached: Optional[Callable] = None
+
+        def _resolve() -> Callable:
+            nonlocal cached
+            if cached is None:
+                try:
+                    import streamlit as st
+
+                    cached = st.cache_data(**cache_kwargs)(func)
+                except ImportError:
+                    cached = func
+            return cached
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return _resolve()(*args, **kwargs)
+
+        def clear():
+            if cached is not None and hasattr(cached, "clear"):
+                cached.clear()
+
+        wrapper.clear = clear
+        return wrapper
+
+    return decorator
+
+
 # よく使う重量級ライブラリの遅延インポート関数
 @lru_cache(maxsize=1)
 def get_tensorflow():
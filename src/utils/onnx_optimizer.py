@@ -1,6 +1,8 @@
 import logging
 import os
 from pathlib import Path
+from typing import Optional
+
 from src.paths import MODELS_DIR
 
 logger = logging.getLogger(__name__)
@@ -1,14 +1,23 @@
 """
 API Rate Limiter
 Manages API call limits to prevent rate limiting from Yahoo Finance and other services.
+
+Limits are enforced with GCRA (the generic cell rate algorithm, equivalent to a
+token bucket): each key keeps a single "theoretical arrival time" float, so the
+per-request cost is O(1) regardless of traffic. Key state lives in a pluggable
+store - an LRU-bounded in-process dict, or a SQLite file shared by several
+API worker processes.
 """
 
 import logging
+import math
+import sqlite3
+import threading
 import time
-from collections import deque
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Dict, Optional, Callable, Any
-import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +29,204 @@ class RateLimitConfig:
     max_calls: int  # Maximum calls allowed
     time_window: int  # Time window in seconds
     name: str = "default"
+    burst: Optional[int] = None  # Calls allowed back-to-back (defaults to max_calls)
+
+    @property
+    def emission_interval(self) -> float:
+        """Seconds between calls at the sustained rate."""
+        return self.time_window / self.max_calls
+
+    @property
+    def capacity(self) -> int:
+        """Bucket size, i.e. the largest burst that is admitted at once."""
+        return self.burst if self.burst else self.max_calls
+
+
+@dataclass
+class RateLimitDecision:
+    """Result of a single rate limit check."""
+
+    allowed: bool
+    remaining: int
+    retry_after: float  # Seconds until the next call would be admitted
+    reset_after: float  # Seconds until the bucket is full again
+
+
+class MemoryRateLimitStore:
+    """In-process key store with LRU eviction.
+
+    An evicted key simply starts again with a full bucket, so the bound trades
+    a little leniency for constant memory under many distinct clients.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, key: str, func: Callable[[Optional[float]], Tuple[Optional[float], Any]]) -> Any:
+        """Atomically read the TAT for ``key``, apply ``func`` and store the new TAT."""
+        with self._lock:
+            new_tat, result = func(self._tats.get(key))
+            if new_tat is not None:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+                while len(self._tats) > self.max_keys:
+                    self._tats.popitem(last=False)
+            return result
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            return self._tats.get(key)
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Drop keys whose bucket has fully refilled (they carry no state)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [k for k, tat in self._tats.items() if tat <= now]
+            for k in expired:
+                del self._tats[k]
+            return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class SQLiteRateLimitStore:
+    """Key store backed by a local SQLite file.
+
+    Several API worker processes pointing at the same file share one set of
+    buckets. Each update runs in a ``BEGIN IMMEDIATE`` transaction so the
+    read-modify-write of a key is atomic across processes.
+    """
+
+    def __init__(self, db_path: str = "data/rate_limits.db", max_keys: int = 100000, purge_every: int = 1000):
+        self.db_path = db_path
+        self.max_keys = max_keys
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_tat ON rate_limits(tat)")
+
+    def update(self, key: str, func: Callable[[Optional[float]], Tuple[Optional[float], Any]]) -> Any:
+        """Atomically read the TAT for ``key``, apply ``func`` and store the new TAT."""
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                row = cur.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+                new_tat, result = func(row[0] if row else None)
+                if new_tat is not None:
+                    cur.execute(
+                        "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET tat = excluded.tat",
+                        (key, new_tat),
+                    )
+                    self._writes += 1
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+            if self._writes >= self.purge_every:
+                self._writes = 0
+                self.purge()
+            return result
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Drop refilled buckets, then the stalest keys beyond ``max_keys``."""
+        now = time.time() if now is None else now
+        with self._conn:
+            removed = self._conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,)).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM rate_limits WHERE key IN "
+                "(SELECT key FROM rate_limits ORDER BY tat DESC LIMIT -1 OFFSET ?)",
+                (self.max_keys,),
+            ).rowcount
+        return removed
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class GCRALimiter:
+    """Keyed GCRA/token-bucket limiter with O(1) state per key."""
+
+    def __init__(self, store: Optional[Any] = None, clock: Callable[[], float] = time.time):
+        self.store = store if store is not None else MemoryRateLimitStore()
+        self._clock = clock
+
+    def check(self, key: str, config: RateLimitConfig, cost: int = 1) -> RateLimitDecision:
+        """Consume ``cost`` calls for ``key`` if the bucket allows it."""
+        interval = config.emission_interval
+        tolerance = interval * config.capacity  # Bucket depth expressed in seconds
+        now = self._clock()
+
+        def _apply(tat: Optional[float]):
+            tat = now if tat is None else max(tat, now)
+            new_tat = tat + interval * cost
+            allow_at = new_tat - tolerance
+            if now < allow_at:
+                remaining = int(max(0.0, tolerance - (tat - now)) // interval)
+                return None, RateLimitDecision(False, remaining, allow_at - now, tat - now)
+            remaining = int((tolerance - (new_tat - now)) // interval)
+            return new_tat, RateLimitDecision(True, remaining, 0.0, new_tat - now)
+
+        return self.store.update(key, _apply)
+
+    def peek(self, key: str, config: RateLimitConfig) -> RateLimitDecision:
+        """Report the bucket state for ``key`` without consuming a call."""
+        interval = config.emission_interval
+        tolerance = interval * config.capacity
+        now = self._clock()
+        tat = self.store.get(key)
+        tat = now if tat is None else max(tat, now)
+        remaining = int(max(0.0, tolerance - (tat - now)) // interval)
+        retry_after = 0.0 if remaining > 0 else tat + interval - tolerance - now
+        return RateLimitDecision(remaining > 0, remaining, max(0.0, retry_after), tat - now)
+
+
+class RouteRateLimiter:
+    """Per-client limiter with optional per-route overrides.
+
+    Routes are matched by longest path prefix; each (route, client) pair gets
+    its own bucket so a burst on one endpoint does not starve the others.
+    """
+
+    def __init__(
+        self,
+        default: RateLimitConfig,
+        routes: Optional[Dict[str, RateLimitConfig]] = None,
+        limiter: Optional[GCRALimiter] = None,
+    ):
+        self.default = default
+        self.routes = dict(routes or {})
+        self._prefixes = sorted(self.routes, key=len, reverse=True)
+        self._limiter = limiter or GCRALimiter()
+
+    def resolve(self, path: str) -> Tuple[str, RateLimitConfig]:
+        """Return the route key and limit that apply to ``path``."""
+        for prefix in self._prefixes:
+            if path.startswith(prefix):
+                return prefix, self.routes[prefix]
+        return "*", self.default
+
+    def check(self, client_id: str, path: str) -> RateLimitDecision:
+        route, config = self.resolve(path)
+        return self._limiter.check(f"{route}|{client_id}", config)
 
 
 class RateLimiter:
@@ -31,25 +238,17 @@ class RateLimiter:
     YAHOO_FINANCE_LIMIT = RateLimitConfig(max_calls=2000, time_window=3600, name="Yahoo Finance")
     GEMINI_API_LIMIT = RateLimitConfig(max_calls=60, time_window=60, name="Gemini API")
 
-    def __init__(self, config: RateLimitConfig):
+    def __init__(self, config: RateLimitConfig, limiter: Optional[GCRALimiter] = None):
         self.config = config
-        self._call_times: deque = deque()
+        self._limiter = limiter or GCRALimiter()
+        self._key = config.name
         self._lock = threading.Lock()
         self._total_calls = 0
         self._blocked_calls = 0
 
-    def _clean_old_calls(self):
-        """Remove call timestamps outside the time window."""
-        cutoff = time.time() - self.config.time_window
-
-        while self._call_times and self._call_times[0] < cutoff:
-            self._call_times.popleft()
-
     def can_proceed(self) -> bool:
         """Check if a call can proceed without blocking."""
-        with self._lock:
-            self._clean_old_calls()
-            return len(self._call_times) < self.config.max_calls
+        return self._limiter.peek(self._key, self.config).allowed
 
     def wait_if_needed(self, timeout: Optional[float] = None) -> bool:
         """
@@ -59,30 +258,21 @@ class RateLimiter:
         start_time = time.time()
 
         while True:
-            with self._lock:
-                self._clean_old_calls()
-
-                if len(self._call_times) < self.config.max_calls:
-                    # Record this call
-                    self._call_times.append(time.time())
+            decision = self._limiter.check(self._key, self.config)
+            if decision.allowed:
+                with self._lock:
                     self._total_calls += 1
-                    return True
-
-                # Calculate wait time
-                if self._call_times:
-                    oldest_call = self._call_times[0]
-                    wait_time = (oldest_call + self.config.time_window) - time.time()
-                else:
-                    wait_time = 1.0
+                return True
 
             # Check timeout
             if timeout and (time.time() - start_time) >= timeout:
-                self._blocked_calls += 1
+                with self._lock:
+                    self._blocked_calls += 1
                 logger.warning(f"{self.config.name}: Rate limit timeout reached")
                 return False
 
             # Wait a bit before retrying
-            sleep_time = min(wait_time, 1.0)
+            sleep_time = min(decision.retry_after, 1.0)
             if sleep_time > 0:
                 logger.debug(f"{self.config.name}: Rate limited, waiting {sleep_time:.1f}s")
                 time.sleep(sleep_time)
@@ -104,26 +294,18 @@ class RateLimiter:
 
     def get_stats(self) -> Dict[str, Any]:
         """Get rate limiter statistics."""
-        with self._lock:
-            self._clean_old_calls()
-
-            current_calls = len(self._call_times)
-            remaining = self.config.max_calls - current_calls
-
-            # Calculate reset time
-            if self._call_times:
-                oldest = self._call_times[0]
-                reset_in = (oldest + self.config.time_window) - time.time()
-            else:
-                reset_in = 0
+        state = self._limiter.peek(self._key, self.config)
+        capacity = self.config.capacity
+        current_calls = capacity - state.remaining
 
+        with self._lock:
             return {
                 "service": self.config.name,
                 "current_calls": current_calls,
                 "max_calls": self.config.max_calls,
-                "remaining": remaining,
-                "utilization_pct": f"{(current_calls / self.config.max_calls * 100):.1f}%",
-                "reset_in_seconds": max(0, int(reset_in)),
+                "remaining": state.remaining,
+                "utilization_pct": f"{(current_calls / capacity * 100):.1f}%",
+                "reset_in_seconds": max(0, math.ceil(state.reset_after)),
                 "total_calls": self._total_calls,
                 "blocked_calls": self._blocked_calls,
             }
@@ -132,8 +314,9 @@ class RateLimiter:
 class RateLimiterManager:
     """Manages multiple rate limiters for different services."""
 
-    def __init__(self):
+    def __init__(self, store: Optional[Any] = None):
         self._limiters: Dict[str, RateLimiter] = {}
+        self._gcra = GCRALimiter(store)
         self._lock = threading.Lock()
 
     def get_limiter(self, service: str) -> RateLimiter:
@@ -149,7 +332,7 @@ class RateLimiterManager:
                     # Default: 100 calls per minute
                     config = RateLimitConfig(max_calls=100, time_window=60, name=service)
 
-                self._limiters[service] = RateLimiter(config)
+                self._limiters[service] = RateLimiter(config, limiter=self._gcra)
 
             return self._limiters[service]
 
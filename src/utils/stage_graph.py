@@ -0,0 +1,283 @@
+"""
+ステージグラフ（依存関係付きの処理パイプライン）
+
+- 各ステージは依存ステージ（または入力）の出力を引数に受け取る関数
+- 依存関係のないステージはスレッドプールで並行実行する
+- ステージの出力は「ステージ名・バージョン・入力のフィンガープリント」で
+  メモ化する（コンテンツアドレス）。入力が変わらなければ再実行しない
+- フィンガープリントは入力値だけから計算するので、キャッシュにヒットした
+  ステージの上流は実行されない
+- ttl 付きステージのフィンガープリントには有効期間の開始時刻も含める。
+  期限が切れると下流ステージのフィンガープリントも変わり、古い外部データを
+  使ったメモは再利用されない
+- ステージごとの実行時間・キャッシュヒット数を記録する
+
+Example:
+    graph = StageGraph(max_workers=4)
+    graph.add("features", make_features, deps=("df",), cache=False)
+    graph.add("lgbm", predict_lgbm, deps=("features", "days_ahead"))
+    graph.add("prophet", predict_prophet, deps=("df", "days_ahead"))
+    run = graph.run({"df": df, "days_ahead": 5}, targets=["lgbm", "prophet"])
+    run.values["lgbm"], run.timings, run.cached
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(value: Any) -> str:
+    """値の内容から決まるハッシュ（DataFrame / ndarray は中身を、その他は repr を使う）"""
+    h = hashlib.sha1()
+    _update_hash(h, value)
+    return h.hexdigest()
+
+
+def _update_hash(h, value: Any) -> None:
+    if isinstance(value, pd.DataFrame):
+        h.update(b"df")
+        h.update(repr(list(value.columns)).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        h.update(b"series")
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(f"nd{value.dtype}{value.shape}".encode("utf-8"))
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b"dict")
+        for key in sorted(value, key=repr):
+            h.update(repr(key).encode("utf-8"))
+            _update_hash(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(type(value).__name__.encode("utf-8"))
+        for item in value:
+            _update_hash(h, item)
+    else:
+        h.update(repr(value).encode("utf-8"))
+
+
+@dataclass
+class Stage:
+    """グラフのステージ定義"""
+
+    name: str
+    func: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+    version: str = "1"  # 関数の出力が変わったら上げる
+    cache: bool = True  # False なら出力をメモ化しない（大きな中間データなど）
+    ttl: Optional[float] = None  # 外部データに依存するステージのキャッシュ有効秒数
+
+
+@dataclass
+class StageRun:
+    """1回の run の結果"""
+
+    values: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)  # 実行したステージの所要秒数
+    cached: Set[str] = field(default_factory=set)  # キャッシュから返したステージ
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.values.get(name, default)
+
+
+class StageGraph:
+    """メモ化付きの並行ステージグラフ"""
+
+    def __init__(self, max_workers: int = 4, max_entries: int = 512):
+        self.stages: Dict[str, Stage] = {}
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self._memo: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._epochs: Dict[str, float] = {}  # ttl 付きステージの入力フィンガープリント -> 有効期間の開始時刻
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def add(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        deps: Iterable[str] = (),
+        version: str = "1",
+        cache: bool = True,
+        ttl: Optional[float] = None,
+    ) -> "StageGraph":
+        self.stages[name] = Stage(name, func, tuple(deps), version, cache, ttl)
+        return self
+
+    # ------------------------------------------------------------------
+    # メモ
+    # ------------------------------------------------------------------
+    def _memo_get(self, stage: Stage, key: str) -> Tuple[bool, Any]:
+        if not stage.cache:
+            return False, None
+        with self._lock:
+            entry = self._memo.get(key)
+            if entry is None:
+                return False, None
+            created, value = entry
+            if stage.ttl is not None and time.monotonic() - created > stage.ttl:
+                del self._memo[key]
+                return False, None
+            self._memo.move_to_end(key)
+            return True, value
+
+    def _memo_put(self, stage: Stage, key: str, value: Any) -> None:
+        if not stage.cache:
+            return
+        with self._lock:
+            self._memo[key] = (time.monotonic(), value)
+            self._memo.move_to_end(key)
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+
+    def _ttl_epoch(self, key: str, ttl: float) -> float:
+        """ttl 付きステージの現在の有効期間の開始時刻（期限切れなら今から始める）"""
+        now = time.monotonic()
+        with self._lock:
+            epoch = self._epochs.get(key)
+            if epoch is None or now - epoch > ttl:
+                epoch = self._epochs[key] = now
+                if len(self._epochs) > self.max_entries:
+                    # 期限の判定は run ごとに行うので、古いものから捨てて構わない
+                    for stale in sorted(self._epochs, key=self._epochs.get)[: len(self._epochs) - self.max_entries]:
+                        del self._epochs[stale]
+            return epoch
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memo.clear()
+            self._epochs.clear()
+
+    # ------------------------------------------------------------------
+    # 実行
+    # ------------------------------------------------------------------
+    def _fingerprints(self, inputs: Dict[str, Any], targets: Iterable[str]) -> Dict[str, str]:
+        prints = {name: fingerprint(value) for name, value in inputs.items()}
+
+        def visit(name: str, path: Tuple[str, ...]) -> str:
+            if name in prints:
+                return prints[name]
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage or input: {name}")
+            if name in path:
+                raise ValueError(f"Cycle in stage graph: {' -> '.join(path + (name,))}")
+            stage = self.stages[name]
+            parts = [visit(dep, path + (name,)) for dep in stage.deps]
+            prints[name] = fingerprint((stage.name, stage.version, parts))
+            if stage.ttl is not None:
+                # 期限が切れたら下流も含めて別のキーになる
+                prints[name] = fingerprint((prints[name], self._ttl_epoch(prints[name], stage.ttl)))
+            return prints[name]
+
+        for target in targets:
+            visit(target, ())
+        return prints
+
+    def _record(self, name: str, seconds: Optional[float]) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(name, {"runs": 0, "hits": 0, "total_seconds": 0.0, "last_seconds": 0.0})
+            if seconds is None:
+                stats["hits"] += 1
+            else:
+                stats["runs"] += 1
+                stats["total_seconds"] += seconds
+                stats["last_seconds"] = seconds
+
+    def run(self, inputs: Dict[str, Any], targets: Optional[Iterable[str]] = None) -> StageRun:
+        """
+        targets（省略時は全ステージ）とその上流を実行する
+
+        失敗したステージは errors に記録し、その下流ステージは実行しない。
+        """
+        targets = list(self.stages) if targets is None else list(targets)
+        prints = self._fingerprints(inputs, targets)
+        result = StageRun(values=dict(inputs))
+
+        # キャッシュにないステージと、その実行に必要な上流だけを集める
+        pending: Dict[str, Stage] = {}
+
+        def resolve(name: str) -> None:
+            if name in result.values or name in pending:
+                return
+            stage = self.stages[name]
+            hit, value = self._memo_get(stage, prints[name])
+            if hit:
+                result.values[name] = value
+                result.cached.add(name)
+                self._record(name, None)
+                return
+            pending[name] = stage
+            for dep in stage.deps:
+                resolve(dep)
+
+        for target in targets:
+            resolve(target)
+        if not pending:
+            return result
+
+        executor = self._get_executor()
+        running: Dict[Future, str] = {}
+
+        def call(stage: Stage, args: List[Any]) -> Tuple[Any, float]:
+            start = time.perf_counter()
+            value = stage.func(*args)
+            return value, time.perf_counter() - start
+
+        while pending or running:
+            for name, stage in list(pending.items()):
+                failed = [dep for dep in stage.deps if dep in result.errors]
+                if failed:
+                    result.errors[name] = f"upstream stage failed: {failed[0]}"
+                    del pending[name]
+                elif all(dep in result.values for dep in stage.deps):
+                    args = [result.values[dep] for dep in stage.deps]
+                    running[executor.submit(call, stage, args)] = name
+                    del pending[name]
+            if not running:
+                break
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    value, seconds = future.result()
+                except Exception as e:
+                    logger.warning(f"Stage {name} failed: {e}")
+                    result.errors[name] = str(e)
+                    continue
+                result.values[name] = value
+                result.timings[name] = seconds
+                self._record(name, seconds)
+                self._memo_put(self.stages[name], prints[name], value)
+
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage")
+        return self._executor
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """ステージ別の実行回数・キャッシュヒット数・所要時間"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -1,17 +1,100 @@
 """
 Walk-Forward Validation
 Implements time series cross-validation to prevent data leakage and overfitting.
+
+Splits are computed as positional ``(train_slice, test_slice)`` ranges with a
+single ``searchsorted`` over the sorted index, so no DataFrame is copied per
+window. Models receive NumPy views of one feature matrix, independent folds
+can be fitted in a process pool, and LightGBM-style estimators can be
+warm-started from the previous fold's booster.
 """
 
+import copy
+import inspect
 import logging
-from typing import List, Tuple, Dict, Any
-from datetime import timedelta
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
 import numpy as np
 import pandas as pd
 from sklearn.metrics import mean_absolute_percentage_error
 
 logger = logging.getLogger(__name__)
 
+FoldSlices = Tuple[slice, slice]
+
+# Feature matrix / target shared with pool workers (set once per worker by the initializer)
+_SHARED: Dict[str, np.ndarray] = {}
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray) -> None:
+    _SHARED["X"] = X
+    _SHARED["y"] = y
+
+
+def _fit_predict(model, X: np.ndarray, y: np.ndarray, train: slice, test: slice) -> np.ndarray:
+    model.fit(X[train], y[train])
+    return np.asarray(model.predict(X[test]), dtype=np.float64)
+
+
+def _fit_predict_worker(model, train: slice, test: slice) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """Process-pool task: fit on the shared arrays, return predictions or an error message."""
+    try:
+        return _fit_predict(model, _SHARED["X"], _SHARED["y"], train, test), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _clone(model):
+    try:
+        from sklearn.base import clone
+
+        return clone(model)
+    except Exception:
+        return copy.deepcopy(model)
+
+
+def _is_picklable(model) -> bool:
+    """Pool workers receive the model by pickle; locally defined or lambda-holding models cannot be sent."""
+    try:
+        pickle.dumps(model)
+        return True
+    except Exception as e:
+        logger.warning(f"Model cannot be pickled ({e}); running folds serially")
+        return False
+
+
+def _supports_init_model(model) -> bool:
+    try:
+        return "init_model" in inspect.signature(model.fit).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def compute_metrics(predictions: np.ndarray, actuals: np.ndarray) -> Dict[str, Any]:
+    """Vectorized walk-forward metrics over concatenated out-of-sample predictions."""
+    predictions = np.asarray(predictions, dtype=np.float64)
+    actuals = np.asarray(actuals, dtype=np.float64)
+    total = int(predictions.size)
+    if total == 0:
+        return {"directional_accuracy": 0, "mape": np.nan, "mae": np.nan, "rmse": np.nan, "total_predictions": 0}
+
+    errors = actuals - predictions
+    metrics = {
+        # Zero on either side counts as a miss, as in the original per-element loop
+        "directional_accuracy": float(np.mean(np.sign(predictions) * np.sign(actuals) > 0)),
+        "mape": mean_absolute_percentage_error(actuals, predictions),
+        "mae": float(np.mean(np.abs(errors))),
+        "rmse": float(np.sqrt(np.mean(errors**2))),
+        "total_predictions": total,
+    }
+    metrics["sharpe_ratio"] = float(np.mean(predictions) / (np.std(predictions) + 1e-10) * np.sqrt(252))
+    return metrics
+
 
 class WalkForwardValidator:
     """
@@ -24,10 +107,55 @@ class WalkForwardValidator:
         train_period_days: int = 730,  # 2 years
         test_period_days: int = 30,  # 1 month
         step_days: int = 30,  # Move forward 1 month each iteration
+        n_jobs: int = 1,
     ):
         self.train_period_days = train_period_days
         self.test_period_days = test_period_days
         self.step_days = step_days
+        self.n_jobs = n_jobs
+
+    @staticmethod
+    def _prepare(df: pd.DataFrame, date_column: str = "Date") -> pd.DataFrame:
+        if date_column in df.columns:
+            df = df.set_index(date_column)
+
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df = df.copy()
+            df.index = pd.to_datetime(df.index)
+
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        return df
+
+    def split_indices(self, index: pd.DatetimeIndex) -> List[FoldSlices]:
+        """
+        Compute positional (train, test) ranges for a sorted DatetimeIndex.
+
+        All window boundaries are located with one vectorized ``searchsorted``.
+        """
+        if len(index) == 0:
+            return []
+
+        train = pd.Timedelta(days=self.train_period_days)
+        test = pd.Timedelta(days=self.test_period_days)
+        step = pd.Timedelta(days=self.step_days)
+
+        first_cutoff = index[0] + train
+        last_cutoff = index[-1] - test
+        if first_cutoff > last_cutoff:
+            return []
+        n_splits = int((last_cutoff - first_cutoff) // step) + 1
+        cutoffs = first_cutoff + pd.to_timedelta(np.arange(n_splits) * self.step_days, unit="D")
+
+        train_start = index.searchsorted(cutoffs - train, side="left")
+        split_point = index.searchsorted(cutoffs, side="left")
+        test_end = index.searchsorted(cutoffs + test, side="left")
+
+        return [
+            (slice(int(a), int(b)), slice(int(b), int(c)))
+            for a, b, c in zip(train_start, split_point, test_end)
+            if b > a and c > b
+        ]
 
     def split_time_series(self, df: pd.DataFrame, date_column: str = "Date") -> List[Tuple[pd.DataFrame, pd.DataFrame]]:
         """
@@ -40,46 +168,104 @@ class WalkForwardValidator:
         Returns:
             List of (train_df, test_df) tuples
         """
-        # Ensure datetime index
-        if date_column in df.columns:
-            df = df.set_index(date_column)
-
-        if not isinstance(df.index, pd.DatetimeIndex):
-            df.index = pd.to_datetime(df.index)
-
-        df = df.sort_index()
-
-        splits = []
-        start_date = df.index.min()
-        end_date = df.index.max()
-
-        current_date = start_date + timedelta(days=self.train_period_days)
-
-        while current_date + timedelta(days=self.test_period_days) <= end_date:
-            # Define train period
-            train_start = current_date - timedelta(days=self.train_period_days)
-            train_end = current_date
-
-            # Define test period
-            test_start = current_date
-            test_end = current_date + timedelta(days=self.test_period_days)
+        df = self._prepare(df, date_column)
+        splits = [(df.iloc[train], df.iloc[test]) for train, test in self.split_indices(df.index)]
+        logger.info(f"Created {len(splits)} walk-forward splits")
+        return splits
 
-            # Extract data
-            train_df = df[(df.index >= train_start) & (df.index < train_end)]
-            test_df = df[(df.index >= test_start) & (df.index < test_end)]
+    def _run_folds(
+        self,
+        model,
+        X: np.ndarray,
+        y: np.ndarray,
+        folds: List[FoldSlices],
+        n_jobs: int,
+        warm_start: bool,
+    ) -> List[Optional[np.ndarray]]:
+        """Fit/predict every fold and return predictions (None for failed folds)."""
+        if warm_start and _supports_init_model(model):
+            return self._run_warm_started(model, X, y, folds)
+
+        if n_jobs != 1 and len(folds) > 1 and _is_picklable(model):
+            workers = min(len(folds), n_jobs if n_jobs > 0 else (os.cpu_count() or 1))
+            try:
+                return self._run_in_pool(model, X, y, folds, workers)
+            except (BrokenProcessPool, pickle.PicklingError, AttributeError, TypeError) as e:
+                logger.warning(f"Process pool failed ({e}); falling back to serial folds")
 
-            if not train_df.empty and not test_df.empty:
-                splits.append((train_df, test_df))
-                logger.debug(
-                    f"Split: Train {train_start.date()} to {train_end.date()}, "
-                    f"Test {test_start.date()} to {test_end.date()}"
-                )
+        results = []
+        for i, (train, test) in enumerate(folds):
+            logger.info(f"Validating split {i + 1}/{len(folds)}")
+            try:
+                results.append(_fit_predict(model, X, y, train, test))
+            except Exception as e:
+                logger.error(f"Fold {i} failed: {e}")
+                results.append(None)
+        return results
+
+    @staticmethod
+    def _run_in_pool(model, X: np.ndarray, y: np.ndarray, folds: List[FoldSlices], workers: int):
+        # spawn: fork is unsafe once OpenMP/BLAS threads (LightGBM, sklearn) are running
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(X, y),
+        ) as executor:
+            futures = [executor.submit(_fit_predict_worker, _clone(model), tr, te) for tr, te in folds]
+            results: List[Optional[np.ndarray]] = []
+            for i, future in enumerate(futures):
+                preds, error = future.result()
+                if error:
+                    logger.error(f"Fold {i} failed: {error}")
+                results.append(preds)
+            return results
+
+    @staticmethod
+    def _run_warm_started(model, X: np.ndarray, y: np.ndarray, folds: List[FoldSlices]) -> List[Optional[np.ndarray]]:
+        """
+        Sequential refits that continue boosting from the previous fold.
 
-            # Move forward
-            current_date += timedelta(days=self.step_days)
+        The first fold trains from scratch; later folds add trees fitted only
+        on the rows that entered the training window since the previous fold.
+        """
+        results: List[Optional[np.ndarray]] = []
+        booster = None
+        prev_end = None
+        for i, (train, test) in enumerate(folds):
+            try:
+                if booster is None:
+                    model.fit(X[train], y[train])
+                else:
+                    new_rows = slice(max(prev_end, train.start), train.stop)
+                    if new_rows.stop > new_rows.start:
+                        model.fit(X[new_rows], y[new_rows], init_model=booster)
+                booster = getattr(model, "booster_", None)
+                prev_end = train.stop
+                results.append(np.asarray(model.predict(X[test]), dtype=np.float64))
+            except Exception as e:
+                logger.error(f"Warm-started fold {i} failed: {e}")
+                results.append(None)
+        return results
 
-        logger.info(f"Created {len(splits)} walk-forward splits")
-        return splits
+    def _evaluate(
+        self,
+        model,
+        df: pd.DataFrame,
+        folds: List[FoldSlices],
+        feature_columns: List[str],
+        target_column: str,
+        n_jobs: Optional[int],
+        warm_start: bool,
+    ) -> Tuple[Dict[str, Any], List[Optional[np.ndarray]]]:
+        X = np.ascontiguousarray(df[feature_columns].to_numpy(dtype=np.float64))
+        y = df[target_column].to_numpy(dtype=np.float64)
+        fold_preds = self._run_folds(model, X, y, folds, self.n_jobs if n_jobs is None else n_jobs, warm_start)
+
+        done = [(preds, test) for preds, (_, test) in zip(fold_preds, folds) if preds is not None]
+        predictions = np.concatenate([p for p, _ in done]) if done else np.empty(0)
+        actuals = np.concatenate([y[test] for _, test in done]) if done else np.empty(0)
+        return compute_metrics(predictions, actuals), fold_preds
 
     def validate_model(
         self,
@@ -87,6 +273,8 @@ class WalkForwardValidator:
         df: pd.DataFrame,
         feature_columns: List[str],
         target_column: str = "target",
+        n_jobs: Optional[int] = None,
+        warm_start: bool = False,
     ) -> Dict[str, Any]:
         """
         Perform walk-forward validation on a model.
@@ -96,71 +284,16 @@ class WalkForwardValidator:
             df: Full dataset
             feature_columns: List of feature column names
             target_column: Target column name
+            n_jobs: Worker processes for independent folds (-1 = all cores, default: self.n_jobs)
+            warm_start: Continue boosting across folds for estimators whose fit() accepts init_model
 
         Returns:
             Dictionary with validation metrics
         """
-        splits = self.split_time_series(df)
-
-        all_predictions = []
-        all_actuals = []
-        all_dates = []
-
-        directional_correct = 0
-        total_predictions = 0
-
-        for i, (train_df, test_df) in enumerate(splits):
-            logger.info(f"Validating split {i + 1}/{len(splits)}")
-
-            # Prepare data
-            X_train = train_df[feature_columns]
-            y_train = train_df[target_column]
-            X_test = test_df[feature_columns]
-            y_test = test_df[target_column]
-
-            # Train model
-            try:
-                model.fit(X_train, y_train)
-            except Exception as e:
-                logger.error(f"Training failed on split {i}: {e}")
-                continue
-
-            # Predict
-            try:
-                y_pred = model.predict(X_test)
-            except Exception as e:
-                logger.error(f"Prediction failed on split {i}: {e}")
-                continue
-
-            # Store results
-            all_predictions.extend(y_pred)
-            all_actuals.extend(y_test.values)
-            all_dates.extend(test_df.index.tolist())
-
-            # Calculate directional accuracy
-            for pred, actual in zip(y_pred, y_test.values):
-                if (pred > 0 and actual > 0) or (pred < 0 and actual < 0):
-                    directional_correct += 1
-                total_predictions += 1
-
-        # Calculate metrics
-        all_predictions = np.array(all_predictions)
-        all_actuals = np.array(all_actuals)
-
-        metrics = {
-            "directional_accuracy": directional_correct / total_predictions if total_predictions > 0 else 0,
-            "mape": mean_absolute_percentage_error(all_actuals, all_predictions),
-            "mae": np.mean(np.abs(all_actuals - all_predictions)),
-            "rmse": np.sqrt(np.mean((all_actuals - all_predictions) ** 2)),
-            "total_predictions": total_predictions,
-            "num_splits": len(splits),
-        }
-
-        # Calculate Sharpe ratio (if predictions are returns)
-        if total_predictions > 0:
-            returns = all_predictions
-            sharpe = np.mean(returns) / (np.std(returns) + 1e-10) * np.sqrt(252)  # Annualized
-            metrics["sharpe_ratio"] = sharpe
+        df = self._prepare(df)
+        folds = self.split_indices(df.index)
+        metrics, _ = self._evaluate(model, df, folds, feature_columns, target_column, n_jobs, warm_start)
+        metrics["num_splits"] = len(folds)
 
         logger.info(
             f"Validation complete: Directional Accuracy={metrics['directional_accuracy']:.2%}, "
@@ -176,6 +309,8 @@ class WalkForwardValidator:
         feature_columns: List[str],
         target_column: str = "target",
         min_train_size: int = 252,  # 1 year of trading days
+        n_jobs: Optional[int] = None,
+        warm_start: bool = False,
     ) -> Dict[str, Any]:
         """
         Expanding window validation (incremental training data).
@@ -186,56 +321,18 @@ class WalkForwardValidator:
             feature_columns: Feature columns
             target_column: Target column
             min_train_size: Minimum training samples
+            n_jobs: Worker processes for independent folds
+            warm_start: Continue boosting across folds (see validate_model)
         """
-        if not isinstance(df.index, pd.DatetimeIndex):
-            df.index = pd.to_datetime(df.index)
-
-        df = df.sort_index()
-
-        all_predictions = []
-        all_actuals = []
-        directional_correct = 0
-        total_predictions = 0
-
-        # Start with minimum training size
-        for i in range(min_train_size, len(df), self.step_days):
-            train_df = df.iloc[:i]
-            test_df = df.iloc[i : i + self.test_period_days]
-
-            if test_df.empty:
-                break
-
-            X_train = train_df[feature_columns]
-            y_train = train_df[target_column]
-            X_test = test_df[feature_columns]
-            y_test = test_df[target_column]
-
-            try:
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-
-                all_predictions.extend(y_pred)
-                all_actuals.extend(y_test.values)
-
-                for pred, actual in zip(y_pred, y_test.values):
-                    if (pred > 0 and actual > 0) or (pred < 0 and actual < 0):
-                        directional_correct += 1
-                    total_predictions += 1
-
-            except Exception as e:
-                logger.error(f"Expanding window iteration {i} failed: {e}")
-                continue
-
-        # Calculate metrics
-        all_predictions = np.array(all_predictions)
-        all_actuals = np.array(all_actuals)
-
-        metrics = {
-            "directional_accuracy": directional_correct / total_predictions if total_predictions > 0 else 0,
-            "mape": mean_absolute_percentage_error(all_actuals, all_predictions),
-            "mae": np.mean(np.abs(all_actuals - all_predictions)),
-            "total_predictions": total_predictions,
-        }
+        df = self._prepare(df)
+        n = len(df)
+        folds = [
+            (slice(0, i), slice(i, min(i + self.test_period_days, n))) for i in range(min_train_size, n, self.step_days)
+        ]
+
+        metrics, _ = self._evaluate(model, df, folds, feature_columns, target_column, n_jobs, warm_start)
+        metrics.pop("rmse", None)
+        metrics.pop("sharpe_ratio", None)
 
         logger.info(f"Expanding window validation: Directional Accuracy={metrics['directional_accuracy']:.2%}")
 
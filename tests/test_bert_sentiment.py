@@ -0,0 +1,104 @@
+"""
+BERTSentimentAnalyzer のバッチ推論とキャッシュのテスト（モデル推論はフェイク）
+"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.bert_sentiment import BERTSentimentAnalyzer, SentimentCache, normalize_text
+
+
+class FakeModel:
+    """positive / negative / neutral の確率をキーワードで返し、バッチを記録する"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, batch):
+        self.batches.append(list(batch))
+        rows = []
+        for text in batch:
+            if "beat" in text.lower():
+                rows.append([0.8, 0.1, 0.1])
+            elif "miss" in text.lower():
+                rows.append([0.1, 0.8, 0.1])
+            else:
+                rows.append([0.1, 0.1, 0.8])
+        return np.array(rows)
+
+
+@pytest.fixture
+def make_analyzer(tmp_path, monkeypatch):
+    monkeypatch.setattr(BERTSentimentAnalyzer, "_load_model", lambda self: None)
+
+    def factory(batch_size=2):
+        analyzer = BERTSentimentAnalyzer(batch_size=batch_size, cache_path=str(tmp_path / "cache.db"))
+        analyzer.is_ready = True
+        analyzer.fake = FakeModel()
+        analyzer._predict_proba = analyzer.fake
+        return analyzer
+
+    return factory
+
+
+def test_batches_are_length_sorted_and_results_keep_input_order(make_analyzer):
+    analyzer = make_analyzer(batch_size=2)
+    texts = ["Toyota beats estimates by a wide margin", "Sony misses", "Flat day", "Nintendo beat"]
+
+    results = analyzer.analyze_batch(texts)
+
+    assert [r["label"] for r in results] == ["positive", "negative", "neutral", "positive"]
+    assert results[1]["score"] == pytest.approx(-0.7)
+    assert [len(b) for b in analyzer.fake.batches] == [2, 2]
+    assert analyzer.fake.batches[0] == ["Flat day", "Sony misses"]
+
+
+def test_cache_survives_new_instances_and_normalizes_headlines(make_analyzer):
+    first = make_analyzer()
+    first.analyze_batch(["Toyota BEATS estimates", "Sony misses"])
+
+    second = make_analyzer()
+    results = second.analyze_batch(["  toyota beats   estimates ", "Sony misses", "Sony misses", "New headline"])
+
+    assert second.fake.batches == [["New headline"]]
+    assert second.stats["cache_hits"] == 3
+    assert results[0]["label"] == "positive" and results[2] == results[1]
+
+
+def test_empty_texts_and_model_errors_fall_back(make_analyzer):
+    analyzer = make_analyzer()
+
+    def broken(batch):
+        raise RuntimeError("oom")
+
+    analyzer._predict_proba = broken
+    results = analyzer.analyze_batch(["", "profit growth"])
+
+    assert results[0] == {"score": 0.0, "label": "neutral"}
+    assert results[1]["note"] == "fallback" and results[1]["label"] == "positive"
+    # フォールバック結果はキャッシュしない
+    assert len(analyzer.cache) == 0
+
+
+def test_cache_errors_do_not_discard_model_scores(make_analyzer, monkeypatch):
+    analyzer = make_analyzer()
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(analyzer.cache, "get_many", locked)
+    monkeypatch.setattr(analyzer.cache, "put_many", locked)
+
+    result = analyzer.analyze("Toyota beats estimates")
+
+    assert result["label"] == "positive" and "note" not in result
+    assert result["score"] == pytest.approx(0.7)
+
+
+def test_cache_keys_are_model_specific(tmp_path):
+    cache = SentimentCache(str(tmp_path / "c.db"))
+    assert normalize_text("Ｔｏｙｏｔａ　Beats") == "toyota beats"
+    assert SentimentCache.make_key("a", "x") != SentimentCache.make_key("b", "x")
+    assert cache.get_many([]) == {}
@@ -2,7 +2,11 @@
 import pytest
 import os
 import json
-from src.trading.collective_intelligence import CollectiveIntelligenceManager
+from src.trading.collective_intelligence import (
+    BlockchainSignalLedger,
+    CollectiveIntelligenceManager,
+    LedgerCorruptionError,
+)
 
 @pytest.fixture
 def temp_signal_file(tmp_path):
@@ -50,3 +54,116 @@ def test_no_consensus_below_threshold(temp_signal_file):
     
     # 閾値 0.6 を下回るため空リスト
     assert len(consensus) == 0
+
+
+def _segment_lines(ledger):
+    lines = []
+    for path in ledger._segment_files():
+        with open(path, encoding="utf-8") as f:
+            lines.extend(f.readlines())
+    return lines
+
+
+def test_ledger_appends_one_line_per_block_and_rolls_segments(tmp_path):
+    """1ブロック=1行で追記し、セグメントを分割すること"""
+    ledger = BlockchainSignalLedger(str(tmp_path / "chain.json"), segment_size=4, fsync_every=3)
+    for i in range(9):
+        ledger.add_signal({"ticker": str(i)})
+
+    assert len(ledger._segment_files()) == 3
+    assert len(_segment_lines(ledger)) == 10
+    ledger.close()
+
+    reloaded = BlockchainSignalLedger(str(tmp_path / "chain.json"), segment_size=4)
+    assert [b["hash"] for b in reloaded.chain] == [b["hash"] for b in ledger.chain]
+    assert reloaded.verify_integrity()
+
+
+def test_ledger_verifies_incrementally_from_checkpoint(tmp_path, monkeypatch):
+    """チェックポイント以降のブロックだけを再ハッシュすること"""
+    ledger = BlockchainSignalLedger(str(tmp_path / "chain.json"), checkpoint_every=1000)
+    for i in range(50):
+        ledger.add_signal({"ticker": str(i)})
+    assert ledger.verify_integrity()
+    assert ledger.checkpoint["index"] == 50
+
+    for i in range(5):
+        ledger.add_signal({"ticker": f"new{i}"})
+
+    calls = []
+    original = BlockchainSignalLedger._calculate_hash
+    monkeypatch.setattr(BlockchainSignalLedger, "_calculate_hash", lambda self, b: calls.append(1) or original(self, b))
+    assert ledger.verify_integrity()
+    # 新しい5ブロック + チェックポイントのブロック
+    assert len(calls) == 6
+
+
+def test_ledger_detects_tampering_after_checkpoint(tmp_path):
+    """チェックポイント後の改ざんを検出すること"""
+    ledger = BlockchainSignalLedger(str(tmp_path / "chain.json"))
+    ledger.add_signal({"ticker": "7203", "action": "BUY"})
+    assert ledger.verify_integrity()
+    ledger.add_signal({"ticker": "9984", "action": "BUY"})
+    ledger.close()
+
+    segment = ledger._segment_files()[0]
+    with open(segment, encoding="utf-8") as f:
+        content = f.read()
+    with open(segment, "w", encoding="utf-8") as f:
+        f.write(content.replace('"action": "BUY", "ticker": "9984"', '"action": "SELL", "ticker": "9984"'))
+
+    assert not BlockchainSignalLedger(str(tmp_path / "chain.json")).verify_integrity()
+
+
+def test_ledger_recovers_from_torn_write_and_imports_legacy_file(tmp_path):
+    """書きかけの末尾行を破棄し、旧形式のJSONを取り込むこと"""
+    legacy = CollectiveIntelligenceManager(ledger_path=str(tmp_path / "old.json")).ledger
+    legacy.add_signal({"ticker": "6758"})
+    legacy.close()
+    with open(tmp_path / "legacy.json", "w", encoding="utf-8") as f:
+        json.dump(legacy.chain, f)
+
+    imported = BlockchainSignalLedger(str(tmp_path / "legacy.json"))
+    assert [b["hash"] for b in imported.chain] == [b["hash"] for b in legacy.chain]
+    imported.close()
+
+    with open(imported._segment_files()[-1], "a", encoding="utf-8") as f:
+        f.write('{"index": 2, "data": {"tick')
+    recovered = BlockchainSignalLedger(str(tmp_path / "legacy.json"))
+    assert len(recovered.chain) == 2 and recovered.verify_integrity()
+    recovered.add_signal({"ticker": "7974"})
+    assert len(_segment_lines(recovered)) == 3
+
+
+@pytest.mark.parametrize("line_no", [2, 5])
+def test_ledger_refuses_to_truncate_corrupt_blocks(tmp_path, line_no):
+    """途中（または改行まで書かれた末尾）の壊れたブロックは切り詰めずにエラーにすること"""
+    ledger = BlockchainSignalLedger(str(tmp_path / "chain.json"))
+    for i in range(5):
+        ledger.add_signal({"ticker": str(i)})
+    ledger.close()
+    segment = ledger._segment_files()[0]
+    with open(segment, encoding="utf-8") as f:
+        lines = f.readlines()
+    lines[line_no] = '{"index": ' + "\n"
+    with open(segment, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    size = os.path.getsize(segment)
+
+    with pytest.raises(LedgerCorruptionError):
+        BlockchainSignalLedger(str(tmp_path / "chain.json"))
+    assert os.path.getsize(segment) == size
+
+
+def test_ledger_torn_tail_is_only_tolerated_in_newest_segment(tmp_path):
+    """書きかけの行が封じられたセグメントにある場合は破損として扱うこと"""
+    ledger = BlockchainSignalLedger(str(tmp_path / "chain.json"), segment_size=4)
+    for i in range(5):
+        ledger.add_signal({"ticker": str(i)})
+    ledger.close()
+    sealed = ledger._segment_files()[0]
+    with open(sealed, "rb+") as f:
+        f.truncate(os.path.getsize(sealed) - 10)
+
+    with pytest.raises(LedgerCorruptionError):
+        BlockchainSignalLedger(str(tmp_path / "chain.json"), segment_size=4)
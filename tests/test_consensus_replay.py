@@ -0,0 +1,91 @@
+"""
+ConsensusEngine のヒストリカル再生モードのテスト
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.trading.consensus_engine import ConsensusEngine, SignalCube
+
+
+def random_cube(n_days=30, tickers=("A", "B", "C"), strategies=("s1", "s2", "s3", "s4"), seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2024-01-01", periods=n_days)
+    signals = {s: {t: pd.Series(rng.integers(-1, 2, n_days), index=dates) for t in tickers} for s in strategies}
+    confidence = {s: {t: pd.Series(rng.uniform(0.2, 1.0, n_days), index=dates) for t in tickers} for s in strategies}
+    return SignalCube.from_signals(signals, confidence), signals, confidence
+
+
+def test_decisions_match_aggregate_signals():
+    cube, signals, confidence = random_cube()
+    engine = ConsensusEngine()
+    weights = {"s1": 1.0, "s2": 0.8, "s3": 0.7}  # s4 は未登録 → 0.5
+    thresholds = [0.3, 0.6, 1.0]
+    decisions = engine.replay_decisions(cube, thresholds, weights)
+
+    engine.source_weights = weights
+    for h_idx, threshold in enumerate(thresholds):
+        engine.threshold = threshold
+        for d, date in enumerate(cube.dates):
+            day_signals = [
+                {
+                    "ticker": t,
+                    "action": "BUY" if signals[s][t][date] == 1 else "SELL",
+                    "source": s,
+                    "confidence": confidence[s][t][date],
+                }
+                for s in signals
+                for t in signals[s]
+                if signals[s][t][date] != 0
+            ]
+            expected = {sig["ticker"]: sig["action"] for sig in engine.aggregate_signals(day_signals)}
+            for j, ticker in enumerate(cube.tickers):
+                got = {1: "BUY", -1: "SELL"}.get(int(decisions[d, j, h_idx]))
+                assert got == expected.get(ticker)
+
+
+def test_majority_vote_of_streaming_pipeline():
+    dates = pd.bdate_range("2024-01-01", periods=2)
+    # 1日目: BUY 2/4 (過半数ではない)、2日目: BUY 3/4
+    votes = {"s1": [1, 1], "s2": [1, 1], "s3": [-1, 1], "s4": [0, -1]}
+    cube = SignalCube.from_signals({s: {"A": pd.Series(v, index=dates)} for s, v in votes.items()})
+    equal = {s: 1 / len(votes) for s in votes}
+
+    decisions = ConsensusEngine().replay_decisions(cube, [0.5], equal)
+
+    assert decisions[:, 0, 0].tolist() == [0, 1]
+
+
+def test_replay_backtest_holds_between_buy_and_sell():
+    dates = pd.bdate_range("2024-01-01", periods=5)
+    cube = SignalCube.from_signals({"s1": {"A": pd.Series([1, 0, 0, -1, 0], index=dates)}})
+    prices = pd.DataFrame({"A": [100.0, 110.0, 121.0, 133.1, 100.0]}, index=dates)
+
+    result = ConsensusEngine().replay(cube, prices, thresholds=[0.5, 2.0], weightings={"w": {"s1": 1.0}}, cost=0.0)
+    by_threshold = result.set_index("threshold")
+
+    # 1日目に買い、4日目の売りで手仕舞い → 3日分の +10%
+    assert by_threshold.loc[0.5, "total_return"] == pytest.approx(1.1**3 - 1)
+    assert by_threshold.loc[0.5, "trades"] == 2
+    assert by_threshold.loc[0.5, "exposure"] == pytest.approx(3 / 5)
+    # 閾値が高すぎれば取引しない
+    assert by_threshold.loc[2.0, "total_return"] == 0.0 and by_threshold.loc[2.0, "trades"] == 0
+
+
+def test_grid_of_thresholds_and_weightings_runs_quickly():
+    cube, _, _ = random_cube(n_days=500, tickers=[f"T{i}" for i in range(100)], strategies=[f"s{i}" for i in range(8)])
+    rng = np.random.default_rng(1)
+    prices = pd.DataFrame(
+        100 * np.cumprod(1 + rng.normal(0, 0.01, (500, 100)), axis=0), index=cube.dates, columns=cube.tickers
+    )
+    weightings = {f"w{k}": dict(zip(cube.strategies, rng.uniform(0.2, 1.5, 8))) for k in range(5)}
+
+    start = time.time()
+    result = ConsensusEngine().replay(cube, prices, thresholds=np.linspace(0.2, 3.0, 20), weightings=weightings)
+
+    assert time.time() - start < 10
+    assert len(result) == 100
+    assert result["sharpe_ratio"].is_monotonic_decreasing
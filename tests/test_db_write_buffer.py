@@ -0,0 +1,131 @@
+"""
+DatabaseManager の書き込みバッファテスト
+"""
+
+import gc
+import time
+import weakref
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from src.db.database import Base
+from src.db.manager import DatabaseManager
+from src.db.models import CouncilVote, MarketScan, SystemEvent, TradeLog
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'agstock.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _count(session_factory, model):
+    with session_factory() as session:
+        return session.query(model).count()
+
+
+def test_logs_are_buffered_until_size_threshold(session_factory):
+    manager = DatabaseManager(buffer_size=3, flush_interval=0, session_factory=session_factory)
+
+    assert manager.log_scan("7203.T", 1, 0.8, "breakout", {"RSI": 55.0})
+    assert manager.log_event("INFO", "scan started")
+    assert _count(session_factory, MarketScan) == 0
+
+    manager.log_scan("6758.T", -1, 0.6, "breakdown")
+    assert _count(session_factory, MarketScan) == 2
+    assert _count(session_factory, SystemEvent) == 1
+    assert len(manager.buffer) == 0
+
+
+def test_single_commit_per_flush(session_factory):
+    manager = DatabaseManager(buffer_size=1000, flush_interval=0, session_factory=session_factory)
+    commits = []
+    event.listen(manager.db.get_bind(), "commit", lambda conn: commits.append(1))
+
+    for i in range(200):
+        manager.log_scan(f"{i}.T", 0, 0.5, "hold")
+    assert manager.flush() == 200
+
+    assert len(commits) == 1
+    assert _count(session_factory, MarketScan) == 200
+
+
+def test_time_threshold_flushes_in_background(session_factory):
+    manager = DatabaseManager(buffer_size=1000, flush_interval=0.05, session_factory=session_factory)
+    manager.log_trade("7203.T", "BUY", 2500.0, 100)
+
+    deadline = time.time() + 2
+    while _count(session_factory, TradeLog) == 0 and time.time() < deadline:
+        time.sleep(0.02)
+    assert _count(session_factory, TradeLog) == 1
+    manager.close()
+
+
+def test_reads_see_buffered_writes(session_factory):
+    manager = DatabaseManager(flush_interval=0, session_factory=session_factory)
+    manager.log_trade("7203.T", "SELL", 2600.0, 100, strategy="LightGBM", pnl=1000.0)
+    manager.log_trade("6758.T", "SELL", 1300.0, 100, strategy="LightGBM", pnl=-200.0)
+
+    assert manager.get_strategy_performance() == {"LightGBM": 800.0}
+
+
+def test_close_flushes_pending_rows(session_factory):
+    manager = DatabaseManager(flush_interval=0, session_factory=session_factory)
+    manager.log_council_vote("7203.T", {"id": "a1", "name": "Bull", "score": 80, "stance": "BULL"})
+    assert _count(session_factory, CouncilVote) == 0
+
+    manager.close()
+    assert _count(session_factory, CouncilVote) == 1
+
+
+def _reject_ticker(manager, ticker, times=None):
+    """ticker を含む INSERT を失敗させる（times 回まで。None なら常に）"""
+    failures = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        rows = parameters if executemany else [parameters]
+        if any(ticker in tuple(row) for row in rows) and (times is None or len(failures) < times):
+            failures.append(1)
+            raise RuntimeError("database is locked")
+
+    event.listen(manager.db.get_bind(), "before_cursor_execute", before_execute)
+    return failures
+
+
+def test_bad_row_does_not_drop_the_batch(session_factory):
+    manager = DatabaseManager(buffer_size=1000, flush_interval=0, session_factory=session_factory)
+    _reject_ticker(manager, "BAD")
+    for ticker in ["7203.T", "BAD", "6758.T"]:
+        manager.log_scan(ticker, 0, 0.5, "hold")
+
+    assert manager.flush() == 2
+    assert _count(session_factory, MarketScan) == 2
+
+    # 失敗した行は max_attempts 回まで再試行してから破棄される
+    manager.flush()
+    manager.flush()
+    assert manager.buffer.dropped_rows == 1
+    assert len(manager.buffer) == 0
+
+
+def test_transient_failure_is_retried(session_factory):
+    manager = DatabaseManager(buffer_size=1000, flush_interval=0, session_factory=session_factory)
+    _reject_ticker(manager, "7203.T", times=2)
+    manager.log_scan("7203.T", 1, 0.8, "breakout")
+
+    assert manager.flush() == 0
+    assert len(manager.buffer) == 1
+    assert manager.flush() == 1
+    assert _count(session_factory, MarketScan) == 1
+    assert manager.buffer.dropped_rows == 0
+
+
+def test_buffers_are_not_pinned_by_atexit(session_factory):
+    manager = DatabaseManager(flush_interval=0, session_factory=session_factory)
+    ref = weakref.ref(manager.buffer)
+    del manager
+    gc.collect()
+    assert ref() is None
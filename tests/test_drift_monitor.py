@@ -0,0 +1,95 @@
+"""
+DriftMonitor（スケッチベース）のテスト
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from src.drift_monitor import DriftMonitor
+
+
+def exact_psi(expected: np.ndarray, actual: np.ndarray, bins: int = 10) -> float:
+    """生データから求める PSI（スケッチ版の比較用）"""
+    breakpoints = np.percentile(expected, np.linspace(0, 100, bins + 1))
+    expected_perc = np.histogram(expected, bins=breakpoints)[0] / expected.size
+    actual_perc = np.histogram(actual, bins=breakpoints)[0] / actual.size
+    expected_perc = np.where(expected_perc == 0, 1e-6, expected_perc)
+    actual_perc = np.where(actual_perc == 0, 1e-6, actual_perc)
+    return float(np.sum((actual_perc - expected_perc) * np.log(actual_perc / expected_perc)))
+
+
+@pytest.fixture
+def reference():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "ret": rng.normal(0, 1, 5000),
+            "vol": rng.gamma(2.0, 1.0, 5000),
+            "label": ["x"] * 5000,
+        }
+    )
+
+
+def test_no_drift_on_same_distribution(reference):
+    monitor = DriftMonitor()
+    monitor.set_reference(reference)
+
+    rng = np.random.default_rng(1)
+    current = pd.DataFrame({"ret": rng.normal(0, 1, 2000), "vol": rng.gamma(2.0, 1.0, 2000)})
+    result = monitor.check(current)
+
+    assert not result.drift_detected
+    assert result.details == {}
+
+
+def test_detects_shift_and_matches_exact_statistics(reference):
+    monitor = DriftMonitor()
+    monitor.set_reference(reference)
+
+    rng = np.random.default_rng(2)
+    current = pd.DataFrame({"ret": rng.normal(0.8, 1, 2000), "vol": rng.gamma(2.0, 1.0, 2000)})
+    result = monitor.check(current)
+
+    assert result.drift_detected
+    assert list(result.details) == ["ret"]
+    exact_ks = stats.ks_2samp(reference["ret"], current["ret"]).statistic
+    assert result.details["ret"]["ks"] == pytest.approx(exact_ks, abs=0.02)
+    assert result.details["ret"]["psi"] == pytest.approx(
+        exact_psi(reference["ret"].values, current["ret"].values), rel=0.1
+    )
+
+
+def test_reference_memory_is_fixed_size(reference):
+    monitor = DriftMonitor(n_bins=50, psi_bins=10)
+    monitor.set_reference(reference)
+
+    assert monitor.reference.counts.shape == (2, 50)
+    assert monitor.reference.edges.shape == (2, 49)
+    assert int(monitor.reference.totals.sum()) == 10000
+
+
+def test_incremental_updates_with_sliding_window(reference):
+    monitor = DriftMonitor(window_batches=3)
+    monitor.set_reference(reference)
+    rng = np.random.default_rng(3)
+
+    for _ in range(3):
+        monitor.update(pd.DataFrame({"ret": rng.normal(0, 1, 200), "vol": rng.gamma(2.0, 1.0, 200)}))
+    assert not monitor.check_current().drift_detected
+
+    # 古いバッチが押し出され、シフト後のデータだけが残る
+    for _ in range(3):
+        monitor.update(pd.DataFrame({"ret": rng.normal(1.5, 1, 200), "vol": rng.gamma(2.0, 1.0, 200)}))
+    assert int(monitor.current.totals[0]) == 600
+    assert "ret" in monitor.check_current().details
+
+
+def test_min_samples_and_missing_reference():
+    monitor = DriftMonitor(min_samples=200)
+    assert not monitor.check(pd.DataFrame({"a": [1.0, 2.0]})).drift_detected
+
+    monitor.set_reference(pd.DataFrame({"a": np.arange(500, dtype=float)}))
+    assert not monitor.check(pd.DataFrame({"a": np.arange(100, dtype=float) + 1000})).drift_detected
+    assert monitor.check(pd.DataFrame({"a": np.arange(300, dtype=float) + 1000})).drift_detected
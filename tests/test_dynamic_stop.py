@@ -256,3 +256,44 @@ def test_trailing_stop_behavior(stop_manager, sample_price_data):
 
     # 最終的なストップが初期ストップより高い
     assert stops[-1] > entry_price * 0.95
+
+
+def test_batch_atr_matches_ta(stop_manager, sample_price_data):
+    """一括ATR：ta の AverageTrueRange と一致、データ不足は0"""
+    import ta
+
+    long_df = pd.concat([sample_price_data] * 10, ignore_index=True)
+    expected = ta.volatility.AverageTrueRange(long_df["High"], long_df["Low"], long_df["Close"], window=14)
+    atr = stop_manager.batch_atr([long_df, sample_price_data.iloc[:5], None])
+
+    assert atr[0] == pytest.approx(expected.average_true_range().iloc[-1], rel=1e-4)
+    assert atr[1] == 0.0 and atr[2] == 0.0
+
+
+def test_update_stops_matches_update_stop(sample_price_data):
+    """一括ストップ更新：銘柄ごとの update_stop と同じ結果"""
+    tickers = ["A", "B", "C", "UNKNOWN"]
+    prices = np.array([110.0, 90.0, 106.0, 50.0])
+    frames = [sample_price_data, None, sample_price_data.iloc[:3], sample_price_data]
+
+    single = DynamicStopManager()
+    batch = DynamicStopManager()
+    for manager in (single, batch):
+        for ticker in tickers[:3]:
+            manager.register_entry(ticker, 100.0)
+
+    expected = [single.update_stop(t, p, df) for t, p, df in zip(tickers, prices, frames)]
+    result = batch.update_stops(tickers, prices, batch.batch_atr(frames))
+
+    np.testing.assert_allclose(result, expected, rtol=1e-3)
+    assert batch.highest_prices == single.highest_prices
+    assert "UNKNOWN" not in batch.stops
+
+
+def test_check_exits(stop_manager):
+    """一括出口チェック"""
+    stop_manager.register_entry("A", 100.0, initial_stop=95.0)
+    stop_manager.register_entry("B", 100.0, initial_stop=95.0)
+
+    exits = stop_manager.check_exits(["A", "B", "C"], np.array([94.0, 96.0, 1.0]))
+    assert exits.tolist() == [True, False, False]
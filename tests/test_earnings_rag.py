@@ -0,0 +1,97 @@
+"""
+EarningsRAG のバッチインデックス化のテスト（ローカル埋め込み関数を使用）
+"""
+
+import hashlib
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_text_splitters")
+pytest.importorskip("langchain_google_genai")
+
+from src.rag.earnings_rag import EarningsRAG  # noqa: E402
+
+
+class HashEmbedding:
+    """テキストのハッシュから決まる8次元ベクトル。呼び出しごとのバッチサイズを記録する"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(len(texts))
+        return [[b / 255.0 for b in hashlib.md5(t.encode("utf-8")).digest()[:8]] for t in texts]
+
+
+def make_filing(n_sections, prefix="売上高"):
+    text = "\n\n".join(
+        f"{prefix} セクション{i}: " + "営業利益は前年同期比で増加しました。" * 30 for i in range(n_sections)
+    )
+    return {"text": text, "metadata": {"company": "テスト株式会社", "date": "2024-11-01"}}
+
+
+@pytest.fixture
+def embed():
+    return HashEmbedding()
+
+
+@pytest.fixture
+def rag(tmp_path, embed):
+    return EarningsRAG(persist_directory=str(tmp_path / "chroma"), embedding_function=embed, batch_size=4)
+
+
+def test_chunks_are_embedded_in_batches(rag, embed):
+    stats = rag.index_document_with_stats(make_filing(12), "7203_2024Q3")
+
+    assert stats["success"] and stats["indexed"] == stats["chunks"] > 4
+    assert max(embed.batches) == 4 and sum(embed.batches) == stats["chunks"]
+    assert stats["chunks_per_sec"] > 0
+    assert rag.get_document_summary("7203_2024Q3")["num_chunks"] == stats["chunks"]
+
+
+def test_reindex_skips_unchanged_chunks(rag, embed):
+    filing = make_filing(6)
+    assert rag.index_document(filing, "DOC")
+    calls = len(embed.batches)
+
+    stats = rag.index_document_with_stats(filing, "DOC")
+    assert stats["indexed"] == 0 and stats["skipped"] == stats["chunks"]
+    assert len(embed.batches) == calls
+
+
+def test_changed_document_replaces_stale_chunks(rag):
+    rag.index_document(make_filing(6), "DOC")
+    stats = rag.index_document_with_stats(make_filing(3, prefix="純利益"), "DOC")
+
+    assert stats["removed"] > 0
+    assert rag.get_document_summary("DOC")["num_chunks"] == stats["chunks"]
+
+
+def test_failed_reindex_keeps_previous_chunks(rag, embed):
+    rag.index_document(make_filing(6), "DOC")
+    before = rag.get_document_summary("DOC")["num_chunks"]
+
+    calls = []
+
+    def rate_limited_after_first_batch(texts):
+        calls.append(len(texts))
+        if len(calls) > 1:
+            raise RuntimeError("rate limited")
+        return embed(texts)
+
+    rag.embeddings.embed_documents = rate_limited_after_first_batch
+    stats = rag.index_document_with_stats(make_filing(6, prefix="純利益"), "DOC")
+
+    # 新しいチャンクが揃うまで古いチャンクは消さない
+    assert not stats["success"] and stats["removed"] == 0
+    assert rag.get_document_summary("DOC")["num_chunks"] > before
+
+
+def test_index_documents_concurrently(rag):
+    summary = rag.index_documents({f"DOC{i}": make_filing(4, prefix=f"会社{i}") for i in range(5)})
+
+    assert summary["failed"] == []
+    assert set(summary["documents"]) == {f"DOC{i}" for i in range(5)}
+    assert summary["indexed"] == sum(d["chunks"] for d in summary["documents"].values())
+    assert rag.query("営業利益", n_results=2, filter_doc_id="DOC3")[0]["metadata"]["doc_id"] == "DOC3"
@@ -0,0 +1,128 @@
+"""
+StrategyEvaluationRunner / discover_strategies のテスト
+"""
+
+import textwrap
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategies.evaluation_runner import StrategyEvaluationRunner, score_signals
+from src.strategies.loader import discover_strategies
+
+HEADER = "import pandas as pd\nfrom src.strategies.base import Strategy\n\n"
+
+MODULES = {
+    "momentum.py": """
+        class MomentumStrategy(Strategy):
+            def __init__(self):
+                super().__init__("Momentum", trend_period=0)
+
+            def generate_signals(self, df):
+                df["ret"] = df["Close"].pct_change(5)
+                return (df["ret"] > 0).astype(int) - (df["ret"] < 0).astype(int)
+    """,
+    "slow.py": """
+        import time
+
+        class SlowStrategy(Strategy):
+            def __init__(self):
+                super().__init__("Slow")
+
+            def generate_signals(self, df):
+                time.sleep(60)
+    """,
+    "crash.py": """
+        import os
+
+        class CrashStrategy(Strategy):
+            def __init__(self):
+                super().__init__("Crash")
+
+            def generate_signals(self, df):
+                os._exit(3)
+    """,
+    "hog.py": """
+        class HogStrategy(Strategy):
+            def __init__(self):
+                super().__init__("Hog")
+
+            def generate_signals(self, df):
+                self.blob = bytearray(4 * 1024**3)
+                return pd.Series(0, index=df.index)
+    """,
+    "broken.py": """
+        class BrokenStrategy(Strategy)
+            pass
+    """,
+}
+
+
+@pytest.fixture
+def strategy_dir(tmp_path):
+    directory = tmp_path / "evolved"
+    directory.mkdir()
+    for filename, body in MODULES.items():
+        (directory / filename).write_text(HEADER + textwrap.dedent(body))
+    (directory / "helpers.py").write_text("class NotAStrategy:\n    pass\n")
+    return str(directory)
+
+
+@pytest.fixture
+def price_data():
+    dates = pd.date_range("2023-01-02", periods=120, freq="B")
+    rng = np.random.default_rng(0)
+    data = {}
+    for ticker in ["7203.T", "6758.T"]:
+        close = 1000 * np.cumprod(1 + rng.normal(0.0005, 0.01, len(dates)))
+        data[ticker] = pd.DataFrame(
+            {"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close, "Volume": 1e6}, index=dates
+        )
+    # 上場日が遅い銘柄は NaN 行を除いて評価される
+    data["9984.T"] = data["7203.T"].iloc[40:].copy()
+    return data
+
+
+def test_discovery_does_not_import_modules(strategy_dir):
+    specs = discover_strategies([strategy_dir])
+
+    assert sorted(s.class_name for s in specs) == [
+        "CrashStrategy",
+        "HogStrategy",
+        "MomentumStrategy",
+        "SlowStrategy",
+    ]
+    assert all(s.module_name.startswith("src.strategies.evolved.") for s in specs)
+
+
+def test_score_signals_holds_last_signal_and_charges_cost():
+    close = pd.Series([100.0, 110.0, 121.0, 121.0])
+    signals = pd.Series([1, 0, 0, -1])
+
+    daily = score_signals(signals, close, cost=0.01)
+
+    np.testing.assert_allclose(daily.values, [-0.01, 0.1, 0.1, 0.0 - 0.02])
+
+
+def test_bad_modules_are_isolated(strategy_dir, price_data):
+    runner = StrategyEvaluationRunner(price_data, workers=2, timeout=10, memory_limit_mb=512)
+
+    results = {r["class_name"]: r for r in runner.run(discover_strategies([strategy_dir]))}
+
+    assert results["MomentumStrategy"]["status"] == "ok"
+    assert results["MomentumStrategy"]["name"] == "Momentum"
+    assert results["MomentumStrategy"]["trades"] > 0
+    assert results["SlowStrategy"]["status"] == "timeout"
+    assert results["CrashStrategy"]["status"] == "crashed"
+    assert results["HogStrategy"]["status"] == "memory_limit"
+
+
+def test_run_all_ranks_by_sharpe(strategy_dir, price_data):
+    specs = [s for s in discover_strategies([strategy_dir]) if s.class_name in ("MomentumStrategy", "CrashStrategy")]
+    runner = StrategyEvaluationRunner(price_data, workers=1, timeout=10, memory_limit_mb=None)
+
+    board = runner.run_all(specs)
+
+    assert list(board["class_name"]) == ["MomentumStrategy", "CrashStrategy"]
+    assert np.isfinite(board.loc[0, "sharpe_ratio"])
@@ -0,0 +1,107 @@
+import pandas as pd
+import pytest
+
+import src.execution.execution_engine as ee
+from src.execution import ExecutionEngine, RiskContext
+
+
+class CountingPaperTrader:
+    def __init__(self, positions: pd.DataFrame, total_equity: float = 1_000_000, cash: float = 900_000):
+        self._positions = positions
+        self._balance = {"total_equity": total_equity, "cash": cash}
+        self.initial_capital = total_equity
+        self.calls = {"get_positions": 0, "get_current_balance": 0, "get_equity_history": 0}
+        self.trades = []
+
+    def get_positions(self) -> pd.DataFrame:
+        self.calls["get_positions"] += 1
+        return self._positions
+
+    def get_current_balance(self):
+        self.calls["get_current_balance"] += 1
+        return self._balance
+
+    def get_equity_history(self):
+        self.calls["get_equity_history"] += 1
+        return pd.DataFrame({"date": pd.date_range("2024-01-01", periods=5), "total_equity": [100, 99, 101, 98, 100]})
+
+    def execute_trade(self, ticker, action, qty, price, **kwargs):
+        self.trades.append((ticker, action, qty))
+        return True
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    positions = pd.DataFrame([{"ticker": "HELD", "quantity": 100, "current_price": 1000.0, "market_value": 100_000.0}])
+    pt = CountingPaperTrader(positions)
+    engine = ExecutionEngine(pt)
+    engine.exposure_limits = {"max_per_ticker_pct": 0.25, "max_per_sector_pct": 0.35}
+
+    calls = {"external": 0, "fundamental": 0}
+
+    def fake_external(period="2y"):
+        calls["external"] += 1
+        return {"VIX": pd.DataFrame({"Close": [20.0]})}
+
+    def fake_fundamental(ticker):
+        calls["fundamental"] += 1
+        return {"sector": "Tech" if ticker.startswith(("T", "HELD")) else "Other"}
+
+    monkeypatch.setattr(ee, "fetch_external_data", fake_external)
+    monkeypatch.setattr(ee, "fetch_fundamental_data", fake_fundamental)
+    monkeypatch.setattr(ee, "quick_health_check", lambda endpoints=None: {})
+    monkeypatch.setattr(engine, "check_risk", lambda: True)
+    engine.calls = calls
+    return engine
+
+
+def test_batch_fetches_risk_inputs_once(engine):
+    signals = [{"ticker": f"O{i}", "action": "BUY", "confidence": 0.01} for i in range(50)]
+    prices = {f"O{i}": 100.0 for i in range(50)}
+
+    trades = engine.execute_orders(signals, prices)
+
+    assert len(trades) == 50
+    assert engine.pt.calls == {"get_positions": 1, "get_current_balance": 1, "get_equity_history": 1}
+    assert engine.calls["external"] == 1
+    # セクターは保有銘柄と発注銘柄それぞれ1回だけ
+    assert engine.calls["fundamental"] == 51
+
+
+def test_sector_limit_accounts_for_fills_within_the_batch(engine):
+    # HELD(Tech) 10% + 各 10% の Tech 買い → 3件目で 35% を超える
+    signals = [{"ticker": t, "action": "BUY", "quantity": 100} for t in ["T1", "T2", "T3", "X1"]]
+    prices = {t: 1000.0 for t in ["T1", "T2", "T3", "X1"]}
+
+    trades = engine.execute_orders(signals, prices)
+
+    assert [t["ticker"] for t in trades] == ["T1", "T2", "X1"]
+    # 数量指定のみのバッチでは VIX / CVaR を取得しない
+    assert engine.calls["external"] == 0
+    assert engine.pt.calls["get_equity_history"] == 0
+
+
+def test_sell_uses_snapshot_and_updates_context(engine):
+    signals = [
+        {"ticker": "HELD", "action": "SELL"},
+        {"ticker": "HELD", "action": "SELL"},
+    ]
+
+    trades = engine.execute_orders(signals, {"HELD": 1100.0})
+
+    assert [(t["ticker"], t["quantity"]) for t in trades] == [("HELD", 100)]
+    assert engine.pt.calls["get_positions"] == 1
+
+
+def test_with_fill_returns_new_context():
+    ctx = RiskContext(equity=1000.0, cash=500.0, initial_capital=1000.0, quantities={"A": 10}, values={"A": 500.0})
+
+    bought = ctx.with_fill("B", "BUY", 2, 50.0, "Tech")
+    sold = bought.with_fill("A", "SELL", 4, 60.0)
+
+    assert ctx.values == {"A": 500.0} and ctx.cash == 500.0
+    assert bought.values == {"A": 500.0, "B": 100.0} and bought.cash == 400.0 and bought.sectors == {"B": "Tech"}
+    assert sold.quantities == {"A": 6, "B": 2}
+    assert sold.values["A"] == pytest.approx(300.0)
+    assert sold.cash == pytest.approx(640.0)
+    assert sold.equity == pytest.approx(1040.0)
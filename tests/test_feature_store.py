@@ -0,0 +1,172 @@
+"""
+特徴量ストアのテスト
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.feature_store import DEFAULT_FEATURE_SETS, FeatureSet, FeatureStore, frame_key
+
+
+@pytest.fixture
+def ohlcv():
+    rng = np.random.default_rng(1)
+    close = 100 + rng.normal(size=400).cumsum()
+    return pd.DataFrame(
+        {"Close": close, "Volume": rng.integers(1_000, 5_000, 400).astype(float)},
+        index=pd.date_range("2020-01-01", periods=400, freq="B"),
+    )
+
+
+class CountingFeatures:
+    """呼び出し回数と入力行数を記録する特徴量関数"""
+
+    def __init__(self):
+        self.rows = []
+
+    def __call__(self, df):
+        self.rows.append(len(df))
+        out = df.copy()
+        out["SMA_20"] = df["Close"].rolling(20).mean()
+        out["Ret_5"] = df["Close"].pct_change(5)
+        return out
+
+
+@pytest.fixture
+def store(tmp_path):
+    func = CountingFeatures()
+    store = FeatureStore(str(tmp_path), feature_sets=[FeatureSet("test", func, version="1", lookback=30)])
+    store.func = func
+    return store
+
+
+def test_incremental_rows_match_full_recompute(store, ohlcv):
+    store.get_features(ohlcv.iloc[:300], "test", key="7203.T")
+    result = store.get_features(ohlcv, "test", key="7203.T")
+
+    # 2回目は新しい100行 + lookback 30行だけを計算
+    assert store.func.rows == [300, 130]
+    assert store.get_stats()["incremental"] == 1
+
+    expected = CountingFeatures()(ohlcv)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+
+def test_cache_hit_serves_subrange_without_compute(store, ohlcv):
+    store.get_features(ohlcv, "test", key="7203.T")
+    window = store.get_features(ohlcv.iloc[100:200], "test", key="7203.T")
+
+    assert store.func.rows == [400]
+    assert store.get_stats()["hits"] == 1
+    assert window.index[0] == ohlcv.index[100] and window.index[-1] == ohlcv.index[199]
+    # 保存済みの長い履歴から計算された値なので先頭も NaN にならない
+    assert not window["SMA_20"].isna().any()
+
+
+def test_changed_history_triggers_full_recompute(store, ohlcv):
+    store.get_features(ohlcv.iloc[:300], "test", key="X")
+    adjusted = ohlcv.copy()
+    adjusted["Close"] *= 0.5  # 株式分割の遡及調整
+
+    result = store.get_features(adjusted, "test", key="X")
+
+    assert store.func.rows == [300, 400]
+    assert result["Close"].iloc[0] == pytest.approx(adjusted["Close"].iloc[0])
+
+
+def test_version_bump_invalidates(tmp_path, ohlcv):
+    func = CountingFeatures()
+    for version in ("1", "2"):
+        store = FeatureStore(str(tmp_path), [FeatureSet("test", func, version=version, lookback=30)])
+        store.get_features(ohlcv, "test", key="K")
+    assert func.rows == [400, 400]
+
+
+def test_get_matrix_is_float32_multiindex(store, ohlcv):
+    other = ohlcv * 2
+    matrix = store.get_matrix({"A": ohlcv, "B": other}, "test", start=ohlcv.index[50])
+
+    assert list(matrix.columns) == ["SMA_20", "Ret_5"]
+    assert set(matrix.dtypes) == {np.dtype(np.float32)}
+    assert matrix.index.names == ["ticker", "date"]
+    assert len(matrix.loc["A"]) == len(matrix.loc["B"]) == 350
+
+
+def test_frame_key_is_stable_when_rows_are_appended(ohlcv):
+    assert frame_key(ohlcv.iloc[:300]) == frame_key(ohlcv)
+    assert frame_key(ohlcv.iloc[1:]) != frame_key(ohlcv)
+
+
+@pytest.fixture
+def full_ohlcv():
+    rng = np.random.default_rng(2)
+    close = 100 * np.exp(rng.normal(0, 0.02, 500).cumsum())
+    return pd.DataFrame(
+        {
+            "Open": close * (1 + rng.normal(0, 0.005, 500)),
+            "High": close * 1.01,
+            "Low": close * 0.99,
+            "Close": close,
+            "Volume": rng.integers(100_000, 500_000, 500).astype(float),
+        },
+        index=pd.date_range("2020-01-01", periods=500, freq="B"),
+    )
+
+
+@pytest.mark.parametrize("name", [fs.name for fs in DEFAULT_FEATURE_SETS])
+def test_default_sets_match_full_recompute_after_append(tmp_path, full_ohlcv, name):
+    store = FeatureStore(str(tmp_path))
+    store.get_features(full_ohlcv.iloc[:300], name, key="7203.T")
+
+    result = store.get_features(full_ohlcv, name, key="7203.T")
+
+    # 追加分だけ増分計算し、履歴全体に依存する列（分位点・OBV・EMA など）は history で全期間から計算し直す
+    assert store.get_stats()["incremental"] == 1
+    expected = store.feature_sets[name].func(full_ohlcv)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+
+def test_non_incremental_set_serves_cache_for_covered_range(tmp_path, ohlcv):
+    func = CountingFeatures()
+    store = FeatureStore(str(tmp_path), [FeatureSet("test", func, incremental=False)])
+
+    store.get_features(ohlcv.iloc[:300], "test", key="K")
+    store.get_features(ohlcv.iloc[100:300], "test", key="K")
+    store.get_features(ohlcv, "test", key="K")
+
+    assert func.rows == [300, 400]
+    assert store.get_stats() == {"hits": 1, "incremental": 0, "full": 2}
+
+
+def test_windows_of_different_length_share_one_cache(store, ohlcv):
+    # 長い履歴と直近 100 行の窓を交互に渡しても、互いの保存結果を壊さない
+    for end in (300, 301, 302):
+        store.get_features(ohlcv.iloc[:end], "test", key="7203.T")
+        window = store.get_features(ohlcv.iloc[end - 100 : end], "test", key="7203.T")
+        assert len(window) == 100
+
+    assert store.func.rows == [300, 31, 31]
+    assert store.get_stats() == {"hits": 3, "incremental": 2, "full": 1}
+
+
+def test_anonymous_frames_are_not_written_to_disk(tmp_path, ohlcv):
+    func = CountingFeatures()
+    store = FeatureStore(str(tmp_path), [FeatureSet("test", func, lookback=30)], max_memory_frames=2)
+
+    for start in range(5):
+        store.get_features(ohlcv.iloc[start:], "test")
+    store.get_features(ohlcv.iloc[4:], "test")
+
+    assert not list(tmp_path.rglob("*.*"))
+    assert len(store._memory) == 2
+    assert store.get_stats()["hits"] == 1
+
+
+def test_short_frames_are_persisted(store, ohlcv):
+    window = ohlcv.iloc[-20:]
+    store.get_features(window, "test", key="7203.T")
+    store.get_features(window, "test", key="7203.T")
+
+    assert store.func.rows == [20]
+    assert store.get_stats()["hits"] == 1
@@ -0,0 +1,224 @@
+"""
+FeedService のテスト（ローカル HTTP サーバーでフィードを配信）
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.data.feed_service import FeedService, article_key
+
+RSS_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>{name}</title>{items}</channel></rss>
+"""
+ITEM_TEMPLATE = "<item><title>{title}</title><link>{link}</link><description>{title} summary</description></item>"
+
+
+class FeedServer:
+    """パスごとの記事リストを配信し、ETag が一致すれば 304 を返す"""
+
+    def __init__(self, delay: float = 0.0):
+        self.feeds = {}
+        self.requests = []
+        self.delay = delay
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append((self.path, self.headers.get("If-None-Match")))
+                time.sleep(server.delay)
+                items = server.feeds.get(self.path)
+                if items is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                etag = f'"{hash(tuple(items))}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = RSS_TEMPLATE.format(
+                    name=self.path,
+                    items="".join(ITEM_TEMPLATE.format(title=t, link=l) for t, l in items),
+                ).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/rss+xml")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.httpd.server_port}{path}"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    srv = FeedServer()
+    yield srv
+    srv.close()
+
+
+@pytest.fixture
+def service(tmp_path):
+    return FeedService(db_path=str(tmp_path / "news.db"), max_workers=4, timeout=5)
+
+
+def test_feeds_are_fetched_concurrently(tmp_path, service):
+    srv = FeedServer(delay=0.3)
+    try:
+        for i in range(4):
+            srv.feeds[f"/f{i}"] = [(f"Headline {i}", f"http://news.example/{i}")]
+
+        start = time.time()
+        result = service.fetch({f"src{i}": srv.url(f"/f{i}") for i in range(4)})
+
+        # 逐次なら 4 × 0.3 秒
+        assert time.time() - start < 0.9
+        assert [a["title"] for a in result["articles"]] == [f"Headline {i}" for i in range(4)]
+        assert [a["source"] for a in result["articles"]] == [f"src{i}" for i in range(4)]
+        assert result["new_count"] == 4
+    finally:
+        srv.close()
+
+
+def test_unchanged_feed_is_not_downloaded_again(server, service):
+    server.feeds["/a"] = [("Newest", "http://news.example/2"), ("Older", "http://news.example/1")]
+    first = service.fetch([server.url("/a")])
+
+    second = service.fetch([server.url("/a")])
+
+    assert server.requests[0][1] is None and server.requests[1][1] is not None
+    assert second["feeds"][server.url("/a")]["status"] == 304
+    assert second["new_count"] == 0
+    # 304 でも保存済みの記事を新しい順で返す
+    assert [a["title"] for a in second["articles"]] == [a["title"] for a in first["articles"]] == ["Newest", "Older"]
+    assert service.stats["not_modified"] == 1
+
+
+def test_duplicates_across_sources_and_tracking_params_are_stored_once(server, service):
+    server.feeds["/a"] = [("Toyota raises guidance", "http://news.example/toyota?utm_source=a")]
+    server.feeds["/b"] = [
+        ("TOYOTA  raises guidance", "http://mirror.example/toyota"),
+        ("Sony beats", "http://news.example/sony"),
+    ]
+    server.feeds["/c"] = [("Toyota raises guidance", "http://news.example/toyota?utm_source=c")]
+
+    result = service.fetch({"a": server.url("/a"), "b": server.url("/b"), "c": server.url("/c")})
+
+    assert result["new_count"] == 2
+    assert service.article_count() == 2
+    assert article_key("http://news.example/toyota?utm_source=a") == article_key("http://news.example/toyota/")
+
+
+def test_query_parameters_identify_distinct_articles(server, service):
+    server.feeds["/a"] = [
+        ("Market update", "http://news.example/article?id=2"),
+        ("Market update (morning)", "http://news.example/article?id=1"),
+    ]
+
+    result = service.fetch([server.url("/a")])
+
+    assert result["new_count"] == 2
+    assert article_key("http://news.example/article?id=1") != article_key("http://news.example/article?id=2")
+    assert article_key("http://news.example/article?utm_medium=rss&id=1#top") == article_key(
+        "http://news.example/article?id=1"
+    )
+
+
+def test_recurring_headline_is_stored_again_after_title_window(server, service):
+    server.feeds["/a"] = [("日経平均、反発", "http://news.example/2024-05-01")]
+    service.fetch([server.url("/a")])
+
+    # 同じ見出しでも、前回保存から title_window_hours を過ぎた別 URL の記事は新しい記事
+    with sqlite3.connect(service.db_path) as conn:
+        old = (datetime.now() - timedelta(hours=service.title_window_hours + 1)).isoformat()
+        conn.execute("UPDATE articles SET fetched_at = ?", (old,))
+    server.feeds["/a"] = [("日経平均、反発", "http://news.example/2024-05-02")]
+    result = service.fetch([server.url("/a")])
+
+    assert result["new_count"] == 1
+    assert service.article_count() == 2
+
+
+def test_old_store_with_unique_titles_is_migrated(tmp_path):
+    db_path = str(tmp_path / "news.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE articles (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                url_hash TEXT NOT NULL UNIQUE,
+                title_hash TEXT NOT NULL UNIQUE,
+                feed_url TEXT NOT NULL,
+                source TEXT,
+                title TEXT,
+                link TEXT,
+                published TEXT,
+                summary TEXT,
+                fetched_at TEXT
+            )""")
+        conn.execute(
+            "INSERT INTO articles (seq, url_hash, title_hash, feed_url, title, fetched_at) "
+            "VALUES (7, 'u', 't', 'f', 'Old', '')"
+        )
+
+    service = FeedService(db_path=db_path)
+
+    assert [(a["seq"], a["title"]) for a in service.new_articles("sentiment")] == [(7, "Old")]
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO articles (url_hash, title_hash, feed_url) VALUES ('u2', 't', 'f')")
+        assert conn.execute("SELECT MAX(seq) FROM articles").fetchone()[0] == 8
+
+
+def test_consumers_only_see_new_articles(server, service):
+    server.feeds["/a"] = [("First", "http://news.example/1")]
+    service.fetch([server.url("/a")])
+    assert [a["title"] for a in service.new_articles("sentiment")] == ["First"]
+    assert service.new_articles("sentiment") == []
+
+    server.feeds["/a"] = [("Third", "http://news.example/3"), ("Second", "http://news.example/2")]
+    service.fetch([server.url("/a")])
+
+    assert [a["title"] for a in service.new_articles("sentiment")] == ["Second", "Third"]
+    # 利用者ごとに独立した既読位置
+    assert [a["title"] for a in service.new_articles("aggregator", advance=False)] == ["First", "Second", "Third"]
+    assert len(service.new_articles("aggregator")) == 3
+
+
+def test_failing_feed_does_not_block_others(server, service):
+    server.feeds["/ok"] = [("Fine", "http://news.example/ok")]
+
+    result = service.fetch([server.url("/missing"), server.url("/ok"), "http://127.0.0.1:1/refused"])
+
+    assert [a["title"] for a in result["articles"]] == ["Fine"]
+    assert result["feeds"][server.url("/missing")]["status"] == 404
+    assert result["feeds"]["http://127.0.0.1:1/refused"]["status"] is None
+    assert service.stats["errors"] == 2
+
+
+def test_new_articles_can_be_limited_to_feeds(server, service):
+    server.feeds["/a"] = [("From A", "http://news.example/a")]
+    server.feeds["/b"] = [("From B", "http://news.example/b")]
+    service.fetch([server.url("/a")])
+    service.fetch([server.url("/b")])
+
+    assert [a["title"] for a in service.new_articles("sentiment", feeds=[server.url("/b")])] == ["From B"]
+    # 対象外のフィードの記事も既読として読み飛ばす
+    assert service.new_articles("sentiment") == []
+    assert [a["title"] for a in service.new_articles("other", feeds=[server.url("/a")], limit=1)] == ["From A"]
+    assert [a["title"] for a in service.new_articles("other")] == ["From B"]
@@ -0,0 +1,124 @@
+"""
+FilingWatcher のパイプライン処理のテスト（外部依存はモック）
+"""
+
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.generativeai")
+
+import src.rag.filing_watcher as fw  # noqa: E402
+
+
+def fake_extract(path):
+    time.sleep(0.1)
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return {"text": text, "metadata": {"ticker": os.path.basename(path)[:4], "company": "Test"}}
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    with patch.object(fw, "EarningsRAG"), patch.object(fw, "EarningsAnalyzer") as analyzer, patch.object(
+        fw, "EarningsHistory"
+    ), patch.object(fw, "SmartNotifier"), patch.object(fw, "EventTrader") as trader, patch.object(
+        fw, "extract_filing", fake_extract
+    ):
+        analyzer.return_value.analyze.side_effect = lambda data, rag, doc_id: (
+            time.sleep(0.1),
+            {"recommendation": "BUY"},
+        )[1]
+        trader.return_value.handle_high_impact_event.return_value = {"status": "skipped"}
+        yield fw.FilingWatcher(
+            str(tmp_path / "new"), str(tmp_path / "done"), settle_seconds=0, use_processes=False, extract_workers=4
+        )
+
+
+def write(watcher, name, text):
+    with open(os.path.join(watcher.watch_dir, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_burst_is_processed_in_parallel(watcher):
+    for i in range(12):
+        write(watcher, f"{1000 + i}_tanshin.pdf", f"filing {i}")
+
+    start = time.time()
+    results = watcher.scan_and_process()
+
+    # 逐次なら 12 × 0.2 秒
+    assert time.time() - start < 1.5
+    assert [r["status"] for r in results] == ["processed"] * 12
+    assert os.listdir(watcher.watch_dir) == []
+    assert all(r["timings"].keys() == {"extract", "index", "analyze", "act"} for r in results)
+
+
+def test_same_content_is_processed_once(watcher):
+    write(watcher, "7203_a.pdf", "same filing")
+    write(watcher, "7203_b.pdf", "same filing")
+    statuses = sorted(r["status"] for r in watcher.scan_and_process())
+    # 2つ目は1つ目の処理中に見つかるので保留し、1つ目の成功後に重複として移動する
+    assert statuses == ["deferred", "processed"]
+    assert [r["status"] for r in watcher.scan_and_process()] == ["duplicate"]
+
+    write(watcher, "7203_c.pdf", "same filing")
+    assert [r["status"] for r in watcher.scan_and_process()] == ["duplicate"]
+    assert watcher.analyzer.analyze.call_count == 1
+
+
+def test_unchanged_failures_are_not_retried(watcher):
+    write(watcher, "empty.pdf", "")
+    assert [r["status"] for r in watcher.scan_and_process()] == ["no_text"]
+    assert watcher.scan_and_process() == []
+
+    time.sleep(0.01)
+    write(watcher, "empty.pdf", "text arrived")
+    assert [r["status"] for r in watcher.scan_and_process()] == ["processed"]
+
+
+def test_transient_failure_is_retried_with_backoff(watcher):
+    analyze = watcher.analyzer.analyze
+    analyze.side_effect = [TimeoutError("LLM timeout"), {"recommendation": "HOLD"}]
+    write(watcher, "7203_a.pdf", "filing")
+    assert [r["status"] for r in watcher.scan_and_process()] == ["failed"]
+
+    # 待ち時間中は再試行しない
+    assert watcher.scan_and_process() == []
+
+    watcher._retry[os.path.join(watcher.watch_dir, "7203_a.pdf")] = (0.0, 1)
+    assert [r["status"] for r in watcher.scan_and_process()] == ["processed"]
+    assert watcher._retry == {}
+
+
+def test_deferred_copy_is_processed_when_first_copy_fails(watcher):
+    analyze = watcher.analyzer.analyze
+    analyze.side_effect = [TimeoutError("LLM timeout"), {"recommendation": "HOLD"}]
+    write(watcher, "7203_a.pdf", "same filing")
+    write(watcher, "7203_b.pdf", "same filing")
+    results = {r["status"]: r["filename"] for r in watcher.scan_and_process()}
+    assert sorted(results) == ["deferred", "failed"]
+
+    # 失敗した方は待ち時間中なので、保留していた方を処理する
+    assert [r["filename"] for r in watcher.scan_and_process()] == [results["deferred"]]
+    assert os.listdir(watcher.watch_dir) == [results["failed"]]
+
+
+def test_failed_move_after_acting_does_not_act_again(watcher):
+    write(watcher, "7203_a.pdf", "filing")
+    move = fw.shutil.move
+    with patch.object(fw.shutil, "move", side_effect=OSError("disk full")):
+        assert [r["status"] for r in watcher.scan_and_process()] == ["failed"]
+
+    watcher._retry[os.path.join(watcher.watch_dir, "7203_a.pdf")] = (0.0, 1)
+    with patch.object(fw.shutil, "move", move):
+        assert [r["status"] for r in watcher.scan_and_process()] == ["processed"]
+
+    # 再試行では移動と記録だけを行い、通知・発注は1回のまま
+    assert watcher.event_trader.handle_high_impact_event.call_count == 1
+    assert watcher.notifier.send_text.call_count == 1
+    assert os.listdir(watcher.watch_dir) == []
+    assert all("processed_at" in entry for entry in watcher._ledger.values())
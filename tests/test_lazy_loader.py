@@ -0,0 +1,134 @@
+"""
+LazyModelLoader のメモリ予算・統計テスト
+"""
+
+import threading
+import time
+
+from src.lazy_loader import LazyModelLoader, estimate_size_bytes
+
+
+class DummyModel:
+    def __init__(self, name):
+        self.name = name
+
+
+def _loader(name, calls=None, delay=0.0):
+    def load():
+        if calls is not None:
+            calls.append(name)
+        time.sleep(delay)
+        return DummyModel(name)
+
+    return load
+
+
+def test_lazy_load_and_hit_stats():
+    loader = LazyModelLoader()
+    loader.register("lgbm", _loader("lgbm"), size_mb=10)
+
+    assert not loader.is_loaded("lgbm")
+    first = loader.get("lgbm")
+    second = loader.get("lgbm")
+
+    assert first is second
+    stats = loader.get_stats()["lgbm"]
+    assert stats["loads"] == 1
+    assert stats["hits"] == 1
+    assert stats["size_mb"] == 10.0
+    assert stats["loaded"]
+    assert loader.get("unknown") is None
+
+
+def test_budget_evicts_least_recently_used():
+    loader = LazyModelLoader(memory_budget_mb=25)
+    for name in ("a", "b", "c"):
+        loader.register(name, _loader(name), size_mb=10)
+
+    loader.get("a")
+    loader.get("b")
+    loader.get("a")  # b が最も古くなる
+    loader.get("c")
+
+    assert loader.get_status()["loaded"] == ["a", "c"]
+    assert loader.get_stats()["b"]["evictions"] == 1
+    assert loader.resident_bytes() <= 25 * 1024 * 1024
+
+
+def test_eviction_runs_unload_hook():
+    shared = {}
+
+    def load_singleton():
+        shared.setdefault("model", DummyModel("bert"))
+        return shared["model"]
+
+    loader = LazyModelLoader(memory_budget_mb=15)
+    loader.register("bert", load_singleton, size_mb=10, on_unload=lambda model: shared.pop("model"))
+    loader.register("lgbm", _loader("lgbm"), size_mb=10)
+
+    loader.get("bert")
+    loader.get("lgbm")
+
+    assert not loader.is_loaded("bert")
+    assert shared == {}
+
+
+def test_budget_respects_priority():
+    loader = LazyModelLoader(memory_budget_mb=25)
+    loader.register("keep", _loader("keep"), size_mb=10, priority=5)
+    loader.register("x", _loader("x"), size_mb=10)
+    loader.register("y", _loader("y"), size_mb=10)
+
+    loader.get("keep")
+    loader.get("x")
+    loader.get("y")
+
+    assert loader.is_loaded("keep")
+    assert not loader.is_loaded("x")
+
+
+def test_concurrent_loads_are_deduplicated():
+    calls = []
+    loader = LazyModelLoader()
+    loader.register("bert", _loader("bert", calls, delay=0.1))
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(loader.get("bert"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ["bert"]
+    assert len({id(r) for r in results}) == 1
+
+
+def test_preload_hot_models_in_background():
+    loader = LazyModelLoader()
+    loader.register("lgbm", _loader("lgbm"), hot=True)
+    loader.register("prophet", _loader("prophet"))
+
+    thread = loader.preload()
+    thread.join(timeout=5)
+
+    assert loader.is_loaded("lgbm")
+    assert not loader.is_loaded("prophet")
+
+
+def test_failed_load_is_counted():
+    loader = LazyModelLoader()
+
+    def broken():
+        raise RuntimeError("missing weights")
+
+    loader.register("rl", broken)
+    assert loader.get("rl") is None
+    assert loader.get_stats()["rl"]["failures"] == 1
+
+
+def test_estimate_size_counts_arrays():
+    import numpy as np
+
+    model = DummyModel("m")
+    model.weights = [np.zeros(1000, dtype=np.float64), np.zeros(500, dtype=np.float32)]
+    assert estimate_size_bytes(model) >= 8000 + 2000
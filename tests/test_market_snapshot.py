@@ -0,0 +1,94 @@
+"""
+サイクル単位マーケットデータスナップショットのテスト
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.market_snapshot import MarketDataSnapshot
+
+
+class FakeFetcher:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, tickers, period):
+        self.calls.append((list(tickers), period))
+        index = pd.date_range(end=datetime.now(), periods=800, freq="D").normalize()
+        return {
+            t: pd.DataFrame({"Close": np.arange(800, dtype=float) + i, "Volume": np.ones(800, dtype=int)}, index=index)
+            for i, t in enumerate(tickers)
+            if t != "MISSING"
+        }
+
+
+@pytest.fixture
+def fetcher():
+    return FakeFetcher()
+
+
+def test_one_load_per_ticker_across_periods(fetcher):
+    snapshot = MarketDataSnapshot(period="2y", fetcher=fetcher)
+    snapshot.load(["A", "B"])
+
+    month = snapshot.get_many(["A", "B"], period="1mo")
+    quarter = snapshot.get_many(["A"], period="3mo")
+    full = snapshot.get_many(["A", "B"])
+
+    assert fetcher.calls == [(["A", "B"], "2y")]
+    assert len(month["A"]) < len(quarter["A"]) < len(full["A"])
+    assert month["A"].index[0] >= pd.Timestamp(datetime.now() - timedelta(days=31)).normalize()
+    assert snapshot.get_stats()["hits"] == 5
+    assert snapshot.get_stats()["misses"] == 0
+
+
+def test_misses_are_batched_and_not_refetched(fetcher):
+    snapshot = MarketDataSnapshot(fetcher=fetcher)
+    snapshot.load(["A"])
+
+    result = snapshot.get_many(["A", "C", "MISSING"], period="3mo")
+    snapshot.get_many(["C", "MISSING"])
+
+    assert fetcher.calls == [(["A"], "2y"), (["C", "MISSING"], "2y")]
+    assert set(result) == {"A", "C"}
+    stats = snapshot.get_stats()
+    assert stats["misses"] == 2 and stats["tickers"] == 3 and stats["fetch_calls"] == 2
+
+
+def test_longer_period_reloads_only_that_ticker(fetcher):
+    snapshot = MarketDataSnapshot(period="1y", fetcher=fetcher)
+    snapshot.load(["A", "B"])
+    snapshot.get_many(["A"], period="2y")
+
+    assert fetcher.calls[-1] == (["A"], "2y")
+
+
+def test_views_are_read_only_but_extendable(fetcher):
+    snapshot = MarketDataSnapshot(fetcher=fetcher)
+    view = snapshot.get("A", period="1mo")
+
+    with pytest.raises(ValueError):
+        view.iloc[0, 0] = -1.0
+
+    view["Return"] = view["Close"].pct_change()
+    assert "Return" not in snapshot.get("A").columns
+    assert view["Volume"].dtype == np.float64
+
+
+def test_paper_trader_positions_use_snapshot(tmp_path, fetcher):
+    from src.paper_trader import PaperTrader
+
+    pt = PaperTrader(db_path=str(tmp_path / "pt.db"), initial_capital=1_000_000)
+    pt.execute_trade("A", "BUY", 10, 100.0)
+
+    snapshot = MarketDataSnapshot(fetcher=fetcher)
+    pt.market_snapshot = snapshot
+    positions = pt.get_positions()
+    pt.get_positions()
+
+    assert fetcher.calls == [(["A"], "2y")]
+    assert positions.iloc[0]["current_price"] == pytest.approx(799.0)
+    assert snapshot.get_stats()["hits"] == 1
@@ -0,0 +1,107 @@
+"""
+OnlineLGBMPredictor の増分ウォームスタート学習のテスト
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("lightgbm")
+
+from src.online_lgbm import OnlineLGBMPredictor  # noqa: E402
+
+
+def simple_features(df, feature_set="phase29", key=None):
+    out = df.copy()
+    out["Ret_1"] = df["Close"].pct_change()
+    out["Ret_5"] = df["Close"].pct_change(5)
+    out["Vol_Ratio"] = df["Volume"] / df["Volume"].rolling(10).mean()
+    return out
+
+
+@pytest.fixture
+def ohlcv():
+    rng = np.random.default_rng(3)
+    close = 100 + rng.normal(size=700).cumsum()
+    return pd.DataFrame(
+        {"Close": close, "Volume": rng.integers(1_000, 5_000, 700).astype(float)},
+        index=pd.date_range("2021-01-01", periods=700, freq="B"),
+    )
+
+
+@pytest.fixture
+def predictor(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.features.feature_store.cached_features", simple_features)
+    monkeypatch.setattr("src.online_lgbm.ONLINE_MODEL_PATH", str(tmp_path / "legacy.pkl"))
+    return OnlineLGBMPredictor(
+        model_path=str(tmp_path / "online.txt"), window_size=200, rounds_per_update=10, max_trees=125
+    )
+
+
+def _a_week_later(predictor):
+    predictor.last_update = predictor.learner.last_update = datetime.now() - timedelta(days=8)
+
+
+def test_warm_start_appends_trees_on_window(predictor, ohlcv, tmp_path):
+    assert predictor.update_if_needed(ohlcv.iloc[:600], ticker="7203.T")
+    assert predictor.booster.num_trees() == predictor.initial_rounds
+    assert (tmp_path / "online.txt").exists() and (tmp_path / "online.json").exists()
+
+    _a_week_later(predictor)
+    assert predictor.update_if_needed(ohlcv, ticker="7203.T")
+
+    assert predictor.booster.num_trees() == predictor.initial_rounds + 10
+    history = predictor.learner.update_history[-1]
+    assert history["warm_start"] and history["n_samples"] <= 200
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_legacy_pickle_is_migrated(tmp_path, monkeypatch):
+    import shutil
+
+    shutil.copy("models/lgbm_online.pkl", tmp_path / "legacy.pkl")
+    monkeypatch.setattr("src.online_lgbm.ONLINE_MODEL_PATH", str(tmp_path / "legacy.pkl"))
+
+    migrated = OnlineLGBMPredictor(model_path=str(tmp_path / "online.txt"))
+    assert migrated.booster is not None and migrated.feature_cols
+
+
+def test_reload_skips_when_no_new_rows(predictor, ohlcv, tmp_path):
+    predictor.update_if_needed(ohlcv, ticker="7203.T")
+
+    reloaded = OnlineLGBMPredictor(model_path=str(tmp_path / "online.txt"), window_size=200)
+    assert reloaded.booster.num_trees() == predictor.booster.num_trees()
+    assert reloaded.feature_cols == ["Ret_1", "Ret_5", "Vol_Ratio"]
+
+    _a_week_later(reloaded)
+    assert not reloaded.update_if_needed(ohlcv, ticker="7203.T")
+
+
+def test_tree_budget_triggers_refit(predictor, ohlcv):
+    predictor.update_if_needed(ohlcv.iloc[:500], ticker="A")
+    for end in (550, 600, 650):
+        _a_week_later(predictor)
+        predictor.update_if_needed(ohlcv.iloc[:end], ticker="A")
+        assert predictor.booster.num_trees() <= predictor.max_trees
+
+    assert predictor.learner.update_history[-1]["warm_start"] is False
+
+
+def test_features_are_computed_only_for_training_tail(predictor, ohlcv, monkeypatch):
+    from src.online_lgbm import FEATURE_LOOKBACK
+
+    seen = []
+
+    def recording_features(df, feature_set="phase29", key=None):
+        seen.append(len(df))
+        return simple_features(df)
+
+    monkeypatch.setattr("src.features.feature_store.cached_features", recording_features)
+    window = predictor._training_window(ohlcv, "7203.T")
+
+    # 全700行ではなく学習ウィンドウ + ウォームアップ分だけを特徴量計算に渡す
+    assert seen == [min(len(ohlcv), predictor.window_size + 1 + FEATURE_LOOKBACK)]
+    assert len(window) == predictor.window_size
+    assert window.index[-1] == ohlcv.index[-2]
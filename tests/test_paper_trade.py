@@ -125,8 +125,74 @@ def test_balance_upsert_matches_recalc(monkeypatch, temp_db_path):
         # unrealized_pnl = (5 * 250) - (5 * 200) = 250
         # total_equity = 1000000 + 1000 + 250 = 1001250?
         # WAIT: get_current_balance calculates invested and pnl based on positions df
-        
+
         assert balance["total_equity"] == 1000000 + (5 * 250.0)
     finally:
         pt.close()
         conn.close()
+
+
+def test_update_position_stops_batch(paper_trader):
+    paper_trader.execute_trade("AAA", "BUY", 10, 100.0)
+    paper_trader.execute_trade("BBB", "BUY", 5, 200.0)
+
+    paper_trader.update_position_stops([("AAA", 95.0, 110.0), ("BBB", 190.0, 210.0)])
+
+    rows = dict(
+        (row[0], row[1:])
+        for row in paper_trader.conn.execute("SELECT ticker, stop_price, highest_price FROM positions")
+    )
+    assert rows == {"AAA": (95.0, 110.0), "BBB": (190.0, 210.0)}
+
+
+def test_ledger_aggregates_follow_orders(paper_trader):
+    paper_trader.execute_trade("AAA", "BUY", 100, 1000)
+    paper_trader.execute_trade("AAA", "BUY", 100, 1200)
+    paper_trader.execute_trade("AAA", "SELL", 50, 1300)
+
+    summary = paper_trader.get_ledger_summary()
+    assert summary["cash"] == 1000000 - 100000 - 120000 + 65000
+    assert summary["realized_pnl"] == pytest.approx(50 * (1300 - 1100))
+    assert summary["order_count"] == 3
+
+    ledger = paper_trader.get_ticker_ledger("AAA")
+    assert ledger["quantity"] == 150
+    assert ledger["cost_basis"] == pytest.approx(150 * 1100)
+    assert paper_trader.get_trade_history().iloc[0]["realized_pnl"] == pytest.approx(10000)
+
+
+def test_ledger_rebuilt_when_orders_written_externally(temp_db_path):
+    pt = PaperTrader(db_path=temp_db_path, initial_capital=1000000)
+    pt.execute_trade("AAA", "BUY", 10, 100.0)
+    pt.close()
+
+    conn = sqlite3.connect(temp_db_path)
+    conn.execute("INSERT INTO orders (ticker, action, quantity, price) VALUES ('AAA', 'SELL', 10, 150.0)")
+    conn.commit()
+    conn.close()
+
+    pt = PaperTrader(db_path=temp_db_path, initial_capital=1000000)
+    try:
+        summary = pt.get_ledger_summary()
+        assert summary["cash"] == 1000000 - 1000 + 1500
+        assert summary["realized_pnl"] == pytest.approx(500)
+        assert summary["cost_basis"] == 0
+        assert pt.get_ticker_ledger("AAA")["sell_quantity"] == 10
+    finally:
+        pt.close()
+
+
+def test_trade_page_cursor(paper_trader):
+    for i in range(5):
+        paper_trader.execute_trade("AAA" if i % 2 else "BBB", "BUY", 1, 100.0 + i)
+
+    first, cursor = paper_trader.get_trade_page(limit=2)
+    second, cursor2 = paper_trader.get_trade_page(limit=2, before_id=cursor)
+    last, cursor3 = paper_trader.get_trade_page(limit=2, before_id=cursor2)
+
+    ids = list(first["id"]) + list(second["id"]) + list(last["id"])
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 5
+    assert cursor3 is None
+
+    only_a, _ = paper_trader.get_trade_page(limit=10, ticker="AAA")
+    assert set(only_a["ticker"]) == {"AAA"} and len(only_a) == 2
@@ -3,7 +3,7 @@ import tempfile
 
 import pytest
 
-from src.rag.pdf_loader import PDFLoader
+from src.rag.pdf_loader import PDFLoader, extract_filing
 
 
 def _create_pdf_bytes(text: str) -> bytes:
@@ -48,3 +48,98 @@ def test_chunk_text_overlap():
     assert len(chunks) >= 3
     # Ensure overlap worked (chunk 1 tail equals chunk 2 head)
     assert chunks[0][-10:] in chunks[1]
+
+
+def _multipage_pdf_bytes(pages) -> bytes:
+    """Build a plain PDF with one line of Helvetica text per page (no reportlab needed)."""
+    n = len(pages)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(n))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode())
+    font_id = 3 + 2 * n
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+@pytest.fixture
+def report_path(tmp_path):
+    pages = [f"Page {i} revenue grew {i} percent " + "x" * 150 for i in range(1, 41)]
+    path = tmp_path / "annual_report.pdf"
+    path.write_bytes(_multipage_pdf_bytes(pages))
+    return path
+
+
+def test_iter_pages_parallel_matches_serial(report_path):
+    serial = list(PDFLoader.iter_pages(report_path))
+    parallel = list(PDFLoader.iter_pages(report_path, workers=2))
+
+    assert [n for n, _ in serial] == list(range(1, 41))
+    assert parallel == serial
+    assert "Page 17 revenue" in serial[16][1]
+
+
+def test_iter_chunks_streams_windows_with_page_numbers(report_path):
+    text = PDFLoader.extract_text(report_path)
+    chunks = list(PDFLoader.iter_chunks(report_path, chunk_size=500, overlap=100))
+
+    expected = PDFLoader.chunk_text(text, chunk_size=500, overlap=100)
+    assert [c["text"] for c in chunks] == expected[: len(chunks)]
+    assert all(len(e) <= 100 for e in expected[len(chunks) :])  # only trailing overlap is dropped
+    assert chunks[0]["page_start"] == 1 and chunks[-1]["page_end"] == 40
+    pages = dict(PDFLoader.iter_pages(report_path))
+    for chunk in chunks:
+        span = "\n\n".join(pages[n] for n in range(chunk["page_start"], chunk["page_end"] + 1))
+        assert chunk["text"] in span
+
+
+def test_page_cache_skips_extraction(report_path, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    first = PDFLoader.extract_text(report_path, cache_dir=str(cache_dir))
+    assert len(list(cache_dir.glob("*.jsonl"))) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("PDF parsed again")
+
+    monkeypatch.setattr(PDFLoader, "_parse_pages", fail)
+    assert PDFLoader.extract_text(report_path.read_bytes(), cache_dir=str(cache_dir)) == first
+    assert len(list(PDFLoader.iter_pages(report_path, max_pages=3, cache_dir=str(cache_dir)))) == 3
+
+
+def test_extract_filing_reads_ticker_from_filename(report_path, tmp_path):
+    filing = tmp_path / "7203_tanshin.pdf"
+    filing.write_bytes(report_path.read_bytes())
+
+    data = extract_filing(str(filing))
+
+    assert data["metadata"] == {"ticker": "7203", "company": "Unknown", "source": "7203_tanshin.pdf"}
+    assert "Page 1 revenue" in data["text"]
+    assert extract_filing(str(report_path))["metadata"]["ticker"] == "UNKNOWN"
+
+
+def test_iter_chunks_without_overlap_keeps_page_separators():
+    # Page 1 is exactly chunk_size long, so the buffer is empty at the page boundary
+    pages = [(1, "a" * 100), (2, "b" * 150), (3, "c" * 120)]
+    text = "\n\n".join(t for _, t in pages)
+
+    chunks = [c["text"] for c in PDFLoader.iter_chunks(pages, chunk_size=100, overlap=0)]
+
+    assert chunks == PDFLoader.chunk_text(text, chunk_size=100, overlap=0)
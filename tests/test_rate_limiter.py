@@ -0,0 +1,129 @@
+"""
+レートリミッター (GCRA) テスト
+"""
+
+import pytest
+
+from src.utils.rate_limiter import (
+    GCRALimiter,
+    MemoryRateLimitStore,
+    RateLimitConfig,
+    RateLimiter,
+    RouteRateLimiter,
+    SQLiteRateLimitStore,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_burst_then_sustained_rate(clock):
+    limiter = GCRALimiter(clock=clock)
+    config = RateLimitConfig(max_calls=60, time_window=60, burst=5)
+
+    results = [limiter.check("ip", config).allowed for _ in range(6)]
+    assert results == [True] * 5 + [False]
+
+    denied = limiter.check("ip", config)
+    assert denied.retry_after == pytest.approx(1.0)
+
+    clock.now += 1.0
+    assert limiter.check("ip", config).allowed
+    assert not limiter.check("ip", config).allowed
+
+
+def test_keys_are_independent(clock):
+    limiter = GCRALimiter(clock=clock)
+    config = RateLimitConfig(max_calls=2, time_window=60)
+
+    assert limiter.check("a", config).allowed
+    assert limiter.check("a", config).allowed
+    assert not limiter.check("a", config).allowed
+    assert limiter.check("b", config).allowed
+
+
+def test_memory_store_is_lru_bounded(clock):
+    store = MemoryRateLimitStore(max_keys=3)
+    limiter = GCRALimiter(store, clock=clock)
+    config = RateLimitConfig(max_calls=10, time_window=60)
+
+    for i in range(10):
+        limiter.check(f"client-{i}", config)
+
+    assert len(store) == 3
+    assert store.get("client-0") is None
+    assert store.get("client-9") is not None
+
+
+def test_memory_store_purge_drops_refilled_buckets(clock):
+    store = MemoryRateLimitStore()
+    limiter = GCRALimiter(store, clock=clock)
+    limiter.check("ip", RateLimitConfig(max_calls=60, time_window=60))
+
+    assert store.purge(now=clock.now) == 0
+    assert store.purge(now=clock.now + 2) == 1
+    assert len(store) == 0
+
+
+def test_sqlite_store_is_shared_between_limiters(tmp_path, clock):
+    db_path = str(tmp_path / "rate_limits.db")
+    config = RateLimitConfig(max_calls=3, time_window=60)
+
+    worker_a = GCRALimiter(SQLiteRateLimitStore(db_path), clock=clock)
+    worker_b = GCRALimiter(SQLiteRateLimitStore(db_path), clock=clock)
+
+    assert worker_a.check("ip", config).allowed
+    assert worker_b.check("ip", config).allowed
+    assert worker_a.check("ip", config).allowed
+    assert not worker_b.check("ip", config).allowed
+
+
+def test_sqlite_store_purge_respects_max_keys(tmp_path, clock):
+    store = SQLiteRateLimitStore(str(tmp_path / "rl.db"), max_keys=2)
+    limiter = GCRALimiter(store, clock=clock)
+    config = RateLimitConfig(max_calls=10, time_window=60)
+    for i in range(5):
+        limiter.check(f"k{i}", config)
+
+    store.purge(now=clock.now)
+    assert len(store) == 2
+
+
+def test_route_limits_use_longest_prefix(clock):
+    routes = {
+        "/api/v1/trades": RateLimitConfig(max_calls=1, time_window=60),
+        "/api": RateLimitConfig(max_calls=5, time_window=60),
+    }
+    limiter = RouteRateLimiter(RateLimitConfig(max_calls=100, time_window=60), routes, GCRALimiter(clock=clock))
+
+    assert limiter.resolve("/api/v1/trades/1")[0] == "/api/v1/trades"
+    assert limiter.resolve("/health")[0] == "*"
+
+    assert limiter.check("ip", "/api/v1/trades").allowed
+    assert not limiter.check("ip", "/api/v1/trades").allowed
+    # 別ルートのバケットは独立
+    assert limiter.check("ip", "/api/v1/alerts").allowed
+
+
+def test_rate_limiter_stats(clock):
+    limiter = RateLimiter(RateLimitConfig(max_calls=4, time_window=60, name="svc"), GCRALimiter(clock=clock))
+
+    assert limiter.wait_if_needed(timeout=0.01)
+    assert limiter.wait_if_needed(timeout=0.01)
+    stats = limiter.get_stats()
+
+    assert stats["current_calls"] == 2
+    assert stats["remaining"] == 2
+    assert stats["total_calls"] == 2
+    assert stats["reset_in_seconds"] == 30
+    assert limiter.can_proceed()
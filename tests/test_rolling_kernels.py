@@ -0,0 +1,61 @@
+"""
+ベクトル化ローリングカーネルのテスト（pandas rolling.apply との一致を確認）
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.rolling_kernels import (
+    rolling_autocorr,
+    rolling_fft_max_amplitude,
+    rolling_mad,
+    rolling_sum_of_squares,
+    rolling_windows,
+)
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    s = pd.Series(rng.normal(size=300).cumsum(), index=pd.date_range("2020-01-01", periods=300))
+    s.iloc[[50, 51, 200]] = np.nan
+    return s
+
+
+def test_sum_of_squares_matches_pandas(series):
+    expected = series.rolling(20).apply(lambda x: np.sum(x**2))
+    pd.testing.assert_series_equal(rolling_sum_of_squares(series, 20), expected)
+
+
+def test_mad_matches_pandas(series):
+    expected = series.rolling(14).apply(lambda x: np.abs(x - x.mean()).mean())
+    pd.testing.assert_series_equal(rolling_mad(series, 14), expected)
+
+
+def test_autocorr_matches_pandas(series):
+    expected = series.rolling(20).apply(lambda x: x.autocorr(lag=5))
+    pd.testing.assert_series_equal(rolling_autocorr(series, 20, lag=5), expected)
+
+
+def test_autocorr_constant_window_is_nan():
+    result = rolling_autocorr(pd.Series(np.ones(10)), 5, lag=1)
+    assert result.isna().all()
+
+
+@pytest.mark.parametrize("window", [30, 31])
+def test_fft_max_amplitude_matches_full_fft(series, window):
+    def reference(x):
+        fft_vals = np.fft.fft(x)
+        return np.abs(fft_vals[np.fft.fftfreq(len(x)) > 0]).max()
+
+    expected = series.rolling(window).apply(reference, raw=True)
+    pd.testing.assert_series_equal(rolling_fft_max_amplitude(series, window), expected)
+
+
+def test_short_input_and_ndarray():
+    values = np.arange(3, dtype=float)
+    assert rolling_windows(values, 5).shape == (0, 5)
+    result = rolling_sum_of_squares(values, 5)
+    assert isinstance(result, np.ndarray)
+    assert np.isnan(result).all()
@@ -40,22 +40,24 @@ def test_init(analyzer):
     assert len(analyzer.feeds) > 0
 
 
-@patch("src.sentiment.feedparser.parse")
-def test_fetch_news(mock_parse, analyzer):
+@patch("src.sentiment.get_feed_service")
+def test_fetch_news(mock_service, analyzer):
     """ニュース取得のテスト"""
-    # フィードのモックレスポンス
-    feed_mock = MagicMock()
-    entry = MagicMock()
-    entry.title = "Test News"
-    entry.link = "http://example.com"
-    entry.get.return_value = "Summary"
-    feed_mock.entries = [entry]
-    mock_parse.return_value = feed_mock
+    # フィードサービスのモックレスポンス
+    mock_service.return_value.fetch.return_value = {
+        "articles": [
+            {"title": "Test News", "link": "http://example.com", "published": None, "summary": "Summary"},
+        ],
+        "new_count": 1,
+        "feeds": {},
+    }
 
     news = analyzer.fetch_news(limit=5)
 
     assert len(news) > 0
     assert news[0]["title"] == "Test News"
+    assert news[0]["summary"] == "Summary"
+    mock_service.return_value.fetch.assert_called_once_with(analyzer.feeds, per_feed_limit=10)
 
 
 def test_analyze_sentiment(analyzer):
@@ -64,16 +66,18 @@ def test_analyze_sentiment(analyzer):
     assert score == 0.8
 
 
+@patch("src.sentiment.get_feed_service")
 @patch("src.sentiment.SentimentAnalyzer.fetch_news")
-def test_get_market_sentiment(mock_fetch, analyzer):
+def test_get_market_sentiment(mock_fetch, mock_service, analyzer):
     """市場センチメント取得のテスト"""
+    mock_service.return_value.new_articles.return_value = []
     mock_fetch.return_value = [
         {"title": "Good news", "summary": "Market is up"},
         {"title": "Bad news", "summary": "Market is down"},
     ]
 
     # BERTアナライザーのモック動作を調整
-    analyzer.bert_analyzer.analyze.side_effect = [{"score": 0.5}, {"score": -0.5}]
+    analyzer.bert_analyzer.analyze_batch.return_value = [{"score": 0.5}, {"score": -0.5}]
 
     sentiment = analyzer.get_market_sentiment()
 
@@ -82,6 +86,35 @@ def test_get_market_sentiment(mock_fetch, analyzer):
     assert sentiment["news_count"] == 2
 
 
+@patch("src.sentiment.get_feed_service")
+def test_articles_are_scored_once_when_they_arrive(mock_service, mock_bert, tmp_path):
+    """新着記事だけをスコアリングし、以降は保存済みスコアを使う"""
+    analyzer = SentimentAnalyzer(db_path=str(tmp_path / "sentiment.db"))
+    service = mock_service.return_value
+    bert = analyzer.bert_analyzer
+    news = [
+        {"title": "Good news", "link": "http://news.example/good", "summary": "Market is up"},
+        {"title": "Bad news", "link": "http://news.example/bad", "summary": "Market is down"},
+    ]
+    service.fetch.return_value = {"articles": [dict(article, published="") for article in news]}
+    service.new_articles.return_value = [dict(article, seq=i + 1) for i, article in enumerate(news)]
+    bert.analyze_batch.return_value = [{"score": 0.6}, {"score": 0.2}]
+
+    first = analyzer.get_market_sentiment()
+
+    service.new_articles.assert_called_once_with("sentiment", feeds=analyzer.feeds)
+    bert.analyze_batch.assert_called_once_with(["Good news Market is up", "Bad news Market is down"])
+    assert first["score"] == pytest.approx(0.4)
+
+    # 2回目: 新着なし → BERT は呼ばれず保存済みスコアを使う
+    service.new_articles.return_value = []
+    second = analyzer.get_market_sentiment()
+
+    assert bert.analyze_batch.call_count == 1
+    assert second["score"] == pytest.approx(0.4)
+    assert second["news_count"] == 2
+
+
 def test_save_sentiment_history(analyzer, mock_sqlite):
     """履歴保存のテスト"""
     data = {"score": 0.5, "label": "Positive", "news_count": 10}
@@ -0,0 +1,98 @@
+"""
+ensemble.stacking.StackingEnsemble の OOF 生成テスト
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression, Ridge
+
+from src.ensemble.stacking import PurgedKFold, StackingEnsemble
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 3)), columns=["a", "b", "c"])
+    y = pd.Series(X["a"] * 2 - X["b"] + rng.normal(scale=0.1, size=300))
+    return X, y
+
+
+class CountingModel(LinearRegression):
+    """fit 呼び出しを記録する推定器"""
+
+    calls = []
+    lock = threading.Lock()
+
+    def fit(self, X, y):
+        with self.lock:
+            CountingModel.calls.append(len(X))
+        return super().fit(X, y)
+
+
+def test_purged_kfold_covers_every_sample_once():
+    cv = PurgedKFold(n_splits=4, purge=3, embargo=2)
+    X = np.zeros((40, 1))
+    seen = []
+    for train, val in cv.split(X):
+        seen.extend(val)
+        # 検証ブロックの前 purge 件・後 embargo 件は訓練から除外される
+        blocked = set(range(max(0, val[0] - 3), min(40, val[-1] + 1 + 2)))
+        assert blocked.isdisjoint(train)
+    assert sorted(seen) == list(range(40))
+
+
+def test_parallel_oof_matches_serial(data):
+    X, y = data
+    serial = StackingEnsemble([LinearRegression(), Ridge(alpha=0.5)], n_jobs=1)
+    parallel = StackingEnsemble([LinearRegression(), Ridge(alpha=0.5)], n_jobs=4)
+
+    np.testing.assert_allclose(serial._generate_meta_features(X, y), parallel._generate_meta_features(X, y))
+
+
+def test_fit_runs_oof_and_full_fits_in_one_pass(data):
+    X, y = data
+    CountingModel.calls = []
+    base = CountingModel()
+    ensemble = StackingEnsemble([base], n_folds=5, n_jobs=3, cv=PurgedKFold(n_splits=5, embargo=5))
+
+    ensemble.fit(X, y)
+    preds = ensemble.predict(X)
+
+    # 5 フォールド + 全データ 1 回
+    assert len(CountingModel.calls) == 6
+    assert max(CountingModel.calls) == len(X)
+    assert ensemble.base_models[0] is base
+    assert np.corrcoef(preds, y)[0, 1] > 0.95
+
+
+def test_fit_does_not_make_caller_array_read_only(data):
+    X, y = data
+    values = X.to_numpy().copy()
+    StackingEnsemble([LinearRegression()], n_jobs=2).fit(values, y.to_numpy())
+    values[0, 0] = 1.0
+
+
+class ThreadRecordingModel(LinearRegression):
+    """fit 時の n_jobs を記録する推定器"""
+
+    seen = []
+
+    def fit(self, X, y):
+        ThreadRecordingModel.seen.append(self.n_jobs)
+        return super().fit(X, y)
+
+
+def test_base_models_share_cpus_inside_the_pool(data, monkeypatch):
+    X, y = data
+    monkeypatch.setattr("src.ensemble.stacking.os.cpu_count", lambda: 8)
+    ThreadRecordingModel.seen = []
+    base = ThreadRecordingModel(n_jobs=-1)
+
+    StackingEnsemble([base], n_folds=3, n_jobs=4).fit(X, y)
+
+    # 4 ワーカーで 8 CPU を分け合う。元のモデルの設定は fit 後に戻る
+    assert ThreadRecordingModel.seen == [2] * 4
+    assert base.n_jobs == -1
@@ -0,0 +1,193 @@
+"""
+ステージグラフ（メモ化・並行実行）のテスト
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.utils.stage_graph import StageGraph, fingerprint
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    close = 100 + rng.normal(size=120).cumsum()
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": np.full(120, 1000.0)},
+        index=pd.date_range("2024-01-01", periods=120, freq="B"),
+    )
+
+
+class Counter:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def wrap(self, name, func):
+        def stage(*args):
+            with self.lock:
+                self.calls.append(name)
+            return func(*args)
+
+        return stage
+
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def slow(x):
+        barrier.wait()  # 3ステージが同時に走らないと通過できない
+        return x
+
+    graph = StageGraph(max_workers=3)
+    for name in ("a", "b", "c"):
+        graph.add(name, slow, deps=("x",))
+    run = graph.run({"x": 1})
+
+    assert run.values["a"] == run.values["b"] == run.values["c"] == 1
+    assert set(run.timings) == {"a", "b", "c"}
+
+
+def test_unchanged_input_is_served_from_memo(df):
+    counter = Counter()
+    graph = StageGraph()
+    graph.add("features", counter.wrap("features", lambda d: d["Close"].pct_change()), deps=("df",), cache=False)
+    graph.add("model", counter.wrap("model", lambda f, n: float(f.tail(n).mean())), deps=("features", "n"))
+
+    first = graph.run({"df": df, "n": 5}, targets=["model"])
+    second = graph.run({"df": df.copy(), "n": 5}, targets=["model"])
+
+    # キャッシュヒットしたステージの上流（features）も実行されない
+    assert counter.calls == ["features", "model"]
+    assert second.values["model"] == first.values["model"]
+    assert second.cached == {"model"} and second.timings == {}
+    assert graph.get_stats()["model"] == pytest.approx(
+        {"runs": 1, "hits": 1, "total_seconds": first.timings["model"], "last_seconds": first.timings["model"]}
+    )
+
+
+def test_changed_input_recomputes(df):
+    counter = Counter()
+    graph = StageGraph()
+    graph.add("last", counter.wrap("last", lambda d: d["Close"].iloc[-1]), deps=("df",))
+
+    graph.run({"df": df})
+    changed = df.copy()
+    changed.iloc[-1, changed.columns.get_loc("Close")] += 1.0
+    run = graph.run({"df": changed})
+
+    assert counter.calls == ["last", "last"]
+    assert run.values["last"] == changed["Close"].iloc[-1]
+    assert fingerprint(df) != fingerprint(changed)
+
+
+def test_ttl_expires_entries(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.utils.stage_graph.time.monotonic", lambda: clock[0])
+    counter = Counter()
+    graph = StageGraph()
+    graph.add("external", counter.wrap("external", lambda: {"vix": 20.0}), ttl=60)
+
+    graph.run({})
+    clock[0] += 30
+    graph.run({})
+    clock[0] += 61
+    graph.run({})
+
+    assert counter.calls == ["external", "external"]
+
+
+def test_ttl_expiry_invalidates_downstream_stages(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.utils.stage_graph.time.monotonic", lambda: clock[0])
+    counter = Counter()
+    vix = [20.0]
+    graph = StageGraph()
+    graph.add("external", counter.wrap("external", lambda: {"vix": vix[0]}), ttl=60)
+    graph.add("features", counter.wrap("features", lambda ext, n: ext["vix"] * n), deps=("external", "n"), cache=False)
+    graph.add("model", counter.wrap("model", lambda f: f + 1), deps=("features",))
+
+    assert graph.run({"n": 2}, targets=["model"]).values["model"] == 41.0
+    clock[0] += 30
+    assert graph.run({"n": 2}, targets=["model"]).cached == {"model"}
+
+    # 外部データの期限切れ後は、同じ入力でも下流のモデルを作り直す
+    vix[0] = 30.0
+    clock[0] += 61
+    run = graph.run({"n": 2}, targets=["model"])
+
+    assert run.values["model"] == 61.0
+    assert counter.calls == ["external", "features", "model", "external", "features", "model"]
+
+
+def test_failure_skips_dependents_and_is_not_memoized():
+    counter = Counter()
+    attempts = []
+
+    def flaky(x):
+        attempts.append(x)
+        if len(attempts) == 1:
+            raise RuntimeError("feed down")
+        return x * 2
+
+    graph = StageGraph()
+    graph.add("fetch", flaky, deps=("x",))
+    graph.add("use", counter.wrap("use", lambda v: v + 1), deps=("fetch",))
+    graph.add("other", lambda x: x, deps=("x",))
+
+    run = graph.run({"x": 2})
+    assert run.errors["fetch"] == "feed down"
+    assert "upstream" in run.errors["use"]
+    assert run.values["other"] == 2 and counter.calls == []
+
+    run = graph.run({"x": 2})
+    assert run.values["use"] == 5 and not run.errors
+
+
+def test_ensemble_predict_trajectory_reuses_unchanged_stages(df):
+    from src.ensemble_predictor import EnhancedEnsemblePredictor
+
+    class FakePredictor:
+        def __init__(self, change):
+            self.change = change
+            self.calls = 0
+
+        def predict_trajectory(self, data, days_ahead):
+            self.calls += 1
+            price = data["Close"].iloc[-1]
+            preds = [price * (1 + self.change)] * days_ahead
+            return {
+                "current_price": price,
+                "predictions": preds,
+                "peak_price": max(preds),
+                "trend": "UP",
+                "change_pct": self.change * 100,
+            }
+
+    predictor = EnhancedEnsemblePredictor.__new__(EnhancedEnsemblePredictor)
+    predictor._prediction_graph = None
+    predictor.prediction_history = []
+    predictor.performance_history = []
+    for name in ("lstm", "lgbm", "prophet", "transformer"):
+        setattr(predictor, f"{name}_predictor", FakePredictor(0.02))
+    predictor._fetch_external_features = lambda: {}
+    predictor._build_advanced_features = lambda data, external: data
+    predictor._predict_advanced = lambda features, data, days_ahead: {}
+
+    kwargs = dict(days_ahead=5, enable_risk_adjustment=False, enable_xai=False)
+    first = predictor.predict_trajectory(df, **kwargs)
+    second = predictor.predict_trajectory(df, **kwargs)
+
+    assert "error" not in first
+    assert second["predictions"] == first["predictions"]
+    assert first["details"]["models_used"] == ["lstm", "lgbm", "prophet", "transformer", "sma"]
+    assert set(first["details"]["stage_timings"]) >= {"lstm", "lgbm", "prophet", "transformer", "sma"}
+    assert {"lstm", "sma"} <= set(second["details"]["cached_stages"])
+    assert predictor.lgbm_predictor.calls == 1
+
+    predictor.predict_trajectory(df.iloc[:-1], **kwargs)
+    assert predictor.lgbm_predictor.calls == 2
+    assert predictor.get_stage_stats()["lgbm"]["hits"] == 1
@@ -0,0 +1,54 @@
+"""
+起動時インポート時間のベンチマーク
+"""
+
+import pytest
+
+from src.utils.import_profiler import (
+    DEFAULT_BUDGET_SECONDS,
+    ENTRY_POINTS,
+    ImportProfile,
+    check_budget,
+    parse_importtime,
+    profile_imports,
+)
+
+SAMPLE_IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _json
+import time:       300 |        420 |   json
+import time:       900 |        900 |     torch._C
+import time:      5000 |       5900 |   torch
+import time:        50 |       6370 | mypkg
+import time:        10 |         10 | other
+"""
+
+
+def test_parse_importtime_builds_tree():
+    roots = parse_importtime(SAMPLE_IMPORTTIME)
+
+    assert [r.name for r in roots] == ["mypkg", "other"]
+    mypkg = roots[0]
+    assert [c.name for c in mypkg.children] == ["json", "torch"]
+    assert mypkg.children[1].children[0].name == "torch._C"
+    assert mypkg.cumulative_us == 6370
+
+
+def test_profile_reports_heavy_imports_and_budget():
+    profile = ImportProfile("mypkg", 0.5, parse_importtime(SAMPLE_IMPORTTIME))
+
+    assert profile.heavy_imports() == ["torch"]
+    assert profile.top(1)[0].name == "torch"
+    assert any("torch" in p for p in check_budget(profile, budget_seconds=1.0))
+    assert any("cold start" in p for p in check_budget(ImportProfile("x", 2.0, []), budget_seconds=1.0))
+    assert check_budget(ImportProfile("x", 0.2, []), budget_seconds=1.0) == []
+
+
+@pytest.mark.parametrize("entry_point", ["api", "api_legacy", "scheduler"])
+def test_entry_point_cold_start_within_budget(entry_point):
+    profile = profile_imports(ENTRY_POINTS[entry_point])
+    if profile.error and "ModuleNotFoundError" in profile.error:
+        pytest.skip(f"optional dependency missing: {profile.error}")
+
+    # 計測環境の揺らぎを考慮し、予算の2倍までは許容する
+    assert check_budget(profile, budget_seconds=DEFAULT_BUDGET_SECONDS * 2) == []
@@ -0,0 +1,212 @@
+"""
+列指向税務ロットエンジンのテスト
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.tax.lots import TaxLotEngine
+
+
+@pytest.fixture
+def history():
+    rng = np.random.default_rng(0)
+    rows, held = [], {}
+    for i in range(600):
+        symbol = str(rng.choice(["7203", "6758", "9984"]))
+        if held.get(symbol, 0) > 0 and rng.random() < 0.45:
+            quantity = int(rng.integers(1, held[symbol] + 1))
+            held[symbol] -= quantity
+            kind = "sell"
+        else:
+            quantity = int(rng.integers(1, 100))
+            held[symbol] = held.get(symbol, 0) + quantity
+            kind = "buy"
+        rows.append(
+            {
+                "symbol": symbol,
+                "transaction_type": kind,
+                "date": pd.Timestamp("2021-01-01") + pd.Timedelta(days=i * 2),
+                "quantity": quantity,
+                "price": float(rng.uniform(50, 150)),
+                "commission": float(rng.uniform(0, 5)),
+            }
+        )
+    return rows
+
+
+def reference_average(rows):
+    positions, gains = {}, []
+    for r in rows:
+        qty, cost = positions.get(r["symbol"], (0, 0.0))
+        if r["transaction_type"] == "buy":
+            positions[r["symbol"]] = (qty + r["quantity"], cost + r["quantity"] * r["price"] + r["commission"])
+        else:
+            avg = cost / qty
+            gains.append(r["quantity"] * r["price"] - r["commission"] - r["quantity"] * avg)
+            positions[r["symbol"]] = (qty - r["quantity"], cost - r["quantity"] * avg)
+    return gains
+
+
+def reference_fifo(rows):
+    lots, gains = {}, []
+    for r in rows:
+        queue = lots.setdefault(r["symbol"], deque())
+        if r["transaction_type"] == "buy":
+            queue.append([r["quantity"], r["price"] + r["commission"] / r["quantity"]])
+            continue
+        need, cost = r["quantity"], 0.0
+        while need > 0:
+            take = min(need, queue[0][0])
+            cost += take * queue[0][1]
+            queue[0][0] -= take
+            need -= take
+            if queue[0][0] == 0:
+                queue.popleft()
+        gains.append(r["quantity"] * r["price"] - r["commission"] - cost)
+    return gains
+
+
+def test_average_cost_matches_sequential(history):
+    realized = TaxLotEngine("average").ingest(history).realized
+    np.testing.assert_allclose(realized["gain_loss"], reference_average(history), atol=1e-6)
+
+
+def test_fifo_matches_sequential(history):
+    realized = TaxLotEngine("specific").ingest(history).realized
+    np.testing.assert_allclose(realized["gain_loss"], reference_fifo(history), atol=1e-6)
+
+
+def test_explicit_lot_and_oversell():
+    engine = TaxLotEngine("specific").ingest(
+        [
+            {"symbol": "A", "transaction_type": "buy", "date": "2024-01-05", "quantity": 100, "price": 100.0},
+            {"symbol": "A", "transaction_type": "buy", "date": "2024-02-05", "quantity": 100, "price": 200.0},
+            {
+                "symbol": "A",
+                "transaction_type": "sell",
+                "date": "2024-03-05",
+                "quantity": 50,
+                "price": 150.0,
+                "lot_id": "A:2",
+            },
+            {"symbol": "A", "transaction_type": "sell", "date": "2024-04-05", "quantity": 500, "price": 150.0},
+        ]
+    )
+
+    realized = engine.realized
+    assert len(realized) == 1  # 保有を超える売却は除外
+    assert realized["gain_loss"].iloc[0] == pytest.approx(50 * (150 - 200))
+    lots = engine.open_lots().set_index("lot_id")
+    assert lots.loc["A:1", "quantity"] == 100 and lots.loc["A:2", "quantity"] == 50
+
+
+def test_fifo_sells_only_use_lots_bought_before_them():
+    engine = TaxLotEngine("specific").ingest(
+        [
+            {
+                "symbol": "A",
+                "transaction_type": "buy",
+                "date": "2024-01-01",
+                "quantity": 10,
+                "price": 100.0,
+                "lot_id": "L1",
+            },
+            {"symbol": "A", "transaction_type": "sell", "date": "2024-02-01", "quantity": 10, "price": 120.0},
+            {
+                "symbol": "A",
+                "transaction_type": "buy",
+                "date": "2024-03-01",
+                "quantity": 10,
+                "price": 200.0,
+                "lot_id": "L2",
+            },
+            {
+                "symbol": "A",
+                "transaction_type": "sell",
+                "date": "2024-04-01",
+                "quantity": 10,
+                "price": 210.0,
+                "lot_id": "L1",
+            },
+        ]
+    )
+
+    realized = engine.realized
+    # 2月の売却は L1（2,000円ではなく 1,000円）。4月の L1 指定は払い出し済みなので FIFO で L2
+    assert list(realized["cost_basis"]) == pytest.approx([1000.0, 2000.0])
+    assert list(realized["gain_loss"]) == pytest.approx([200.0, 100.0])
+    assert engine.open_lots().empty
+
+
+def test_explicit_and_fifo_sells_match_sequential_order(history):
+    rows = [dict(r) for r in history]
+    # 一部の売却で直近の買付ロットを指定する（その時点で十分残っているもの）
+    queue = {}
+    for r in rows:
+        lots = queue.setdefault(r["symbol"], [])
+        if r["transaction_type"] == "buy":
+            r["lot_id"] = f"{r['symbol']}-{len(lots)}"
+            lots.append([r["lot_id"], r["quantity"], r["price"] + r["commission"] / r["quantity"]])
+        elif lots and lots[-1][1] >= r["quantity"] and r["quantity"] % 3 == 0:
+            r["lot_id"] = lots[-1][0]
+            lots[-1][1] -= r["quantity"]
+            r["expected_cost"] = r["quantity"] * lots[-1][2]
+        else:
+            need, cost = r["quantity"], 0.0
+            for lot in lots:
+                take = min(need, lot[1])
+                lot[1] -= take
+                cost += take * lot[2]
+                need -= take
+            r["expected_cost"] = cost
+
+    realized = TaxLotEngine("specific").ingest([{k: v for k, v in r.items() if k != "expected_cost"} for r in rows])
+    expected = [r["expected_cost"] for r in rows if r["transaction_type"] == "sell"]
+    assert realized.realized["lot_id"].notna().any()
+    np.testing.assert_allclose(realized.realized["cost_basis"], expected, atol=1e-6)
+
+
+def test_year_summary_is_cached_and_includes_dividends(history):
+    engine = TaxLotEngine().ingest(history)
+    engine.add({"symbol": "7203", "transaction_type": "dividend", "date": "2022-03-31", "quantity": 100, "price": 30.0})
+
+    summary = engine.year_summary(2022)
+    by_year = engine.realized_by_year()
+    assert engine.realized_by_year() is by_year
+    assert summary["net_gains"] == pytest.approx(by_year.loc[2022, "total_gains"] - by_year.loc[2022, "total_losses"])
+    assert summary["dividend_gross_income"] == pytest.approx(3000.0)
+    assert engine.year_summary(1999)["n_sales"] == 0
+
+
+def test_rank_loss_harvest_stops_at_target():
+    engine = TaxLotEngine("specific").ingest(
+        [
+            {"symbol": s, "transaction_type": "buy", "date": "2024-01-05", "quantity": 10, "price": p}
+            for s, p in (("A", 100.0), ("B", 100.0), ("C", 100.0), ("D", 100.0))
+        ]
+    )
+    ranked = engine.rank_loss_harvest({"A": 90.0, "B": 50.0, "C": 80.0, "D": 120.0}, target_loss=600)
+
+    assert list(ranked["symbol"]) == ["B", "C"]
+    assert list(ranked["cumulative_loss"]) == [500.0, 700.0]
+
+
+def test_tax_calculator_loss_harvesting_uses_ranking():
+    from src.tax_calculator import TaxCalculator
+
+    positions = pd.DataFrame(
+        {
+            "ticker": ["7203.T", "9984.T", "6758.T"],
+            "quantity": [100, 50, 200],
+            "entry_price": [1500, 3000, 2000],
+            "current_price": [1400, 2800, 1900],
+        }
+    )
+    recs = TaxCalculator().optimize_loss_harvesting(positions, target_loss=15000)
+
+    assert [r["ticker"] for r in recs] == ["6758.T"]
+    assert recs[0]["unrealized_loss"] == -20000
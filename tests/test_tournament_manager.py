@@ -0,0 +1,131 @@
+"""
+VectorizedTournament / TournamentManager のテスト
+"""
+
+import sqlite3
+import time
+
+import numpy as np
+import pytest
+
+from src.trading.tournament_manager import PERSONALITIES, TournamentManager, VectorizedTournament, personality_grid
+
+SIGNALS = [
+    {"ticker": "7203.T", "action": "BUY", "price": 2000.0},
+    {"ticker": "6758.T", "action": "BUY", "price": 13000.0},
+    {"ticker": "7203.T", "action": "BUY", "price": 2100.0},
+    {"ticker": "9984.T", "action": "SELL", "price": 8000.0},
+]
+
+
+def sequential_reference(profile, signals, capital=1000000.0):
+    """PaperTrader を使っていた旧実装と同じ手順の逐次計算"""
+    cash, book = capital, {}
+    for sig in signals:
+        qty_held, avg = book.get(sig["ticker"], (0, 0.0))
+        if sig["action"] == "BUY":
+            qty = int(cash * profile["risk_per_trade"] / sig["price"])
+            if qty > 0:
+                book[sig["ticker"]] = (qty_held + qty, (qty_held * avg + qty * sig["price"]) / (qty_held + qty))
+                cash -= qty * sig["price"]
+        elif qty_held:
+            cash += qty_held * sig["price"]
+            del book[sig["ticker"]]
+    return cash, book
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return TournamentManager(db_path=str(tmp_path / "tournament.db"))
+
+
+def test_vectorized_books_match_sequential_simulation(manager):
+    manager.run_daily_simulation(SIGNALS, date="2024-01-04")
+
+    for acc_id, profile in PERSONALITIES.items():
+        cash, book = sequential_reference(profile, SIGNALS)
+        i = manager.book.account_ids.index(acc_id)
+        assert manager.book.cash[i] == pytest.approx(cash)
+        positions = manager.book.positions(acc_id).set_index("ticker")
+        assert {t: int(q) for t, q in positions["quantity"].items()} == {t: q for t, (q, _) in book.items()}
+        for ticker, (_, avg) in book.items():
+            assert positions.loc[ticker, "avg_price"] == pytest.approx(avg)
+
+
+def test_sell_realizes_pnl_and_marks_to_market(manager):
+    manager.run_daily_simulation([{"ticker": "7203.T", "action": "BUY", "price": 1000.0}], date="2024-01-04")
+    manager.run_daily_simulation([], date="2024-01-05", prices={"7203.T": 1100.0})
+
+    board = manager.get_leaderboard().set_index("Account ID")
+    # 堅実: 現金の2% → 20株、含み益 2,000円
+    assert board.loc["shadow_conservative", "Unrealized PnL"] == pytest.approx(2000.0)
+    assert board.loc["shadow_conservative", "Daily PnL"] == pytest.approx(2000.0)
+    assert board.index[0] == "shadow_aggressive"
+
+    manager.run_daily_simulation([{"ticker": "7203.T", "action": "SELL", "price": 1200.0}], date="2024-01-08")
+    i = manager.book.account_ids.index("shadow_conservative")
+    assert manager.book.realized_pnl[i] == pytest.approx(4000.0)
+    assert manager.book.positions("shadow_conservative").empty
+
+
+def test_one_snapshot_per_day_and_state_survives_restart(tmp_path):
+    db_path = str(tmp_path / "tournament.db")
+    first = TournamentManager(db_path=db_path)
+    first.run_daily_simulation(SIGNALS[:2], date="2024-01-04")
+    first.run_daily_simulation(SIGNALS[:2], date="2024-01-04")  # 同日の再実行は上書き
+    first.run_daily_simulation([], date="2024-01-05")
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tournament_equity").fetchone()[0] == 2 * len(PERSONALITIES)
+
+    second = TournamentManager(db_path=db_path)
+    np.testing.assert_allclose(second.book.cash, first.book.cash)
+    np.testing.assert_array_equal(second.book.quantity, first.book.quantity)
+    assert list(second.get_equity_history("shadow_aggressive")["date"]) == ["2024-01-04", "2024-01-05"]
+
+
+def test_rerunning_a_day_does_not_apply_its_signals_twice(tmp_path):
+    db_path = str(tmp_path / "tournament.db")
+    once = TournamentManager(db_path=str(tmp_path / "once.db"))
+    once.run_daily_simulation(SIGNALS[:1], date="2024-01-04")
+    once.run_daily_simulation(SIGNALS[1:3], date="2024-01-05")
+
+    rerun = TournamentManager(db_path=db_path)
+    rerun.run_daily_simulation(SIGNALS[:1], date="2024-01-04")
+    rerun.run_daily_simulation(SIGNALS[1:3], date="2024-01-05")
+    # 再起動後の再実行でも、前日終了時点の帳簿からやり直す
+    rerun = TournamentManager(db_path=db_path)
+    rerun.run_daily_simulation(SIGNALS[1:3], date="2024-01-05")
+
+    np.testing.assert_allclose(rerun.book.cash, once.book.cash)
+    np.testing.assert_array_equal(rerun.book.quantity, once.book.quantity)
+    np.testing.assert_allclose(rerun.book.avg_price, once.book.avg_price)
+    board = rerun.get_leaderboard().set_index("Account ID")
+    assert board.loc["shadow_conservative", "Daily PnL"] == pytest.approx(
+        once.get_leaderboard().set_index("Account ID").loc["shadow_conservative", "Daily PnL"]
+    )
+
+    with pytest.raises(ValueError):
+        rerun.run_daily_simulation(SIGNALS[:1], date="2024-01-04")
+
+
+def test_hundreds_of_variants(tmp_path):
+    variants = personality_grid(
+        risk_per_trade=np.linspace(0.01, 0.2, 10),
+        stop_loss=[0.03, 0.05, 0.1, 0.15],
+        take_profit=[0.1, 0.2, 0.3, 0.5, 1.0],
+    )
+    assert len(variants) == 200
+
+    book = VectorizedTournament(variants, db_path=str(tmp_path / "tournament.db"))
+    signals = [
+        {"ticker": f"{1000 + i}.T", "action": "BUY" if i % 3 else "SELL", "price": 500.0 + i} for i in range(100)
+    ]
+    start = time.time()
+    for day in range(1, 6):
+        book.run_day(signals, date=f"2024-02-0{day}")
+    assert time.time() - start < 5
+
+    board = book.leaderboard()
+    assert len(board) == 200
+    assert (book.cash >= 0).all()
@@ -0,0 +1,109 @@
+"""
+WalkForwardValidator のテスト
+"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from src.walk_forward import WalkForwardValidator, compute_metrics
+
+
+@pytest.fixture
+def dataset():
+    rng = np.random.default_rng(0)
+    idx = pd.bdate_range("2018-01-01", periods=900)
+    x1 = rng.normal(size=len(idx))
+    x2 = rng.normal(size=len(idx))
+    target = 0.5 * x1 - 0.2 * x2 + rng.normal(scale=0.1, size=len(idx))
+    return pd.DataFrame({"x1": x1, "x2": x2, "target": target}, index=idx)
+
+
+def _mask_splits(df, validator):
+    """旧実装（ブールマスク）による分割"""
+    splits = []
+    current = df.index.min() + timedelta(days=validator.train_period_days)
+    while current + timedelta(days=validator.test_period_days) <= df.index.max():
+        train = df[(df.index >= current - timedelta(days=validator.train_period_days)) & (df.index < current)]
+        test = df[(df.index >= current) & (df.index < current + timedelta(days=validator.test_period_days))]
+        if not train.empty and not test.empty:
+            splits.append((train, test))
+        current += timedelta(days=validator.step_days)
+    return splits
+
+
+def test_positional_splits_match_mask_splits(dataset):
+    validator = WalkForwardValidator(train_period_days=365, test_period_days=30, step_days=30)
+
+    expected = _mask_splits(dataset, validator)
+    actual = validator.split_time_series(dataset)
+
+    assert len(actual) == len(expected) > 0
+    for (tr, te), (etr, ete) in zip(actual, expected):
+        assert tr.index.equals(etr.index)
+        assert te.index.equals(ete.index)
+
+
+def test_split_indices_are_contiguous_ranges(dataset):
+    validator = WalkForwardValidator(train_period_days=365, test_period_days=30, step_days=30)
+    for train, test in validator.split_indices(dataset.index):
+        assert train.stop == test.start
+        assert dataset.index[train.stop - 1] - dataset.index[train.start] < pd.Timedelta(days=365)
+
+
+def test_compute_metrics_directional_accuracy():
+    preds = np.array([1.0, -1.0, 0.5, 0.0])
+    actuals = np.array([2.0, 1.0, 0.1, 1.0])
+    metrics = compute_metrics(preds, actuals)
+
+    assert metrics["directional_accuracy"] == pytest.approx(0.5)
+    assert metrics["total_predictions"] == 4
+    assert metrics["mae"] == pytest.approx(np.mean(np.abs(actuals - preds)))
+
+
+def test_parallel_validation_matches_serial(dataset):
+    validator = WalkForwardValidator(train_period_days=365, test_period_days=60, step_days=60)
+
+    serial = validator.validate_model(LinearRegression(), dataset, ["x1", "x2"], n_jobs=1)
+    parallel = validator.validate_model(LinearRegression(), dataset, ["x1", "x2"], n_jobs=2)
+
+    assert serial["num_splits"] == parallel["num_splits"] > 1
+    assert serial["total_predictions"] == parallel["total_predictions"]
+    assert serial["rmse"] == pytest.approx(parallel["rmse"])
+    assert serial["directional_accuracy"] > 0.8
+
+
+def test_unpicklable_model_falls_back_to_serial(dataset):
+    class LocalRegression(LinearRegression):
+        pass
+
+    validator = WalkForwardValidator(train_period_days=365, test_period_days=60, step_days=60)
+
+    result = validator.validate_model(LocalRegression(), dataset, ["x1", "x2"], n_jobs=2)
+
+    assert result["num_splits"] > 1
+    assert result["directional_accuracy"] > 0.8
+
+
+def test_expanding_window_validation(dataset):
+    validator = WalkForwardValidator(test_period_days=20, step_days=20)
+    metrics = validator.expanding_window_validation(LinearRegression(), dataset, ["x1", "x2"], min_train_size=252)
+
+    assert metrics["total_predictions"] == len(dataset) - 252
+    assert "rmse" not in metrics
+
+
+def test_warm_start_continues_lightgbm_booster(dataset):
+    lgb = pytest.importorskip("lightgbm")
+    validator = WalkForwardValidator(train_period_days=365, test_period_days=60, step_days=60)
+    model = lgb.LGBMRegressor(n_estimators=20, verbose=-1)
+
+    metrics = validator.validate_model(model, dataset, ["x1", "x2"], warm_start=True)
+
+    assert metrics["num_splits"] > 1
+    # 各フォールドで木が追加されていく
+    assert model.booster_.num_trees() == 20 * metrics["num_splits"]
+    assert metrics["directional_accuracy"] > 0.7